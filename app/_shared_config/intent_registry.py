@@ -3,51 +3,89 @@ Intent Registry Service - Singleton service for loading and accessing intents re
 
 This service provides runtime access to the dynamic categories and intents structure,
 fetched directly from the database (documents metadata).
+
+The registry is published as an immutable, versioned RegistrySnapshot. Reloads build
+a complete new snapshot off to the side and swap it in with a single assignment, so
+readers never observe a half-updated registry. Reloads can be triggered in the
+background (schedule_reload) and across workers via Postgres LISTEN/NOTIFY.
 """
 
 import asyncio
 import logging
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timezone
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable
 import psycopg
 
 from app.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Postgres channel used to tell every worker that documents metadata changed
+REGISTRY_NOTIFY_CHANNEL = "intent_registry_changed"
+
+RegistryListener = Callable[["RegistrySnapshot"], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class RegistrySnapshot:
+    """Immutable view of the registry. Replaced as a whole on reload."""
+    version: int = 0
+    categories: Tuple[str, ...] = ()
+    intents: Tuple[str, ...] = ()
+    category_to_intents: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    intent_to_category: Dict[str, str] = field(default_factory=dict)
+    category_descriptions: Dict[str, str] = field(default_factory=dict)
+    loaded_at: Optional[datetime] = None
+
+    def same_structure(self, other: "RegistrySnapshot") -> bool:
+        return (
+            self.categories == other.categories
+            and self.intents == other.intents
+            and self.category_to_intents == other.category_to_intents
+        )
+
+
 class IntentRegistryService:
     """
     Singleton service for managing the intent registry.
-    
+
     Provides:
     - Loading/reloading of the registry from Database
     - Access to categories and intents lists
     - Enrichment maps for semantic classification
-    - In-memory caching of the structure
+    - In-memory caching of the structure as a versioned snapshot
+    - Change notifications for consumers holding derived data (label embeddings)
     """
-    
+
     _instance: Optional['IntentRegistryService'] = None
-    _initialized: bool = False
-    
-    # Cached data
-    _categories: List[str] = []
-    _intents: List[str] = []
-    _category_to_intents: Dict[str, List[str]] = {}
-    _intent_to_category: Dict[str, str] = {}
-    _category_descriptions: Dict[str, str] = {}
-    _last_loaded_at: Optional[datetime] = None
+
+    _snapshot: RegistrySnapshot = RegistrySnapshot()
     _loading_lock = asyncio.Lock()
-    
+    _listeners: List[RegistryListener] = []
+    _reload_task: Optional[asyncio.Task] = None
+    _reload_pending: bool = False
+    _listener_task: Optional[asyncio.Task] = None
+
     def __new__(cls) -> 'IntentRegistryService':
         if cls._instance is None:
             cls._instance = super(IntentRegistryService, cls).__new__(cls)
         return cls._instance
-    
+
     @property
     def is_loaded(self) -> bool:
         """Check if registry is loaded."""
-        return self._last_loaded_at is not None
-    
+        return self._snapshot.loaded_at is not None
+
+    @property
+    def snapshot(self) -> RegistrySnapshot:
+        """Current immutable registry snapshot."""
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
     async def initialize(self) -> bool:
         """Async initialization."""
         async with self._loading_lock:
@@ -57,7 +95,79 @@ class IntentRegistryService:
         """Force reload the registry from DB."""
         async with self._loading_lock:
             return await self._load_registry_from_db()
-            
+
+    def subscribe(self, listener: RegistryListener) -> None:
+        """Register a coroutine called with the new snapshot after each change."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def schedule_reload(self) -> None:
+        """
+        Reload in the background without blocking the caller.
+        Bursts of triggers while a reload is running collapse into one extra reload.
+        """
+        if self._reload_task is not None and not self._reload_task.done():
+            IntentRegistryService._reload_pending = True
+            return
+        IntentRegistryService._reload_task = asyncio.create_task(self._background_reload())
+
+    async def _background_reload(self) -> None:
+        while True:
+            IntentRegistryService._reload_pending = False
+            await self.reload()
+            if not self._reload_pending:
+                break
+
+    async def notify_changed(self, reload_local: bool = True) -> None:
+        """
+        Announce that documents metadata changed (e.g. after an ingestion commit).
+        Other workers pick it up through LISTEN; this worker reloads right away
+        unless reload_local is False (caller already reloaded).
+        """
+        try:
+            from app.storage.connection import get_db_connection
+            async with get_db_connection() as conn:
+                await conn.execute(f"NOTIFY {REGISTRY_NOTIFY_CHANNEL}")
+        except Exception as e:
+            logger.warning(f"[IntentRegistry] NOTIFY failed: {e}")
+        if reload_local:
+            self.schedule_reload()
+
+    async def start_listener(self) -> None:
+        """Start the LISTEN loop that reloads the registry on NOTIFY from any worker."""
+        if not settings.DATABASE_URL:
+            return
+        if self._listener_task is None or self._listener_task.done():
+            IntentRegistryService._listener_task = asyncio.create_task(self._listen_loop())
+
+    async def stop_listener(self) -> None:
+        task = self._listener_task
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            IntentRegistryService._listener_task = None
+
+    async def _listen_loop(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                # LISTEN needs a dedicated connection held for the lifetime of the loop
+                async with await psycopg.AsyncConnection.connect(settings.DATABASE_URL, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {REGISTRY_NOTIFY_CHANNEL}")
+                    logger.info(f"[IntentRegistry] Listening on '{REGISTRY_NOTIFY_CHANNEL}'")
+                    backoff = 1.0
+                    async for _ in conn.notifies():
+                        self.schedule_reload()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[IntentRegistry] Listener error, retrying in {backoff:.0f}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+
     async def _load_registry_from_db(self) -> bool:
         """
         Fetch unique categories and their associated intents from the documents table
@@ -69,27 +179,7 @@ class IntentRegistryService:
 
         try:
             # 1. Fetch Structure
-            categories_intents: Dict[str, List[str]] = {}
-            
-            async with await psycopg.AsyncConnection.connect(settings.DATABASE_URL, autocommit=True) as conn:
-                async with conn.cursor() as cur:
-                    await cur.execute("""
-                        SELECT 
-                            COALESCE(metadata->>'category', 'unknown') as category,
-                            COALESCE(metadata->>'intent', 'unknown') as intent
-                        FROM documents
-                        WHERE metadata->>'category' IS NOT NULL
-                        GROUP BY metadata->>'category', metadata->>'intent'
-                    """)
-                    
-                    rows = await cur.fetchall()
-                    for cat, intent in rows:
-                        if not cat: continue
-                        if cat not in categories_intents:
-                            categories_intents[cat] = []
-                        
-                        if intent and intent != 'unknown' and intent not in categories_intents[cat]:
-                            categories_intents[cat].append(intent)
+            categories_intents = await self._fetch_structure()
 
             # 2. Build Internal Structures
             new_categories = []
@@ -101,90 +191,143 @@ class IntentRegistryService:
             for cat, intents in sorted(categories_intents.items()):
                 new_categories.append(cat)
                 sorted_intents = sorted(intents)
-                new_cat_to_intents[cat] = sorted_intents
-                
+                new_cat_to_intents[cat] = tuple(sorted_intents)
+
                 # Generate Description
                 new_descriptions[cat] = self._generate_description(cat, sorted_intents)
-                
+
                 for intent in sorted_intents:
                     if intent not in new_intents:
                         new_intents.append(intent)
                     new_intent_to_cat[intent] = cat
 
-            # 3. Apply Update
-            self._categories = new_categories
-            self._intents = new_intents
-            self._category_to_intents = new_cat_to_intents
-            self._intent_to_category = new_intent_to_cat
-            self._category_descriptions = new_descriptions
-            self._last_loaded_at = datetime.now(timezone.utc)
-            
-            logger.info(f"[IntentRegistry] Loaded from DB: {len(self._categories)} categories, {len(self._intents)} intents")
+            # 3. Apply Update (single reference swap)
+            current = self._snapshot
+            candidate = RegistrySnapshot(
+                version=current.version,
+                categories=tuple(new_categories),
+                intents=tuple(new_intents),
+                category_to_intents=new_cat_to_intents,
+                intent_to_category=new_intent_to_cat,
+                category_descriptions=new_descriptions,
+                loaded_at=datetime.now(timezone.utc)
+            )
+            changed = current.loaded_at is None or not current.same_structure(candidate)
+            if changed:
+                candidate = replace(candidate, version=current.version + 1)
+            IntentRegistryService._snapshot = candidate
+
+            logger.info(
+                f"[IntentRegistry] Loaded from DB: {len(candidate.categories)} categories, "
+                f"{len(candidate.intents)} intents (v{candidate.version}, changed={changed})"
+            )
+            if changed:
+                self._fire_listeners(candidate)
             return True
 
         except Exception as e:
             logger.error(f"[IntentRegistry] Error loading from DB: {e}")
             return False
 
+    async def _fetch_structure(self) -> Dict[str, List[str]]:
+        """Category -> intents found in the documents table."""
+        from app.storage.connection import get_db_connection
+
+        categories_intents: Dict[str, List[str]] = {}
+        async with get_db_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("""
+                    SELECT
+                        COALESCE(metadata->>'category', 'unknown') as category,
+                        COALESCE(metadata->>'intent', 'unknown') as intent
+                    FROM documents
+                    WHERE metadata->>'category' IS NOT NULL
+                    GROUP BY metadata->>'category', metadata->>'intent'
+                """)
+
+                rows = await cur.fetchall()
+                for cat, intent in rows:
+                    if not cat: continue
+                    if cat not in categories_intents:
+                        categories_intents[cat] = []
+
+                    if intent and intent != 'unknown' and intent not in categories_intents[cat]:
+                        categories_intents[cat].append(intent)
+        return categories_intents
+
+    def _fire_listeners(self, snapshot: RegistrySnapshot) -> None:
+        for listener in list(self._listeners):
+            asyncio.create_task(self._run_listener(listener, snapshot))
+
+    @staticmethod
+    async def _run_listener(listener: RegistryListener, snapshot: RegistrySnapshot) -> None:
+        try:
+            await listener(snapshot)
+        except Exception as e:
+            logger.error(f"[IntentRegistry] Listener failed for v{snapshot.version}: {e}")
+
     def _generate_description(self, category: str, intents: List[str]) -> str:
         """Generate description locally (same logic as old RegistryGenerator)."""
         readable_name = category.replace("_", " ").replace("-", " ").title()
         description = f"Questions related to {readable_name}"
-        
+
         if intents:
             top_intents = [
-                i.replace("_", " ").replace("-", " ").lower() 
+                i.replace("_", " ").replace("-", " ").lower()
                 for i in intents[:3] # Limit to 3 for brevity in description
             ]
             if top_intents:
                 description += f", including {', '.join(top_intents)}"
                 if len(intents) > 3:
                     description += ", and others"
-        
+
         return description + "."
 
     # --- Synchronous Accessors (Assumption: Data is loaded) ---
     # These method calls assume initialize() has been called during app startup.
     # If not loaded, they return empty/None gracefully or could raise error.
-    
+
     @property
     def categories(self) -> List[str]:
-        return self._categories.copy()
-    
+        return list(self._snapshot.categories)
+
     @property
     def intents(self) -> List[str]:
-        return self._intents.copy()
-    
+        return list(self._snapshot.intents)
+
     def get_intents_for_category(self, category: str) -> List[str]:
-        return self._category_to_intents.get(category, []).copy()
-    
+        return list(self._snapshot.category_to_intents.get(category, ()))
+
     def get_category_for_intent(self, intent: str) -> Optional[str]:
-        return self._intent_to_category.get(intent)
-    
+        return self._snapshot.intent_to_category.get(intent)
+
     def get_category_description(self, category: str) -> Optional[str]:
-        return self._category_descriptions.get(category)
-    
+        return self._snapshot.category_descriptions.get(category)
+
     @property
     def metadata(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
         return {
-            "generated_at": str(self._last_loaded_at),
+            "generated_at": str(snapshot.loaded_at),
+            "version": snapshot.version,
             "source_db": "postgres:documents",
-            "total_categories": len(self._categories),
-            "total_intents": len(self._intents)
+            "total_categories": len(snapshot.categories),
+            "total_intents": len(snapshot.intents)
         }
 
-    def get_enrichment_maps(self) -> Tuple[Dict[str, str], Dict[str, str]]:
+    def get_enrichment_maps(self, snapshot: Optional[RegistrySnapshot] = None) -> Tuple[Dict[str, str], Dict[str, str]]:
         """Generate enrichment maps from in-memory data."""
+        snapshot = snapshot or self._snapshot
         intent_map: Dict[str, str] = {}
         category_map: Dict[str, str] = {}
-        
-        for cat, desc in self._category_descriptions.items():
+
+        for cat, desc in snapshot.category_descriptions.items():
             category_map[cat] = f"{cat} {desc}"
-        
-        for intent in self._intents:
+
+        for intent in snapshot.intents:
             readable = intent.replace('_', ' ').replace('-', ' ')
             intent_map[intent] = readable
-            
+
         return intent_map, category_map
 
 
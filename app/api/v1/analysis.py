@@ -210,7 +210,12 @@ async def update_draft_chunks(
         raise HTTPException(status_code=404, detail="Draft not found or no updates applied")
         
     return Envelope(
-        data={"status": "updated", "draft_id": draft_id, "updated_count": len(updates)},
+        data={
+            "status": "updated",
+            "draft_id": draft_id,
+            "updated_count": len(result["items"]),
+            "version": result["draft"]["version"]
+        },
         meta=MetaResponse(trace_id=trace_id)
     )
 
@@ -271,24 +276,20 @@ async def classify_draft_zeroshot(
         return Envelope(data={"categories": []}, meta=MetaResponse(trace_id=trace_id))
     
     # 2. Get System Taxonomy
-    from app.services.taxonomy import TaxonomyService
-    taxonomy_service = TaxonomyService()
-    categories = await taxonomy_service.get_all_categories()
+    from app.services.taxonomy import taxonomy_service
+    snapshot = await taxonomy_service.snapshot()
     
-    if not categories:
+    if not snapshot.categories:
         raise HTTPException(status_code=400, detail="No system taxonomy found. Please define categories and intents first.")
     
     # Build taxonomy structure
     from app.services.classification.zeroshot_service import CategoryIntent, ZeroShotClassificationService
     
-    taxonomy = []
-    for cat in categories:
-        intents = await taxonomy_service.get_intents_by_category(cat["id"])
-        if intents:
-            taxonomy.append(CategoryIntent(
-                name=cat["name"],
-                intents=[i["name"] for i in intents]
-            ))
+    taxonomy = [
+        CategoryIntent(name=name, intents=list(snapshot.intents[name]))
+        for name in snapshot.categories
+        if snapshot.intents[name]
+    ]
     
     if not taxonomy:
         raise HTTPException(status_code=400, detail="No intents found in system taxonomy")
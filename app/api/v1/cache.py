@@ -6,6 +6,7 @@ from redis import asyncio as aioredis
 from app.api.v1.models import Envelope, MetaResponse
 from app.settings import settings
 from app.services.cache.manager import get_cache_manager
+from app.services.redis_pool import get_redis_manager
 
 router = APIRouter(tags=["Cache"])
 
@@ -14,6 +15,7 @@ class CacheStatus(BaseModel):
     total_keys: int
     hit_rate: Optional[float] = None
     connected: bool
+    redis_pools: Optional[Dict[str, Any]] = None
 
 @router.get("/cache/session_state", response_model=Envelope[List[Dict[str, Any]]])
 async def get_session_state(
@@ -176,7 +178,7 @@ async def get_cache_status(request: Request):
         health = await manager.health_check()
         
         # Stats from manager
-        stats = manager.get_stats()
+        stats = await manager.get_aggregated_stats()
         hit_rate = 0.0
         
         if stats:
@@ -197,13 +199,19 @@ async def get_cache_status(request: Request):
         total_keys = 0
         if manager.redis.is_available():
             total_keys = await manager.redis.dbsize()
+
+        # Named pool utilization, pipelining and client-side cache counters
+        redis_manager = get_redis_manager()
+        redis_pools = redis_manager.stats()
+        redis_pools["health"] = await redis_manager.health_check()
         
         return Envelope(
             data=CacheStatus(
                 memory_usage_mb=round(used_memory / 1024 / 1024, 2),
                 total_keys=total_keys, 
                 hit_rate=hit_rate,
-                connected=health.get("status") == "healthy"
+                connected=health.get("status") == "healthy",
+                redis_pools=redis_pools
             ),
             meta=MetaResponse(trace_id=trace_id)
         )
@@ -15,6 +15,7 @@ from app.settings import settings
 from app.api.v1.models import Envelope, MetaResponse
 from app.observability.filtered_handler import FilteredLangfuseHandler
 from app.api.v1.limiter import standard_limiter, strict_limiter
+from app.services.streaming import StreamChannel, stream_channel_context
 
 router = APIRouter(tags=["Chat"])
 logger = logging.getLogger(__name__)
@@ -182,18 +183,14 @@ async def chat_completions(request: Request, body: ChatCompletionRequest, backgr
 async def chat_stream(request: Request, body: ChatCompletionRequest):
     """
     SSE Stream generation.
+
+    The graph runs in a background task inside a per-request stream channel:
+    pre-generation nodes produce status frames as they complete and the
+    generation node writes tokens straight into the channel, which this
+    response drains.
     """
     trace_id = request.state.trace_id
     
-    # Streaming requires modifying the graph execution to yield tokens or using callback events.
-    # Since rag_graph is a compiled LangGraph, we can use astream_events or similar.
-    # For now, if the graph doesn't fully support token-by-token streaming easily to API, 
-    # we might simulate it or use ainvoke and yield chunks if supported.
-    # Assuming 'astream' is available on the compiled graph for standard output.
-    
-    # NOTE: LangGraph objects support .astream() but usually yield state updates, not tokens directly unless configured.
-    # We might need to iterate over specific events.
-    
     async def event_generator():
         # Resolving identity first
         internal_user_id = await IdentityManager.resolve_identity(
@@ -222,43 +219,39 @@ async def chat_stream(request: Request, body: ChatCompletionRequest):
         }
 
         final_state = {}
+        stream = StreamChannel()
+
+        async def run_graph():
+            # Node tasks inherit the context, so the generation node finds the channel
+            with stream_channel_context(stream):
+                try:
+                    async for update in rag_graph.astream(
+                        input_state,
+                        stream_mode="updates",
+                        config={"callbacks": [], "run_name": "api_chat_stream"}
+                    ):
+                        for node_name, node_output in update.items():
+                            if isinstance(node_output, dict):
+                                final_state.update(node_output)
+                            stream.node_completed(node_name)
+                finally:
+                    stream.close()
+
+        graph_task = asyncio.create_task(run_graph())
 
         try:
-            async for event in rag_graph.astream_events(
-                input_state, 
-                version="v1",
-                config={"callbacks": [], "run_name": "api_chat_stream"}
-            ):
-                kind = event["event"]
-                tags = event.get("tags", [])
-                
-                # Filter tokens: only allow generation or clarification LLMs
-                if kind == "on_chat_model_stream":
-                    if "generation_llm" in tags or "clarification_llm" in tags:
-                        content = event["data"]["chunk"].content
-                        if content:
-                            yield f"data: {json.dumps({'token': content, 'trace_id': trace_id}, ensure_ascii=False)}\n\n"
-                
-                # Capture state updates to get final metadata
-                elif kind == "on_chain_stream" and event["name"] == "LangGraph":
-                    # In astream_events, the graph itself emits state updates
-                    chunk = event["data"]["chunk"]
-                    if chunk and isinstance(chunk, dict):
-                        final_state.update(chunk)
-                
-                # Manual capture of node outputs to ensure we have the latest answer
-                # This is a fallback in case the graph end event doesn't contain the full state
-                elif kind == "on_chain_end": 
-                    name = event.get("name")
-                    output = event["data"].get("output")
-                    if output and isinstance(output, dict):
-                        # specific node captures or general update
-                        # We blindly update because State keys are global and we want the latest
-                        final_state.update(output)
-                    
-                    if name == "api_chat_stream":
-                        # logic to handle graph completion if needed, though we updated incrementally
-                        pass
+            async for frame in stream.frames():
+                frame["trace_id"] = trace_id
+                yield f"data: {json.dumps(frame, ensure_ascii=False)}\n\n"
+            await graph_task
+            logger.debug(
+                f"Stream finished: first token at {stream.first_token_ms} ms, {stream.tokens_sent} token frames"
+            )
+
+            # Answers that did not come from the generation node (cache hit, blocked input);
+            # a guard block before the first sentence already sent the fallback as a replace frame
+            if not stream.tokens_sent and not stream.replaced and final_state.get("answer"):
+                yield f"data: {json.dumps({'token': final_state['answer'], 'trace_id': trace_id}, ensure_ascii=False)}\n\n"
 
             # After the loop, send the final complete object and DONE signal
             # Process sources from final state
@@ -309,6 +302,10 @@ async def chat_stream(request: Request, body: ChatCompletionRequest):
             logger.error(f"Streaming error: {e}", exc_info=True)
             err_payload = {"error": str(e), "trace_id": trace_id}
             yield f"data: {json.dumps(err_payload, ensure_ascii=False)}\n\n"
+        finally:
+            # Client went away: stop the pipeline instead of generating into the void
+            if not graph_task.done():
+                graph_task.cancel()
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
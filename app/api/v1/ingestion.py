@@ -6,8 +6,11 @@ import tempfile
 import os
 import json
 
-from app.api.v1.models import Envelope, MetaResponse
-from app.services.staging import staging_service
+from app.api.v1.models import Envelope, MetaResponse, PaginationMeta
+from app.services.staging import staging_service, DraftVersionConflict
+from app.services.ingestion.pipeline import IngestionProgress
+from app.services.qa_validators.near_duplicate_index import get_near_duplicate_index
+from app.logging_config import logger
 from app.services.document_processing import DocumentProcessingService
 from app.services.webhook_service import WebhookService
 from app.utils.file_security import validate_file_type, sanitize_filename
@@ -41,10 +44,27 @@ class ManualChunksAdd(BaseModel):
 
 class ChunkUpdateBatch(BaseModel):
     updates: List[ChunkUpdate]
+    expected_version: Optional[int] = Field(None, description="Reject with 409 if the draft changed since this version")
     
 class CommitRequest(BaseModel):
     draft_id: str
     action: str = Field("commit", pattern="^commit$")
+    background: bool = Field(False, description="Return a job_id right away and ingest in the background")
+
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    status: str
+    source: Optional[str] = None
+    parsed: int = 0
+    skipped: int = 0
+    embedded: int = 0
+    written: int = 0
+    batches: int = 0
+    started_at: Optional[float] = None
+    updated_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
 
 class KnowledgeResponse(BaseModel):
     file_id: Optional[str] = None
@@ -52,6 +72,7 @@ class KnowledgeResponse(BaseModel):
     filename: Optional[str] = None
     extracted_pairs: Optional[List[Dict[str, Any]]] = None
     total_pairs: int
+    version: Optional[int] = None
 
 class ContractResponse(BaseModel):
     supported_formats: List[str]
@@ -154,6 +175,15 @@ async def upload_file(request: Request, background_tasks: BackgroundTasks, file:
         # Process file using valid pipeline (Loader -> Analyzer -> Extractor)
         pairs = await DocumentProcessingService.process_file(tmp_path, original_filename=safe_filename)
 
+        # Flag pairs that already exist in the knowledge base (reviewers decide in staging)
+        try:
+            matches = await get_near_duplicate_index().check(pairs)
+            for pair, match in zip(pairs, matches):
+                if match:
+                    pair.metadata["near_duplicate_of"] = match
+        except Exception as e:
+            logger.warning("Near-duplicate check failed", extra={"filename": safe_filename, "error": str(e)})
+
         # Convert ProcessedQAPair objects to dicts for staging
         pairs_dicts = [
             {"question": p.question, "answer": p.answer, "metadata": p.metadata}
@@ -239,7 +269,8 @@ async def list_drafts(
             draft_id=d.get("draft_id"),
             filename=d.get("filename"),
             extracted_pairs=d.get("chunks"),
-            total_pairs=len(d.get("chunks", []))
+            total_pairs=len(d.get("chunks", [])),
+            version=d.get("version")
         ))
         
     return Envelope(
@@ -265,7 +296,8 @@ async def create_draft(request: Request, body: ManualDraftCreate):
                 draft_id=draft["draft_id"],
                 filename=draft.get("filename"),
                 extracted_pairs=draft["chunks"],
-                total_pairs=len(draft["chunks"])
+                total_pairs=len(draft["chunks"]),
+                version=draft.get("version")
             ),
             meta=MetaResponse(trace_id=trace_id)
         )
@@ -289,7 +321,8 @@ async def get_draft(request: Request, draft_id: str):
             draft_id=draft.get("draft_id"),
             filename=draft.get("filename"),
             extracted_pairs=draft.get("chunks"),
-            total_pairs=len(draft.get("chunks", []))
+            total_pairs=len(draft.get("chunks", [])),
+            version=draft.get("version")
         ),
         meta=MetaResponse(trace_id=trace_id)
     )
@@ -312,29 +345,72 @@ async def delete_draft(request: Request, draft_id: str):
 
 # --- Chunk Management ---
 
+@router.get("/ingestion/staging_draft/{draft_id}/chunks", response_model=Envelope[KnowledgeResponse])
+async def list_draft_chunks(
+    request: Request,
+    draft_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """
+    Page through the chunks of a draft in order.
+    """
+    trace_id = getattr(request.state, "trace_id", None)
+
+    page = await staging_service.list_chunks(draft_id, offset=offset, limit=limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Draft not found")
+
+    draft = page["draft"]
+    return Envelope(
+        data=KnowledgeResponse(
+            file_id=draft.get("file_id"),
+            draft_id=draft.get("draft_id"),
+            filename=draft.get("filename"),
+            extracted_pairs=page["items"],
+            total_pairs=page["total"],
+            version=draft.get("version")
+        ),
+        meta=MetaResponse(
+            trace_id=trace_id,
+            pagination=PaginationMeta(limit=limit, offset=offset, total=page["total"])
+        )
+    )
+
+def _written_response(result: Dict[str, Any], trace_id: Optional[str]) -> Envelope[KnowledgeResponse]:
+    """Envelope for a chunk write: only the touched chunks, plus the draft's version and size."""
+    draft = result["draft"]
+    return Envelope(
+        data=KnowledgeResponse(
+            file_id=draft.get("file_id"),
+            draft_id=draft.get("draft_id"),
+            filename=draft.get("filename"),
+            extracted_pairs=result["items"],
+            total_pairs=result["total"],
+            version=draft.get("version")
+        ),
+        meta=MetaResponse(trace_id=trace_id)
+    )
+
 @router.post("/ingestion/staging_draft/{draft_id}/chunks", response_model=Envelope[KnowledgeResponse])
 async def add_chunks_to_draft(request: Request, draft_id: str, body: ManualChunksAdd):
     """
     Add chunks to an existing draft.
+
+    Returns the added chunks with the draft's new version and total_pairs;
+    page through GET .../chunks for the rest.
     """
     trace_id = getattr(request.state, "trace_id", None)
     chunks_data = [c.model_dump() for c in body.chunks]
     
     try:
-        draft = await staging_service.add_chunks(draft_id, chunks_data)
-        if not draft:
+        result = await staging_service.add_chunks(draft_id, chunks_data)
+        if not result:
              raise HTTPException(status_code=404, detail="Draft not found")
              
-        return Envelope(
-            data=KnowledgeResponse(
-                file_id=draft["file_id"],
-                draft_id=draft["draft_id"],
-                filename=draft.get("filename"),
-                extracted_pairs=draft["chunks"],
-                total_pairs=len(draft["chunks"])
-            ),
-            meta=MetaResponse(trace_id=trace_id)
-        )
+        return _written_response(result, trace_id)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -358,49 +434,65 @@ async def delete_chunk_from_draft(request: Request, draft_id: str, chunk_id: str
 async def update_chunks_in_draft(request: Request, draft_id: str, body: ChunkUpdateBatch):
     """
     Update multiple chunks in a draft.
+
+    Returns the updated chunks with the draft's new version and total_pairs;
+    page through GET .../chunks for the rest.
     """
     trace_id = getattr(request.state, "trace_id", None)
     
     try:
-        current_draft = None
-        # Loop through updates as service updates one by one (or check if batch exists)
-        # Service has update_chunk (single) and update_chunk_metadata_batch (batch metadata).
-        # We need full update (question/answer too). StagingService.update_chunk does that.
-        
-        for update in body.updates:
-            updates_dict = update.model_dump(exclude_unset=True, exclude={"chunk_id"})
-            current_draft = await staging_service.update_chunk(draft_id, update.chunk_id, updates_dict)
-            
-        if not current_draft:
-             # Try get it just in case no updates were valid or draft not found
-             current_draft = await staging_service.get_draft(draft_id)
-             if not current_draft:
-                 raise HTTPException(status_code=404, detail="Draft not found")
-
-        return Envelope(
-            data=KnowledgeResponse(
-                file_id=current_draft["file_id"],
-                draft_id=current_draft["draft_id"],
-                filename=current_draft.get("filename"),
-                extracted_pairs=current_draft["chunks"],
-                total_pairs=len(current_draft["chunks"])
-            ),
-            meta=MetaResponse(trace_id=trace_id)
+        # One optimistic transaction for the whole batch
+        result = await staging_service.update_chunks(
+            draft_id,
+            [update.model_dump(exclude_unset=True) for update in body.updates],
+            expected_version=body.expected_version
         )
+        if result is None:
+            raise HTTPException(status_code=404, detail="Draft not found")
+
+        return _written_response(result, trace_id)
+    except DraftVersionConflict as e:
+        raise HTTPException(status_code=409, detail=f"Draft was modified (current version {e.current_version})")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # --- Commit ---
 
+async def _commit_in_background(draft_id: str, job_id: str):
+    try:
+        result = await staging_service.commit_draft(draft_id, job_id=job_id)
+    except Exception as e:
+        logger.error("Background commit failed", extra={"draft_id": draft_id, "job_id": job_id, "error": str(e)})
+        await IngestionProgress(job_id).finish("failed", error=str(e))
+        return
+    await WebhookService.trigger_outgoing_event(
+        event_type="knowledge.document.indexed",
+        payload={"draft_id": draft_id, "result": result}
+    )
+
 @router.post("/ingestion/commit", response_model=Envelope[Dict[str, Any]])
 async def commit_staging(request: Request, body: CommitRequest, background_tasks: BackgroundTasks):
     """
     Commit staging to Prod.
+    With background=true, returns a job_id to poll at /ingestion/jobs/{job_id}.
     """
     trace_id = getattr(request.state, "trace_id", None)
-    
+    job_id = IngestionProgress.new_job_id()
+
+    if body.background:
+        if not await staging_service.get_draft_meta(body.draft_id):
+            raise HTTPException(status_code=404, detail="Draft not found")
+        await IngestionProgress(job_id).queue(f"draft:{body.draft_id}")
+        background_tasks.add_task(_commit_in_background, body.draft_id, job_id)
+        return Envelope(
+            data={"status": "accepted", "job_id": job_id, "draft_id": body.draft_id},
+            meta=MetaResponse(trace_id=trace_id)
+        )
+
     try:
-        result = await staging_service.commit_draft(body.draft_id)
+        result = await staging_service.commit_draft(body.draft_id, job_id=job_id)
         
         # Trigger Webhook
         background_tasks.add_task(
@@ -420,3 +512,19 @@ async def commit_staging(request: Request, body: CommitRequest, background_tasks
          raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
          raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/ingestion/jobs/{job_id}", response_model=Envelope[IngestionJobResponse])
+async def get_ingestion_job(request: Request, job_id: str):
+    """
+    Progress of an ingestion job: pairs parsed, skipped as duplicates, embedded and written.
+    """
+    trace_id = getattr(request.state, "trace_id", None)
+
+    job = await IngestionProgress.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return Envelope(
+        data=IngestionJobResponse(**{k: v for k, v in job.items() if k in IngestionJobResponse.model_fields}),
+        meta=MetaResponse(trace_id=trace_id)
+    )
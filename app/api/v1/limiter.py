@@ -1,6 +1,6 @@
 from fastapi_limiter import FastAPILimiter
 from fastapi_limiter.depends import RateLimiter
-from redis import asyncio as aioredis
+from app.services.redis_pool import get_redis
 from app.settings import settings
 import logging
 
@@ -8,7 +8,7 @@ logger = logging.getLogger(__name__)
 
 async def init_limiter():
     try:
-        redis = await aioredis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
+        redis = await get_redis("limiter")
         await FastAPILimiter.init(redis)
         logger.info(f"Rate limiter initialized with Redis at {settings.REDIS_URL}")
     except Exception as e:
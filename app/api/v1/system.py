@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Response
 from app.settings import settings
 from app.api.v1.models import Envelope, MetaResponse
-from typing import Dict
+from app.services.model_readiness import model_readiness
+from typing import Dict, Any
 
 router = APIRouter(tags=["System"])
 
@@ -26,6 +27,34 @@ async def health_check(request: Request):
         meta=MetaResponse(trace_id=trace_id)
     )
 
+@router.get("/ready", response_model=Envelope[Dict[str, Any]])
+async def readiness_check(request: Request, response: Response):
+    """
+    Readiness probe reporting the warmup state of each model.
+
+    Returns 503 while any model used by an enabled node is still loading,
+    so orchestrators can hold traffic until the worker is warm.
+    """
+    trace_id = getattr(request.state, "trace_id", None)
+    snapshot = model_readiness.snapshot()
+    if not snapshot["ready"]:
+        response.status_code = 503
+    return Envelope(
+        data=snapshot,
+        meta=MetaResponse(trace_id=trace_id)
+    )
+
+@router.get("/guardrails/stats", response_model=Envelope[Dict[str, Any]])
+async def guardrails_stats(request: Request):
+    """Per-tier decision counts and latency of the cascaded input guardrails."""
+    from app.nodes.input_guardrails.node import input_guardrails_node
+
+    trace_id = getattr(request.state, "trace_id", None)
+    return Envelope(
+        data=input_guardrails_node.get_stats(),
+        meta=MetaResponse(trace_id=trace_id)
+    )
+
 @router.get("/ping", response_model=Envelope[str])
 async def ping(request: Request):
     trace_id = getattr(request.state, "trace_id", None)
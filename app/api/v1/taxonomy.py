@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from app.api.v1.models import Envelope, MetaResponse
 from app.services.taxonomy import taxonomy_service
 
@@ -39,6 +39,26 @@ async def rename_taxonomy_item(request: Request, body: RenameRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+class MergeRequest(BaseModel):
+    sources: List[str] = Field(..., min_length=1)
+    target: str
+    type: str = Field(..., pattern="^(category|intent)$")
+
+@router.post("/categories/merge", response_model=Envelope[Dict[str, Any]])
+async def merge_taxonomy_items(request: Request, body: MergeRequest):
+    """
+    Merge categories or intents into one, in a single transaction.
+    """
+    trace_id = getattr(request.state, "trace_id", None)
+    
+    try:
+        result = await taxonomy_service.merge(body.type, body.sources, body.target)
+        return Envelope(data=result, meta=MetaResponse(trace_id=trace_id))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/categories/sync", response_model=Envelope[Dict[str, Any]])
 async def sync_taxonomy(request: Request):
     """
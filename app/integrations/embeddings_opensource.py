@@ -1,10 +1,11 @@
 import asyncio
+import threading
 from typing import List, Union
-from sentence_transformers import SentenceTransformer
-import torch
 import torch
 from app.logging_config import logger
 from app.observability.tracing import langfuse_context, observe
+from app.services.model_server.client import ModelServerClient, get_model_server_client
+from app.services.inference.backend import load_sentence_transformer
 from concurrent.futures import ThreadPoolExecutor
 
 import os
@@ -15,17 +16,27 @@ executor = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4))
 
 class EmbeddingModel:
     _instance = None
+    _instance_lock = threading.Lock()
 
     @classmethod
     def get_instance(cls):
+        # Loaded lazily (and only once) on first use, usually from an executor thread
         if cls._instance is None:
-            cls._instance = cls()
+            with cls._instance_lock:
+                if cls._instance is None:
+                    client = get_model_server_client()
+                    cls._instance = RemoteEmbeddingModel(client) if client is not None else cls()
         return cls._instance
 
+    @classmethod
+    def is_loaded(cls) -> bool:
+        return cls._instance is not None
+
     def __init__(self, model_name: str = "intfloat/multilingual-e5-small"):
+        self.model_name = model_name
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         logger.info("Loading embedding model", extra={"model": model_name, "device": self.device})
-        self.model = SentenceTransformer(model_name, device=self.device)
+        self.model = load_sentence_transformer(model_name, "e5", device=self.device)
         self.vector_size = self.model.get_sentence_embedding_dimension()
 
     def encode_sync(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
@@ -41,8 +52,35 @@ class EmbeddingModel:
         
         return embeddings.tolist()
 
-# Initialize global instance
-embedding_model = EmbeddingModel.get_instance()
+class RemoteEmbeddingModel:
+    """EmbeddingModel backed by the shared model server instead of local weights."""
+
+    def __init__(self, client: ModelServerClient):
+        self.client = client
+        self.device = "remote"
+        info = client.info()
+        self.model_name = info["e5_model_name"]
+        self.vector_size = info["e5_vector_size"]
+        logger.info("Using model server for embeddings", extra={"model": self.model_name, "socket": client.socket_path})
+
+    def encode_sync(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        # The server batches across workers itself, batch_size is ignored here
+        clean_texts = [t.replace("\n", " ") for t in texts]
+        return self.client.embed("e5", clean_texts).tolist()
+
+def get_embedding_model() -> EmbeddingModel:
+    """Return the shared embedding model, loading it on first use."""
+    return EmbeddingModel.get_instance()
+
+def __getattr__(name: str):
+    # Backward compatibility: `embedding_model` used to be created at import time
+    if name == "embedding_model":
+        return get_embedding_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _encode(texts: List[str], batch_size: int) -> List[List[float]]:
+    # Runs in the executor, so a first-time model load never blocks the event loop
+    return get_embedding_model().encode_sync(texts, batch_size)
 
 async def _get_embedding_base(text: str, is_query: bool = True) -> List[float]:
     """Base logic for getting a single embedding."""
@@ -51,7 +89,7 @@ async def _get_embedding_base(text: str, is_query: bool = True) -> List[float]:
     # Run in executor to avoid blocking event loop
     embeddings = await loop.run_in_executor(
         executor, 
-        embedding_model.encode_sync, 
+        _encode, 
         [f"{prefix}{text}"], 
         1
     )
@@ -100,7 +138,7 @@ async def _get_embeddings_batch_base(texts: List[str], batch_size: int = 32) ->
     loop = asyncio.get_running_loop()
     embeddings = await loop.run_in_executor(
         executor,
-        embedding_model.encode_sync,
+        _encode,
         prefixed_texts,
         batch_size
     )
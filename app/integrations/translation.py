@@ -1,17 +1,19 @@
 """
 Integration with translation services.
-Wraps the singleton QueryTranslator for async usage.
+Wraps the batched, cached TranslationEngine for async usage.
 """
-import asyncio
 import logging
-from app.services.translation.translator import translator
+from typing import List
+from app.services.translation.engine import get_translation_engine
+from app.services.model_readiness import ensure_model_ready
 
 logger = logging.getLogger(__name__)
 
 async def translate_text(text: str, target_lang: str = "en") -> str:
     """
     Translate text to target language using the configured translator.
-    Runs the blocking translation in a thread pool.
+    Runs on the translation engine's own executor and shares batches with
+    concurrent requests.
     
     Args:
         text (str): Text to translate
@@ -22,11 +24,22 @@ async def translate_text(text: str, target_lang: str = "en") -> str:
     """
     if not text:
         return ""
-        
+    return (await translate_texts([text], target_lang=target_lang))[0]
+
+async def translate_texts(texts: List[str], target_lang: str = "en") -> List[str]:
+    """
+    Translate several texts in one batched call per language direction.
+    Falls back to the original texts on failure.
+    """
+    if not texts:
+        return []
+
+    if not await ensure_model_ready("translator_ru_en", policy="wait"):
+        return list(texts)
+
     try:
-        # Offload CPU-intensive translation to thread
-        return await asyncio.to_thread(translator.translate_query, text, target_lang=target_lang)
+        return await get_translation_engine().translate_many(texts, target_lang=target_lang)
     except Exception as e:
         logger.error(f"Translation failed: {e}")
         # Fallback to original text
-        return text
+        return list(texts)
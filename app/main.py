@@ -51,16 +51,47 @@ async def lifespan(app: FastAPI):
     logger.info("Warming up models...")
     from app._shared_config.intent_registry import get_registry
     await get_registry().initialize()
-    await WarmupService.warmup_all()
+    # Reload the registry in the background when any worker announces a change
+    await get_registry().start_listener()
+    # Drop the cached taxonomy when any worker renames or merges
+    from app.services.taxonomy import taxonomy_service
+    await taxonomy_service.start_listener()
+    # Blocks until warm, or serves while warming (global warmup_mode)
+    await WarmupService.start()
+
+    # Durable webhook delivery queue (shared with other workers via SKIP LOCKED)
+    if settings.WEBHOOK_DISPATCHER_ENABLED:
+        from app.services.webhook_dispatcher import get_webhook_dispatcher
+        await get_webhook_dispatcher().start()
 
     yield
 
     # Cleanup
     logger.info("Shutting down Support RAG Pipeline...")
     try:
+        from app._shared_config.intent_registry import get_registry
+        await get_registry().stop_listener()
+
+        from app.services.taxonomy import taxonomy_service
+        await taxonomy_service.stop_listener()
+
+        from app.services.search.bm25_index import get_lexical_index
+        await get_lexical_index().stop_listener()
+
+        from app.services.qa_validators.near_duplicate_index import get_near_duplicate_index
+        await get_near_duplicate_index().stop_listener()
+
+        if settings.WEBHOOK_DISPATCHER_ENABLED:
+            from app.services.webhook_dispatcher import get_webhook_dispatcher
+            await get_webhook_dispatcher().stop()
+
         cache = await get_cache_manager()
         await cache.close()
         logger.info("Cache closed")
+
+        from app.services.redis_pool import get_redis_manager
+        await get_redis_manager().close()
+        logger.info("Redis pools closed")
         
         await close_db_pool()
         logger.info("DB Pool closed")
@@ -16,6 +16,7 @@ class AggregationNode(BaseNode):
                 - question (str): User question
             Optional:
                 - conversation_history (List[Dict]): Message history
+                - turn_analysis (Dict): Combined analysis result (rewritten query)
         
         Output:
             Guaranteed:
@@ -26,7 +27,7 @@ class AggregationNode(BaseNode):
     
     INPUT_CONTRACT = {
         "required": ["question"],
-        "optional": ["conversation_history"]
+        "optional": ["conversation_history", "turn_analysis"]
     }
     
     OUTPUT_CONTRACT = {
@@ -39,6 +40,14 @@ class AggregationNode(BaseNode):
         Dispatcher for aggregation.
         Routes to the configured aggregation implementation.
         """
+        # Combined turn analysis already rewrote the query in the same LLM call
+        turn_analysis = state.get("turn_analysis") or {}
+        if turn_analysis.get("rewritten_query"):
+            return {
+                "aggregated_query": turn_analysis["rewritten_query"],
+                "extracted_entities": {}
+            }
+
         if conversation_config.use_llm_aggregation:
             return await llm_aggregation_node(state)
         else:
@@ -8,6 +8,7 @@ from typing import Dict, Any
 from app.nodes.base_node import BaseNode
 from app.storage.persistence import PersistenceManager
 from app.services.cache.session_manager import SessionManager
+from app.services.redis_pool import get_redis
 from app.services.cache.manager import get_cache_manager
 from app.logging_config import logger
 from app.observability.tracing import observe
@@ -237,7 +238,7 @@ class ArchiveSessionNode(BaseNode):
         try:
             cache_manager = await get_cache_manager()
             if cache_manager.redis.is_available():
-                session_manager = SessionManager(cache_manager.redis.client)
+                session_manager = SessionManager(await get_redis("sessions"))
                 
                 # Debug logging for Clarification Persistence
                 ctx_to_save = state.get("clarification_context")
@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.logging_config import logger
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_ITEM_TIMEOUT = 120.0
+
+
+class EvalCheckpoint:
+    """
+    Append-only JSONL log of finished evaluation items.
+
+    The first line is a header, {"checkpoint": {"run_name": ..., "params": ...,
+    "dataset": sha256}}, then one line per item: {"index": i, "question": ...,
+    ...result}. A run that is interrupted leaves a valid prefix (plus at most
+    one torn line, which is ignored), so re-running with the same path only
+    evaluates what is missing. A checkpoint written by a different run, with
+    other parameters or for another dataset, is refused rather than mixed in.
+    """
+
+    def __init__(self, path: str, header: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.header = header or {}
+        self._lock = asyncio.Lock()
+        self._file = None
+
+    def load(self, questions: List[str]) -> Dict[int, Dict[str, Any]]:
+        """
+        Return finished results by index, skipping lines that no longer match the dataset.
+
+        Raises ValueError when the file's header differs from this run's.
+        """
+        done: Dict[int, Dict[str, Any]] = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        if not lines:
+            return done
+        try:
+            found = json.loads(lines[0]).get("checkpoint")
+        except (json.JSONDecodeError, AttributeError):
+            if len(lines) == 1:
+                # Torn header, nothing evaluated yet: start over
+                open(self.path, "w").close()
+                return done
+            found = None
+        if found != self.header:
+            raise ValueError(
+                f"Checkpoint {self.path} was written by another run "
+                f"(found {found}, expected {self.header}); "
+                "pass the same run_name and parameters, or a new checkpoint path"
+            )
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn write from an interrupted run
+            idx = record.get("index")
+            if isinstance(idx, int) and 0 <= idx < len(questions) and record.get("question") == questions[idx]:
+                done[idx] = record
+        return done
+
+    async def append(self, record: Dict[str, Any]):
+        async with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+                if self._file.tell() == 0:
+                    self._file.write(json.dumps({"checkpoint": self.header}, ensure_ascii=False) + "\n")
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def dataset_hash(items: List[Any]) -> str:
+    """sha256 of the items' content (pydantic models are dumped, anything else repr'd)."""
+    payload = [item.model_dump() if hasattr(item, "model_dump") else repr(item) for item in items]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+async def run_items(
+    items: List[Any],
+    evaluate: Callable[[int, Any], Awaitable[Dict[str, Any]]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    item_timeout: Optional[float] = DEFAULT_ITEM_TIMEOUT,
+    checkpoint_path: Optional[str] = None,
+    run_name: str = "",
+    params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Evaluate items with a fixed pool of workers.
+
+    `evaluate(index, item)` returns a JSON-serialisable dict; the runner adds
+    "index", "question" and "latency_ms". Results come back in dataset order,
+    so aggregates are computed exactly as a sequential run would compute them.
+    Items that fail or exceed `item_timeout` are reported in "errors" and not
+    checkpointed, so a resumed run retries them. `params` (e.g. top_k) go into
+    the checkpoint header with `run_name` and the dataset hash; a checkpoint
+    with a different header is not resumed (ValueError).
+    """
+    questions = [item.question for item in items]
+    checkpoint = None
+    if checkpoint_path:
+        checkpoint = EvalCheckpoint(checkpoint_path, {
+            "run_name": run_name,
+            "params": params or {},
+            "dataset": dataset_hash(items),
+        })
+    results: Dict[int, Dict[str, Any]] = checkpoint.load(questions) if checkpoint else {}
+    resumed = len(results)
+    errors: List[Dict[str, Any]] = []
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for idx in range(len(items)):
+        if idx not in results:
+            queue.put_nowait(idx)
+
+    logger.info("Evaluation runner started", extra={
+        "run_name": run_name,
+        "total": len(items),
+        "resumed": resumed,
+        "concurrency": concurrency,
+    })
+
+    async def worker():
+        while True:
+            try:
+                idx = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                record = await asyncio.wait_for(evaluate(idx, items[idx]), timeout=item_timeout)
+            except asyncio.TimeoutError:
+                errors.append({"index": idx, "question": questions[idx], "error": f"timeout after {item_timeout}s"})
+                continue
+            except Exception as e:
+                logger.warning("Evaluation item failed", extra={"run_name": run_name, "index": idx, "error": str(e)})
+                errors.append({"index": idx, "question": questions[idx], "error": str(e)})
+                continue
+            record = {
+                "index": idx,
+                "question": questions[idx],
+                "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+                **record,
+            }
+            results[idx] = record
+            if checkpoint:
+                await checkpoint.append(record)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, queue.qsize() or 1)))))
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    ordered = [results[idx] for idx in sorted(results)]
+    errors.sort(key=lambda e: e["index"])
+    return {"results": ordered, "errors": errors, "resumed": resumed}
+
+
+def mean_metrics(results: List[Dict[str, Any]], field: str = "metrics") -> Dict[str, float]:
+    """Per-metric mean over results, summed in dataset order."""
+    sums: Dict[str, List[float]] = {}
+    for record in results:
+        for name, value in (record.get(field) or {}).items():
+            sums.setdefault(name, []).append(value)
+    return {name: sum(values) / len(values) for name, values in sums.items()}
+
+
+def latency_summary(results: List[Dict[str, Any]]) -> Dict[str, float]:
+    values = sorted(r["latency_ms"] for r in results if "latency_ms" in r)
+    if not values:
+        return {}
+
+    def pct(p: float) -> float:
+        return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+    return {
+        "mean": round(sum(values) / len(values), 2),
+        "p50": pct(50),
+        "p95": pct(95),
+        "p99": pct(99),
+    }
@@ -1,31 +1,56 @@
 import asyncio
-from typing import Optional
+import threading
+from typing import Optional, Dict, List, Tuple
 from collections import OrderedDict
 from app.logging_config import logger
-from transformers import pipeline
+from app.services.inference.backend import load_zero_shot_pipeline
 from app._shared_config.intent_registry import get_registry
 from app.nodes.classification.models import ClassificationOutput
+from app.services.model_server.client import get_model_server_client
+from app.services.classification.linear_head import LinearHeadClassifier
+from app.services.config_loader.loader import get_node_params
 
 class ClassificationService:
+    """
+    Intent/category classification.
+
+    In "linear_head" mode (default) a logistic head over the e5 query embedding
+    decides with one matrix product; the NLI zero-shot model only runs for a
+    dimension whose top-2 margin is below `min_margin`. In "nli" mode every
+    query goes through zero-shot NLI as before.
+    """
     _instance = None
     _classifier = None
+    _classifier_lock = threading.Lock()
     _cache = OrderedDict()
     _cache_size = 1000
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(ClassificationService, cls).__new__(cls)
-            # Initialize zero-shot classifier
-            # Using cpu for simplicity as requested "No dependencies" implies standard env, but transformers is heavy.
-            # User accepted transformers dependency.
-            # Using smaller DistilBART for faster CPU performance (~2-3x faster than BART-Large)
-            cls._classifier = pipeline(
-                "zero-shot-classification", 
-                model="valhalla/distilbart-mnli-12-1",
-                device=-1 # CPU
-            )
         return cls._instance
 
+    @classmethod
+    def _get_classifier(cls):
+        # Loaded on first NLI use (or at warmup), typically from an executor thread
+        with cls._classifier_lock:
+            if cls._classifier is None:
+                cls._classifier = cls._create_classifier()
+        return cls._classifier
+
+    @staticmethod
+    def _create_classifier():
+        client = get_model_server_client()
+        if client is not None and "zero_shot" in client.info().get("models", []):
+            # Same call signature and result keys as the local pipeline
+            return lambda text, labels, multi_label=False: client.zero_shot(text, labels)
+        # Using smaller DistilBART for faster CPU performance (~2-3x faster than BART-Large)
+        return load_zero_shot_pipeline("valhalla/distilbart-mnli-12-1", "zero_shot")
+
+    def load_nli(self):
+        """Load the zero-shot NLI model (blocking)."""
+        self._get_classifier()
+
     def _get_from_cache(self, text: str) -> Optional[ClassificationOutput]:
         if text in self._cache:
             self._cache.move_to_end(text)
@@ -39,41 +64,74 @@ class ClassificationService:
             self._cache.popitem(last=False)
         self._cache[text] = output
 
-    async def classify(self, text: str) -> ClassificationOutput:
+    async def _classify_nli(self, text: str, labels: List[str]) -> Tuple[str, float]:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            None,
+            lambda: self._get_classifier()(text, labels, multi_label=False)
+        )
+        return result['labels'][0], result['scores'][0]
+
+    async def _classify_head(
+        self, text: str, query_embedding: Optional[List[float]]
+    ) -> Dict[str, Optional[Tuple[str, float, float]]]:
+        head = LinearHeadClassifier()
+        if not head.is_ready:
+            # Training scans every document embedding; never on the request path.
+            # Until it is ready both dimensions go to NLI.
+            head.schedule_warmup()
+            return {"intent": None, "category": None}
+        if query_embedding is None:
+            from app.integrations.embeddings import get_embedding
+            query_embedding = await get_embedding(text)
+        return head.predict(query_embedding)
+
+    async def classify(self, text: str, query_embedding: Optional[List[float]] = None) -> ClassificationOutput:
         cached = self._get_from_cache(text)
         if cached:
             return cached
 
-        loop = asyncio.get_running_loop()
-        
         import time
         start_time = time.time()
-        
+
+        params = get_node_params("classify")
+        mode = params.get("mode", "linear_head")
+        min_margin = params.get("min_margin", 0.15)
+        nli_fallback = params.get("nli_fallback", True)
+
         # Get dynamic lists
         registry = get_registry()
-        intents = registry.intents
-        categories = registry.categories
+        labels = {"intent": registry.intents, "category": registry.categories}
 
-        # Parallel classification
-        intent_task = loop.run_in_executor(
-            None, 
-            lambda: self._classifier(text, intents, multi_label=False)
-        )
-        category_task = loop.run_in_executor(
-            None, 
-            lambda: self._classifier(text, categories, multi_label=False)
-        )
+        decided: Dict[str, Tuple[str, float]] = {}
+        if mode == "linear_head":
+            predictions = await self._classify_head(text, query_embedding)
+            for dimension, prediction in predictions.items():
+                if prediction is None:
+                    continue
+                label, confidence, margin = prediction
+                if margin >= min_margin or not nli_fallback:
+                    decided[dimension] = (label, confidence)
 
-        intent_res, category_res = await asyncio.gather(intent_task, category_task)
+        # NLI only for dimensions the head could not settle, in parallel
+        undecided = [d for d in ("intent", "category") if d not in decided]
+        if undecided:
+            results = await asyncio.gather(*(self._classify_nli(text, labels[d]) for d in undecided))
+            decided.update(zip(undecided, results))
 
         duration = time.time() - start_time
-        logger.debug("Classification performance", extra={"duration_s": round(duration, 3), "text_preview": text[:20]})
+        logger.debug("Classification performance", extra={
+            "duration_s": round(duration, 3),
+            "text_preview": text[:20],
+            "mode": mode,
+            "nli_fallback": undecided
+        })
 
         output = ClassificationOutput(
-            intent=intent_res['labels'][0],
-            intent_confidence=intent_res['scores'][0],
-            category=category_res['labels'][0],
-            category_confidence=category_res['scores'][0]
+            intent=decided["intent"][0],
+            intent_confidence=decided["intent"][1],
+            category=decided["category"][0],
+            category_confidence=decided["category"][1]
         )
         
         self._add_to_cache(text, output)
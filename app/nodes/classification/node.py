@@ -1,6 +1,8 @@
 from typing import Dict, Any
 from app.nodes.base_node import BaseNode
 from app.nodes.classification.classifier import ClassificationService
+from app.services.model_readiness import ensure_model_ready
+from app.services.config_loader.loader import get_node_params
 
 from app.observability.tracing import observe
 
@@ -14,6 +16,8 @@ class ClassificationNode(BaseNode):
             Optional:
                 - question (str): User question
                 - aggregated_query (str): Enhanced query
+                - query_embedding (List[float]): e5 query embedding, reused when it matches
+                - query_embedding_text (str): Text the query embedding was computed from
         
         Output:
             Guaranteed:
@@ -26,7 +30,7 @@ class ClassificationNode(BaseNode):
     
     INPUT_CONTRACT = {
         "required": [],
-        "optional": ["question", "aggregated_query"]
+        "optional": ["question", "aggregated_query", "query_embedding", "query_embedding_text"]
     }
     
     OUTPUT_CONTRACT = {
@@ -45,9 +49,20 @@ class ClassificationNode(BaseNode):
             Dict: State updates with intent and category
         """
         question = state.get("aggregated_query") or state.get("question", "")
+        
+        mode = get_node_params("classify").get("mode", "linear_head")
+        model = "classification_head" if mode == "linear_head" else "zero_shot_classifier"
+        if not await ensure_model_ready(model, policy="degrade"):
+            return {"intent": "unknown", "category": "General"}
+        
         service = ClassificationService()
         
-        result = await service.classify(question)
+        # Reuse the embedding computed earlier in the pipeline for the same text
+        query_embedding = None
+        if state.get("query_embedding_text") == question:
+            query_embedding = state.get("query_embedding")
+        
+        result = await service.classify(question, query_embedding=query_embedding)
         
         return {
             "intent": result.intent,
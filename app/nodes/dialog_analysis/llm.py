@@ -1,5 +1,6 @@
 from typing import Dict, Any, List
 import json
+import os
 from app.pipeline.state import State
 from app.logging_config import logger
 from app.observability.tracing import observe
@@ -36,26 +37,9 @@ async def llm_dialog_analysis_node(state: State) -> Dict[str, Any]:
     # Prepare messages for context (last 5 messages)
     recent_history = history[-5:] if history else []
     
-    history_text = ""
-    for msg in recent_history:
-        if isinstance(msg, dict):
-            role = msg.get("role", "unknown")
-            content = msg.get("content", "")
-        else:
-            # Handle object-based messages (e.g. LangChain HumanMessage/AIMessage)
-            role = getattr(msg, "type", "unknown")
-            content = getattr(msg, "content", "")
-            
-        history_text += f"{role.upper()}: {content}\n"
-
-    import os
+    history_text = format_history_text(recent_history)
 
-    def _load_prompt(filename: str) -> str:
-        path = os.path.join(os.path.dirname(__file__), filename)
-        with open(path, "r", encoding="utf-8") as f:
-            return f.read().strip()
-
-    prompt_template = _load_prompt("prompt_analysis.txt")
+    prompt_template = load_prompt("prompt_analysis.txt")
     prompt = prompt_template.format(
         history_text=history_text,
         current_question=current_question,
@@ -72,79 +56,114 @@ async def llm_dialog_analysis_node(state: State) -> Dict[str, Any]:
         response = await llm.ainvoke([{"role": "user", "content": prompt}])
         
         # Parse JSON
-        analysis_content = response.content
-        if "```json" in analysis_content:
-            analysis_content = analysis_content.split("```json")[1].split("```")[0].strip()
-        elif "```" in analysis_content:
-            analysis_content = analysis_content.split("```")[1].split("```")[0].strip()
-            
-        analysis_data = json.loads(analysis_content)
-        
-        # Extract components
-        signals = analysis_data.get("signals", {})
-        sentiment = analysis_data.get("sentiment", {"label": "neutral", "score": 0.0})
-        safety = analysis_data.get("safety", {"violation": False, "reason": None})
-        escalation = analysis_data.get("escalation", {"decision": "auto_reply", "reason": None})
-        
-        # Map back to standard dict
-        escalation_req = signals.get(SIGNAL_ESCALATION_REQ, False)
-        
-        # Topic loop detection (NEW!)
-        topic_loop_detected = False
-        if params.get("detect_topic_loop", True):
-            loop_result = await detect_topic_loop(
-                current_question=current_question,
-                conversation_history=history,
-                similarity_threshold=params.get("topic_loop_similarity_threshold", 0.85),  # Higher for English
-                window_size=params.get("topic_loop_window_size", 4),
-                min_messages_for_loop=params.get("topic_loop_min_messages", 3),
-                translated_query=state.get("translated_query"),  # From query_translation node
-                detected_language=state.get("detected_language")  # From language_detection node
-            )
-            topic_loop_detected = loop_result["topic_loop_detected"]
-            # Store additional metadata for debugging
-            state["loop_detection_metadata"] = loop_result
+        analysis_data = parse_json_response(response.content)
         
-        result = {
-            "dialog_analysis": {
-                SIGNAL_GRATITUDE: signals.get(SIGNAL_GRATITUDE, False),
-                SIGNAL_ESCALATION_REQ: escalation_req,
-                SIGNAL_QUESTION: signals.get(SIGNAL_QUESTION, True),
-                SIGNAL_REPEATED: signals.get(SIGNAL_REPEATED, False),
-                SIGNAL_FRUSTRATION: sentiment.get("label") in ["frustrated", "angry"],
-                "topic_loop_detected": topic_loop_detected,
-                "refusal": signals.get("refusal", False),
-                "topic_shift": signals.get("topic_shift", False)
-            },
-            # Phase 5 & 6 State Extensions
-            "sentiment": sentiment,
-            "safety_violation": safety.get("violation", False),
-            "safety_reason": safety.get("reason"),
-            "escalation_requested": escalation_req,  # For routing node
-            "escalation_decision": escalation.get("decision", "auto_reply"),
-            "escalation_reason": escalation.get("reason")
-        }
-                
-        return result
+        topic_loop_detected = await run_loop_detection(state, params, history)
+        return build_analysis_result(analysis_data, topic_loop_detected)
 
     except Exception as e:
         logger.error("LLM Dialog Analysis failed", extra={"error": str(e)})
         # Fallback to safe defaults
-        return {
-            "dialog_analysis": {
-                SIGNAL_GRATITUDE: False,
-                SIGNAL_ESCALATION_REQ: False,
-                SIGNAL_QUESTION: True,
-                SIGNAL_FRUSTRATION: False,
-                SIGNAL_REPEATED: False,
-                "topic_loop_detected": False,
-                "refusal": False,
-                "topic_shift": False
-            },
-            "sentiment": {"label": "neutral", "score": 0.0},
-            "safety_violation": False,
-            "safety_reason": None,
-            "escalation_requested": False,  # For routing node
-            "escalation_decision": "auto_reply",
-            "escalation_reason": "fallback"
-        }
+        return fallback_analysis_result()
+
+
+def load_prompt(filename: str) -> str:
+    path = os.path.join(os.path.dirname(__file__), filename)
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def format_history_text(messages: List[Any]) -> str:
+    history_text = ""
+    for msg in messages:
+        if isinstance(msg, dict):
+            role = msg.get("role", "unknown")
+            content = msg.get("content", "")
+        else:
+            # Handle object-based messages (e.g. LangChain HumanMessage/AIMessage)
+            role = getattr(msg, "type", "unknown")
+            content = getattr(msg, "content", "")
+            
+        history_text += f"{role.upper()}: {content}\n"
+    return history_text
+
+
+def parse_json_response(content: str) -> Dict[str, Any]:
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0].strip()
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0].strip()
+    return json.loads(content)
+
+
+async def run_loop_detection(state: State, params: Dict[str, Any], history: List[Any]) -> bool:
+    """Embedding-based topic loop detection (no LLM call)."""
+    if not params.get("detect_topic_loop", True):
+        return False
+    loop_result = await detect_topic_loop(
+        current_question=state.get("question", ""),
+        conversation_history=history,
+        similarity_threshold=params.get("topic_loop_similarity_threshold", 0.85),  # Higher for English
+        window_size=params.get("topic_loop_window_size", 4),
+        min_messages_for_loop=params.get("topic_loop_min_messages", 3),
+        translated_query=state.get("translated_query"),  # From query_translation node
+        detected_language=state.get("detected_language")  # From language_detection node
+    )
+    # Store additional metadata for debugging
+    state["loop_detection_metadata"] = loop_result
+    return loop_result["topic_loop_detected"]
+
+
+def build_analysis_result(analysis_data: Dict[str, Any], topic_loop_detected: bool) -> Dict[str, Any]:
+    """Maps the LLM analysis JSON onto the dialog_analysis state fields."""
+    # Extract components
+    signals = analysis_data.get("signals", {})
+    sentiment = analysis_data.get("sentiment", {"label": "neutral", "score": 0.0})
+    safety = analysis_data.get("safety", {"violation": False, "reason": None})
+    escalation = analysis_data.get("escalation", {"decision": "auto_reply", "reason": None})
+    
+    # Map back to standard dict
+    escalation_req = signals.get(SIGNAL_ESCALATION_REQ, False)
+    
+    result = {
+        "dialog_analysis": {
+            SIGNAL_GRATITUDE: signals.get(SIGNAL_GRATITUDE, False),
+            SIGNAL_ESCALATION_REQ: escalation_req,
+            SIGNAL_QUESTION: signals.get(SIGNAL_QUESTION, True),
+            SIGNAL_REPEATED: signals.get(SIGNAL_REPEATED, False),
+            SIGNAL_FRUSTRATION: sentiment.get("label") in ["frustrated", "angry"],
+            "topic_loop_detected": topic_loop_detected,
+            "refusal": signals.get("refusal", False),
+            "topic_shift": signals.get("topic_shift", False)
+        },
+        # Phase 5 & 6 State Extensions
+        "sentiment": sentiment,
+        "safety_violation": safety.get("violation", False),
+        "safety_reason": safety.get("reason"),
+        "escalation_requested": escalation_req,  # For routing node
+        "escalation_decision": escalation.get("decision", "auto_reply"),
+        "escalation_reason": escalation.get("reason")
+    }
+
+    return result
+
+
+def fallback_analysis_result() -> Dict[str, Any]:
+    return {
+        "dialog_analysis": {
+            SIGNAL_GRATITUDE: False,
+            SIGNAL_ESCALATION_REQ: False,
+            SIGNAL_QUESTION: True,
+            SIGNAL_FRUSTRATION: False,
+            SIGNAL_REPEATED: False,
+            "topic_loop_detected": False,
+            "refusal": False,
+            "topic_shift": False
+        },
+        "sentiment": {"label": "neutral", "score": 0.0},
+        "safety_violation": False,
+        "safety_reason": None,
+        "escalation_requested": False,  # For routing node
+        "escalation_decision": "auto_reply",
+        "escalation_reason": "fallback"
+    }
@@ -77,7 +77,11 @@ async def detect_topic_loop(
         # Step 1: Translate all messages to English (if not already)
         # This gives us consistent, high-quality embeddings
         
-        from app.integrations.translation import translate_text
+        from app.integrations.translation import translate_texts
+        
+        # Messages still needing translation are collected and translated
+        # together in one batched call
+        to_translate: List[str] = []
         
         # Translate current question if not already translated
         if translated_query and detected_language and detected_language != "en":
@@ -87,31 +91,36 @@ async def detect_topic_loop(
             current_en = current_question
             logger.debug("Loop detector: question already in English")
         else:
-            # Fallback: translate now
-            current_en = await translate_text(current_question, target_lang="en")
-            logger.debug("Loop detector: translated current question", extra={"original": current_question, "en": current_en})
+            # Fallback: translate with the history batch
+            current_en = None
+            to_translate.append(current_question)
         
         # Translate history messages
         # OPTIMIZATION: Use pre-saved translations from message metadata
-        translated_history = []
+        translated_history: List[Optional[str]] = []
         for msg in user_messages:
             # Try to get pre-translated version from metadata (saved by archive_session)
             if isinstance(msg, dict):
                 # Check metadata first
                 if "translated" in msg.get("metadata", {}):
                     translated_history.append(msg["metadata"]["translated"])
+                    continue
                 elif "translated" in msg:  # Direct field
                     translated_history.append(msg["translated"])
-                else:
-                    # Fallback: translate now (only if not cached)
-                    msg_text = msg.get("content", "")
-                    translated = await translate_text(msg_text, target_lang="en")
-                    translated_history.append(translated)
+                    continue
+                msg_text = msg.get("content", "")
             else:
-                # Handle object/string - translate now
+                # Handle object/string
                 msg_text = getattr(msg, "content", "") if not isinstance(msg, str) else msg
-                translated = await translate_text(msg_text, target_lang="en")
-                translated_history.append(translated)
+            translated_history.append(None)
+            to_translate.append(msg_text)
+        
+        if to_translate:
+            translated = iter(await translate_texts(to_translate, target_lang="en"))
+            if current_en is None:
+                current_en = next(translated)
+                logger.debug("Loop detector: translated current question", extra={"original": current_question, "en": current_en})
+            translated_history = [t if t is not None else next(translated) for t in translated_history]
         
         all_english_messages = [current_en] + translated_history
         logger.debug("Loop detector comparing English messages", extra={"count": len(all_english_messages)})
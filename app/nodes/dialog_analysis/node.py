@@ -7,6 +7,7 @@ from app.logging_config import logger
 from app.services.config_loader.conversation_config import conversation_config
 from app.services.config_loader.loader import get_node_params
 from app.nodes.dialog_analysis.llm import llm_dialog_analysis_node
+from app.nodes.dialog_analysis.turn_analysis import combined_turn_analysis_node
 from app.nodes.state_machine.states_config import (
     SIGNAL_GRATITUDE, SIGNAL_ESCALATION_REQ, SIGNAL_QUESTION, 
     SIGNAL_REPEATED, SIGNAL_FRUSTRATION
@@ -38,6 +39,7 @@ class DialogAnalysisNode(BaseNode):
                 - safety_reason (str): Reason if safety violation
                 - escalation_reason (str): Reason for escalation
                 - loop_detection_metadata (Dict): Loop detection details
+                - turn_analysis (Dict): Rewritten query and expansions (combined mode)
     """
     
     INPUT_CONTRACT = {
@@ -56,7 +58,8 @@ class DialogAnalysisNode(BaseNode):
         "conditional": [
             "safety_reason",
             "escalation_reason",
-            "loop_detection_metadata"
+            "loop_detection_metadata",
+            "turn_analysis"
         ]
     }
     
@@ -64,6 +67,8 @@ class DialogAnalysisNode(BaseNode):
         """
         Dispatcher for dialog analysis.
         """
+        if conversation_config.use_combined_turn_analysis:
+            return await combined_turn_analysis_node(state)
         if conversation_config.use_llm_analysis:
             return await llm_dialog_analysis_node(state)
         else:
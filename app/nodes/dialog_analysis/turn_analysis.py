@@ -0,0 +1,153 @@
+"""
+Combined Turn Analysis.
+
+One LLM call per turn that returns, as a single JSON object, what otherwise
+takes up to three sequential calls:
+- dialog signals / sentiment / safety / escalation (dialog_analysis, llm mode)
+- the standalone rewritten query (aggregation, llm mode)
+- expansion variants (expand_query)
+
+Enabled with `mode: combined` in the dialog_analysis config. The result is
+stored in `turn_analysis`; aggregation and expand_query reuse it instead of
+calling the LLM. If the call fails or the response does not validate, the
+turn falls back to the individual nodes.
+"""
+import time
+from typing import Any, Dict, List
+
+from app.integrations.llm import get_llm
+from app.logging_config import logger
+from app.nodes.dialog_analysis.llm import (
+    build_analysis_result,
+    format_history_text,
+    llm_dialog_analysis_node,
+    load_prompt,
+    parse_json_response,
+    run_loop_detection,
+)
+from app.nodes.state_machine.states_config import (
+    SIGNAL_GRATITUDE, SIGNAL_ESCALATION_REQ, SIGNAL_QUESTION, SIGNAL_REPEATED
+)
+from app.observability.tracing import observe
+from app.pipeline.state import State
+from app.services.config_loader.loader import get_node_enabled, get_node_params
+
+SENTIMENT_LABELS = {"positive", "neutral", "negative", "frustrated", "angry"}
+ESCALATION_DECISIONS = {"escalate", "auto_reply"}
+
+
+class TurnAnalysisValidationError(ValueError):
+    pass
+
+
+def validate_turn_analysis(data: Any, max_expansions: int) -> Dict[str, Any]:
+    """
+    Validates the combined response and normalizes it.
+    Raises TurnAnalysisValidationError when a required part is missing or malformed.
+    """
+    if not isinstance(data, dict):
+        raise TurnAnalysisValidationError("response is not a JSON object")
+
+    signals = data.get("signals")
+    if not isinstance(signals, dict):
+        raise TurnAnalysisValidationError("signals must be an object")
+    for key, value in signals.items():
+        if not isinstance(value, bool):
+            raise TurnAnalysisValidationError(f"signal '{key}' must be boolean")
+
+    sentiment = data.get("sentiment")
+    if not isinstance(sentiment, dict) or sentiment.get("label") not in SENTIMENT_LABELS:
+        raise TurnAnalysisValidationError("sentiment.label is missing or unknown")
+    try:
+        sentiment["score"] = min(max(float(sentiment.get("score", 0.0)), 0.0), 1.0)
+    except (TypeError, ValueError):
+        raise TurnAnalysisValidationError("sentiment.score must be a number")
+
+    safety = data.get("safety", {"violation": False, "reason": None})
+    if not isinstance(safety, dict) or not isinstance(safety.get("violation", False), bool):
+        raise TurnAnalysisValidationError("safety.violation must be boolean")
+
+    escalation = data.get("escalation", {"decision": "auto_reply", "reason": None})
+    if not isinstance(escalation, dict) or escalation.get("decision", "auto_reply") not in ESCALATION_DECISIONS:
+        raise TurnAnalysisValidationError("escalation.decision must be 'escalate' or 'auto_reply'")
+
+    rewritten = data.get("rewritten_query")
+    if not isinstance(rewritten, str) or not rewritten.strip():
+        raise TurnAnalysisValidationError("rewritten_query must be a non-empty string")
+
+    expansions = data.get("expansions", [])
+    if not isinstance(expansions, list):
+        raise TurnAnalysisValidationError("expansions must be a list")
+    expansions = [e.strip() for e in expansions if isinstance(e, str) and e.strip()]
+
+    data["safety"] = safety
+    data["escalation"] = escalation
+    data["rewritten_query"] = rewritten.strip()
+    data["expansions"] = expansions[:max_expansions]
+    return data
+
+
+@observe(as_type="span")
+async def combined_turn_analysis_node(state: State) -> Dict[str, Any]:
+    """
+    Dialog analysis + query rewriting + expansion in one structured LLM call.
+    Falls back to the individual llm dialog analysis (and leaves rewriting and
+    expansion to their own nodes) on failure.
+    """
+    history = state.get("conversation_history") or state.get("session_history", []) or []
+    current_question = state.get("question", "")
+
+    params = get_node_params("dialog_analysis")
+    combined_config = params.get("turn_analysis", {})
+    llm_config = params.get("llm", {})
+    model = combined_config.get("model") or llm_config.get("model", "gpt-4o-mini")
+    temperature = combined_config.get("temperature", llm_config.get("temperature", 0.0))
+    # Expansion variants are only worth generating when expand_query would run
+    max_expansions = combined_config.get("max_expansions", 3) if get_node_enabled("expand_query") else 0
+
+    prompt = load_prompt("prompt_turn_analysis.txt").format(
+        history_text=format_history_text(history[-combined_config.get("history_messages", 5):]),
+        current_question=current_question,
+        num_expansions=max_expansions,
+        SIGNAL_GRATITUDE=SIGNAL_GRATITUDE,
+        SIGNAL_ESCALATION_REQ=SIGNAL_ESCALATION_REQ,
+        SIGNAL_QUESTION=SIGNAL_QUESTION,
+        SIGNAL_REPEATED=SIGNAL_REPEATED
+    )
+
+    start = time.perf_counter()
+    try:
+        llm = get_llm(model=model, temperature=temperature, json_mode=True)
+        response = await llm.ainvoke([{"role": "user", "content": prompt}])
+        data = validate_turn_analysis(parse_json_response(response.content), max_expansions)
+    except Exception as e:
+        logger.warning(
+            "Combined turn analysis failed, falling back to individual nodes",
+            extra={"error": str(e), "error_type": type(e).__name__}
+        )
+        if not combined_config.get("fallback_to_nodes", True):
+            raise
+        return await llm_dialog_analysis_node(state)
+
+    latency_ms = (time.perf_counter() - start) * 1000
+    topic_loop_detected = await run_loop_detection(state, params, history)
+
+    result = build_analysis_result(data, topic_loop_detected)
+    result["turn_analysis"] = {
+        "mode": "combined",
+        "rewritten_query": data["rewritten_query"],
+        "expansions": data["expansions"],
+        "model": model,
+        "latency_ms": round(latency_ms, 1)
+    }
+    logger.debug(
+        "Combined turn analysis completed",
+        extra={"latency_ms": round(latency_ms, 1), "expansions": len(data["expansions"])}
+    )
+    return result
+
+
+def turn_analysis_queries(turn_analysis: Dict[str, Any], question: str) -> List[str]:
+    """Expanded query list in the same shape QueryExpander returns."""
+    variants = [question] + list(turn_analysis.get("expansions", []))
+    return list(dict.fromkeys(q for q in variants if q))
@@ -2,12 +2,21 @@ import time
 from typing import Dict, Any
 from app.nodes.base_node import BaseNode
 from app.services.classification.semantic_service import SemanticClassificationService
+from app.services.classification.prototype_service import PrototypeClassificationService
+from app.integrations.embeddings import get_embedding
+from app.services.model_readiness import ensure_model_ready
 from app.observability.tracing import observe
 from app.services.config_loader.loader import get_node_params
 
 class SemanticClassificationNode(BaseNode):
     """
     Classifies user query using semantic classification.
+
+    Modes (config.mode):
+        - semantic: dedicated multilingual MiniLM model (default)
+        - prototype: scores the retrieval (e5) query embedding against
+          precomputed label prototypes; the embedding is exported to state
+          so hybrid_search does not encode the query again.
     
     Contracts:
         Input:
@@ -25,39 +34,59 @@ class SemanticClassificationNode(BaseNode):
             Conditional:
                 - semantic_intent_confidence (float): Intent confidence
                 - semantic_category_confidence (float): Category confidence
+                - query_embedding (List[float]): e5 query embedding (prototype mode)
+                - query_embedding_text (str): Text the embedding was computed for
     """
     
     INPUT_CONTRACT = {
         "required": [],
-        "optional": ["question", "translated_query", "aggregated_query"]
+        "optional": ["question", "translated_query", "aggregated_query", "query_embedding", "query_embedding_text"]
     }
     
     OUTPUT_CONTRACT = {
         "guaranteed": ["semantic_intent", "semantic_category", "semantic_time"],
-        "conditional": ["semantic_intent_confidence", "semantic_category_confidence"]
+        "conditional": [
+            "semantic_intent_confidence",
+            "semantic_category_confidence",
+            "query_embedding",
+            "query_embedding_text"
+        ]
     }
     
     async def execute(self, state: Dict[str, Any]) -> Dict[str, Any]:
         # Use translated_query if available (from query_translation node)
         # This ensures classification happens in document language
         question = state.get("translated_query") or state.get("aggregated_query") or state.get("question", "")
-        service = SemanticClassificationService()
         
         params = get_node_params("easy_classification")
+        mode = params.get("mode", "semantic")
         i_threshold = params.get("intent_confidence_threshold", 0.3)
         c_threshold = params.get("category_confidence_threshold", 0.3)
         fallback_intent = params.get("fallback_intent", "unknown")
         fallback_category = params.get("fallback_category", "General")
 
         start_time = time.time()
-        result = await service.classify(question)
+        extra: Dict[str, Any] = {}
+        if mode == "prototype":
+            embedding = None
+            if state.get("query_embedding_text") == question:
+                embedding = state.get("query_embedding")
+            if embedding is None:
+                embedding = await get_embedding(question)
+            extra = {"query_embedding": embedding, "query_embedding_text": question}
+            result = await PrototypeClassificationService().classify_embedding(embedding)
+        elif await ensure_model_ready("semantic_classifier", policy="degrade"):
+            result = await SemanticClassificationService().classify(question)
+        else:
+            result = None
         end_time = time.time()
         
         if result is None:
             return {
                 "semantic_intent": fallback_intent,
                 "semantic_category": fallback_category,
-                "semantic_time": end_time - start_time
+                "semantic_time": end_time - start_time,
+                **extra
             }
         
         # Apply thresholds
@@ -69,7 +98,8 @@ class SemanticClassificationNode(BaseNode):
             "semantic_intent_confidence": result.intent_confidence,
             "semantic_category": category,
             "semantic_category_confidence": result.category_confidence,
-            "semantic_time": end_time - start_time
+            "semantic_time": end_time - start_time,
+            **extra
         }
 
 # For backward compatibility with graph definition (if any)
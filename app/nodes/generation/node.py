@@ -6,6 +6,7 @@ from langchain_core.prompts import ChatPromptTemplate
 from app.logging_config import logger
 from app.observability.callbacks import get_langfuse_callback_handler
 from app.utils.prompt_sanitization import sanitize_for_prompt, sanitize_list
+from app.services.streaming import StreamChannel, get_stream_channel
 
 class GenerationNode(BaseNode):
     """
@@ -22,6 +23,12 @@ class GenerationNode(BaseNode):
                 - aggregated_query (str): Aggregated/enhanced query
                 - escalation_message (str): If set, skip generation
                 - langfuse_handler: Custom callback handler
+                - detected_language (str): Fallback language for streamed output guardrails
+        
+        Streaming:
+            Inside /chat/stream tokens are written to the request's stream
+            channel as they arrive (checked sentence by sentence when output
+            guardrails are enabled).
         
         Output:
             Guaranteed:
@@ -39,7 +46,8 @@ class GenerationNode(BaseNode):
             "aggregated_query",
             "escalation_message",
             "answer",
-            "dialog_state"
+            "dialog_state",
+            "detected_language"
         ]
     }
     
@@ -66,8 +74,11 @@ class GenerationNode(BaseNode):
             Dict: State updates containing the final answer
         """
         # Check if escalation happened - if so, use escalation message instead of generating
+        channel = get_stream_channel()
         escalation_message = state.get("escalation_message")
         if escalation_message:
+            if channel:
+                channel.token(escalation_message)
             return {"answer": escalation_message}
             
         # Optimization: If answer is already provided (e.g. by clarification node), skip generation
@@ -79,6 +90,8 @@ class GenerationNode(BaseNode):
         
         if existing_answer and dialog_state == "NEEDS_CLARIFICATION":
             logger.debug("Skipping generation as answer already provided by clarification node")
+            if channel:
+                channel.token(existing_answer)
             return {"answer": existing_answer}
             
         # Use pre-built prompts from prompt_routing
@@ -112,12 +125,55 @@ class GenerationNode(BaseNode):
         if not langfuse_handler:
             langfuse_handler = get_langfuse_callback_handler()
         
-        response = await chain.ainvoke(
-            {"human_prompt": human_prompt},
-            config={"callbacks": [langfuse_handler], "tags": ["generation_llm"]}
-        )
+        run_config = {"callbacks": [langfuse_handler], "tags": ["generation_llm"]}
+        if channel:
+            answer = await self._stream_answer(chain, {"human_prompt": human_prompt}, run_config, channel, state)
+            return {"answer": answer}
+        
+        response = await chain.ainvoke({"human_prompt": human_prompt}, config=run_config)
         return {"answer": response.content}
 
+    async def _stream_answer(
+        self,
+        chain: Any,
+        inputs: Dict[str, Any],
+        run_config: Dict[str, Any],
+        channel: StreamChannel,
+        state: Dict[str, Any]
+    ) -> str:
+        """
+        Streams tokens into the channel. With output guardrails enabled text is
+        released per checked sentence; a block replaces everything sent so far.
+        """
+        from app.nodes.output_guardrails.node import output_guardrails_node
+
+        guard = output_guardrails_node.incremental_guard(
+            user_query=state.get("question", ""),
+            language=state.get("detected_language")
+        )
+        parts = []
+        async for chunk in chain.astream(inputs, config=run_config):
+            text = chunk.content
+            if not text:
+                continue
+            if guard is None:
+                parts.append(text)
+                channel.token(text)
+                continue
+            for segment in guard.feed(text):
+                channel.token(segment)
+            if guard.blocked:
+                break
+
+        if guard is None:
+            return "".join(parts)
+
+        for segment in guard.finish():
+            channel.token(segment)
+        if guard.blocked:
+            channel.replace(guard.answer)
+        return guard.answer
+
 
 # For backward compatibility
 generate_node = GenerationNode()
@@ -24,6 +24,8 @@ class HybridSearchNode(BaseNode):
                 - matched_category (str): Category filter
                 - filter_used (bool): Whether to apply filter
                 - detected_language (str): User's language
+                - query_embedding (List[float]): Precomputed query embedding
+                - query_embedding_text (str): Text query_embedding belongs to
         
         Output:
             Guaranteed:
@@ -43,7 +45,9 @@ class HybridSearchNode(BaseNode):
             "queries",
             "matched_category",
             "filter_used",
-            "detected_language"
+            "detected_language",
+            "query_embedding",
+            "query_embedding_text"
         ]
     }
     
@@ -63,6 +67,10 @@ class HybridSearchNode(BaseNode):
         queries = state.get("queries", [question])
         detected_language = state.get("detected_language")  # Get from language_detection node
         
+        # Reuse the embedding computed by easy_classification (prototype mode)
+        embedding_text = state.get("query_embedding_text")
+        precomputed_embedding = state.get("query_embedding")
+        
         # Get category filter from metadata_filter node
         category_filter = state.get("matched_category") if state.get("filter_used") else None
         
@@ -74,7 +82,8 @@ class HybridSearchNode(BaseNode):
                 q, 
                 top_k=top_k, 
                 category_filter=category_filter,
-                detected_language=detected_language
+                detected_language=detected_language,
+                query_embedding=precomputed_embedding if q == embedding_text else None
             ) 
             for q in queries
         ]
@@ -121,7 +130,8 @@ async def search_hybrid(
     query: str, 
     top_k: int = 10, 
     category_filter: Optional[str] = None,
-    detected_language: Optional[str] = None
+    detected_language: Optional[str] = None,
+    query_embedding: Optional[List[float]] = None
 ) -> List[SearchResult]:
     """
     Perform hybrid search by combining vector and lexical search.
@@ -131,6 +141,7 @@ async def search_hybrid(
         top_k: Number of results to return
         category_filter: Optional category filter
         detected_language: Language detected by language_detection node (for lexical search translation)
+        query_embedding: Precomputed embedding of query (skips re-encoding)
     """
     params = get_node_params("hybrid_search")
     apply_filter_to_lexical = params.get("apply_category_filter_to_lexical", True)
@@ -142,7 +153,7 @@ async def search_hybrid(
     # Vector search uses multilingual embeddings (no translation needed)
     # Lexical search uses translation based on detected_language
     async def run_vector_search():
-        embedding = await get_embedding(query)
+        embedding = query_embedding or await get_embedding(query)
         return await search_documents(embedding, top_k=top_k * 2, category_filter=category_filter)
 
     vector_task = run_vector_search()
@@ -13,7 +13,7 @@ Features:
 
 Note: This is heavier than basic guardrails (~50-200ms latency)
 """
-from typing import List, Dict, Optional
+from typing import Collection, List, Dict, Optional
 from dataclasses import dataclass
 import asyncio
 from app.logging_config import logger
@@ -153,22 +153,33 @@ class AdvancedGuardrailsService:
         self._initialized = True
         logger.info("Guardrails models loaded successfully")
     
-    async def scan(self, text: str) -> AdvancedScanResult:
+    async def scan(self, text: str, skip: Optional[Collection[str]] = None) -> AdvancedScanResult:
         """
         Run all scanners on the input text in parallel (batch processing).
         
+        Args:
+            text: Input text
+            skip: Scanner class names (e.g. "PromptInjection") already decided
+                  by a cheaper check; these are not run
+        
         Returns aggregated result with risk score and triggered scanners.
         """
         # Ensure scanners are loaded (lazy loading on first call)
         self._ensure_scanners_loaded()
         
+        scanners = self.scanners
+        if skip:
+            scanners = [s for s in scanners if type(s).__name__ not in skip]
+        if not scanners:
+            return AdvancedScanResult(is_safe=True, risk_score=0.0, triggered_scanners=[], details={"scores": {}})
+        
         # Run LLM Guard scanners in executor (they're synchronous)
         # We batch-execute all scanners together via scan_prompt
         loop = asyncio.get_event_loop()
         sanitized_prompt, results_valid, results_score = await loop.run_in_executor(
             None,
             scan_prompt,
-            self.scanners,
+            scanners,
             text
         )
         
@@ -0,0 +1,303 @@
+"""
+Cascaded Input Guardrails
+
+Runs guardrails in tiers, cheapest first, and stops at the first tier that
+can decide:
+
+1. screen:     regex + secrets patterns merged into one compiled automaton,
+               token limit and language checks (~1ms)
+2. similarity: cosine similarity of the e5 query embedding against known
+               attack exemplars (~5-10ms, one encoder call)
+3. ml:         LLM Guard transformer scanners (~50-200ms). Only scanners
+               whose category a cheaper tier already cleared are skipped:
+               PromptInjection when similarity is below the clear threshold,
+               Secrets/Language/TokenLimit when their screens ran. Toxicity
+               and BanTopics have no cheap counterpart and always run.
+
+Screen and similarity hits are reported under the LLM Guard scanner names
+(Secrets, Language, TokenLimit; PromptInjection for attack similarity), so
+the node treats them exactly like an ML-tier hit: critical threats are
+blocked even in log mode, and secrets are redacted for sanitize mode.
+
+Without the ML tier (protection_level "basic") the similarity tier decides
+on its own. The thresholds are node parameters; bench/attack_similarity.py
+prints the e5 score distributions to calibrate them against.
+
+Per-tier decision counts and latency are kept in CascadeStats.
+"""
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple, Any
+
+import numpy as np
+
+from app.logging_config import logger
+from app.nodes.input_guardrails.scanner import (
+    ScanResult,
+    SecretsScanner,
+    TokenLimitScanner,
+    LanguageScanner,
+)
+from app.nodes.input_guardrails.advanced_scanner import AdvancedGuardrailsService
+
+TIERS = ("screen", "similarity", "ml")
+
+# Screen -> LLM Guard scanner covering the same category; a passed screen
+# makes the scanner redundant. Attack similarity below the clear threshold
+# stands in for PromptInjection only. Screen hits are reported under the
+# scanner's name.
+_SCREENED_BY = {"secrets": "Secrets", "language": "Language", "token_limit": "TokenLimit"}
+SIMILARITY_SCANNER = "PromptInjection"
+# What LLM Guard's Secrets scanner puts in place of a secret
+REDACTED = "******"
+
+_LEADING_FLAGS = re.compile(r"^\(\?([aiLmsux]+)\)")
+
+
+def _scoped(pattern: str, default_flags: str = "") -> str:
+    """
+    Turn a pattern with leading global flags, e.g. "(?i)abc", into a scoped
+    group "(?i:abc)" so several patterns can be joined into one alternation.
+    """
+    match = _LEADING_FLAGS.match(pattern)
+    flags = set(default_flags)
+    if match:
+        flags |= set(match.group(1))
+        pattern = pattern[match.end():]
+    return f"(?{''.join(sorted(flags))}:{pattern})" if flags else f"(?:{pattern})"
+
+
+class CompiledPatternScanner:
+    """
+    Regex and secrets patterns merged into a single compiled alternation.
+
+    Every source pattern gets a named group, so one pass over the text tells
+    which patterns matched instead of running ~40 separate searches. Where
+    several patterns match the same span only the first is reported; the
+    decision is unaffected.
+    """
+
+    def __init__(self, regex_patterns: List[Dict]):
+        self.groups: Dict[str, Tuple[str, str]] = {}
+        parts = []
+        for i, p in enumerate(regex_patterns):
+            name = f"r{i}"
+            # RegexScanner compiled these with IGNORECASE
+            parts.append(f"(?P<{name}>{_scoped(p['pattern'], 'i')})")
+            self.groups[name] = ("regex_patterns", p["description"])
+        for i, (pattern, description) in enumerate(SecretsScanner.PATTERNS):
+            name = f"s{i}"
+            parts.append(f"(?P<{name}>{_scoped(pattern)})")
+            self.groups[name] = ("secrets", description)
+        self.regex = re.compile("|".join(parts), re.MULTILINE) if parts else None
+        self.secrets_regex = re.compile(
+            "|".join(_scoped(pattern) for pattern, _ in SecretsScanner.PATTERNS), re.MULTILINE
+        )
+
+    def scan(self, text: str) -> Dict[str, List[str]]:
+        """Return {scanner: [matched descriptions]} for patterns found in text."""
+        found: Dict[str, List[str]] = {}
+        if self.regex is None:
+            return found
+        seen = set()
+        for match in self.regex.finditer(text):
+            name = match.lastgroup
+            if name in seen:
+                continue
+            seen.add(name)
+            scanner, description = self.groups[name]
+            found.setdefault(scanner, []).append(description)
+        return found
+
+    def redact_secrets(self, text: str) -> str:
+        return self.secrets_regex.sub(REDACTED, text)
+
+
+@dataclass
+class TierStats:
+    decisions: int = 0
+    blocked: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def record(self, duration_ms: float, is_safe: bool):
+        self.decisions += 1
+        self.blocked += 0 if is_safe else 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "decisions": self.decisions,
+            "blocked": self.blocked,
+            "avg_ms": round(self.total_ms / self.decisions, 2) if self.decisions else 0.0,
+            "max_ms": round(self.max_ms, 2)
+        }
+
+
+@dataclass
+class CascadeStats:
+    tiers: Dict[str, TierStats] = field(default_factory=lambda: {t: TierStats() for t in TIERS})
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = sum(t.decisions for t in self.tiers.values())
+        return {
+            "total": total,
+            "tiers": {name: stats.to_dict() for name, stats in self.tiers.items()}
+        }
+
+
+class CascadedGuardrailsService:
+    """
+    Tiered guardrails: cheap screens decide clear cases, transformer
+    scanners only run for the categories the screens cannot clear.
+    """
+
+    def __init__(
+        self,
+        regex_patterns: List[Dict],
+        max_tokens: int,
+        allowed_languages: List[str],
+        attack_exemplars: List[str],
+        similarity_clear_threshold: float = 0.80,
+        similarity_block_threshold: float = 0.92,
+        advanced: Optional[AdvancedGuardrailsService] = None
+    ):
+        self.pattern_scanner = CompiledPatternScanner(regex_patterns)
+        self.token_scanner = TokenLimitScanner(max_tokens)
+        self.language_scanner = LanguageScanner(allowed_languages)
+        self.attack_exemplars = list(attack_exemplars)
+        self.similarity_clear_threshold = similarity_clear_threshold
+        self.similarity_block_threshold = similarity_block_threshold
+        self.advanced = advanced
+        self._exemplar_matrix: Optional[np.ndarray] = None
+        self.stats = CascadeStats()
+
+    async def warmup(self):
+        """Embed attack exemplars and load the ML tier (if any) off the event loop."""
+        if self.attack_exemplars and self._exemplar_matrix is None:
+            from app.integrations.embeddings_opensource import get_embedding_model, executor
+            loop = asyncio.get_running_loop()
+            # Exemplars are short and symmetric with queries, so use the "query: " prefix
+            vectors = await loop.run_in_executor(
+                executor,
+                lambda: get_embedding_model().encode_sync([f"query: {t}" for t in self.attack_exemplars])
+            )
+            self._exemplar_matrix = np.asarray(vectors, dtype=np.float32)
+        if self.advanced is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.advanced._ensure_scanners_loaded)
+
+    def _screen(
+        self, text: str, detected_language: Optional[str], enabled_scanners: Dict[str, bool]
+    ) -> ScanResult:
+        triggered: List[str] = []
+        details: Dict[str, Any] = {}
+        max_risk = 0.0
+        sanitized = None
+
+        matches = self.pattern_scanner.scan(text)
+        if enabled_scanners.get("regex_patterns", True) and "regex_patterns" in matches:
+            triggered.append("regex_patterns")
+            details["regex_patterns"] = matches["regex_patterns"]
+            max_risk = max(max_risk, min(1.0, len(matches["regex_patterns"]) * 0.3))
+        if enabled_scanners.get("secrets", True) and "secrets" in matches:
+            triggered.append(_SCREENED_BY["secrets"])
+            details["secrets"] = matches["secrets"]
+            max_risk = 1.0
+            sanitized = self.pattern_scanner.redact_secrets(text)
+
+        if enabled_scanners.get("token_limit", True):
+            is_safe, risk = self.token_scanner.scan(text)
+            if not is_safe:
+                triggered.append(_SCREENED_BY["token_limit"])
+                details["token_limit"] = "Input exceeds token limit"
+            max_risk = max(max_risk, risk)
+
+        if enabled_scanners.get("language", True):
+            is_safe, risk = self.language_scanner.scan(text, detected_language)
+            if not is_safe:
+                triggered.append(_SCREENED_BY["language"])
+                details["language"] = f"Unsupported language: {detected_language}"
+            max_risk = max(max_risk, risk)
+
+        return ScanResult(
+            is_safe=not triggered,
+            risk_score=max_risk,
+            triggered_scanners=triggered,
+            sanitized_text=sanitized,
+            details=details
+        )
+
+    async def _attack_similarity(self, query_embedding: Optional[List[float]], text: str) -> Optional[float]:
+        if self._exemplar_matrix is None:
+            return None
+        try:
+            if query_embedding is None:
+                from app.integrations.embeddings import get_embedding
+                query_embedding = await get_embedding(text)
+            # Both sides are L2-normalized, so dot product == cosine
+            return float((self._exemplar_matrix @ np.asarray(query_embedding, dtype=np.float32)).max())
+        except Exception as e:
+            logger.warning("Attack similarity check failed", extra={"error": str(e)})
+            return None
+
+    def _decide(self, tier: str, start: float, result: ScanResult) -> ScanResult:
+        duration_ms = (time.perf_counter() - start) * 1000
+        self.stats.tiers[tier].record(duration_ms, result.is_safe)
+        result.details = {**(result.details or {}), "tier": tier}
+        logger.debug("Guardrails decision", extra={
+            "tier": tier,
+            "is_safe": result.is_safe,
+            "duration_ms": round(duration_ms, 2)
+        })
+        return result
+
+    async def scan(
+        self,
+        text: str,
+        detected_language: Optional[str] = None,
+        enabled_scanners: Dict[str, bool] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> ScanResult:
+        start = time.perf_counter()
+        enabled_scanners = enabled_scanners or {}
+
+        # Tier 1: deterministic screens; a hit is a decision on its own
+        screened = self._screen(text, detected_language, enabled_scanners)
+        if not screened.is_safe:
+            return self._decide("screen", start, screened)
+
+        # Tier 2: similarity to known attacks
+        similarity = await self._attack_similarity(query_embedding, text)
+        if similarity is not None and similarity >= self.similarity_block_threshold:
+            return self._decide("similarity", start, ScanResult(
+                is_safe=False,
+                risk_score=similarity,
+                triggered_scanners=[SIMILARITY_SCANNER],
+                details={"attack_similarity": similarity}
+            ))
+        if self.advanced is None:
+            if similarity is None:
+                return self._decide("screen", start, screened)
+            return self._decide("similarity", start, ScanResult(
+                is_safe=True,
+                risk_score=max(screened.risk_score, similarity),
+                triggered_scanners=[],
+                details={"attack_similarity": similarity}
+            ))
+
+        # Tier 3: transformer scanners for every category no cheaper tier has cleared
+        skip = {name for screen, name in _SCREENED_BY.items() if enabled_scanners.get(screen, True)}
+        if similarity is not None and similarity < self.similarity_clear_threshold:
+            skip.add(SIMILARITY_SCANNER)
+        advanced = await self.advanced.scan(text, skip=skip)
+        return self._decide("ml", start, ScanResult(
+            is_safe=advanced.is_safe,
+            risk_score=advanced.risk_score,
+            triggered_scanners=advanced.triggered_scanners,
+            sanitized_text=advanced.sanitized_text,
+            details={**(advanced.details or {}), "attack_similarity": similarity, "skipped_scanners": sorted(skip)}
+        ))
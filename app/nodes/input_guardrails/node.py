@@ -19,7 +19,10 @@ from app.logging_config import logger
 from app.services.config_loader.loader import get_node_params, get_node_config
 from app.nodes.input_guardrails.scanner import get_basic_guardrails_service, ScanResult, BasicGuardrailsService, reset_basic_service
 from app.nodes.input_guardrails.advanced_scanner import get_advanced_guardrails_service, AdvancedScanResult, reset_advanced_service
+from app.nodes.input_guardrails.cascade import CascadedGuardrailsService
+from app.nodes.input_guardrails.verdict_cache import GuardrailVerdictCache, config_version
 from app.observability.tracing import observe
+from app.services.model_readiness import ensure_model_ready
 
 
 class InputGuardrailsNode(BaseNode):
@@ -39,6 +42,8 @@ class InputGuardrailsNode(BaseNode):
                 - question (str): User's input text to scan
             Optional:
                 - detected_language (str): Language hint for scanner
+                - query_embedding (List[float]): e5 embedding of the question, if already computed
+                - query_embedding_text (str): Text the query embedding was computed from
         
         Output:
             Guaranteed:
@@ -55,7 +60,7 @@ class InputGuardrailsNode(BaseNode):
     
     INPUT_CONTRACT = {
         "required": ["question"],
-        "optional": ["detected_language"]
+        "optional": ["detected_language", "query_embedding", "query_embedding_text"]
     }
     
     OUTPUT_CONTRACT = {
@@ -73,11 +78,25 @@ class InputGuardrailsNode(BaseNode):
     
     def __init__(self):
         super().__init__("input_guardrails")
-        
-        # Load configuration
+        self._load_config()
+
+        # Support-context whitelist (terms that are normal in support but trigger false positives)
+        self.support_whitelist_patterns = [
+            r"(?i)(black|white)\s+(screen|page)",  # "black screen" is a technical issue
+            r"(?i)(login|password|credentials|authentication)",  # Auth issues are normal
+            r"(?i)(won't accept|can't log in|error logging)",  # Login problems
+            r"(?i)(website|app|service).*(down|slow|not working)",  # Service issues
+            r"(?i)(crazy|insane|ridiculous).*(website|service|app|support)",  # Frustrated users
+        ]
+
+        # Initialize scanner service (Lazy load)
+        self.scanner = None
+
+    def _load_config(self):
+        """(Re)read node parameters and config."""
         self.params = get_node_params("input_guardrails")
         self.config = get_node_config("input_guardrails")
-        
+
         # Protection settings
         self.protection_level = self.params.get("protection_level", "standard")
         self.action_mode = self.params.get("action_mode", "block")
@@ -101,24 +120,23 @@ class InputGuardrailsNode(BaseNode):
         
         # Logging config
         self.logging_config = self.config.get("logging", {})
-        
-        # Support-context whitelist (terms that are normal in support but trigger false positives)
-        self.support_whitelist_patterns = [
-            r"(?i)(black|white)\s+(screen|page)",  # "black screen" is a technical issue
-            r"(?i)(login|password|credentials|authentication)",  # Auth issues are normal
-            r"(?i)(won't accept|can't log in|error logging)",  # Login problems
-            r"(?i)(website|app|service).*(down|slow|not working)",  # Service issues
-            r"(?i)(crazy|insane|ridiculous).*(website|service|app|support)",  # Frustrated users
-        ]
-        
-        # Initialize scanner service (Lazy load)
-        self.scanner = None
-        
+
+        # Verdict cache, keyed by the config version so any config change invalidates it
+        self.verdict_cache_enabled = self.params.get("verdict_cache_enabled", True)
+        self.verdict_cache = GuardrailVerdictCache(
+            max_size=self.params.get("verdict_cache_size", 5000),
+            ttl_seconds=self.params.get("verdict_cache_ttl_seconds", 3600)
+        )
+        self.verdict_cache.reset(config_version(self.params, self.config))
+
     async def warmup(self):
         """
         Initialize the scanner service and load models.
         Should be called during startup or configuration reload.
         """
+        # Pick up config changes (and drop verdicts cached under the old config)
+        self._load_config()
+
         # Force reset singleton to pick up new config
         reset_advanced_service()
         reset_basic_service()
@@ -126,6 +144,33 @@ class InputGuardrailsNode(BaseNode):
 
         regex_patterns = self.config.get("regex_patterns", [])
         
+        # Cascade: cheap screens and attack similarity first, ML scanners only on suspicion
+        if self.params.get("cascade_enabled", True):
+            advanced = None
+            if self.protection_level in ["standard", "advanced"]:
+                advanced = get_advanced_guardrails_service(
+                    protection_level=self.protection_level,
+                    prompt_injection_threshold=self.prompt_injection_threshold,
+                    toxicity_threshold=self.toxicity_threshold,
+                    ban_topics_threshold=self.ban_topics_threshold,
+                    banned_topics=self.config.get("banned_topics", []),
+                    allowed_languages=self.allowed_languages,
+                    max_tokens=self.max_input_tokens
+                )
+            cascade = CascadedGuardrailsService(
+                regex_patterns=regex_patterns,
+                max_tokens=self.max_input_tokens,
+                allowed_languages=self.allowed_languages,
+                attack_exemplars=self.config.get("attack_exemplars", []),
+                similarity_clear_threshold=self.params.get("attack_similarity_clear_threshold", 0.80),
+                similarity_block_threshold=self.params.get("attack_similarity_block_threshold", 0.92),
+                advanced=advanced
+            )
+            await cascade.warmup()
+            self.scanner = cascade
+            logger.info("Input Guardrails ready", extra={"mode": "cascade", "ml_tier": advanced is not None})
+            return
+
         # Try initializing advanced guardrails if configured
         if self.protection_level in ["standard", "advanced"]:
             logger.info("Initializing Advanced Guardrails", extra={
@@ -172,6 +217,9 @@ class InputGuardrailsNode(BaseNode):
         user_input = state.get("question", "")
         detected_language = state.get("detected_language")
         
+        # Never skip safety checks: queue until startup warmup has built the scanner
+        await ensure_model_ready("input_guardrails", policy="wait")
+        
         # Ensure scanner is loaded (Lazy load fallback)
         if self.scanner is None:
             await self.warmup()
@@ -179,14 +227,16 @@ class InputGuardrailsNode(BaseNode):
         # Check if this looks like a legitimate support query (whitelist)
         is_whitelisted = self._is_support_query(user_input)
         
-        # Run security scan
-        scan_result = await self.scanner.scan(
-            text=user_input,
-            **({"detected_language": detected_language, "enabled_scanners": self.scanners} 
-               if self.protection_level == "basic" or isinstance(self.scanner, BasicGuardrailsService) 
-               else {})
-        )
-        
+        # Repeated messages reuse the verdict cached for the current config version
+        scan_result = None
+        if self.verdict_cache_enabled:
+            scan_result = await self.verdict_cache.get(user_input, detected_language)
+
+        if scan_result is None:
+            scan_result = await self._scan(user_input, detected_language, state)
+            if self.verdict_cache_enabled:
+                await self.verdict_cache.set(user_input, scan_result, detected_language)
+
         # Log scan results
         if self.logging_config.get("log_to_langfuse", True):
             self._log_scan_result(scan_result, user_input)
@@ -202,6 +252,22 @@ class InputGuardrailsNode(BaseNode):
             "guardrails_risk_score": scan_result.risk_score
         }
     
+    async def _scan(self, user_input: str, detected_language: str, state: Dict[str, Any]) -> ScanResult:
+        """Run the configured scanner on the input."""
+        if isinstance(self.scanner, CascadedGuardrailsService):
+            return await self.scanner.scan(
+                text=user_input,
+                detected_language=detected_language,
+                enabled_scanners=self.scanners,
+                query_embedding=state.get("query_embedding") if state.get("query_embedding_text") == user_input else None
+            )
+        return await self.scanner.scan(
+            text=user_input,
+            **({"detected_language": detected_language, "enabled_scanners": self.scanners}
+               if self.protection_level == "basic" or isinstance(self.scanner, BasicGuardrailsService)
+               else {})
+        )
+
     async def _handle_threat(
         self, 
         scan_result: ScanResult, 
@@ -312,6 +378,13 @@ class InputGuardrailsNode(BaseNode):
         # This will be captured by Langfuse via @observe decorator
         return log_data
     
+    def get_stats(self) -> Dict[str, Any]:
+        """Verdict cache hit rate plus per-tier decision counts and latency of the cascade."""
+        stats = {"verdict_cache": self.verdict_cache.stats()}
+        if isinstance(self.scanner, CascadedGuardrailsService):
+            stats.update(self.scanner.stats.snapshot())
+        return stats
+
     def _is_support_query(self, text: str) -> bool:
         """
         Check if text matches support-related patterns that might trigger false positives.
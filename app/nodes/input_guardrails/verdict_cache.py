@@ -0,0 +1,114 @@
+"""
+Guardrail Verdict Cache
+
+Caches ScanResults keyed by a hash of the normalized input plus the guardrail
+config version, in-process (LRU) and in Redis (TTL), so repeated messages skip
+scanning entirely.
+
+Normalization is deliberately conservative (Unicode NFKC, collapsed whitespace):
+case and punctuation can change what the scanners see, and the cached verdict
+may carry sanitized text that must match the input it was produced for.
+"""
+import hashlib
+import json
+import re
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Dict, Optional
+
+from app.logging_config import logger
+from app.nodes.input_guardrails.scanner import ScanResult
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_input(text: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def config_version(params: Dict[str, Any], config: Dict[str, Any]) -> str:
+    """Stable hash of the guardrail configuration, identical across workers."""
+    payload = json.dumps({"parameters": params, "config": config}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class GuardrailVerdictCache:
+    REDIS_PREFIX = "guardrails:verdict:"
+
+    def __init__(self, max_size: int = 5000, ttl_seconds: int = 3600, use_redis: bool = True):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.use_redis = use_redis
+        self.version = ""
+        self._local: "OrderedDict[str, ScanResult]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self, version: str):
+        """Drop local verdicts and switch to a new config version (old Redis keys become unreachable)."""
+        self.version = version
+        self._local.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, text: str, detected_language: Optional[str]) -> str:
+        # Language is part of the key: the language scanner depends on it
+        raw = f"{detected_language or ''}\x00{normalize_input(text)}"
+        return f"{self.version}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+    async def get(self, text: str, detected_language: Optional[str] = None) -> Optional[ScanResult]:
+        key = self._key(text, detected_language)
+        result = self._local.get(key)
+        if result is not None:
+            self._local.move_to_end(key)
+            self.hits += 1
+            return result
+
+        if self.use_redis:
+            try:
+                from app.services.redis_pool import get_redis
+                redis = await get_redis()
+                data = await redis.get(f"{self.REDIS_PREFIX}{key}")
+                if data:
+                    result = ScanResult(**json.loads(data))
+                    self._put_local(key, result)
+                    self.hits += 1
+                    return result
+            except Exception as e:
+                logger.debug("Guardrail verdict cache lookup failed", extra={"error": str(e)})
+
+        self.misses += 1
+        return None
+
+    async def set(self, text: str, result: ScanResult, detected_language: Optional[str] = None):
+        key = self._key(text, detected_language)
+        self._put_local(key, result)
+
+        if self.use_redis:
+            try:
+                from app.services.redis_pool import get_redis
+                redis = await get_redis()
+                await redis.setex(
+                    f"{self.REDIS_PREFIX}{key}",
+                    self.ttl_seconds,
+                    json.dumps(asdict(result), default=str)
+                )
+            except Exception as e:
+                logger.debug("Guardrail verdict cache write failed", extra={"error": str(e)})
+
+    def _put_local(self, key: str, result: ScanResult):
+        self._local[key] = result
+        self._local.move_to_end(key)
+        if len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "local_entries": len(self._local)
+        }
@@ -0,0 +1,135 @@
+"""
+Incremental Output Guardrails
+
+Used while streaming: generated text is buffered up to the next sentence
+boundary, checked, and only then released to the client. Data leakage is
+checked per sentence, hallucination indicators on the text so far, and
+relevance / refusal once on the complete answer.
+
+Action modes follow the output_guardrails node:
+- block: stop streaming and replace what was sent with the fallback message
+- sanitize: release the redacted sentence
+- log: release unchanged and log
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+from app.logging_config import logger
+from app.nodes.output_guardrails.scanner import BasicOutputGuardrailsService
+
+# Sentence end followed by whitespace, or a newline
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+class IncrementalOutputGuard:
+    def __init__(
+        self,
+        scanner: BasicOutputGuardrailsService,
+        enabled_scanners: Dict[str, bool],
+        action_mode: str,
+        fallback_message: str,
+        user_query: str = ""
+    ):
+        self.scanner = scanner
+        self.enabled_scanners = enabled_scanners
+        self.action_mode = action_mode
+        self.fallback_message = fallback_message
+        self.user_query = user_query
+
+        self._buffer = ""
+        self._released: List[str] = []
+        self.blocked = False
+        self.sanitized = False
+        self.triggers: List[str] = []
+
+    @property
+    def released_text(self) -> str:
+        return "".join(self._released)
+
+    def feed(self, text: str) -> List[str]:
+        """Adds generated text; returns the checked segments that may be sent now."""
+        if self.blocked:
+            return []
+        self._buffer += text
+        segments = []
+        last = 0
+        for match in _SENTENCE_BOUNDARY.finditer(self._buffer):
+            segment = self._buffer[last:match.end()]
+            last = match.end()
+            checked = self._check_segment(segment)
+            if checked is None:
+                return segments
+            segments.append(checked)
+        self._buffer = self._buffer[last:]
+        return segments
+
+    def finish(self) -> List[str]:
+        """Flushes the tail and runs the whole-answer checks."""
+        if self.blocked:
+            return []
+        segments = []
+        if self._buffer:
+            checked = self._check_segment(self._buffer)
+            self._buffer = ""
+            if checked is None:
+                return []
+            segments.append(checked)
+
+        answer = self.released_text
+        final_scanners = {
+            "relevance": self.enabled_scanners.get("relevance", True),
+            "refusal_detection": self.enabled_scanners.get("refusal_detection", False),
+        }
+        if any(final_scanners.values()):
+            result = self._scan_sync(answer, final_scanners)
+            if result["triggered"]:
+                self._handle(result["triggered"], result["risk"], block_only=True)
+        return segments
+
+    def _check_segment(self, segment: str) -> Optional[str]:
+        sentence_scanners = {"data_leakage": self.enabled_scanners.get("data_leakage", True)}
+        if sentence_scanners["data_leakage"]:
+            is_safe, risk, patterns, sanitized = self.scanner.data_leakage_scanner.scan(segment)
+            if not is_safe:
+                self._handle(["data_leakage"], risk)
+                if self.blocked:
+                    return None
+                if self.action_mode == "sanitize" and sanitized:
+                    self.sanitized = True
+                    segment = sanitized
+
+        if self.enabled_scanners.get("hallucination", False):
+            is_safe, risk, _ = self.scanner.hallucination_scanner.scan(self.released_text + segment)
+            if not is_safe:
+                self._handle(["hallucination"], risk, block_only=True)
+                if self.blocked:
+                    return None
+
+        self._released.append(segment)
+        return segment
+
+    def _scan_sync(self, text: str, scanners: Dict[str, bool]) -> Dict[str, Any]:
+        triggered, risk = [], 0.0
+        if scanners.get("relevance"):
+            ok, r = self.scanner.relevance_scanner.scan(text, self.user_query)
+            if not ok:
+                triggered.append("relevance")
+            risk = max(risk, r)
+        if scanners.get("refusal_detection"):
+            refused, r = self.scanner.refusal_scanner.scan(text)
+            if refused:
+                triggered.append("refusal")
+            risk = max(risk, r)
+        return {"triggered": triggered, "risk": risk}
+
+    def _handle(self, triggers: List[str], risk: float, block_only: bool = False):
+        self.triggers.extend(t for t in triggers if t not in self.triggers)
+        if self.action_mode == "block":
+            self.blocked = True
+            logger.warning("Blocked unsafe streamed response", extra={"risk": risk, "triggers": triggers})
+        elif self.action_mode == "log" or block_only:
+            logger.warning("Suspicious streamed output detected", extra={"risk": risk, "triggers": triggers})
+
+    @property
+    def answer(self) -> str:
+        return self.fallback_message if self.blocked else self.released_text
@@ -4,11 +4,12 @@ Output Guardrails Node
 Validates LLM responses before sending to user.
 Should be placed right before cache storage or END.
 """
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.nodes.base_node import BaseNode
 from app.logging_config import logger
-from app.services.config_loader.loader import get_node_params, get_node_config
+from app.services.config_loader.loader import get_node_params, get_node_config, get_node_enabled
 from app.nodes.output_guardrails.scanner import get_output_guardrails_service, OutputScanResult
+from app.nodes.output_guardrails.incremental import IncrementalOutputGuard
 from app.observability.tracing import observe
 
 
@@ -127,6 +128,29 @@ class OutputGuardrailsNode(BaseNode):
             "output_risk_score": scan_result.risk_score
         }
     
+    def incremental_guard(
+        self,
+        user_query: str = "",
+        language: Optional[str] = None
+    ) -> Optional[IncrementalOutputGuard]:
+        """
+        Sentence-level guard for streamed answers, or None when output
+        guardrails are disabled in the pipeline.
+        """
+        if not get_node_enabled("output_guardrails") or not self.params.get("incremental_streaming", True):
+            return None
+        fallback_msg = self.fallback_responses.get(
+            language or "en",
+            self.fallback_responses.get("default", "I cannot provide this response.")
+        )
+        return IncrementalOutputGuard(
+            scanner=self.scanner,
+            enabled_scanners=self.scanners,
+            action_mode=self.action_mode,
+            fallback_message=fallback_msg,
+            user_query=user_query
+        )
+    
     async def _handle_threat(
         self,
         state: Dict[str, Any],
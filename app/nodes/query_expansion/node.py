@@ -1,6 +1,7 @@
 from typing import Dict, Any
 from app.nodes.base_node import BaseNode
 from app.nodes.query_expansion.expander import QueryExpander
+from app.nodes.dialog_analysis.turn_analysis import turn_analysis_queries
 from app.observability.tracing import observe
 
 class QueryExpansionNode(BaseNode):
@@ -13,6 +14,7 @@ class QueryExpansionNode(BaseNode):
             Optional:
                 - question (str): Original question
                 - aggregated_query (str): Enhanced query
+                - turn_analysis (Dict): Combined analysis result (expansions)
         
         Output:
             Guaranteed:
@@ -22,7 +24,7 @@ class QueryExpansionNode(BaseNode):
     
     INPUT_CONTRACT = {
         "required": [],
-        "optional": ["question", "aggregated_query"]
+        "optional": ["question", "aggregated_query", "turn_analysis"]
     }
     
     OUTPUT_CONTRACT = {
@@ -36,6 +38,13 @@ class QueryExpansionNode(BaseNode):
         """
         question = state.get("aggregated_query") or state.get("question", "")
         
+        # Combined turn analysis already produced the variants
+        turn_analysis = state.get("turn_analysis") or {}
+        if turn_analysis.get("expansions"):
+            return {
+                "queries": turn_analysis_queries(turn_analysis, question)
+            }
+        
         expander = QueryExpander()
         expanded_queries = await expander.expand(question)
         
@@ -11,6 +11,7 @@ from app.nodes.base_node import BaseNode
 from app.logging_config import logger
 from app.observability.tracing import observe
 from app.services.config_loader.loader import get_global_param
+from app.services.model_readiness import ensure_model_ready
 
 class QueryTranslationNode(BaseNode):
     """
@@ -61,7 +62,7 @@ class QueryTranslationNode(BaseNode):
         """
         Translate query to document language if needed.
         """
-        from app.services.translation.translator import translator
+        from app.services.translation.engine import get_translation_engine
         from app.services.config_loader.loader import get_node_params
         
         # Получаем параметры именно этой ноды
@@ -93,10 +94,14 @@ class QueryTranslationNode(BaseNode):
                 "translated_query": query
             }
         
+        # Untranslated queries hurt retrieval, so queue until the model is warm
+        if not await ensure_model_ready("translator_ru_en", policy="wait"):
+            return {"translated_query": query, "translation_performed": False}
+        
         # Translate
         try:
             logger.info("Translating query", extra={"from": detected_language, "to": document_language})
-            translated_query = translator.translate_query(query, target_lang=document_language)
+            translated_query = await get_translation_engine().translate(query, target_lang=document_language)
             logger.info("Translation successful", extra={"original": query, "translated": translated_query})
             
             return {
@@ -1,6 +1,7 @@
 from typing import Dict, Any, List
 from app.nodes.base_node import BaseNode
 from app.nodes.reranking.ranker import get_reranker
+from app.services.model_readiness import ensure_model_ready
 from app.observability.tracing import observe
 
 class RerankingNode(BaseNode):
@@ -48,6 +49,10 @@ class RerankingNode(BaseNode):
         if not docs:
             return {"docs": [], "rerank_scores": []}
         
+        # Serve-while-warming: keep retrieval order until the reranker is loaded
+        if not await ensure_model_ready("reranker", policy="degrade"):
+            return {"docs": docs, "rerank_scores": []}
+        
         ranker = get_reranker()
         ranked_results = await ranker.rank_async(question, docs)
         
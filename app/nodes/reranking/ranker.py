@@ -1,15 +1,16 @@
-from sentence_transformers import CrossEncoder
 from typing import List, Tuple
 import numpy as np
 
 import asyncio
 from app.services.config_loader.loader import get_node_params
+from app.services.inference.backend import load_cross_encoder
+from app.services.model_server.client import ModelServerClient, get_model_server_client
 
 class Reranker:
     def __init__(self, model_name: str = "BAAI/bge-reranker-v2-m3"):
         # This model is state-of-the-art for multilingual reranking.
         # It handles RU/EN cross-lingual pairs very well.
-        self.model = CrossEncoder(model_name)
+        self.model = load_cross_encoder(model_name, "reranker")
 
     async def rank_async(self, query: str, documents: List[str]) -> List[Tuple[float, str]]:
         """
@@ -36,6 +37,9 @@ class Reranker:
             pairs.append([query, clean_doc])
         return pairs
 
+    def _predict(self, pairs: List[List[str]]) -> np.ndarray:
+        return np.asarray(self.model.predict(pairs))
+
     def rank(self, query: str, documents: List[str]) -> List[Tuple[float, str]]:
         """
         Rerank documents based on the query (Synchronous).
@@ -46,7 +50,7 @@ class Reranker:
         pairs = self._prepare_pairs(query, documents)
         
         # Predict returns logits for this model
-        scores = self.model.predict(pairs)
+        scores = self._predict(pairs)
         
         # Apply sigmoid to get [0, 1] range
         scores = 1 / (1 + np.exp(-scores))
@@ -60,6 +64,16 @@ class Reranker:
         return sorted_results
 
 
+class RemoteReranker(Reranker):
+    """Reranker that scores pairs on the shared model server."""
+
+    def __init__(self, client: ModelServerClient):
+        self.client = client
+        self.model = None
+
+    def _predict(self, pairs: List[List[str]]) -> np.ndarray:
+        return self.client.rerank(pairs)
+
 
 # Singleton instance
 reranker_instance = None
@@ -67,6 +81,10 @@ reranker_instance = None
 def get_reranker():
     global reranker_instance
     if reranker_instance is None:
+        client = get_model_server_client()
+        if client is not None:
+            reranker_instance = RemoteReranker(client)
+            return reranker_instance
         params = get_node_params("reranking")
         model_name = params.get("model_name", "BAAI/bge-reranker-v2-m3")
         reranker_instance = Reranker(model_name=model_name)
@@ -7,6 +7,9 @@ from app.observability.score_logger import log_score
 from app.observability.tracing import observe
 from app.dataset.loader import load_ground_truth_dataset, sync_dataset_to_langfuse
 from app.nodes.base_node import BaseEvaluator
+from app.nodes.base_node.eval_runner import (
+    DEFAULT_CONCURRENCY, DEFAULT_ITEM_TIMEOUT, run_items, mean_metrics, latency_summary
+)
 from app.nodes.retrieval.search import retrieve_context
 from app.nodes.retrieval.metrics import HitRate, MRR, ExactMatch, AverageScore, FirstChunkScore, Recall, F1Score
 from app.nodes.reranking.metrics.ndcg import NDCG
@@ -51,10 +54,17 @@ class RetrievalEvaluator(BaseEvaluator):
         self,
         ground_truth_file: str = "datasets/ground_truth_dataset.json",
         top_k: int = 3,
-        run_name: Optional[str] = None
+        run_name: Optional[str] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        item_timeout: Optional[float] = DEFAULT_ITEM_TIMEOUT,
+        checkpoint_path: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Run batch evaluation for retrieval.
+
+        Items run on `concurrency` workers; with `checkpoint_path` every result
+        is appended to a JSONL file and a rerun with the same run_name, top_k
+        and dataset skips the items already there.
         """
         if run_name is None:
             # Shorten name
@@ -65,33 +75,12 @@ class RetrievalEvaluator(BaseEvaluator):
         
         if langfuse_client:
             sync_dataset_to_langfuse(langfuse_client, items)
-            
-        results = []
-        scores_aggregate = {
-            "hit_rate": [], 
-            "mrr": [], 
-            "exact_match": [],
-            "average_score": [],
-            "first_chunk_score": []
-        }
-        
-        logger.info("Starting retrieval evaluation", extra={"run_name": run_name, "count": len(items)})
-        
-        for idx, item in enumerate(items):
+
+        async def evaluate_item(idx: int, item) -> Dict[str, Any]:
             eval_res = await self.evaluate_single(item.question, item.expected_chunks, top_k=top_k)
             metrics = eval_res["metrics"]
             output = eval_res["output"]
-            
-            # Aggregate keys
-            for k, v in metrics.items():
-                if k in scores_aggregate:
-                    scores_aggregate[k].append(v)
-            
-            results.append({
-                "question": item.question,
-                "metrics": metrics
-            })
-            
+
             # Log to Langfuse
             if langfuse_client:
                 trace_id = f"eval-{run_name}-{idx}"
@@ -109,16 +98,34 @@ class RetrievalEvaluator(BaseEvaluator):
                         value=value,
                         comment=f"Metric: {name}"
                     )
+            return {"metrics": metrics}
+
+        logger.info("Starting retrieval evaluation", extra={"run_name": run_name, "count": len(items)})
+
+        run = await run_items(
+            items,
+            evaluate_item,
+            concurrency=concurrency,
+            item_timeout=item_timeout,
+            checkpoint_path=checkpoint_path,
+            run_name=run_name,
+            params={"top_k": top_k}
+        )
+        results = run["results"]
+        aggregated = mean_metrics(results)
         
-        aggregated = {
-            k: sum(v)/len(v) if v else 0.0 for k, v in scores_aggregate.items() 
-        }
-        
-        logger.info("Retrieval evaluation finished", extra={"run_name": run_name, "results": aggregated})
+        logger.info("Retrieval evaluation finished", extra={
+            "run_name": run_name,
+            "results": aggregated,
+            "errors": len(run["errors"]),
+            "resumed": run["resumed"]
+        })
         return {
             "run_name": run_name,
             "metrics": aggregated,
-            "details": results
+            "latency_ms": latency_summary(results),
+            "details": [{"question": r["question"], "metrics": r["metrics"]} for r in results],
+            "errors": run["errors"]
         }
 
 evaluator = RetrievalEvaluator()
@@ -3,6 +3,7 @@ from app.nodes.base_node import BaseNode
 from app._shared_config.history_filter import filter_conversation_history
 from app.services.cache.manager import get_cache_manager
 from app.services.cache.session_manager import SessionManager
+from app.services.redis_pool import get_redis
 from app.storage.persistence import PersistenceManager
 from app.logging_config import logger
 from app.services.config_loader.loader import get_node_params
@@ -151,7 +152,7 @@ class SessionStarterNode(BaseNode):
         try:
             cache_manager = await get_cache_manager()
             if cache_manager.redis.is_available():
-                session_manager = SessionManager(cache_manager.redis.client)
+                session_manager = SessionManager(await get_redis("sessions"))
                 current_session = await session_manager.get_session(user_id, session_id)
                 
                 if not current_session and session_id:
@@ -193,7 +194,7 @@ class SessionStarterNode(BaseNode):
         try:
             cache_manager = await get_cache_manager()
             if cache_manager.redis.is_available():
-                session_manager = SessionManager(cache_manager.redis.client)
+                session_manager = SessionManager(await get_redis("sessions"))
                 redis_messages = await session_manager.get_recent_messages(
                     session_id, 
                     limit=max_messages
@@ -235,7 +236,7 @@ class SessionStarterNode(BaseNode):
                 try:
                     cache_manager = await get_cache_manager()
                     if cache_manager.redis.is_available():
-                        session_manager = SessionManager(cache_manager.redis.client)
+                        session_manager = SessionManager(await get_redis("sessions"))
                         
                         for msg in current_session_messages[-50:]:
                             await session_manager.add_message(
@@ -3,6 +3,9 @@ from datetime import datetime
 from app.logging_config import logger
 from app.nodes.retrieval.evaluator import RetrievalEvaluator
 from app.nodes.generation.evaluator import GenerationEvaluator
+from app.nodes.base_node.eval_runner import (
+    DEFAULT_CONCURRENCY, DEFAULT_ITEM_TIMEOUT, run_items, mean_metrics, latency_summary
+)
 from app.dataset.loader import load_ground_truth_dataset
 from app.pipeline.graph import rag_graph
 from app.observability.langfuse_client import get_langfuse_client
@@ -12,9 +15,20 @@ class PipelineEvaluator:
         self.retrieval_evaluator = RetrievalEvaluator()
         self.generation_evaluator = GenerationEvaluator()
         
-    async def run_evaluation(self, dataset_path: Optional[str] = None, run_name: str = None):
+    async def run_evaluation(
+        self,
+        dataset_path: Optional[str] = None,
+        run_name: str = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        item_timeout: Optional[float] = DEFAULT_ITEM_TIMEOUT,
+        checkpoint_path: Optional[str] = None
+    ):
         """
         Run End-to-End Pipeline Evaluation.
+
+        Questions run on `concurrency` workers with a per-item timeout. With
+        `checkpoint_path`, results are appended to a JSONL file and an
+        interrupted run resumes from it when given the same run_name and dataset.
         """
         if not run_name:
             run_name = f"e2e-eval-{datetime.now().strftime('%Y%m%d-%H%M')}"
@@ -22,16 +36,10 @@ class PipelineEvaluator:
         items = load_ground_truth_dataset(dataset_path)
         langfuse = get_langfuse_client()
         
-        results = []
-        
         logger.info("Starting E2E Evaluation", extra={"run_name": run_name, "dataset_count": len(items)})
-        
-        for i, item in enumerate(items):
-            # Run Pipeline
-            # Trace should be handled by callbacks in graph if configured, 
-            # OR we wrap it here if we want a specific eval trace.
+
+        async def evaluate_item(idx: int, item) -> Dict[str, Any]:
             # "PipelineEvaluator создаёт trace на каждый evaluation run"
-            
             trace = None
             if langfuse:
                 trace = langfuse.trace(
@@ -39,22 +47,25 @@ class PipelineEvaluator:
                     input={"question": item.question},
                     metadata={"run_name": run_name}
                 )
-            
-            # Using trace as parent if possible? LangGraph callbacks usually create their own root if not passed.
-            # Currently we just invoke. LangGraph callbacks will log to Langfuse.
-            # If we want to group under this trace, we might need to pass callbacks with this trace.
-            
-            # For this refactor, let's just invoke and separate scoring logic
-            response = await rag_graph.ainvoke({"question": item.question})
+
+            # Each item gets its own session so concurrent runs don't share dialog state
+            response = await rag_graph.ainvoke({
+                "question": item.question,
+                "session_id": f"{run_name}-{idx}",
+                "user_id": f"{run_name}-{idx}"
+            })
             
             # Extract outputs
-            retrieved_docs = response.get("docs", [])
+            retrieved_docs = response.get("docs") or []
+            retrieved_scores = response.get("rerank_scores") or response.get("scores") or []
+            retrieved_scores = list(retrieved_scores) + [0.0] * (len(retrieved_docs) - len(retrieved_scores))
             generated_answer = response.get("answer", "")
             
             # Calculate Scores
             ret_metrics = self.retrieval_evaluator.calculate_metrics(
-                item.expected_chunk_answer, 
-                retrieved_docs
+                item.expected_chunks,
+                retrieved_docs,
+                retrieved_scores
             )
             
             # Log scores to trace
@@ -63,13 +74,25 @@ class PipelineEvaluator:
                 
                 for k, v in ret_metrics.items():
                     trace.score(name=f"retrieval_{k}", value=v)
-                    
-            results.append({
-                "question": item.question,
-                "retrieval_metrics": ret_metrics,
-                "answer": generated_answer
-            })
-            
-        return {"run_name": run_name, "results": results}
+
+            return {"retrieval_metrics": ret_metrics, "answer": generated_answer}
+
+        run = await run_items(
+            items,
+            evaluate_item,
+            concurrency=concurrency,
+            item_timeout=item_timeout,
+            checkpoint_path=checkpoint_path,
+            run_name=run_name
+        )
+        results = run["results"]
+
+        return {
+            "run_name": run_name,
+            "metrics": mean_metrics(results, field="retrieval_metrics"),
+            "latency_ms": latency_summary(results),
+            "results": results,
+            "errors": run["errors"]
+        }
 
 pipeline_evaluator = PipelineEvaluator()
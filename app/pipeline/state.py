@@ -128,6 +128,8 @@ class State(TypedDict):
     cache_stats: Annotated[Optional[Dict[str, Any]], overwrite]
     cache_reason: Annotated[Optional[str], overwrite]  # "exact_match", "semantic_match"
     question_embedding: Annotated[Optional[List[float]], overwrite]  # Cached embedding for storage
+    query_embedding: Annotated[Optional[List[float]], overwrite]  # e5 embedding of the retrieval query
+    query_embedding_text: Annotated[Optional[str], overwrite]  # Text query_embedding was computed for
 
     # Clarification Flow (Phase 1)
     collected_slots: Annotated[Optional[Dict[str, str]], overwrite]
@@ -143,6 +145,7 @@ class State(TypedDict):
     attempt_count: Annotated[Optional[int], overwrite]
     state_behavior: Annotated[Optional[Dict[str, Any]], overwrite]
     dialog_analysis: Annotated[Optional[Dict[str, Any]], overwrite]
+    turn_analysis: Annotated[Optional[Dict[str, Any]], overwrite]  # Combined analysis: rewritten query + expansions
     
     # Phase 4: Prompt Routing & Localization
     system_prompt: Annotated[Optional[str], overwrite]
@@ -27,14 +27,18 @@ class CacheManager:
         redis_connector: RedisConnector,
         max_entries: int = 1000,
         ttl_seconds: int = 86400,  # 24 hours
-        enable_stats: bool = True
+        enable_stats: bool = True,
+        metrics_top_k: int = 100,
+        metrics_publish_interval: int = 0
     ):
         self.redis = redis_connector
         self.max_entries = max_entries
         self.ttl_seconds = ttl_seconds
         
         self.memory = InMemoryCache(max_entries)
-        self.metrics = CacheMetrics() if enable_stats else None
+        self.metrics = CacheMetrics(top_k_capacity=metrics_top_k) if enable_stats else None
+        self.metrics_publish_interval = metrics_publish_interval
+        self._metrics_task: Optional[asyncio.Task] = None
         
         self.cache_prefix = "faq_cache:"
 
@@ -44,7 +48,9 @@ class CacheManager:
         redis_url: str = "redis://localhost:6379/0",
         max_entries: int = 1000,
         ttl_seconds: int = 86400,
-        enable_stats: bool = True
+        enable_stats: bool = True,
+        metrics_top_k: int = 100,
+        metrics_publish_interval: int = 0
     ) -> "CacheManager":
         """
         Create a cache manager with Redis connection.
@@ -52,12 +58,17 @@ class CacheManager:
         connector = RedisConnector(redis_url)
         await connector.connect()
         
-        return cls(
+        manager = cls(
             redis_connector=connector,
             max_entries=max_entries,
             ttl_seconds=ttl_seconds,
-            enable_stats=enable_stats
+            enable_stats=enable_stats,
+            metrics_top_k=metrics_top_k,
+            metrics_publish_interval=metrics_publish_interval
         )
+        if manager.metrics and metrics_publish_interval > 0 and connector.is_available():
+            manager._metrics_task = asyncio.create_task(manager._publish_metrics_loop())
+        return manager
 
     async def set(self, query_normalized: str, entry: CacheEntry) -> bool:
         """Store a cache entry."""
@@ -178,8 +189,32 @@ class CacheManager:
         self.metrics.update_total_entries(entry_count)
         return self.metrics.get_stats()
 
+    async def get_aggregated_stats(self) -> Optional[Dict[str, Any]]:
+        """Cache statistics across all workers; falls back to this worker's stats."""
+        if not self.metrics or not self._metrics_task or not self.redis.is_available():
+            return self.get_stats()
+        self.metrics.update_total_entries(self.memory.count())
+        try:
+            return await self.metrics.aggregate_snapshots(self.redis.client)
+        except Exception as e:
+            logger.warning("Cache metrics aggregation failed", extra={"error": str(e)})
+            return self.metrics.get_stats()
+
+    async def _publish_metrics_loop(self):
+        # Snapshots expire if the worker stops publishing
+        ttl = max(self.metrics_publish_interval * 3, 30)
+        while True:
+            await asyncio.sleep(self.metrics_publish_interval)
+            try:
+                await self.metrics.publish_snapshot(self.redis.client, ttl_seconds=ttl)
+            except Exception as e:
+                logger.debug("Cache metrics publish failed", extra={"error": str(e)})
+
     async def close(self):
         """Close Redis connection."""
+        if self._metrics_task:
+            self._metrics_task.cancel()
+            self._metrics_task = None
         await self.redis.close()
 
     async def health_check(self) -> Dict[str, Any]:
@@ -221,6 +256,8 @@ async def get_cache_manager(
             redis_url=final_redis_url,
             max_entries=final_max_entries,
             ttl_seconds=final_ttl_seconds,
-            enable_stats=final_enable_stats
+            enable_stats=final_enable_stats,
+            metrics_top_k=cache_config.get("metrics_top_k", 100),
+            metrics_publish_interval=cache_config.get("metrics_publish_interval_seconds", 0)
         )
     return _cache_instance
@@ -63,6 +63,10 @@ class CacheStats(BaseModel):
     hit_rate: float = Field(default=0.0, description="Hit rate percentage (0-100)")
     avg_response_time_cached: float = Field(default=0.0, description="Average cached response time (ms)")
     avg_response_time_full: float = Field(default=0.0, description="Average full pipeline time (ms)")
+    response_time_percentiles: Dict[str, Dict[str, float]] = Field(
+        default_factory=dict,
+        description="p50/p95/p99 response times (ms) for cached and full responses"
+    )
     savings_time: float = Field(default=0.0, description="Total time saved by caching (seconds)")
     memory_usage_mb: float = Field(default=0.0, description="Cache memory usage (MB)")
     total_entries: int = Field(default=0, description="Number of cached entries")
@@ -2,6 +2,8 @@ from typing import Optional, Tuple, Any
 from redis import asyncio as aioredis
 from redis.asyncio import Redis
 from app.logging_config import logger
+from app.services.redis_pool import get_redis
+from app.settings import settings
 
 class RedisConnector:
     """
@@ -10,13 +12,18 @@ class RedisConnector:
     def __init__(self, url: str):
         self.url = url
         self.client: Optional[Redis] = None
+        self._owns_client = False
 
     async def connect(self) -> bool:
         """Establish connection to Redis."""
         try:
-            # decode_responses=False because we store JSON bytes or let Pydantic handle it?
-            # Original code used decode_responses=False
-            self.client = await aioredis.from_url(self.url, decode_responses=False)
+            if self.url == settings.REDIS_URL:
+                # Shared "cache" pool (bytes responses)
+                self.client = await get_redis("cache")
+                self._owns_client = False
+            else:
+                self.client = await aioredis.from_url(self.url, decode_responses=False)
+                self._owns_client = True
             await self.client.ping()
             logger.info("Redis connected successfully")
             return True
@@ -28,7 +35,9 @@ class RedisConnector:
     async def close(self):
         """Close connection."""
         if self.client:
-            await self.client.close()
+            # The shared pool is closed by the Redis manager on shutdown
+            if self._owns_client:
+                await self.client.close()
             self.client = None
 
     def is_available(self) -> bool:
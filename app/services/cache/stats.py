@@ -3,20 +3,164 @@ Cache metrics and statistics tracking.
 
 Monitors:
 - Cache hit/miss rates
-- Response time improvements
+- Response time improvements (mean and percentiles)
 - Memory usage
 - Most frequently asked questions
+
+All collectors use fixed memory regardless of traffic:
+- LatencyHistogram: log-bucketed (HDR-style) histogram, ~2% relative error
+- TopKCounter: Space-Saving sketch for the most asked questions
+
+Both are mergeable, so per-worker snapshots can be combined through Redis
+(publish_snapshot / aggregate_snapshots).
 """
 
-import time
-from collections import defaultdict
-from typing import Optional, Dict, Any
+import json
+import math
+import os
+from typing import Optional, Dict, Any, List
 from datetime import datetime
-from statistics import mean, StatisticsError
 from app.services.cache.models import CacheStats
 from app.logging_config import logger
 
 
+class LatencyHistogram:
+    """
+    Fixed-size latency histogram with logarithmic buckets.
+
+    Values between min_ms and max_ms are kept with `precision` relative error;
+    values outside are clamped into the first/last bucket. Count, sum, min and
+    max are exact.
+    """
+
+    def __init__(self, min_ms: float = 0.1, max_ms: float = 600_000.0, precision: float = 0.02):
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.precision = precision
+        self._log_base = math.log1p(precision)
+        self.buckets = [0] * (self._index(max_ms) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = 0.0
+        self.max = 0.0
+
+    def _index(self, value: float) -> int:
+        if value <= self.min_ms:
+            return 0
+        return int(math.log(value / self.min_ms) / self._log_base) + 1
+
+    def _bucket_value(self, index: int) -> float:
+        if index == 0:
+            return self.min_ms
+        # Geometric midpoint of the bucket
+        return self.min_ms * math.exp((index - 0.5) * self._log_base)
+
+    def record(self, value_ms: float):
+        index = min(self._index(value_ms), len(self.buckets) - 1)
+        self.buckets[index] += 1
+        if self.count == 0 or value_ms < self.min:
+            self.min = value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+        self.count += 1
+        self.total += value_ms
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantiles(self, qs: List[float]) -> Dict[float, float]:
+        """Values at the given quantiles (0-1), in one pass over the buckets."""
+        result = {q: 0.0 for q in qs}
+        if not self.count:
+            return result
+        targets = sorted((max(1, math.ceil(q * self.count)), q) for q in qs)
+        seen = 0
+        t = 0
+        for index, bucket_count in enumerate(self.buckets):
+            if not bucket_count:
+                continue
+            seen += bucket_count
+            while t < len(targets) and seen >= targets[t][0]:
+                result[targets[t][1]] = min(max(self._bucket_value(index), self.min), self.max)
+                t += 1
+            if t == len(targets):
+                break
+        return result
+
+    def merge(self, other: "LatencyHistogram"):
+        if other.count == 0:
+            return
+        for i, c in enumerate(other.buckets[:len(self.buckets)]):
+            self.buckets[i] += c
+        self.min = other.min if self.count == 0 else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Sparse encoding keeps Redis snapshots small
+        return {
+            "buckets": {str(i): c for i, c in enumerate(self.buckets) if c},
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        hist = cls()
+        for i, c in data.get("buckets", {}).items():
+            if int(i) < len(hist.buckets):
+                hist.buckets[int(i)] = c
+        hist.count = data.get("count", 0)
+        hist.total = data.get("total", 0.0)
+        hist.min = data.get("min", 0.0)
+        hist.max = data.get("max", 0.0)
+        return hist
+
+
+class TopKCounter:
+    """
+    Space-Saving heavy-hitters sketch.
+
+    Tracks at most `capacity` keys. When full, a new key replaces the one with
+    the lowest count and inherits that count as its error bound, so any key
+    asked more than total/capacity times is guaranteed to be present.
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, key: str, count: int = 1):
+        if key in self.counts:
+            self.counts[key] += count
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0
+            return
+        victim = min(self.counts, key=self.counts.get)
+        floor = self.counts.pop(victim)
+        self.errors.pop(victim, None)
+        self.counts[key] = floor + count
+        self.errors[key] = floor
+
+    def top(self, n: int) -> List[Dict[str, Any]]:
+        ranked = sorted(self.counts.items(), key=lambda x: x[1], reverse=True)[:n]
+        return [{"query": query, "hits": count} for query, count in ranked]
+
+    def merge(self, other: "TopKCounter"):
+        for key, count in other.counts.items():
+            self.add(key, count)
+
+    def clear(self):
+        self.counts.clear()
+        self.errors.clear()
+
+
 class CacheMetrics:
     """
     Thread-safe cache metrics collector.
@@ -35,19 +179,20 @@ class CacheMetrics:
 
         # Record a cache miss (full pipeline)
         metrics.record_miss(response_time_ms=850)
-
-        # Record a cache miss (full pipeline)
-        metrics.record_miss(response_time_ms=850)
     """
 
-    def __init__(self, max_top_questions: int = 5):
+    SNAPSHOT_PREFIX = "cache_metrics:worker:"
+
+    def __init__(self, max_top_questions: int = 5, top_k_capacity: int = 100):
         """
         Initialize metrics collector.
 
         Args:
             max_top_questions: Keep track of top N questions (default 5)
+            top_k_capacity: Questions tracked by the top-k sketch (bounds memory)
         """
         self.max_top_questions = max_top_questions
+        self.top_k_capacity = top_k_capacity
 
         # Core metrics
         self.total_requests = 0
@@ -55,11 +200,11 @@ class CacheMetrics:
         self.cache_misses = 0
 
         # Response times
-        self.cached_response_times = []
-        self.full_response_times = []
+        self.cached_response_times = LatencyHistogram()
+        self.full_response_times = LatencyHistogram()
 
         # Query frequency tracking
-        self.query_hit_counts: Dict[str, int] = defaultdict(int)
+        self.query_hit_counts = TopKCounter(top_k_capacity)
 
         # Memory tracking
         self.memory_usage_mb = 0.0
@@ -86,8 +231,8 @@ class CacheMetrics:
         """
         self.total_requests += 1
         self.cache_hits += 1
-        self.cached_response_times.append(response_time_ms)
-        self.query_hit_counts[query_normalized] += 1
+        self.cached_response_times.record(response_time_ms)
+        self.query_hit_counts.add(query_normalized)
 
     def record_miss(self, response_time_ms: float):
         """
@@ -98,7 +243,7 @@ class CacheMetrics:
         """
         self.total_requests += 1
         self.cache_misses += 1
-        self.full_response_times.append(response_time_ms)
+        self.full_response_times.record(response_time_ms)
 
     def update_memory_usage(self, memory_mb: float):
         """
@@ -122,6 +267,8 @@ class CacheMetrics:
         """
         Get current cache statistics.
 
+        Cost does not depend on the number of recorded requests.
+
         Returns:
             CacheStats object with all metrics
 
@@ -134,36 +281,21 @@ class CacheMetrics:
             hit_rate = (self.cache_hits / self.total_requests) * 100
 
         # Calculate average response times
-        avg_cached_time = 0.0
-        if self.cached_response_times:
-            try:
-                avg_cached_time = mean(self.cached_response_times)
-            except StatisticsError:
-                avg_cached_time = 0.0
-
-        avg_full_time = 0.0
-        if self.full_response_times:
-            try:
-                avg_full_time = mean(self.full_response_times)
-            except StatisticsError:
-                avg_full_time = 0.0
+        avg_cached_time = self.cached_response_times.mean()
+        avg_full_time = self.full_response_times.mean()
 
         # Calculate time savings
         time_per_hit_saved = (avg_full_time - avg_cached_time) / 1000  # Convert ms to seconds
         total_time_saved = self.cache_hits * time_per_hit_saved
 
-        # Get top N questions
-        top_questions = []
-        if self.query_hit_counts:
-            sorted_queries = sorted(
-                self.query_hit_counts.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )
-            top_questions = [
-                {"query": query, "hits": count}
-                for query, count in sorted_queries[:self.max_top_questions]
-            ]
+        percentiles = {}
+        for name, hist in (("cached", self.cached_response_times), ("full", self.full_response_times)):
+            values = hist.quantiles([0.5, 0.95, 0.99])
+            percentiles[name] = {
+                "p50": round(values[0.5], 2),
+                "p95": round(values[0.95], 2),
+                "p99": round(values[0.99], 2),
+            }
 
         return CacheStats(
             total_requests=self.total_requests,
@@ -172,10 +304,11 @@ class CacheMetrics:
             hit_rate=round(hit_rate, 2),
             avg_response_time_cached=round(avg_cached_time, 2),
             avg_response_time_full=round(avg_full_time, 2),
+            response_time_percentiles=percentiles,
             savings_time=round(total_time_saved, 2),
             memory_usage_mb=round(self.memory_usage_mb, 2),
             total_entries=self.total_entries,
-            most_asked_questions=top_questions,
+            most_asked_questions=self.query_hit_counts.top(self.max_top_questions),
         )
 
     def reset(self):
@@ -183,11 +316,61 @@ class CacheMetrics:
         self.total_requests = 0
         self.cache_hits = 0
         self.cache_misses = 0
-        self.cached_response_times = []
-        self.full_response_times = []
+        self.cached_response_times = LatencyHistogram()
+        self.full_response_times = LatencyHistogram()
         self.query_hit_counts.clear()
         self.stats_start_time = datetime.utcnow()
 
+    # --- Cross-worker aggregation ---
+
+    def to_snapshot(self) -> Dict[str, Any]:
+        return {
+            "total_requests": self.total_requests,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cached_response_times": self.cached_response_times.to_dict(),
+            "full_response_times": self.full_response_times.to_dict(),
+            "query_hit_counts": self.query_hit_counts.counts,
+        }
+
+    def merge_snapshot(self, snapshot: Dict[str, Any]):
+        self.total_requests += snapshot.get("total_requests", 0)
+        self.cache_hits += snapshot.get("cache_hits", 0)
+        self.cache_misses += snapshot.get("cache_misses", 0)
+        self.cached_response_times.merge(LatencyHistogram.from_dict(snapshot.get("cached_response_times", {})))
+        self.full_response_times.merge(LatencyHistogram.from_dict(snapshot.get("full_response_times", {})))
+        for query, count in snapshot.get("query_hit_counts", {}).items():
+            self.query_hit_counts.add(query, count)
+
+    async def publish_snapshot(self, redis, ttl_seconds: int = 300, worker_id: Optional[str] = None):
+        """Store this worker's metrics in Redis for aggregate_snapshots()."""
+        worker_id = worker_id or str(os.getpid())
+        await redis.setex(f"{self.SNAPSHOT_PREFIX}{worker_id}", ttl_seconds, json.dumps(self.to_snapshot()))
+
+    async def aggregate_snapshots(self, redis) -> CacheStats:
+        """
+        Stats across all workers that published a snapshot recently.
+        This worker's live counters replace its own (possibly stale) snapshot.
+        """
+        combined = CacheMetrics(self.max_top_questions, self.top_k_capacity)
+        combined.merge_snapshot(self.to_snapshot())
+        own_key = f"{self.SNAPSHOT_PREFIX}{os.getpid()}"
+
+        keys = [k async for k in redis.scan_iter(match=f"{self.SNAPSHOT_PREFIX}*")]
+        keys = [k for k in keys if (k.decode() if isinstance(k, bytes) else k) != own_key]
+        if keys:
+            for raw in await redis.mget(keys):
+                if not raw:
+                    continue
+                try:
+                    combined.merge_snapshot(json.loads(raw))
+                except (ValueError, TypeError) as e:
+                    logger.debug("Skipping unreadable cache metrics snapshot", extra={"error": str(e)})
+
+        combined.memory_usage_mb = self.memory_usage_mb
+        combined.total_entries = self.total_entries
+        return combined.get_stats()
+
     def get_summary(self) -> str:
         """
         Get a human-readable summary of cache performance.
@@ -6,6 +6,8 @@ from qdrant_client.http import models
 from typing import List, Dict, Any, Optional
 import json
 import psycopg
+from app.services.search.bm25_index import get_lexical_index
+from app.services.qa_validators.near_duplicate_index import get_near_duplicate_index
 
 class ChunkService:
     """Service for managing document chunks in Postgres and Qdrant."""
@@ -197,6 +199,9 @@ class ChunkService:
                     "content": row[1],
                     "metadata": row[2]
                 }
+                await get_lexical_index().notify_changed([chunk_id])
+                if content:
+                    await get_near_duplicate_index().notify_changed([chunk_id])
 
                 # 2. Update Qdrant (Payload only for now, unless we want to re-embed)
                 # If content changed, strictly we should re-embed. 
@@ -232,6 +237,9 @@ class ChunkService:
                 await cur.execute("DELETE FROM documents WHERE id = %s", (chunk_id,))
                 
                 if cur.rowcount > 0:
+                    await get_lexical_index().notify_changed([chunk_id])
+                    await get_near_duplicate_index().notify_changed([chunk_id])
+
                     # Delete from Qdrant
                     try:
                         qdrant = get_async_qdrant_client()
@@ -0,0 +1,246 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Tuple
+
+import numpy as np
+
+from app.logging_config import logger
+from app._shared_config.intent_registry import get_registry, RegistrySnapshot
+
+
+@dataclass(frozen=True)
+class LinearHead:
+    """Multinomial logistic head: softmax((x @ weights + bias) / temperature)."""
+    labels: List[str]
+    weights: np.ndarray  # (dim, n_labels)
+    bias: np.ndarray  # (n_labels,)
+    temperature: float = 1.0
+
+    def predict(self, vector: np.ndarray) -> Tuple[str, float, float]:
+        """Return (label, calibrated confidence, margin between the top two)."""
+        logits = (vector @ self.weights + self.bias) / self.temperature
+        logits = logits - logits.max()
+        probs = np.exp(logits)
+        probs /= probs.sum()
+
+        order = np.argsort(probs)[::-1]
+        top = float(probs[order[0]])
+        second = float(probs[order[1]]) if len(order) > 1 else 0.0
+        return self.labels[int(order[0])], top, top - second
+
+
+@dataclass(frozen=True)
+class LinearHeadSet:
+    """Intent and category heads trained for one registry version, swapped as one unit."""
+    registry_version: int
+    intent: Optional[LinearHead]
+    category: Optional[LinearHead]
+    trained_on: int
+
+
+def _logits(clf, X: np.ndarray) -> np.ndarray:
+    """(n, n_classes) logits; binary models give one column, expanded as in train_head."""
+    scores = clf.decision_function(X)
+    if scores.ndim == 1:
+        scores = np.column_stack([-scores / 2, scores / 2])
+    return scores
+
+
+def _fit_temperature(logits: np.ndarray, targets: np.ndarray) -> float:
+    """Pick the temperature minimizing held-out negative log-likelihood."""
+    best_t, best_nll = 1.0, np.inf
+    for t in np.linspace(0.25, 4.0, 31):
+        scaled = logits / t
+        scaled = scaled - scaled.max(axis=1, keepdims=True)
+        log_probs = scaled - np.log(np.exp(scaled).sum(axis=1, keepdims=True))
+        nll = -log_probs[np.arange(len(targets)), targets].mean()
+        if nll < best_nll:
+            best_t, best_nll = float(t), nll
+    return best_t
+
+
+def train_head(
+    vectors: np.ndarray,
+    labels: List[str],
+    allowed: List[str],
+    regularization: float = 1.0,
+    validation_split: float = 0.2,
+    seed: int = 42
+) -> Optional[LinearHead]:
+    """
+    Train a logistic head over the rows whose label is in `allowed`.
+    Confidences are calibrated with temperature scaling on a held-out split.
+    """
+    from sklearn.linear_model import LogisticRegression
+
+    allowed_set = set(allowed)
+    mask = np.array([label in allowed_set for label in labels])
+    if not mask.any():
+        return None
+    X = vectors[mask]
+    y_labels = [label for label, keep in zip(labels, mask) if keep]
+
+    classes = sorted(set(y_labels))
+    if len(classes) < 2:
+        return None
+    index = {label: i for i, label in enumerate(classes)}
+    y = np.array([index[label] for label in y_labels])
+
+    def fit(X_fit, y_fit):
+        clf = LogisticRegression(C=regularization, max_iter=1000)
+        clf.fit(X_fit, y_fit)
+        return clf
+
+    # Calibrate on a held-out split when there is enough data, then refit on everything
+    temperature = 1.0
+    rng = np.random.default_rng(seed)
+    perm = rng.permutation(len(y))
+    n_val = int(len(y) * validation_split)
+    train_idx, val_idx = perm[n_val:], perm[:n_val]
+    if n_val >= len(classes) and len(set(y[train_idx])) == len(classes):
+        clf = fit(X[train_idx], y[train_idx])
+        temperature = _fit_temperature(_logits(clf, X[val_idx]), y[val_idx])
+
+    clf = fit(X, y)
+    weights, bias = clf.coef_.T, clf.intercept_
+    if len(classes) == 2:
+        # Binary sklearn models expose one logit; expand to two for softmax
+        weights = np.hstack([-weights / 2, weights / 2])
+        bias = np.array([-bias[0] / 2, bias[0] / 2])
+
+    return LinearHead(
+        labels=[classes[i] for i in clf.classes_],
+        weights=weights.astype(np.float32),
+        bias=bias.astype(np.float32),
+        temperature=temperature
+    )
+
+
+class LinearHeadClassifier:
+    """
+    Intent/category classification with logistic heads over e5 embeddings.
+
+    Heads are trained on the stored document embeddings grouped by their
+    metadata category and intent, retrained whenever the intent registry
+    changes, and score a query with one matrix product per head.
+    """
+    _instance = None
+
+    _heads: Optional[LinearHeadSet] = None
+    _lock = asyncio.Lock()
+    # Registry version whose training attempt failed; not retried until it changes
+    _failed_version: Optional[int] = None
+    _warmup_task: Optional[asyncio.Task] = None
+    regularization: float = 1.0
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(LinearHeadClassifier, cls).__new__(cls)
+        return cls._instance
+
+    @property
+    def is_ready(self) -> bool:
+        return self._heads is not None
+
+    @staticmethod
+    async def _load_training_data() -> Tuple[np.ndarray, List[str], List[str]]:
+        from app.storage.connection import get_db_connection
+
+        async with get_db_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("""
+                    SELECT embedding::text, metadata->>'category', metadata->>'intent'
+                    FROM documents
+                    WHERE embedding IS NOT NULL
+                """)
+                rows = await cur.fetchall()
+
+        if not rows:
+            return np.empty((0, 0), dtype=np.float32), [], []
+        vectors = np.stack([np.array(row[0].strip("[]").split(","), dtype=np.float32) for row in rows])
+        categories = [row[1] for row in rows]
+        intents = [row[2] for row in rows]
+        return vectors, categories, intents
+
+    async def retrain(self, snapshot: Optional[RegistrySnapshot] = None, force: bool = False) -> None:
+        """Train both heads for a registry snapshot and swap them in."""
+        snapshot = snapshot or get_registry().snapshot
+        async with self._lock:
+            current = self._heads
+            if not force and current is not None and current.registry_version >= snapshot.version:
+                return
+            if not force and self._failed_version == snapshot.version:
+                return
+
+            try:
+                vectors, categories, intents = await self._load_training_data()
+                if not len(vectors):
+                    logger.warning("No document embeddings to train classification head on")
+                    LinearHeadClassifier._failed_version = snapshot.version
+                    return
+
+                loop = asyncio.get_running_loop()
+                intent_head, category_head = await asyncio.gather(
+                    loop.run_in_executor(
+                        None, train_head, vectors, intents, list(snapshot.intents), self.regularization
+                    ),
+                    loop.run_in_executor(
+                        None, train_head, vectors, categories, list(snapshot.categories), self.regularization
+                    )
+                )
+
+                LinearHeadClassifier._heads = LinearHeadSet(
+                    registry_version=snapshot.version,
+                    intent=intent_head,
+                    category=category_head,
+                    trained_on=len(vectors)
+                )
+                LinearHeadClassifier._failed_version = None
+                logger.info("Classification head trained", extra={
+                    "documents": len(vectors),
+                    "intents": len(intent_head.labels) if intent_head else 0,
+                    "categories": len(category_head.labels) if category_head else 0,
+                    "registry_version": snapshot.version
+                })
+            except Exception:
+                LinearHeadClassifier._failed_version = snapshot.version
+                logger.error("Failed to train classification head", exc_info=True)
+
+    async def warmup(self) -> None:
+        if self._heads is not None:
+            return
+        registry = get_registry()
+        if not registry.is_loaded:
+            await registry.initialize()
+        # Later registry changes retrain in the background
+        registry.subscribe(self.retrain)
+        await self.retrain(registry.snapshot)
+
+    def schedule_warmup(self) -> None:
+        """
+        Start warmup in the background, at most once at a time, and not again
+        for a registry version whose training already failed. For request
+        paths: callers use their fallback until is_ready.
+        """
+        if self._heads is not None:
+            return
+        if self._warmup_task is not None and not self._warmup_task.done():
+            return
+        registry = get_registry()
+        if registry.is_loaded and self._failed_version == registry.version:
+            return
+        LinearHeadClassifier._warmup_task = asyncio.create_task(self.warmup())
+
+    def predict(self, query_embedding: List[float]) -> Dict[str, Optional[Tuple[str, float, float]]]:
+        """
+        Score a query embedding with both heads.
+        Each entry is (label, confidence, margin) or None if that head is untrained.
+        """
+        heads = self._heads
+        if heads is None:
+            return {"intent": None, "category": None}
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        return {
+            "intent": heads.intent.predict(vector) if heads.intent else None,
+            "category": heads.category.predict(vector) if heads.category else None
+        }
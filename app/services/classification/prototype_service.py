@@ -0,0 +1,209 @@
+import asyncio
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple
+
+import numpy as np
+
+from app.logging_config import logger
+from app.nodes.classification.models import ClassificationOutput
+from app._shared_config.intent_registry import get_registry, RegistrySnapshot
+
+
+DEFAULT_CACHE_PATH = Path(os.environ.get(
+    "CLASSIFICATION_PROTOTYPE_CACHE",
+    Path(__file__).parent.parent.parent.parent / ".cache" / "classification_prototypes.npz"
+))
+
+
+@dataclass(frozen=True)
+class PrototypeSet:
+    """Stacked prototypes and the labels they belong to, swapped as one unit."""
+    registry_version: int
+    intents: List[str]
+    categories: List[str]
+    # Rows [0, len(intents)) are intents, the rest categories
+    matrix: np.ndarray
+
+
+class PrototypeClassificationService:
+    """
+    Classification against precomputed label prototypes in the retrieval (e5) space.
+
+    Unlike SemanticClassificationService this does not load a model of its own:
+    label prototypes are encoded once with the shared EmbeddingModel when the
+    registry is loaded, persisted to disk, and each query is scored against the
+    stacked [intents; categories] matrix with a single matrix product. The query
+    vector is the same one hybrid_search uses for vector retrieval.
+    """
+    _instance = None
+
+    _prototypes: Optional[PrototypeSet] = None
+    # Enriched label text -> prototype vector (mirrors the on-disk cache)
+    _text_vectors: Dict[str, np.ndarray] = {}
+    _disk_loaded: bool = False
+    _lock = asyncio.Lock()
+    cache_path: Path = DEFAULT_CACHE_PATH
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(PrototypeClassificationService, cls).__new__(cls)
+        return cls._instance
+
+    @property
+    def is_ready(self) -> bool:
+        return self._prototypes is not None
+
+    @staticmethod
+    def _label_texts(snapshot: RegistrySnapshot) -> Tuple[List[str], List[str], List[str], List[str]]:
+        """Return intents, categories and the enriched texts used as prototypes."""
+        intents, categories = list(snapshot.intents), list(snapshot.categories)
+        intent_map, category_map = get_registry().get_enrichment_maps(snapshot)
+
+        intent_texts = [intent_map.get(i, i.replace('_', ' ').replace('-', ' ')) for i in intents]
+        category_texts = [category_map.get(c, c.replace('_', ' ').replace('-', ' ')) for c in categories]
+        return intents, categories, intent_texts, category_texts
+
+    def _load_from_disk(self, model_name: str) -> Dict[str, np.ndarray]:
+        if not self.cache_path.exists():
+            return {}
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as data:
+                if str(data["model"]) != model_name:
+                    return {}
+                texts = [str(t) for t in data["texts"]]
+                vectors = data["vectors"].astype(np.float32)
+                return dict(zip(texts, vectors))
+        except Exception as e:
+            logger.warning("Failed to load prototype cache", extra={"path": str(self.cache_path), "error": str(e)})
+            return {}
+
+    def _save_to_disk(self, model_name: str, text_vectors: Dict[str, np.ndarray]) -> None:
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix(".tmp.npz")
+            texts = list(text_vectors.keys())
+            np.savez(
+                tmp_path,
+                model=np.array(model_name),
+                texts=np.array(texts, dtype=str),
+                vectors=np.stack([text_vectors[t] for t in texts])
+            )
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning("Failed to persist prototype cache", extra={"path": str(self.cache_path), "error": str(e)})
+
+    async def _encode_labels(self, texts: List[str]) -> np.ndarray:
+        # Labels are short and symmetric with queries, so e5 wants the "query: " prefix
+        from app.integrations.embeddings_opensource import get_embedding_model, executor
+
+        loop = asyncio.get_running_loop()
+        vectors = await loop.run_in_executor(
+            executor,
+            lambda: get_embedding_model().encode_sync([f"query: {t}" for t in texts])
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+    async def rebuild(self, snapshot: RegistrySnapshot) -> None:
+        """
+        Build prototypes for a registry snapshot and swap them in.
+        Only labels missing from the in-memory/on-disk cache are encoded.
+        """
+        async with self._lock:
+            current = self._prototypes
+            if current is not None and current.registry_version >= snapshot.version:
+                return
+
+            try:
+                from app.integrations.embeddings_opensource import get_embedding_model, executor
+                loop = asyncio.get_running_loop()
+                embedding_model = await loop.run_in_executor(executor, get_embedding_model)
+                model_name = embedding_model.model_name
+
+                if not self._disk_loaded:
+                    PrototypeClassificationService._text_vectors = self._load_from_disk(model_name)
+                    PrototypeClassificationService._disk_loaded = True
+
+                intents, categories, intent_texts, category_texts = self._label_texts(snapshot)
+                texts = intent_texts + category_texts
+                if not intents or not categories:
+                    logger.warning("Intent registry is empty, prototype classifier disabled")
+                    return
+
+                missing = list(dict.fromkeys(t for t in texts if t not in self._text_vectors))
+                if missing:
+                    vectors = await self._encode_labels(missing)
+                    live = set(texts)
+                    text_vectors = {t: v for t, v in self._text_vectors.items() if t in live}
+                    text_vectors.update(zip(missing, vectors))
+                    PrototypeClassificationService._text_vectors = text_vectors
+                    self._save_to_disk(model_name, text_vectors)
+
+                # Swap everything together so readers never see mismatched shapes
+                PrototypeClassificationService._prototypes = PrototypeSet(
+                    registry_version=snapshot.version,
+                    intents=intents,
+                    categories=categories,
+                    matrix=np.stack([self._text_vectors[t] for t in texts])
+                )
+
+                logger.info("Classification prototypes ready", extra={
+                    "intents": len(intents),
+                    "categories": len(categories),
+                    "registry_version": snapshot.version,
+                    "encoded": len(missing),
+                    "reused": len(texts) - len(missing)
+                })
+            except Exception:
+                logger.error("Failed to build classification prototypes", exc_info=True)
+
+    async def _ensure_prototypes(self) -> None:
+        if self._prototypes is not None:
+            return
+        registry = get_registry()
+        # Later registry changes are applied in the background by the listener
+        registry.subscribe(self.rebuild)
+        await self.rebuild(registry.snapshot)
+
+    async def warmup(self) -> None:
+        await self._ensure_prototypes()
+
+    def score(self, query_embedding: List[float]) -> Optional[ClassificationOutput]:
+        """Score a normalized query embedding against all prototypes at once."""
+        prototypes = self._prototypes
+        if prototypes is None:
+            return None
+        intents, categories = prototypes.intents, prototypes.categories
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        # Both sides are L2-normalized by EmbeddingModel, so dot product == cosine
+        scores = prototypes.matrix @ query
+
+        n_intents = len(intents)
+        intent_scores = scores[:n_intents]
+        category_scores = scores[n_intents:]
+        i_idx = int(intent_scores.argmax())
+        c_idx = int(category_scores.argmax())
+
+        return ClassificationOutput(
+            intent=intents[i_idx],
+            intent_confidence=float(intent_scores[i_idx]),
+            category=categories[c_idx],
+            category_confidence=float(category_scores[c_idx])
+        )
+
+    async def classify_embedding(self, query_embedding: List[float]) -> Optional[ClassificationOutput]:
+        try:
+            await self._ensure_prototypes()
+            return self.score(query_embedding)
+        except Exception as e:
+            logger.error("Prototype classification error", extra={"error": str(e)})
+            return None
+
+    async def classify(self, text: str) -> Optional[ClassificationOutput]:
+        """Convenience wrapper that embeds the query itself."""
+        from app.integrations.embeddings import get_embedding
+
+        embedding = await get_embedding(text)
+        return await self.classify_embedding(embedding)
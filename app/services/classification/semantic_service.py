@@ -1,15 +1,28 @@
 import time
 import asyncio
 import os
+from dataclasses import dataclass
 from typing import Optional, Dict, List, Any
-from sentence_transformers import SentenceTransformer, util
+import numpy as np
+from sentence_transformers import util
 from app.logging_config import logger
 from app.nodes.classification.models import ClassificationOutput
-from app._shared_config.intent_registry import get_registry, IntentRegistryService
+from app._shared_config.intent_registry import get_registry, IntentRegistryService, RegistrySnapshot
+from app.services.model_server.client import RemoteSentenceEncoder, get_model_server_client
+from app.services.inference.backend import load_sentence_transformer
 
 # Prevent tokenizer parallelism issues (crashes uvicorn on Windows)
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
+@dataclass(frozen=True)
+class LabelEmbeddings:
+    """Label lists and their embedding matrices, published together as one unit."""
+    registry_version: int
+    intents: List[str]
+    categories: List[str]
+    intent_embeddings: np.ndarray
+    category_embeddings: np.ndarray
+
 class SemanticClassificationService:
     """
     Service for Zero-Shot Classification using Semantic Embeddings (SentenceTransformers).
@@ -21,11 +34,11 @@ class SemanticClassificationService:
     _model = None
     _model_name = "paraphrase-multilingual-MiniLM-L12-v2"  # Multilingual model for RU/EN support
     
-    # Cache for embedded labels
-    _intent_embeddings = None
-    _category_embeddings = None
-    _current_intents: List[str] = []
-    _current_categories: List[str] = []
+    # Current label snapshot (swapped atomically on registry change)
+    _labels: Optional[LabelEmbeddings] = None
+    # Enriched label text -> vector, so refreshes only encode labels that changed
+    _text_vectors: Dict[str, np.ndarray] = {}
+    _refresh_lock = asyncio.Lock()
     
     def __new__(cls):
         if cls._instance is None:
@@ -39,12 +52,17 @@ class SemanticClassificationService:
         registry = get_registry()
         return registry.intents, registry.categories
     
-    def _build_enrichment_maps(self, intents: List[str], categories: List[str]) -> tuple:
+    def _build_enrichment_maps(
+        self,
+        intents: List[str],
+        categories: List[str],
+        snapshot: Optional[RegistrySnapshot] = None
+    ) -> tuple:
         """
         Build enrichment maps using registry data.
         """
         registry = get_registry()
-        dynamic_intent_map, dynamic_category_map = registry.get_enrichment_maps()
+        dynamic_intent_map, dynamic_category_map = registry.get_enrichment_maps(snapshot)
         
         # Merge: dynamic maps take precedence
         intent_map: Dict[str, str] = {}
@@ -72,31 +90,79 @@ class SemanticClassificationService:
         logger.info("Loading semantic model", extra={"model": self._model_name})
         try:
             loop = asyncio.get_running_loop()
-            self._model = await loop.run_in_executor(None, SentenceTransformer, self._model_name)
-            
-            # Get dynamic lists from registry
-            intents, categories = self._get_dynamic_lists()
-            self._current_intents = intents
-            self._current_categories = categories
-            
-            # Build enrichment maps
-            intent_map, category_map = self._build_enrichment_maps(intents, categories)
-            
+            client = get_model_server_client()
+            if client is not None:
+                model = RemoteSentenceEncoder(client, "semantic")
+            else:
+                model = await loop.run_in_executor(None, load_sentence_transformer, self._model_name, "semantic")
+            SemanticClassificationService._model = model
+
             # Pre-compute embeddings for candidates
+            await self._rebuild_labels(get_registry().snapshot)
+
+            # Keep label embeddings in sync with later registry reloads
+            get_registry().subscribe(self._rebuild_labels)
+
+            labels = self._labels
+            logger.info("Semantic model loaded", extra={
+                "intents": len(labels.intents) if labels else 0,
+                "categories": len(labels.categories) if labels else 0
+            })
+        except Exception as e:
+            logger.error("CRITICAL ERROR loading semantic model", exc_info=True)
+
+    async def _rebuild_labels(self, snapshot: RegistrySnapshot) -> None:
+        """
+        Build a new LabelEmbeddings for the given registry snapshot and swap it in.
+        Live requests keep using the previous snapshot until the swap.
+        """
+        if self._model is None:
+            return
+
+        async with self._refresh_lock:
+            current = self._labels
+            if current is not None and current.registry_version >= snapshot.version:
+                return
+
+            intents = list(snapshot.intents)
+            categories = list(snapshot.categories)
+            intent_map, category_map = self._build_enrichment_maps(intents, categories, snapshot)
             intent_texts = [intent_map.get(i, i) for i in intents]
             category_texts = [category_map.get(c, c) for c in categories]
-            
-            self._intent_embeddings = await loop.run_in_executor(
-                None, self._model.encode, intent_texts
-            )
-            self._category_embeddings = await loop.run_in_executor(
-                None, self._model.encode, category_texts
+
+            # Only encode texts we have not seen before
+            missing = list(dict.fromkeys(
+                t for t in intent_texts + category_texts if t not in self._text_vectors
+            ))
+            if missing:
+                loop = asyncio.get_running_loop()
+                vectors = await loop.run_in_executor(None, self._model.encode, missing)
+                text_vectors = dict(self._text_vectors)
+                text_vectors.update(zip(missing, vectors))
+                # Drop vectors for labels that no longer exist
+                live = set(intent_texts) | set(category_texts)
+                SemanticClassificationService._text_vectors = {
+                    t: v for t, v in text_vectors.items() if t in live
+                }
+
+            def stack(texts: List[str]) -> np.ndarray:
+                if not texts:
+                    return np.empty((0, 0), dtype=np.float32)
+                return np.stack([self._text_vectors[t] for t in texts])
+
+            SemanticClassificationService._labels = LabelEmbeddings(
+                registry_version=snapshot.version,
+                intents=intents,
+                categories=categories,
+                intent_embeddings=stack(intent_texts),
+                category_embeddings=stack(category_texts)
             )
-            
-            logger.info("Semantic model loaded", extra={"intents": len(intents), "categories": len(categories)})
-        except Exception as e:
-            logger.error("CRITICAL ERROR loading semantic model", exc_info=True)
-    
+            logger.info("Semantic label embeddings updated", extra={
+                "registry_version": snapshot.version,
+                "encoded": len(missing),
+                "reused": len(intent_texts) + len(category_texts) - len(missing)
+            })
+
     async def refresh_embeddings(self) -> bool:
         """
         Refresh label embeddings after registry update.
@@ -104,31 +170,14 @@ class SemanticClassificationService:
         """
         if self._model is None:
             return False
-        
+
         try:
-            # Reload registry
             registry = get_registry()
-            registry.reload()
-            
-            # Get updated lists
-            intents, categories = self._get_dynamic_lists()
-            self._current_intents = intents
-            self._current_categories = categories
-            
-            # Rebuild embeddings
-            intent_map, category_map = self._build_enrichment_maps(intents, categories)
-            intent_texts = [intent_map.get(i, i) for i in intents]
-            category_texts = [category_map.get(c, c) for c in categories]
-            
-            loop = asyncio.get_running_loop()
-            self._intent_embeddings = await loop.run_in_executor(
-                None, self._model.encode, intent_texts
-            )
-            self._category_embeddings = await loop.run_in_executor(
-                None, self._model.encode, category_texts
-            )
-            
-            logger.info("Refreshed semantic embeddings", extra={"intents": len(intents), "categories": len(categories)})
+            await registry.reload()
+            await self._rebuild_labels(registry.snapshot)
+
+            labels = self._labels
+            logger.info("Refreshed semantic embeddings", extra={"intents": len(labels.intents), "categories": len(labels.categories)})
             return True
         except Exception as e:
             logger.error("Error refreshing embeddings", extra={"error": str(e)})
@@ -137,7 +186,8 @@ class SemanticClassificationService:
     async def classify(self, text: str) -> Optional[ClassificationOutput]:
         try:
             await self._ensure_model()
-            if self._model is None:
+            labels = self._labels
+            if self._model is None or labels is None or not labels.intents or not labels.categories:
                 return None
 
             start_time = time.time()
@@ -154,8 +204,8 @@ class SemanticClassificationService:
                 best_score = scores[best_idx].item()
                 return original_labels[best_idx], best_score
 
-            intent, i_score = get_best(query_vec, self._intent_embeddings, self._current_intents)
-            category, c_score = get_best(query_vec, self._category_embeddings, self._current_categories)
+            intent, i_score = get_best(query_vec, labels.intent_embeddings, labels.intents)
+            category, c_score = get_best(query_vec, labels.category_embeddings, labels.categories)
 
             return ClassificationOutput(
                 intent=intent,
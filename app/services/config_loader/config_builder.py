@@ -131,6 +131,9 @@ class PipelineConfigBuilder:
                 "retry_count": global_params.get("retry_count", 3)
             }
         }
+        # Carry over any other global parameters (warmup, inference backends, ...)
+        for key, value in global_params.items():
+            details["global"]["parameters"].setdefault(key, value)
 
         details["cache"] = {
             "parameters": {
@@ -19,6 +19,10 @@ class ConversationConfig:
     def use_llm_analysis(self) -> bool:
         return get_node_params("dialog_analysis").get("mode") == "llm"
 
+    @property
+    def use_combined_turn_analysis(self) -> bool:
+        return get_node_params("dialog_analysis").get("mode") == "combined"
+
     @property
     def session_ttl_hours(self) -> int:
         return get_global_param("session_ttl_hours", 24)
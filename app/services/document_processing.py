@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Iterator, Union
 from app.logging_config import logger
 
 from app.services.document_loaders.loader_factory import LoaderFactory
@@ -30,6 +30,17 @@ class DocumentProcessingService:
         Returns:
             List of ProcessedQAPair objects
         """
+        return list(DocumentProcessingService.iter_pairs(file_path, original_filename))
+
+    @staticmethod
+    def iter_pairs(file_path: str, original_filename: str = None) -> Iterator[ProcessedQAPair]:
+        """
+        Same pipeline as process_file, yielding enriched pairs one at a time.
+
+        Loaders and extractors work on the whole document; enrichment is lazy,
+        so a consumer such as DocumentIngestionService.ingest_stream never
+        holds every ProcessedQAPair at once.
+        """
         path_obj = Path(file_path)
         display_name = original_filename if original_filename else path_obj.name
         logger.info("Processing file", extra={"filename": display_name})
@@ -43,7 +54,7 @@ class DocumentProcessingService:
             # If doc.blocks is empty but raw_text is present, might be raw text.
             # But loaders should produce blocks.
             logger.warning("No blocks returned from loader.")
-            return []
+            return
 
         # 2. Analyze Structure & Choose Extractor
         # If it's CSV, we know it's a Table.
@@ -96,7 +107,7 @@ class DocumentProcessingService:
         raw_pairs = extractor.extract(doc.blocks, structure)
         
         # 4. Enrich Metadata -> ProcessedQAPair
-        processed_pairs = []
+        count = 0
         for pair in raw_pairs:
             # Enrich returns dict
             enriched_meta = MetadataEnricher.enrich(
@@ -105,11 +116,11 @@ class DocumentProcessingService:
                 existing_metadata=pair.metadata
             )
             
-            processed_pairs.append(ProcessedQAPair(
+            yield ProcessedQAPair(
                 question=pair.question,
                 answer=pair.answer,
                 metadata=enriched_meta
-            ))
-            
-        logger.info("File processing complete", extra={"pairs_extracted": len(processed_pairs), "filename": display_name})
-        return processed_pairs
+            )
+            count += 1
+
+        logger.info("File processing complete", extra={"pairs_extracted": count, "filename": display_name})
@@ -0,0 +1,25 @@
+"""Pluggable inference backends (PyTorch or ONNX Runtime int8) for local models."""
+
+from .backend import (
+    ONNX_AVAILABLE,
+    ONNX_INT8,
+    TORCH,
+    backends_snapshot,
+    get_backend,
+    load_cross_encoder,
+    load_sentence_transformer,
+    load_seq2seq,
+    load_zero_shot_pipeline,
+)
+
+__all__ = [
+    "ONNX_AVAILABLE",
+    "ONNX_INT8",
+    "TORCH",
+    "backends_snapshot",
+    "get_backend",
+    "load_cross_encoder",
+    "load_sentence_transformer",
+    "load_seq2seq",
+    "load_zero_shot_pipeline",
+]
@@ -0,0 +1,201 @@
+"""
+Inference Backends.
+
+Selects, per model, between eager PyTorch ("torch") and ONNX Runtime with
+dynamic int8 quantization ("onnx_int8"), configured in global.yaml:
+
+    inference_backends:
+      e5: onnx_int8
+      reranker: torch
+
+ONNX exports are produced on first use and cached on disk (ONNX_EXPORT_CACHE,
+default <repo>/.cache/onnx), keyed by model name and quantization target.
+When onnxruntime/optimum are not installed every model falls back to torch.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.logging_config import logger
+from app.services.config_loader.loader import get_global_param
+
+try:
+    import onnxruntime  # noqa: F401
+    from optimum.onnxruntime import (
+        ORTModelForSequenceClassification,
+        ORTModelForSeq2SeqLM,
+        ORTQuantizer,
+    )
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+    logger.debug("onnxruntime/optimum not installed, ONNX backend disabled")
+
+TORCH = "torch"
+ONNX_INT8 = "onnx_int8"
+
+DEFAULT_CACHE_DIR = Path(os.environ.get(
+    "ONNX_EXPORT_CACHE",
+    Path(__file__).parent.parent.parent.parent / ".cache" / "onnx"
+))
+
+# Model keys used in inference_backends
+MODEL_KEYS = ("e5", "semantic", "reranker", "zero_shot", "translator")
+
+_export_lock = threading.Lock()
+
+
+def get_backend(model_key: str) -> str:
+    """Configured backend for a model key, downgraded to torch when ONNX is unavailable."""
+    backend = (get_global_param("inference_backends", {}) or {}).get(model_key, TORCH)
+    if backend == ONNX_INT8 and not ONNX_AVAILABLE:
+        logger.warning("ONNX backend requested but onnxruntime/optimum missing, using torch", extra={"model": model_key})
+        return TORCH
+    return backend
+
+
+def _quantization_target() -> str:
+    # avx2 runs on any modern x86; avx512_vnni is faster where supported; arm64 for Graviton/Apple
+    return get_global_param("onnx_quantization_target", "avx2")
+
+
+def _quantization_config(target: str):
+    if target == "avx512_vnni":
+        return AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    if target == "arm64":
+        return AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+    return AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+
+
+def _export_dir(model_name: str, target: str) -> Path:
+    return DEFAULT_CACHE_DIR / model_name.replace("/", "__") / f"int8_{target}"
+
+
+def export_int8(model_name: str, ort_class: Any) -> Path:
+    """
+    Export a Hugging Face model to ONNX, quantize every graph to dynamic int8
+    and cache the result. Returns the directory with the quantized model.
+    """
+    target = _quantization_target()
+    out_dir = _export_dir(model_name, target)
+    marker = out_dir / "export.json"
+
+    with _export_lock:
+        if marker.exists():
+            return out_dir
+
+        from transformers import AutoTokenizer
+
+        logger.info("Exporting model to ONNX int8", extra={"model": model_name, "target": target})
+        fp32_dir = out_dir.parent / "fp32"
+        ort_class.from_pretrained(model_name, export=True).save_pretrained(fp32_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(fp32_dir)
+
+        out_dir.mkdir(parents=True, exist_ok=True)
+        qconfig = _quantization_config(target)
+        onnx_files = sorted(p.name for p in fp32_dir.glob("*.onnx"))
+        for file_name in onnx_files:
+            quantizer = ORTQuantizer.from_pretrained(fp32_dir, file_name=file_name)
+            # Keep the original file names so ORTModel.from_pretrained finds them
+            quantizer.quantize(save_dir=out_dir, quantization_config=qconfig, file_suffix=None)
+
+        # Tokenizer and model config travel with the quantized graphs
+        for p in fp32_dir.iterdir():
+            if p.suffix != ".onnx" and not (out_dir / p.name).exists() and p.is_file():
+                (out_dir / p.name).write_bytes(p.read_bytes())
+
+        marker.write_text(json.dumps({"model": model_name, "target": target, "files": onnx_files}))
+        logger.info("ONNX int8 export cached", extra={"model": model_name, "path": str(out_dir)})
+        return out_dir
+
+
+# --- Loaders used by the model wrappers ---
+
+def load_sentence_transformer(
+    model_name: str, model_key: str, device: Optional[str] = None, backend: Optional[str] = None
+):
+    """SentenceTransformer on the configured backend (same .encode API either way)."""
+    from sentence_transformers import SentenceTransformer
+
+    if (backend or get_backend(model_key)) != ONNX_INT8:
+        return SentenceTransformer(model_name, device=device)
+
+    target = _quantization_target()
+    out_dir = _export_dir(model_name, target).parent / "sentence_transformers"
+    file_name = f"onnx/model_qint8_{target}.onnx"
+    with _export_lock:
+        if not (out_dir / file_name).exists():
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            logger.info("Exporting sentence-transformer to ONNX int8", extra={"model": model_name, "target": target})
+            model = SentenceTransformer(model_name, backend="onnx")
+            model.save_pretrained(str(out_dir))
+            export_dynamic_quantized_onnx_model(model, target, str(out_dir))
+    return SentenceTransformer(str(out_dir), backend="onnx", model_kwargs={"file_name": file_name})
+
+
+class OnnxCrossEncoder:
+    """CrossEncoder-compatible predict() over an int8 ONNX sequence classifier."""
+
+    def __init__(self, model_dir: Path, max_length: int = 512, batch_size: int = 32):
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = ORTModelForSequenceClassification.from_pretrained(model_dir)
+        self.max_length = max_length
+        self.batch_size = batch_size
+
+    def predict(self, pairs: List[Tuple[str, str]], **kwargs) -> np.ndarray:
+        scores = []
+        for i in range(0, len(pairs), self.batch_size):
+            batch = pairs[i:i + self.batch_size]
+            inputs = self.tokenizer(
+                [p[0] for p in batch], [p[1] for p in batch],
+                padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+            )
+            logits = self.model(**inputs).logits
+            scores.append(np.asarray(logits)[:, 0])
+        return np.concatenate(scores) if scores else np.empty(0, dtype=np.float32)
+
+
+def load_cross_encoder(model_name: str, model_key: str = "reranker", backend: Optional[str] = None):
+    if (backend or get_backend(model_key)) != ONNX_INT8:
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(model_name)
+    return OnnxCrossEncoder(export_int8(model_name, ORTModelForSequenceClassification))
+
+
+def load_zero_shot_pipeline(
+    model_name: str, model_key: str = "zero_shot", backend: Optional[str] = None
+) -> Callable:
+    from transformers import pipeline, AutoTokenizer
+
+    if (backend or get_backend(model_key)) != ONNX_INT8:
+        return pipeline("zero-shot-classification", model=model_name, device=-1)
+    model_dir = export_int8(model_name, ORTModelForSequenceClassification)
+    return pipeline(
+        "zero-shot-classification",
+        model=ORTModelForSequenceClassification.from_pretrained(model_dir),
+        tokenizer=AutoTokenizer.from_pretrained(model_dir)
+    )
+
+
+def load_seq2seq(
+    model_name: str, model_key: str = "translator", device: str = "cpu", backend: Optional[str] = None
+) -> Tuple[Any, Any]:
+    """(tokenizer, model) for MarianMT; both backends support .generate()."""
+    from transformers import MarianMTModel, MarianTokenizer
+
+    if (backend or get_backend(model_key)) != ONNX_INT8:
+        return MarianTokenizer.from_pretrained(model_name), MarianMTModel.from_pretrained(model_name).to(device)
+    model_dir = export_int8(model_name, ORTModelForSeq2SeqLM)
+    return MarianTokenizer.from_pretrained(model_dir), ORTModelForSeq2SeqLM.from_pretrained(model_dir)
+
+
+def backends_snapshot() -> Dict[str, str]:
+    return {key: get_backend(key) for key in MODEL_KEYS}
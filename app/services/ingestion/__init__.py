@@ -1,5 +1,6 @@
 """Document ingestion service for storing Q&A pairs."""
 
 from .ingestion_service import DocumentIngestionService
+from .pipeline import IngestionProgress, IngestionSettings, iter_json_pairs
 
-__all__ = ["DocumentIngestionService"]
+__all__ = ["DocumentIngestionService", "IngestionProgress", "IngestionSettings", "iter_json_pairs"]
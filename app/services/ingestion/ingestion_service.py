@@ -1,215 +1,335 @@
 """Service for ingesting Q&A pairs into PostgreSQL and Qdrant."""
 
+import hashlib
 import json
-from typing import List
+from typing import List, Optional, Tuple
 from app.logging_config import logger
 
-import psycopg
 from qdrant_client.http import models
 
 from app.settings import settings
+from app.storage.connection import get_db_connection
 from app.integrations.embeddings_opensource import get_embeddings_batch
 from app.services.document_loaders import ProcessedQAPair
 from app.storage.qdrant_client import get_async_qdrant_client
+from app._shared_config.intent_registry import get_registry
+from app.services.search.bm25_index import get_lexical_index
+from app.services.ingestion.pipeline import IngestionProgress, IngestionSettings, PairSource, run_pipeline
 
 
+def content_hash(content: str) -> str:
+    """Hex md5 of the content; equals Postgres md5(content) for a UTF8 database."""
+    return hashlib.md5(content.encode("utf-8")).hexdigest()
 
 
 class DocumentIngestionService:
     """Service for ingesting Q&A pairs into vector store and database."""
 
-    BATCH_SIZE = 32
+    QDRANT_BATCH_SIZE = 512
     COLLECTION_NAME = "documents"
     VECTOR_SIZE = 384
 
+    _schema_ready = False
+    # Unique index on documents.content_hash (scripts/migrate-009-content-hash.sql);
+    # without it duplicates are checked by content
+    _content_hash_index = False
+
     @staticmethod
-    async def ingest_pairs(pairs: List[ProcessedQAPair], recreate_collection: bool = False) -> dict:
-        """Ingest Q&A pairs into PostgreSQL and Qdrant.
+    async def _ensure_schema(cur):
+        """
+        Create the documents table and FTS columns once per process.
+
+        The content-hash column and unique index are only added here to an
+        empty table. On an existing KB adding them rewrites and locks
+        documents, and fails while it holds duplicates, so that is left to
+        scripts/migrate-009-content-hash.sql; until it runs, ingestion falls
+        back to matching on content.
+        """
+        if DocumentIngestionService._schema_ready:
+            return
+
+        await cur.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id SERIAL PRIMARY KEY,
+                content TEXT NOT NULL,
+                embedding vector(384),
+                metadata JSONB
+            );
+        """)
+
+        # Add FTS indices if they don't exist
+        try:
+            await cur.execute(
+                "ALTER TABLE documents ADD COLUMN IF NOT EXISTS "
+                "fts_en tsvector GENERATED ALWAYS AS (to_tsvector('english', content)) STORED;"
+            )
+            await cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_documents_fts_en ON documents USING GIN (fts_en);"
+            )
+        except Exception as e:
+            logger.warning("Could not setup English FTS", extra={"error": str(e)})
+
+        try:
+            await cur.execute(
+                "ALTER TABLE documents ADD COLUMN IF NOT EXISTS "
+                "fts_ru tsvector GENERATED ALWAYS AS (to_tsvector('russian', content)) STORED;"
+            )
+            await cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_documents_fts_ru ON documents USING GIN (fts_ru);"
+            )
+        except Exception as e:
+            logger.warning("Could not setup Russian FTS", extra={"error": str(e)})
+
+        await cur.execute("SELECT to_regclass('idx_documents_content_hash') IS NOT NULL")
+        has_index = (await cur.fetchone())[0]
+        if not has_index:
+            await cur.execute("SELECT EXISTS (SELECT 1 FROM documents)")
+            if not (await cur.fetchone())[0]:
+                # Same definition as scripts/migrate-009-content-hash.sql; nothing to rewrite yet
+                try:
+                    await cur.execute(
+                        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS "
+                        "content_hash TEXT GENERATED ALWAYS AS (md5(content)) STORED;"
+                    )
+                    await cur.execute(
+                        "CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_content_hash ON documents (content_hash);"
+                    )
+                    has_index = True
+                except Exception as e:
+                    logger.warning("Could not setup content hash index", extra={"error": str(e)})
+        if not has_index:
+            logger.warning(
+                "documents has no unique content_hash index, checking duplicates by content; "
+                "apply scripts/migrate-009-content-hash.sql and restart to use it"
+            )
+        DocumentIngestionService._content_hash_index = has_index
+        DocumentIngestionService._schema_ready = True
+
+    @staticmethod
+    async def bulk_insert(
+        conn,
+        rows: List[Tuple[str, List[float], dict]],
+        table: str = "documents",
+        unique_hash: bool = True
+    ) -> List[Tuple[int, str]]:
+        """COPY rows into a temp table, then insert the new ones in one statement.
 
         Args:
-            pairs: List of processed Q&A pairs
-            recreate_collection: If True, recreate Qdrant collection
+            conn: Async connection (autocommit); the work runs in one transaction
+            rows: (content, embedding, metadata) tuples
+            table: Target table
+            unique_hash: The table has a unique index on content_hash; if not,
+                rows whose content is already stored are skipped by a NOT EXISTS
 
         Returns:
-            Dict with ingestion results
+            (id, content_hash) of the rows actually inserted; duplicates are skipped
         """
-        if not settings.DATABASE_URL:
-            raise ValueError("DATABASE_URL is not set")
-
-        if not pairs:
-            logger.warning("No pairs to ingest")
-            return {"status": "success", "ingested_count": 0}
-
-        logger.info("Starting ingestion", extra={"count": len(pairs)})
+        if not rows:
+            return []
+
+        async with conn.transaction():
+            async with conn.cursor() as cur:
+                await cur.execute("""
+                    CREATE TEMP TABLE ingest_rows (
+                        ord INT,
+                        content TEXT,
+                        embedding vector(384),
+                        metadata JSONB
+                    ) ON COMMIT DROP
+                """)
+                async with cur.copy("COPY ingest_rows (ord, content, embedding, metadata) FROM STDIN") as copy:
+                    for ord_, (content, embedding, metadata) in enumerate(rows):
+                        await copy.write_row((
+                            ord_,
+                            content,
+                            "[" + ",".join(map(str, embedding)) + "]",
+                            json.dumps(metadata)
+                        ))
+                if unique_hash:
+                    await cur.execute(f"""
+                        INSERT INTO {table} (content, embedding, metadata)
+                        SELECT content, embedding, metadata FROM ingest_rows ORDER BY ord
+                        ON CONFLICT (content_hash) DO NOTHING
+                        RETURNING id, content_hash
+                    """)
+                else:
+                    await cur.execute(f"""
+                        INSERT INTO {table} (content, embedding, metadata)
+                        SELECT r.content, r.embedding, r.metadata FROM ingest_rows r
+                        WHERE NOT EXISTS (SELECT 1 FROM {table} d WHERE d.content = r.content)
+                        ORDER BY r.ord
+                        RETURNING id, md5(content)
+                    """)
+                return [(r[0], r[1]) for r in await cur.fetchall()]
 
-        # Initialize Qdrant
+    @staticmethod
+    async def ensure_collection(recreate: bool = False):
+        """Create the Qdrant collection if missing (or drop and recreate it)."""
         qdrant = get_async_qdrant_client()
         collection_name = DocumentIngestionService.COLLECTION_NAME
+        vectors_config = models.VectorParams(
+            size=DocumentIngestionService.VECTOR_SIZE,
+            distance=models.Distance.COSINE
+        )
 
         try:
-            # Recreate collection if requested
-            if recreate_collection:
+            if recreate:
                 try:
                     await qdrant.delete_collection(collection_name)
                 except Exception:
                     pass  # Collection might not exist
 
-                await qdrant.create_collection(
-                    collection_name=collection_name,
-                    vectors_config=models.VectorParams(
-                        size=DocumentIngestionService.VECTOR_SIZE,
-                        distance=models.Distance.COSINE
-                    )
-                )
+                await qdrant.create_collection(collection_name=collection_name, vectors_config=vectors_config)
                 logger.info("Recreated Qdrant collection", extra={"collection": collection_name})
             else:
-                # Ensure collection exists
                 try:
                     await qdrant.get_collection(collection_name)
                 except Exception:
-                    # Create if doesn't exist
-                    await qdrant.create_collection(
-                        collection_name=collection_name,
-                        vectors_config=models.VectorParams(
-                            size=DocumentIngestionService.VECTOR_SIZE,
-                            distance=models.Distance.COSINE
-                        )
-                    )
+                    await qdrant.create_collection(collection_name=collection_name, vectors_config=vectors_config)
                     logger.info("Created new Qdrant collection", extra={"collection": collection_name})
-
         except Exception as e:
             logger.error("Error initializing Qdrant", extra={"error": str(e)})
             raise
 
-        ingested_count = 0
+    @staticmethod
+    async def existing_hashes(hashes: List[str]) -> set:
+        """Content hashes already stored, so their chunks are never embedded."""
+        if not hashes:
+            return set()
+        async with get_db_connection() as conn:
+            async with conn.cursor() as cur:
+                await DocumentIngestionService._ensure_schema(cur)
+                column = "content_hash" if DocumentIngestionService._content_hash_index else "md5(content)"
+                await cur.execute(
+                    f"SELECT {column} FROM documents WHERE {column} = ANY(%s)",
+                    (hashes,)
+                )
+                return {r[0] for r in await cur.fetchall()}
 
-        try:
-            # Use async connection
-            async with await psycopg.AsyncConnection.connect(
-                settings.DATABASE_URL, autocommit=True
-            ) as conn:
-                async with conn.cursor() as cur:
-                    # Ensure table exists
-                    await cur.execute("""
-                        CREATE TABLE IF NOT EXISTS documents (
-                            id SERIAL PRIMARY KEY,
-                            content TEXT NOT NULL,
-                            embedding vector(384),
-                            metadata JSONB
-                        );
-                    """)
+    @staticmethod
+    async def write_batch(rows: List[Tuple[str, str, dict]], embeddings: List[List[float]]) -> List[int]:
+        """Insert one embedded batch into Postgres, then Qdrant under the same ids.
+
+        Returns the ids of the rows actually inserted.
+        """
+        # Pooled connection only for the COPY + INSERT
+        async with get_db_connection() as conn:
+            inserted = await DocumentIngestionService.bulk_insert(
+                conn,
+                [(content, embedding, metadata) for (content, _, metadata), embedding in zip(rows, embeddings)],
+                unique_hash=DocumentIngestionService._content_hash_index
+            )
+
+        # Qdrant points for exactly the rows Postgres accepted
+        by_hash = {digest: (embedding, metadata) for (_, digest, metadata), embedding in zip(rows, embeddings)}
+        points = []
+        for doc_id, digest in inserted:
+            embedding, metadata = by_hash[digest]
+            points.append(
+                models.PointStruct(
+                    id=doc_id,
+                    vector=embedding,
+                    payload={
+                        "category": metadata.get("category"),
+                        "intent": metadata.get("intent"),
+                        "source": "multi_format_ingest"
+                    }
+                )
+            )
+
+        qdrant = get_async_qdrant_client()
+        for start in range(0, len(points), DocumentIngestionService.QDRANT_BATCH_SIZE):
+            await qdrant.upsert(
+                collection_name=DocumentIngestionService.COLLECTION_NAME,
+                points=points[start : start + DocumentIngestionService.QDRANT_BATCH_SIZE]
+            )
+        return [doc_id for doc_id, _ in inserted]
+
+    @staticmethod
+    async def ingest_stream(
+        source: PairSource,
+        recreate_collection: bool = False,
+        job_id: Optional[str] = None,
+        source_name: str = "",
+        **overrides
+    ) -> dict:
+        """Ingest Q&A pairs from an (async) iterable through the bounded pipeline.
+
+        Memory is bounded past the source; pass a lazy source (iter_json_pairs)
+        to keep the whole run bounded.
+
+        Args:
+            source: Iterable or async iterable of ProcessedQAPair
+            recreate_collection: If True, recreate Qdrant collection
+            job_id: Progress record id (see IngestionProgress); generated if omitted
+            source_name: Shown in the progress record
+            **overrides: IngestionSettings fields overriding the global config
+
+        Returns:
+            Dict with ingestion results
+        """
+        if not settings.DATABASE_URL:
+            raise ValueError("DATABASE_URL is not set")
+
+        config = IngestionSettings.load(**overrides)
+        progress = IngestionProgress(job_id or IngestionProgress.new_job_id(), config.job_ttl_seconds)
+        await progress.start(source_name, config)
+        logger.info("Starting ingestion", extra={"job_id": progress.job_id, "source": source_name})
 
-                    # Add FTS indices if they don't exist
-                    try:
-                        await cur.execute(
-                            "ALTER TABLE documents ADD COLUMN IF NOT EXISTS "
-                            "fts_en tsvector GENERATED ALWAYS AS (to_tsvector('english', content)) STORED;"
-                        )
-                        await cur.execute(
-                            "CREATE INDEX IF NOT EXISTS idx_documents_fts_en ON documents USING GIN (fts_en);"
-                        )
-                    except Exception as e:
-                        logger.warning("Could not setup English FTS", extra={"error": str(e)})
-
-                    try:
-                        await cur.execute(
-                            "ALTER TABLE documents ADD COLUMN IF NOT EXISTS "
-                            "fts_ru tsvector GENERATED ALWAYS AS (to_tsvector('russian', content)) STORED;"
-                        )
-                        await cur.execute(
-                            "CREATE INDEX IF NOT EXISTS idx_documents_fts_ru ON documents USING GIN (fts_ru);"
-                        )
-                    except Exception as e:
-                        logger.warning("Could not setup Russian FTS", extra={"error": str(e)})
-
-                    # Process in batches
-                    for i in range(0, len(pairs), DocumentIngestionService.BATCH_SIZE):
-                        batch = pairs[i : i + DocumentIngestionService.BATCH_SIZE]
-                        batch_num = i // DocumentIngestionService.BATCH_SIZE + 1
-                        total_batches = (len(pairs) + DocumentIngestionService.BATCH_SIZE - 1) // DocumentIngestionService.BATCH_SIZE
-
-                        logger.info("Processing batch", extra={"batch": batch_num, "total": total_batches})
-
-                        # Prepare batch content
-                        batch_contents = []
-                        batch_metadatas = []
-
-                        for pair in batch:
-                            content = f"Question: {pair.question}\nAnswer: {pair.answer}"
-                            batch_contents.append(content)
-                            batch_metadatas.append(pair.metadata)
-
-                        # Generate embeddings
-                        embeddings = await get_embeddings_batch(batch_contents)
-
-                        # Insert into PostgreSQL and prepare Qdrant points
-                        points = []
-
-                        for content, embedding, metadata in zip(
-                            batch_contents, embeddings, batch_metadatas
-                        ):
-                            metadata_json = json.dumps(metadata)
-
-                            # Check for duplicates
-                            await cur.execute(
-                                "SELECT id FROM documents WHERE content = %s",
-                                (content,)
-                            )
-                            existing = await cur.fetchone()
-                            
-                            if existing:
-                                logger.warning("Skipping duplicate content", extra={"content_preview": content[:50]})
-                                # Optionally, we could update metadata here if needed, 
-                                # but for now we just skip to prevent duplication.
-                                continue
-
-                            # Insert into PostgreSQL
-                            await cur.execute(
-                                """
-                                INSERT INTO documents (content, embedding, metadata)
-                                VALUES (%s, %s, %s)
-                                RETURNING id
-                                """,
-                                (content, embedding, metadata_json)
-                            )
-                            row = await cur.fetchone()
-                            doc_id = row[0]
-
-                            # Prepare Qdrant point
-                            qdrant_payload = {
-                                "category": metadata.get("category"),
-                                "intent": metadata.get("intent"),
-                                "source": "multi_format_ingest"
-                            }
-
-                            points.append(
-                                models.PointStruct(
-                                    id=doc_id,
-                                    vector=embedding,
-                                    payload=qdrant_payload
-                                )
-                            )
-
-                            ingested_count += 1
-
-                        # Upsert batch to Qdrant
-                        if points:
-                            await qdrant.upsert(
-                                collection_name=collection_name,
-                                points=points
-                            )
-
-                logger.info("Ingestion complete", extra={"ingested_count": ingested_count})
+        async def write(rows, embeddings) -> int:
+            ids = await DocumentIngestionService.write_batch(rows, embeddings)
+            # Per batch, so the id list never grows with the corpus
+            if ids:
+                await get_lexical_index().notify_changed(ids)
+            return len(ids)
 
+        try:
+            await DocumentIngestionService.ensure_collection(recreate_collection)
+            totals = await run_pipeline(
+                source,
+                content_hash=content_hash,
+                existing_hashes=DocumentIngestionService.existing_hashes,
+                embed=get_embeddings_batch,
+                write=write,
+                settings=config,
+                progress=progress,
+            )
         except Exception as e:
-            logger.error("Error during ingestion", extra={"error": str(e)})
+            logger.error("Error during ingestion", extra={"job_id": progress.job_id, "error": str(e)})
+            await progress.finish("failed", error=str(e))
             raise
-        finally:
-            # Close Qdrant client if it has close method
-            if hasattr(qdrant, "close"):
-                await qdrant.close()
 
-        return {
+        logger.info("Ingestion complete", extra={"job_id": progress.job_id, **totals})
+
+        # New documents may introduce categories/intents: refresh in the background
+        if totals["written"]:
+            await get_registry().notify_changed()
+
+        result = {
             "status": "success",
-            "ingested_count": ingested_count
+            "job_id": progress.job_id,
+            "ingested_count": totals["written"],
+            "skipped_count": totals["skipped"]
         }
+        await progress.finish("completed", result=result)
+        return result
+
+    @staticmethod
+    async def ingest_pairs(pairs: List[ProcessedQAPair], recreate_collection: bool = False, job_id: Optional[str] = None) -> dict:
+        """Ingest Q&A pairs into PostgreSQL and Qdrant.
+
+        Args:
+            pairs: List of processed Q&A pairs
+            recreate_collection: If True, recreate Qdrant collection
+            job_id: Progress record id (optional)
+
+        Returns:
+            Dict with ingestion results
+        """
+        if not pairs:
+            logger.warning("No pairs to ingest")
+            return {"status": "success", "ingested_count": 0}
+
+        return await DocumentIngestionService.ingest_stream(
+            pairs, recreate_collection=recreate_collection, job_id=job_id, source_name=f"{len(pairs)} pairs"
+        )
@@ -0,0 +1,298 @@
+"""
+Streaming ingestion: parse -> chunk -> embed -> write, with bounded queues.
+
+    source (iterable of ProcessedQAPair)
+        -> chunk stage: content, hash, dedup against Postgres, batches of write_batch_size
+        -> [embed queue, queue_size batches] -> embed workers (embed_concurrency)
+        -> [write queue, queue_size batches] -> write workers (write_concurrency)
+
+A full queue blocks the stage in front of it, so at most
+(2 * queue_size + embed_concurrency + write_concurrency + 1) batches are in
+memory past the source. The source itself is only bounded when it is lazy,
+like iter_json_pairs; the document loaders parse a whole file first. Progress is kept in Redis under
+ingestion:job:{job_id} so any worker can serve GET /ingestion/jobs/{job_id}.
+Settings come from the `ingestion` block of _shared_config/global.yaml.
+"""
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.logging_config import logger
+from app.services.document_loaders import ProcessedQAPair
+from app.services.redis_pool import get_redis
+
+JOB_PREFIX = "ingestion:job:"
+
+PairSource = Union[Iterable[ProcessedQAPair], AsyncIterable[ProcessedQAPair]]
+# (content, content_hash, metadata)
+Row = Tuple[str, str, Dict[str, Any]]
+
+_DONE = object()
+
+
+@dataclass
+class IngestionSettings:
+    write_batch_size: int = 1000
+    embed_batch_size: int = 32
+    queue_size: int = 2
+    embed_concurrency: int = 1
+    write_concurrency: int = 2
+    job_ttl_seconds: int = 86400
+
+    @classmethod
+    def load(cls, **overrides) -> "IngestionSettings":
+        from app.services.config_loader.loader import get_global_param
+        values = dict(get_global_param("ingestion", {}) or {})
+        values.update({k: v for k, v in overrides.items() if v is not None})
+        known = {k: int(v) for k, v in values.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+
+class IngestionProgress:
+    """Per-job counters in a Redis hash; failures to record progress never fail the job."""
+
+    COUNTERS = ("parsed", "skipped", "embedded", "written", "batches")
+
+    def __init__(self, job_id: str, ttl_seconds: int = 86400):
+        self.job_id = job_id
+        self.key = f"{JOB_PREFIX}{job_id}"
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def new_job_id() -> str:
+        return uuid.uuid4().hex
+
+    async def queue(self, source: str):
+        """Record a job that was accepted but has not started yet."""
+        now = time.time()
+        await self._write({"job_id": self.job_id, "status": "queued", "source": source, "updated_at": now})
+
+    async def start(self, source: str, settings: IngestionSettings):
+        now = time.time()
+        await self._write({
+            "job_id": self.job_id,
+            "status": "running",
+            "source": source,
+            "settings": json.dumps(settings.__dict__),
+            "started_at": now,
+            "updated_at": now,
+            **{c: 0 for c in self.COUNTERS},
+        })
+
+    async def incr(self, **counters: int):
+        try:
+            redis = await get_redis()
+            async with redis.pipeline(transaction=False) as pipe:
+                for name, value in counters.items():
+                    if value:
+                        await pipe.hincrby(self.key, name, value)
+                await pipe.hset(self.key, "updated_at", time.time())
+                await pipe.expire(self.key, self.ttl_seconds)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("Could not record ingestion progress", extra={"job_id": self.job_id, "error": str(e)})
+
+    async def finish(self, status: str, error: Optional[str] = None, result: Optional[Dict[str, Any]] = None):
+        now = time.time()
+        fields = {"status": status, "updated_at": now, "finished_at": now}
+        if error:
+            fields["error"] = error
+        if result is not None:
+            fields["result"] = json.dumps(result, default=str)
+        await self._write(fields)
+
+    async def _write(self, fields: Dict[str, Any]):
+        try:
+            redis = await get_redis()
+            async with redis.pipeline(transaction=False) as pipe:
+                await pipe.hset(self.key, mapping=fields)
+                await pipe.expire(self.key, self.ttl_seconds)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("Could not record ingestion progress", extra={"job_id": self.job_id, "error": str(e)})
+
+    @staticmethod
+    async def get(job_id: str) -> Optional[Dict[str, Any]]:
+        redis = await get_redis()
+        raw = await redis.hgetall(f"{JOB_PREFIX}{job_id}")
+        if not raw:
+            return None
+        job: Dict[str, Any] = dict(raw)
+        for name in IngestionProgress.COUNTERS:
+            job[name] = int(job.get(name) or 0)
+        for name in ("started_at", "updated_at", "finished_at"):
+            if name in job:
+                job[name] = float(job[name])
+        for name in ("settings", "result"):
+            if name in job:
+                job[name] = json.loads(job[name])
+        return job
+
+
+async def _iterate(source: PairSource):
+    if hasattr(source, "__aiter__"):
+        async for item in source:
+            yield item
+    else:
+        for item in source:
+            yield item
+
+
+def pair_content(pair: ProcessedQAPair) -> str:
+    return f"Question: {pair.question}\nAnswer: {pair.answer}"
+
+
+async def run_pipeline(
+    source: PairSource,
+    content_hash: Callable[[str], str],
+    existing_hashes: Callable[[List[str]], Awaitable[set]],
+    embed: Callable[[List[str]], Awaitable[List[List[float]]]],
+    write: Callable[[List[Row], List[List[float]]], Awaitable[int]],
+    settings: IngestionSettings,
+    progress: Optional[IngestionProgress] = None,
+) -> Dict[str, int]:
+    """
+    Drive the stages and return the totals.
+
+    `existing_hashes(hashes)` returns the ones already stored, `embed(texts)`
+    one vector per text and `write(rows, embeddings)` the number of rows it
+    inserted. The first exception from any stage cancels the others and is
+    re-raised.
+    """
+    embed_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.queue_size)
+    write_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.queue_size)
+    totals = {"parsed": 0, "skipped": 0, "embedded": 0, "written": 0, "batches": 0}
+
+    async def record(**counters: int):
+        for name, value in counters.items():
+            totals[name] += value
+        if progress:
+            await progress.incr(**counters)
+
+    async def flush(rows: List[Row], parsed: int):
+        existing = await existing_hashes([digest for _, digest, _ in rows]) if rows else set()
+        fresh = [r for r in rows if r[1] not in existing]
+        await record(parsed=parsed, skipped=parsed - len(fresh))
+        if fresh:
+            await embed_queue.put(fresh)
+
+    async def chunk_stage():
+        rows: List[Row] = []
+        seen = set()  # duplicates inside one batch; across batches the unique index decides
+        parsed = 0
+        async for pair in _iterate(source):
+            parsed += 1
+            content = pair_content(pair)
+            digest = content_hash(content)
+            if digest not in seen:
+                seen.add(digest)
+                rows.append((content, digest, pair.metadata or {}))
+            if parsed >= settings.write_batch_size:
+                await flush(rows, parsed)
+                rows, seen, parsed = [], set(), 0
+        await flush(rows, parsed)
+        for _ in range(settings.embed_concurrency):
+            await embed_queue.put(_DONE)
+
+    async def embed_worker():
+        while True:
+            rows = await embed_queue.get()
+            if rows is _DONE:
+                return
+            contents = [content for content, _, _ in rows]
+            embeddings: List[List[float]] = []
+            for start in range(0, len(contents), settings.embed_batch_size):
+                embeddings.extend(await embed(contents[start:start + settings.embed_batch_size]))
+            await record(embedded=len(rows))
+            await write_queue.put((rows, embeddings))
+
+    async def write_worker():
+        while True:
+            item = await write_queue.get()
+            if item is _DONE:
+                return
+            rows, embeddings = item
+            written = await write(rows, embeddings)
+            await record(written=written, skipped=len(rows) - written, batches=1)
+
+    async def embed_stage():
+        await asyncio.gather(*(embed_worker() for _ in range(settings.embed_concurrency)))
+        for _ in range(settings.write_concurrency):
+            await write_queue.put(_DONE)
+
+    tasks = [
+        asyncio.create_task(chunk_stage()),
+        asyncio.create_task(embed_stage()),
+        *(asyncio.create_task(write_worker()) for _ in range(settings.write_concurrency)),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return totals
+
+
+def iter_json_pairs(path: str, read_size: int = 1 << 20) -> Iterator[ProcessedQAPair]:
+    """
+    Q&A items from a JSON array or JSON Lines file, decoded one item at a time.
+
+    Accepts the dataset layout used by scripts/ingest.py: question, answer (or
+    expected_chunk_answer), metadata, and top-level intent/category/
+    requires_handoff/confidence_threshold folded into metadata.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        pos = 0
+        in_array = None
+        eof = False
+        while True:
+            # Skip whitespace and array punctuation between items
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buffer) and in_array is None:
+                    in_array = buffer[pos] == "["
+                    if in_array:
+                        pos += 1
+                        continue
+                if pos < len(buffer) and buffer[pos] == "]":
+                    return
+                if pos < len(buffer) or eof:
+                    break
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+            if pos >= len(buffer):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            pos = end
+            if pos > read_size:
+                buffer, pos = buffer[pos:], 0
+            yield _pair_from_item(item)
+
+
+def _pair_from_item(item: Dict[str, Any]) -> ProcessedQAPair:
+    metadata = dict(item.get("metadata") or {})
+    for field in ("intent", "category", "requires_handoff", "confidence_threshold"):
+        if field in item:
+            metadata[field] = item[field]
+    return ProcessedQAPair(
+        question=item.get("question", ""),
+        answer=item.get("answer", "") or item.get("expected_chunk_answer", ""),
+        metadata=metadata,
+    )
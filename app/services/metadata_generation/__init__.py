@@ -2,8 +2,8 @@
 Metadata Generation Service
 
 CPU-first automatic Q&A metadata generation:
-- Sentence-transformers for embeddings
-- Sklearn clustering for category discovery  
+- Shared e5 embeddings (no model of its own)
+- MiniBatchKMeans clustering for category discovery, stable across runs
 - TF-IDF + patterns for category/intent naming
 - LLM validation ONLY for low-confidence cases (minimal API calls)
 """
@@ -2,26 +2,50 @@
 AutoClassificationPipeline - Intelligent Q&A classification with minimal LLM usage.
 
 Architecture:
-1. EmbeddingGenerator - sentence-transformers for question embeddings
-2. CategoryDiscovery - clustering + TF-IDF keyword extraction → category names  
+1. Embeddings - the shared e5 model (same vectors as retrieval), no extra model
+2. CategoryDiscovery - incremental assignment to known categories, then
+   MiniBatchKMeans + centroid merging for the rest, TF-IDF keywords → names
 3. IntentExtractor - semantic patterns + rules → intent names
 4. LLMValidator - ONLY for low-confidence cases (редкие вызовы)
 
+Memory is linear in the number of questions: embeddings are a float32 matrix
+and every distance computation is against at most a few hundred centroids,
+in chunks of `batch_size` rows. Discovered categories (centroids, member
+counts, names) are saved to `state_path`, so a later run assigns questions to
+the same categories and only clusters the ones that fit none of them.
+
 All heavy lifting on CPU. LLM called sparingly.
 """
 
 import asyncio
+import json
+import math
+import os
 import re
 from collections import Counter
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import numpy as np
+from scipy.sparse import csr_matrix
 from app.logging_config import logger
 
-from sentence_transformers import SentenceTransformer
-from sklearn.cluster import AgglomerativeClustering
+from sklearn.cluster import MiniBatchKMeans
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+
+
+DEFAULT_STATE_PATH = Path(os.environ.get(
+    "AUTO_CLASSIFIER_STATE",
+    Path(__file__).parent.parent.parent.parent / ".cache" / "auto_classifier_categories.npz"
+))
+
+# Used when the global config has no auto_classification.distance_threshold
+DEFAULT_DISTANCE_THRESHOLD = 0.2
+# Questions per embedding call; encode_sync returns Python lists, so this bounds
+# the transient list-of-floats copy
+EMBED_CHUNK = 1024
+# Questions per category used to pick TF-IDF keywords for a new category
+KEYWORD_SAMPLE = 200
 
 
 @dataclass
@@ -31,6 +55,7 @@ class CategoryInfo:
     keywords: List[str]
     member_indices: List[int]
     centroid: np.ndarray = field(default=None, repr=False)
+    category_id: int = -1
     
     
 @dataclass
@@ -48,7 +73,7 @@ class AutoClassificationPipeline:
     """
     CPU-first auto-classification pipeline.
     
-    Uses sentence-transformers + sklearn for 95% of work.
+    Uses the shared e5 embeddings + sklearn for 95% of work.
     LLM only for validation of uncertain cases.
     """
     
@@ -142,49 +167,71 @@ class AutoClassificationPipeline:
     
     def __init__(
         self,
-        embedding_model: str = "all-MiniLM-L6-v2",
         min_cluster_samples: int = 1,
-        distance_threshold: float = 0.8,
+        distance_threshold: Optional[float] = None,
         confidence_threshold: float = 0.65,
-        llm_validation_threshold: float = 0.5
+        llm_validation_threshold: float = 0.5,
+        cluster_size: int = 25,
+        max_clusters: int = 256,
+        batch_size: int = 4096,
+        state_path: Optional[Path] = DEFAULT_STATE_PATH
     ):
         """
         Initialize pipeline.
         
         Args:
-            embedding_model: Sentence-transformer model name
             min_cluster_samples: Minimum samples per cluster
-            distance_threshold: Clustering distance threshold (lower = more clusters)
+            distance_threshold: Average cosine distance to a category's members within
+                which a question joins it; also the merge distance between clusters
+                (None = auto_classification.distance_threshold from the global config)
             confidence_threshold: Below this, mark as needs_validation
             llm_validation_threshold: Below this, actually call LLM
+            cluster_size: Target questions per k-means cluster before merging
+            max_clusters: Upper bound on k-means clusters per run
+            batch_size: Rows per k-means mini-batch and per distance computation
+            state_path: Where discovered categories are kept between runs (None = don't persist)
         """
-        self.embedding_model = embedding_model
         self.min_cluster_samples = min_cluster_samples
+        if distance_threshold is None:
+            from app.services.config_loader.loader import get_global_param
+            params = get_global_param("auto_classification", {}) or {}
+            distance_threshold = float(params.get("distance_threshold", DEFAULT_DISTANCE_THRESHOLD))
         self.distance_threshold = distance_threshold
         self.confidence_threshold = confidence_threshold
         self.llm_validation_threshold = llm_validation_threshold
+        self.cluster_size = cluster_size
+        self.max_clusters = max_clusters
+        self.batch_size = batch_size
+        self.state_path = Path(state_path) if state_path else None
         
-        self._encoder: Optional[SentenceTransformer] = None
+        self._model_name: Optional[str] = None
         self._tfidf: Optional[TfidfVectorizer] = None
         self._categories: List[CategoryInfo] = []
-        self._embeddings: Optional[np.ndarray] = None
+        # Known categories, row i of _centroids is category id i
+        self._centroids: Optional[np.ndarray] = None
+        self._counts: Optional[np.ndarray] = None
+        self._names: List[str] = []
+        self._keywords: List[List[str]] = []
+        # Per question of the current batch: cosine to its category centroid
+        self._similarities: Optional[np.ndarray] = None
         self._is_initialized: bool = False
         
     async def initialize(self):
         """
-        Load models (CPU-only).
+        Resolve the shared embedding model and load saved categories.
         
-        This method initializes the SentenceTransformer and TfidfVectorizer.
-        It is idempotent and will return immediately if already initialized.
+        No model of its own is loaded: questions are embedded with the e5
+        EmbeddingModel that retrieval already uses. It is idempotent and will
+        return immediately if already initialized.
         """
         if self._is_initialized:
             return
             
-        logger.info("Loading embedding model", extra={"model": self.embedding_model})
+        from app.integrations.embeddings_opensource import get_embedding_model, executor
+
         loop = asyncio.get_running_loop()
-        self._encoder = await loop.run_in_executor(
-            None, SentenceTransformer, self.embedding_model
-        )
+        model = await loop.run_in_executor(executor, get_embedding_model)
+        self._model_name = model.model_name
         
         # TF-IDF for keyword extraction
         self._tfidf = TfidfVectorizer(
@@ -193,8 +240,12 @@ class AutoClassificationPipeline:
             ngram_range=(1, 2)
         )
         
+        self._load_state()
         self._is_initialized = True
-        logger.info("AutoClassifier ready")
+        logger.info("AutoClassifier ready", extra={
+            "model": self._model_name,
+            "known_categories": len(self._names)
+        })
         
     async def classify_batch(
         self,
@@ -209,7 +260,7 @@ class AutoClassificationPipeline:
             use_llm_validation: Whether to call LLM for uncertain cases
             
         Returns:
-            Tuple of (results, discovered_categories)
+            Tuple of (results, categories with members in this batch)
         """
         if not qa_pairs:
             return [], []
@@ -220,18 +271,19 @@ class AutoClassificationPipeline:
         
         # Step 1: Generate embeddings (CPU)
         logger.info("AutoClassifier Step 1: Embedding questions", extra={"count": len(questions)})
-        loop = asyncio.get_running_loop()
-        self._embeddings = await loop.run_in_executor(
-            None, self._encoder.encode, questions
-        )
+        embeddings = await self._embed(questions)
         
-        # Step 2: Cluster questions (CPU)
+        # Step 2: Assign to known categories, cluster the rest (CPU)
         logger.info("AutoClassifier Step 2: Clustering")
-        cluster_labels = await self._cluster_questions()
+        loop = asyncio.get_running_loop()
+        cluster_labels, new_ids = await loop.run_in_executor(
+            None, self._cluster_questions, embeddings
+        )
         
-        # Step 3: Discover category names using TF-IDF (CPU)
+        # Step 3: Name new categories using TF-IDF (CPU)
         logger.info("AutoClassifier Step 3: Discovering categories via TF-IDF")
-        self._categories = self._discover_categories(questions, cluster_labels)
+        self._categories = self._discover_categories(questions, cluster_labels, new_ids)
+        del embeddings
         
         # Step 4: Classify each Q&A pair (CPU)
         logger.info("AutoClassifier Step 4: Generating classifications")
@@ -244,78 +296,214 @@ class AutoClassificationPipeline:
                 logger.info("AutoClassifier Step 5: LLM validation", extra={"uncertain_count": uncertain_count})
                 results = await self._validate_uncertain(qa_pairs, results)
         
-        logger.info("AutoClassifier completed", extra={"categories_discovered": len(self._categories)})
+        self._save_state()
+        logger.info("AutoClassifier completed", extra={
+            "categories_in_batch": len(self._categories),
+            "new_categories": len(new_ids),
+            "known_categories": len(self._names)
+        })
         return results, self._categories
         
-    async def _cluster_questions(self) -> np.ndarray:
-        """Cluster question embeddings using Agglomerative Clustering."""
-        n = len(self._embeddings)
+    async def _embed(self, questions: List[str]) -> np.ndarray:
+        """Embed questions with the shared e5 model into one float32 matrix."""
+        from app.integrations.embeddings_opensource import get_embedding_model, executor
+
+        model = get_embedding_model()
+        loop = asyncio.get_running_loop()
+        embeddings = np.empty((len(questions), model.vector_size), dtype=np.float32)
+        for start in range(0, len(questions), EMBED_CHUNK):
+            chunk = questions[start:start + EMBED_CHUNK]
+            # Short, symmetric texts: e5 wants the "query: " prefix (as for label prototypes)
+            vectors = await loop.run_in_executor(
+                executor, model.encode_sync, [f"query: {q}" for q in chunk]
+            )
+            embeddings[start:start + len(chunk)] = vectors
+        return embeddings
         
-        if n <= 1:
-            return np.array([0] * n)
+    def _cluster_questions(self, embeddings: np.ndarray) -> Tuple[np.ndarray, List[int]]:
+        """
+        Label every question with a category id.
         
-        if n <= 3:
-            # Too few samples, put each in own cluster or simple grouping
-            return np.arange(n)
-            
-        clustering = AgglomerativeClustering(
-            n_clusters=None,
-            distance_threshold=self.distance_threshold,
-            metric='cosine',
-            linkage='average'
-        )
+        Categories are kept as the plain mean of their (unit) member vectors.
+        For unit vectors, 1 - q . mean is the average cosine distance from q
+        to the members, and 1 - mean_a . mean_b the average distance between
+        two groups, so both steps below are average-linkage decisions at
+        distance_threshold, without a pairwise matrix over questions:
         
-        loop = asyncio.get_running_loop()
-        labels = await loop.run_in_executor(
-            None, clustering.fit_predict, self._embeddings
-        )
+        1. Questions close enough to a known category join it.
+        2. The rest are over-segmented with MiniBatchKMeans and the clusters
+           merged (weighted average linkage over at most max_clusters means).
         
-        logger.debug("Clustering completed", extra={"cluster_count": len(set(labels))})
+        Returns (labels, ids of the categories created by this call).
+        """
+        n = len(embeddings)
+        labels = np.full(n, -1, dtype=np.int64)
+        
+        if self._centroids is not None and len(self._centroids):
+            labels = self._assign(embeddings)
+        
+        novel = np.flatnonzero(labels < 0)
+        new_ids: List[int] = []
+        if len(novel):
+            # Fancy indexing copies; skip it when nothing was assigned (first run)
+            novel_labels, centroids = self._fit_new(embeddings if len(novel) == n else embeddings[novel])
+            first_id = len(self._names)
+            labels[novel] = novel_labels + first_id
+            new_ids = list(range(first_id, first_id + len(centroids)))
+            self._centroids = centroids if self._centroids is None else np.vstack([self._centroids, centroids])
+            self._counts = np.zeros(len(self._centroids), dtype=np.int64) if self._counts is None else np.concatenate(
+                [self._counts, np.zeros(len(centroids), dtype=np.int64)]
+            )
+            self._names.extend([""] * len(centroids))
+            self._keywords.extend([[] for _ in centroids])
+        
+        # Running mean over all members seen so far
+        members = csr_matrix((np.ones(n, dtype=np.float32), (labels, np.arange(n))), shape=(len(self._centroids), n))
+        sums = np.asarray(members @ embeddings, dtype=np.float64)
+        batch_counts = np.bincount(labels, minlength=len(self._centroids))
+        touched = batch_counts > 0
+        totals = self._counts[touched] + batch_counts[touched]
+        merged = self._centroids[touched] * self._counts[touched, None] + sums[touched]
+        self._centroids[touched] = (merged / totals[:, None]).astype(np.float32)
+        self._counts += batch_counts
+        
+        # Confidence: cosine to the category direction
+        directions = _normalize(self._centroids)
+        self._similarities = np.empty(n, dtype=np.float32)
+        for start in range(0, n, self.batch_size):
+            chunk = embeddings[start:start + self.batch_size]
+            self._similarities[start:start + len(chunk)] = np.einsum(
+                "ij,ij->i", chunk, directions[labels[start:start + len(chunk)]]
+            )
+        
+        logger.debug("Clustering completed", extra={
+            "assigned_to_known": int(n - len(novel)),
+            "new_clusters": len(new_ids)
+        })
+        return labels, new_ids
+        
+    def _assign(self, embeddings: np.ndarray) -> np.ndarray:
+        """Closest known category per question, or -1 when none is within distance_threshold."""
+        labels = np.full(len(embeddings), -1, dtype=np.int64)
+        min_similarity = 1.0 - self.distance_threshold
+        for start in range(0, len(embeddings), self.batch_size):
+            scores = embeddings[start:start + self.batch_size] @ self._centroids.T
+            best = scores.argmax(axis=1)
+            close = scores[np.arange(len(best)), best] >= min_similarity
+            labels[start:start + len(best)] = np.where(close, best, -1)
         return labels
         
+    def _fit_new(self, embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Cluster questions that fit no known category; returns (labels from 0, member means)."""
+        n = len(embeddings)
+        k = min(n, self.max_clusters, max(8, math.ceil(n / self.cluster_size)))
+        if k <= 1:
+            return np.zeros(n, dtype=np.int64), embeddings.mean(axis=0, keepdims=True).astype(np.float32)
+        
+        kmeans = MiniBatchKMeans(
+            n_clusters=k,
+            batch_size=self.batch_size,
+            n_init=1,
+            random_state=0
+        )
+        labels = kmeans.fit_predict(embeddings)
+        sizes = np.bincount(labels, minlength=k)
+        occupied = np.flatnonzero(sizes)
+        members = csr_matrix((np.ones(n, dtype=np.float32), (labels, np.arange(n))), shape=(k, n))
+        means = np.asarray(members @ embeddings, dtype=np.float64)[occupied] / sizes[occupied, None]
+        
+        groups, merged_means, merged_sizes = _average_linkage(means, sizes[occupied], self.distance_threshold)
+        
+        # Biggest category first, so ids do not depend on k-means cluster numbering
+        order = np.argsort(-merged_sizes, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        mapping = np.zeros(k, dtype=np.int64)
+        mapping[occupied] = rank[groups]
+        return mapping[labels], merged_means[order].astype(np.float32)
+        
     def _discover_categories(
         self,
         questions: List[str],
-        cluster_labels: np.ndarray
+        cluster_labels: np.ndarray,
+        new_ids: List[int]
     ) -> List[CategoryInfo]:
         """
-        Discover category names using TF-IDF keyword extraction.
+        Build CategoryInfo for every category present in the batch.
         
-        For each cluster:
-        1. Extract top TF-IDF keywords
+        Known categories keep their saved names. For each new one:
+        1. Extract top TF-IDF keywords (from a sample of its questions)
         2. Match keywords to known category templates
         3. If no match, create category from keywords
         """
         categories = []
-        unique_clusters = sorted(set(cluster_labels))
-        
-        for cluster_id in unique_clusters:
-            # Get questions in this cluster
-            member_indices = [
-                i for i, label in enumerate(cluster_labels) 
-                if label == cluster_id
-            ]
-            cluster_questions = [questions[i] for i in member_indices]
-            
-            # Calculate centroid
-            cluster_embeddings = self._embeddings[member_indices]
-            centroid = np.mean(cluster_embeddings, axis=0)
+        new = set(new_ids)
+        order = np.argsort(cluster_labels, kind="stable")
+        cluster_ids, starts = np.unique(cluster_labels[order], return_index=True)
+        ends = list(starts[1:]) + [len(order)]
+        
+        for cluster_id, start, end in zip(cluster_ids, starts, ends):
+            cluster_id = int(cluster_id)
+            member_indices = order[start:end].tolist()
             
-            # Extract keywords using TF-IDF
-            keywords = self._extract_keywords(cluster_questions)
-            
-            # Map keywords to category name
-            category_name = self._keywords_to_category(keywords, cluster_questions)
+            if cluster_id in new:
+                sample = member_indices[:KEYWORD_SAMPLE]
+                cluster_questions = [questions[i] for i in sample]
+                
+                # Extract keywords using TF-IDF
+                keywords = self._extract_keywords(cluster_questions)
+                
+                # Map keywords to category name
+                self._keywords[cluster_id] = keywords
+                self._names[cluster_id] = self._keywords_to_category(keywords, cluster_questions)
             
             categories.append(CategoryInfo(
-                name=category_name,
-                keywords=keywords,
+                name=self._names[cluster_id],
+                keywords=self._keywords[cluster_id],
                 member_indices=member_indices,
-                centroid=centroid
+                centroid=self._centroids[cluster_id],
+                category_id=cluster_id
             ))
             
         return categories
         
+    def _load_state(self):
+        if self.state_path is None or not self.state_path.exists():
+            return
+        try:
+            with np.load(self.state_path, allow_pickle=False) as data:
+                if str(data["model"]) != self._model_name:
+                    logger.info("AutoClassifier state is for another model, starting fresh", extra={
+                        "path": str(self.state_path),
+                        "state_model": str(data["model"])
+                    })
+                    return
+                self._centroids = data["centroids"].astype(np.float32)
+                self._counts = data["counts"].astype(np.int64)
+                self._names = [str(n) for n in data["names"]]
+                self._keywords = json.loads(str(data["keywords"]))
+        except Exception as e:
+            logger.warning("Failed to load AutoClassifier state", extra={"path": str(self.state_path), "error": str(e)})
+            self._centroids, self._counts, self._names, self._keywords = None, None, [], []
+            
+    def _save_state(self):
+        if self.state_path is None or self._centroids is None:
+            return
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_path.with_suffix(".tmp.npz")
+            np.savez(
+                tmp_path,
+                model=np.array(self._model_name),
+                centroids=self._centroids,
+                counts=self._counts,
+                names=np.array(self._names, dtype=str),
+                keywords=np.array(json.dumps(self._keywords, ensure_ascii=False))
+            )
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.warning("Failed to persist AutoClassifier state", extra={"path": str(self.state_path), "error": str(e)})
+        
     def _extract_keywords(self, texts: List[str], top_n: int = 5) -> List[str]:
         """Extract top keywords from texts using TF-IDF."""
         if not texts:
@@ -379,11 +567,7 @@ class AutoClassificationPipeline:
         results = []
         
         # Build cluster -> category mapping
-        cluster_to_category = {}
-        for cat in self._categories:
-            if cat.member_indices:
-                cluster_id = cluster_labels[cat.member_indices[0]]
-                cluster_to_category[cluster_id] = cat
+        cluster_to_category = {cat.category_id: cat for cat in self._categories}
                 
         for i, (qa, label) in enumerate(zip(qa_pairs, cluster_labels)):
             question = qa["question"]
@@ -402,11 +586,8 @@ class AutoClassificationPipeline:
             else:
                 category = cluster_category
                 # Calculate confidence (similarity to centroid)
-                if category_info is not None and category_info.centroid is not None:
-                    similarity = cosine_similarity(
-                        [self._embeddings[i]], 
-                        [category_info.centroid]
-                    )[0][0]
+                if category_info is not None and self._similarities is not None:
+                    similarity = self._similarities[i]
                     category_confidence = float(max(0, min(1, similarity)))
                 else:
                     category_confidence = 0.5
@@ -630,9 +811,53 @@ Respond with JSON only:
         """Get summary of discovered categories."""
         return [
             {
+                "id": cat.category_id,
                 "name": cat.name,
                 "keywords": cat.keywords,
                 "question_count": len(cat.member_indices)
             }
             for cat in self._categories
         ]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _average_linkage(
+    means: np.ndarray,
+    sizes: np.ndarray,
+    threshold: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Merge groups of unit vectors by average-linkage cosine distance.
+    
+    Groups are given by their member means and sizes; the average distance
+    between two groups is 1 - mean_a . mean_b. Returns (group of each input,
+    merged means, merged sizes), groups numbered from 0.
+    """
+    means = means.astype(np.float64)
+    sizes = sizes.astype(np.float64)
+    owner = np.arange(len(means))
+    similarity = means @ means.T
+    np.fill_diagonal(similarity, -np.inf)
+    
+    while len(means) > 1:
+        i, j = np.unravel_index(np.argmax(similarity), similarity.shape)
+        if 1.0 - similarity[i, j] > threshold:
+            break
+        means[i] = (means[i] * sizes[i] + means[j] * sizes[j]) / (sizes[i] + sizes[j])
+        sizes[i] += sizes[j]
+        sizes[j] = 0
+        owner[owner == j] = i
+        similarity[j, :] = similarity[:, j] = -np.inf
+        row = means @ means[i]
+        row[sizes == 0] = -np.inf
+        row[i] = -np.inf
+        similarity[i, :] = similarity[:, i] = row
+    
+    alive = np.flatnonzero(sizes)
+    renumber = np.zeros(len(sizes), dtype=np.int64)
+    renumber[alive] = np.arange(len(alive))
+    return renumber[owner], means[alive], sizes[alive]
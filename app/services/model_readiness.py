@@ -0,0 +1,135 @@
+"""
+Model Readiness Tracking.
+
+Keeps a per-model loading state that startup warmup updates and that nodes
+consult before touching a model. In "serve while warming" mode the API accepts
+traffic before every model is loaded; nodes then either wait for their model
+(bounded by a timeout) or degrade gracefully instead of loading it a second
+time on the request path.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, List, Optional, Any
+
+from app.logging_config import logger
+from app.services.config_loader.loader import get_global_param
+
+
+class ModelState(str, Enum):
+    PENDING = "pending"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+    DISABLED = "disabled"
+
+
+@dataclass
+class ModelStatus:
+    name: str
+    nodes: List[str] = field(default_factory=list)
+    state: ModelState = ModelState.PENDING
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        load_seconds = None
+        if self.started_at is not None and self.finished_at is not None:
+            load_seconds = round(self.finished_at - self.started_at, 3)
+        return {
+            "state": self.state.value,
+            "nodes": self.nodes,
+            "load_seconds": load_seconds,
+            "error": self.error
+        }
+
+
+class ModelReadinessRegistry:
+    """In-process registry of model loading states."""
+
+    def __init__(self):
+        self._status: Dict[str, ModelStatus] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+
+    def register(self, name: str, nodes: List[str], enabled: bool = True) -> None:
+        self._status[name] = ModelStatus(
+            name=name,
+            nodes=list(nodes),
+            state=ModelState.PENDING if enabled else ModelState.DISABLED
+        )
+        event = asyncio.Event()
+        if not enabled:
+            event.set()
+        self._events[name] = event
+
+    def mark_loading(self, name: str) -> None:
+        status = self._status[name]
+        status.state = ModelState.LOADING
+        status.started_at = time.perf_counter()
+
+    def mark_ready(self, name: str) -> None:
+        status = self._status[name]
+        status.state = ModelState.READY
+        status.finished_at = time.perf_counter()
+        self._events[name].set()
+
+    def mark_failed(self, name: str, error: str) -> None:
+        status = self._status[name]
+        status.state = ModelState.FAILED
+        status.finished_at = time.perf_counter()
+        status.error = error
+        self._events[name].set()
+
+    def is_warming(self, name: str) -> bool:
+        """True while warmup has the model queued or loading."""
+        status = self._status.get(name)
+        return status is not None and status.state in (ModelState.PENDING, ModelState.LOADING)
+
+    @property
+    def all_settled(self) -> bool:
+        return not any(self.is_warming(name) for name in self._status)
+
+    async def wait_ready(self, name: str, timeout: float) -> bool:
+        """Wait until warmup finishes with the model. Returns False on timeout."""
+        event = self._events.get(name)
+        if event is None:
+            return True
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.all_settled,
+            "models": {name: status.to_dict() for name, status in self._status.items()}
+        }
+
+
+model_readiness = ModelReadinessRegistry()
+
+
+async def ensure_model_ready(name: str, policy: str = "degrade") -> bool:
+    """
+    Check whether a request may use a model right now.
+
+    Models that are not tracked, already loaded, disabled or that failed to
+    warm up are reported as usable (the caller loads lazily as before). While a
+    model is still warming up:
+        - policy "wait": queue until it is ready (bounded by
+          warmup_wait_timeout_seconds)
+        - policy "degrade": return False immediately so the caller can skip it
+    """
+    if not model_readiness.is_warming(name):
+        return True
+    if policy == "wait":
+        timeout = get_global_param("warmup_wait_timeout_seconds", 30)
+        ready = await model_readiness.wait_ready(name, timeout)
+        if not ready:
+            logger.warning("Timed out waiting for model warmup", extra={"model": name, "timeout_s": timeout})
+        return ready
+    logger.info("Model still warming up, degrading", extra={"model": name})
+    return False
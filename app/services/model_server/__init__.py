@@ -0,0 +1,21 @@
+"""
+Optional shared model server.
+
+When MODEL_SERVER_SOCKET is set, API workers stop loading local copies of the
+encoder, cross-encoder and translation models and call a single local model
+server process through thin clients instead.
+"""
+
+from .client import (
+    ModelServerClient,
+    ModelServerError,
+    RemoteSentenceEncoder,
+    get_model_server_client,
+)
+
+__all__ = [
+    "ModelServerClient",
+    "ModelServerError",
+    "RemoteSentenceEncoder",
+    "get_model_server_client",
+]
@@ -0,0 +1,4 @@
+from app.services.model_server.server import main
+
+if __name__ == "__main__":
+    main()
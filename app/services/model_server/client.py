@@ -0,0 +1,118 @@
+"""
+Thin synchronous client for the local model server.
+
+Call sites (EmbeddingModel, Reranker, QueryTranslator, classifiers) already run
+model calls inside executor threads, so the client is blocking and thread-safe:
+each call borrows a persistent Unix socket from a small pool.
+"""
+import queue
+import socket
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.model_server.protocol import pack_frame, payload_to_array, recv_frame
+
+
+class ModelServerError(RuntimeError):
+    """Raised when the model server reports an error or is unreachable."""
+
+
+class ModelServerClient:
+    def __init__(self, socket_path: str, pool_size: int = 8, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._pool: "queue.LifoQueue[socket.socket]" = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def _request(self, header: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        try:
+            sock = self._pool.get_nowait()
+        except queue.Empty:
+            sock = None
+
+        try:
+            if sock is None:
+                sock = self._connect()
+            sock.sendall(pack_frame(header))
+            response, payload = recv_frame(sock)
+        except (OSError, ConnectionError) as e:
+            if sock is not None:
+                sock.close()
+            raise ModelServerError(f"Model server request '{header.get('op')}' failed: {e}") from e
+
+        try:
+            self._pool.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+
+        if not response.get("ok"):
+            raise ModelServerError(response.get("error", "unknown model server error"))
+        return response, payload
+
+    def ping(self) -> bool:
+        try:
+            return self._request({"op": "ping"})[0].get("result") == "pong"
+        except ModelServerError:
+            return False
+
+    def info(self) -> Dict[str, Any]:
+        return self._request({"op": "info"})[0]["result"]
+
+    def embed(self, model: str, texts: Sequence[str]) -> np.ndarray:
+        response, payload = self._request({"op": "embed", "model": model, "texts": list(texts)})
+        return payload_to_array(response, payload)
+
+    def rerank(self, pairs: Sequence[Sequence[str]]) -> np.ndarray:
+        response, payload = self._request({"op": "rerank", "pairs": [list(p) for p in pairs]})
+        return payload_to_array(response, payload)
+
+    def translate(self, texts: Sequence[str], source_lang: str, target_lang: str) -> List[str]:
+        response, _ = self._request({
+            "op": "translate", "texts": list(texts), "source": source_lang, "target": target_lang
+        })
+        return response["result"]
+
+    def zero_shot(self, text: str, labels: Sequence[str]) -> Dict[str, Any]:
+        return self._request({"op": "zero_shot", "text": text, "labels": list(labels)})[0]["result"]
+
+
+class RemoteSentenceEncoder:
+    """Drop-in for SentenceTransformer.encode backed by the model server."""
+
+    def __init__(self, client: ModelServerClient, model: str):
+        self.client = client
+        self.model = model
+
+    def encode(self, sentences, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        vectors = self.client.embed(self.model, [sentences] if single else list(sentences))
+        return vectors[0] if single else vectors
+
+
+_client: Optional[ModelServerClient] = None
+_client_lock = threading.Lock()
+
+
+def get_model_server_client() -> Optional[ModelServerClient]:
+    """
+    Return the shared client when MODEL_SERVER_SOCKET is configured,
+    otherwise None (models are loaded in-process as usual).
+    """
+    global _client
+    from app.settings import settings
+
+    socket_path = settings.MODEL_SERVER_SOCKET
+    if not socket_path:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ModelServerClient(socket_path)
+    return _client
@@ -0,0 +1,65 @@
+"""
+Wire protocol for the local model server.
+
+Every message is a single frame:
+
+    [4 bytes header length][4 bytes payload length][JSON header][binary payload]
+
+The JSON header carries the operation and small arguments; the optional binary
+payload carries dense arrays (embeddings, scores) as raw float32 so vectors do
+not go through JSON encoding.
+"""
+import json
+import socket
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+_PREFIX = struct.Struct("!II")
+
+
+def pack_frame(header: Dict[str, Any], payload: bytes = b"") -> bytes:
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    return _PREFIX.pack(len(header_bytes), len(payload)) + header_bytes + payload
+
+
+def array_to_payload(array: np.ndarray) -> Tuple[Dict[str, Any], bytes]:
+    array = np.ascontiguousarray(array, dtype=np.float32)
+    return {"shape": list(array.shape), "dtype": "float32"}, array.tobytes()
+
+
+def payload_to_array(meta: Dict[str, Any], payload: bytes) -> np.ndarray:
+    return np.frombuffer(payload, dtype=meta.get("dtype", "float32")).reshape(meta["shape"])
+
+
+async def read_frame(reader) -> Optional[Tuple[Dict[str, Any], bytes]]:
+    """Read one frame from an asyncio StreamReader. Returns None on EOF."""
+    try:
+        prefix = await reader.readexactly(_PREFIX.size)
+    except Exception:
+        return None
+    header_len, payload_len = _PREFIX.unpack(prefix)
+    header = json.loads((await reader.readexactly(header_len)).decode("utf-8"))
+    payload = await reader.readexactly(payload_len) if payload_len else b""
+    return header, payload
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(remaining)
+        if not chunk:
+            raise ConnectionError("Model server closed the connection")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    """Blocking counterpart of read_frame for the synchronous client."""
+    header_len, payload_len = _PREFIX.unpack(_recv_exact(sock, _PREFIX.size))
+    header = json.loads(_recv_exact(sock, header_len).decode("utf-8"))
+    payload = _recv_exact(sock, payload_len) if payload_len else b""
+    return header, payload
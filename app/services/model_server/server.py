@@ -0,0 +1,193 @@
+"""
+Local model server.
+
+Hosts the encoder, cross-encoder and translation models in a single process and
+serves them to every API worker over a Unix domain socket. Requests arriving
+from different workers within a short window are merged into one batch per
+model, so the server both removes duplicated weights and batches across workers.
+
+Run:
+    python -m app.services.model_server --socket /tmp/support_rag_models.sock
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from app.logging_config import logger, setup_logging
+from app.services.batching import MicroBatcher
+from app.services.model_server.protocol import (
+    array_to_payload,
+    pack_frame,
+    read_frame,
+)
+
+DEFAULT_MODELS = ("e5", "semantic", "reranker", "translator")
+
+
+class ModelServer:
+    """Owns the models and dispatches protocol requests to per-model batchers."""
+
+    def __init__(self, models: Tuple[str, ...] = DEFAULT_MODELS, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.model_names = models
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        # One thread per model keeps forward passes of different models concurrent
+        self.executor = ThreadPoolExecutor(max_workers=max(2, len(models)))
+        self.batchers: Dict[str, MicroBatcher] = {}
+        self._models: Dict[str, Any] = {}
+        self.started_at = time.time()
+
+    # --- Model loading ---
+
+    def _load(self, name: str) -> Any:
+        if name == "e5":
+            from app.integrations.embeddings_opensource import EmbeddingModel
+            return EmbeddingModel()
+        if name == "semantic":
+            from app.services.inference.backend import load_sentence_transformer
+            from app.services.classification.semantic_service import SemanticClassificationService
+            return load_sentence_transformer(SemanticClassificationService._model_name, "semantic")
+        if name == "reranker":
+            from app.services.inference.backend import load_cross_encoder
+            from app.services.config_loader.loader import get_node_params
+            return load_cross_encoder(get_node_params("reranking").get("model_name", "BAAI/bge-reranker-v2-m3"))
+        if name == "translator":
+            from app.services.translation.translator import QueryTranslator
+            translator = QueryTranslator()
+            translator.warmup()
+            return translator
+        if name == "zero_shot":
+            from app.services.inference.backend import load_zero_shot_pipeline
+            return load_zero_shot_pipeline("valhalla/distilbart-mnli-12-1")
+        raise ValueError(f"Unknown model '{name}'")
+
+    async def load_models(self):
+        loop = asyncio.get_running_loop()
+        names = list(self.model_names)
+        loaded = await asyncio.gather(*(loop.run_in_executor(self.executor, self._load, n) for n in names))
+        self._models.update(zip(names, loaded))
+
+        if "e5" in self._models:
+            e5 = self._models["e5"]
+            self._add_batcher("embed:e5", lambda texts: list(np.asarray(e5.encode_sync(texts), dtype=np.float32)))
+        if "semantic" in self._models:
+            semantic = self._models["semantic"]
+            self._add_batcher("embed:semantic", lambda texts: list(np.asarray(semantic.encode(texts), dtype=np.float32)))
+        if "reranker" in self._models:
+            reranker = self._models["reranker"]
+            self._add_batcher("rerank", lambda pairs: list(np.asarray(reranker.predict(pairs), dtype=np.float32)))
+        if "translator" in self._models:
+            translator = self._models["translator"]
+            for source, target in (("ru", "en"), ("en", "ru")):
+                self._add_batcher(
+                    f"translate:{source}-{target}",
+                    lambda texts, s=source, t=target: translator.translate_batch(texts, s, t)
+                )
+        logger.info("Model server models loaded", extra={"models": names})
+
+    def _add_batcher(self, key: str, fn: Callable[[List[Any]], List[Any]]):
+        batcher = MicroBatcher(key, fn, self.executor, self.max_batch_size, self.max_wait_ms)
+        batcher.start()
+        self.batchers[key] = batcher
+
+    # --- Request handling ---
+
+    async def handle_request(self, header: Dict[str, Any], payload: bytes) -> bytes:
+        op = header.get("op")
+
+        if op == "ping":
+            return pack_frame({"ok": True, "result": "pong"})
+
+        if op == "info":
+            e5 = self._models.get("e5")
+            return pack_frame({"ok": True, "result": {
+                "models": list(self._models.keys()),
+                "e5_model_name": getattr(e5, "model_name", None),
+                "e5_vector_size": getattr(e5, "vector_size", None),
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "batches": {k: {"batches": b.batches, "items": b.items} for k, b in self.batchers.items()}
+            }})
+
+        if op == "embed":
+            batcher = self._batcher(f"embed:{header['model']}")
+            vectors = await batcher.submit(header["texts"])
+            meta, data = array_to_payload(np.stack(vectors) if vectors else np.empty((0, 0)))
+            return pack_frame({"ok": True, **meta}, data)
+
+        if op == "rerank":
+            scores = await self._batcher("rerank").submit([tuple(p) for p in header["pairs"]])
+            meta, data = array_to_payload(np.asarray(scores, dtype=np.float32))
+            return pack_frame({"ok": True, **meta}, data)
+
+        if op == "translate":
+            batcher = self._batcher(f"translate:{header['source']}-{header['target']}")
+            return pack_frame({"ok": True, "result": await batcher.submit(header["texts"])})
+
+        if op == "zero_shot":
+            classifier = self._models.get("zero_shot")
+            if classifier is None:
+                raise ValueError("zero_shot model is not hosted by this server")
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self.executor,
+                lambda: classifier(header["text"], header["labels"], multi_label=False)
+            )
+            return pack_frame({"ok": True, "result": {"labels": result["labels"], "scores": result["scores"]}})
+
+        raise ValueError(f"Unknown op '{op}'")
+
+    def _batcher(self, key: str) -> MicroBatcher:
+        batcher = self.batchers.get(key)
+        if batcher is None:
+            raise ValueError(f"Model for '{key}' is not hosted by this server")
+        return batcher
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+                header, payload = frame
+                try:
+                    response = await self.handle_request(header, payload)
+                except Exception as e:
+                    response = pack_frame({"ok": False, "error": str(e)})
+                writer.write(response)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path: str):
+        await self.load_models()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = await asyncio.start_unix_server(self._handle_connection, path=socket_path)
+        os.chmod(socket_path, 0o660)
+        logger.info("Model server listening", extra={"socket": socket_path})
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared local model server for API workers.")
+    parser.add_argument("--socket", default=os.environ.get("MODEL_SERVER_SOCKET", "/tmp/support_rag_models.sock"))
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS),
+                        help="Comma-separated models to host: e5, semantic, reranker, translator, zero_shot")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    setup_logging()
+    models = tuple(m.strip() for m in args.models.split(",") if m.strip())
+    server = ModelServer(models, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    asyncio.run(server.serve(args.socket))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,87 +2,111 @@
 
 import difflib
 import logging
-from typing import List, Tuple
+import math
+from typing import FrozenSet, List, Optional, Sequence, Tuple
 
 from app.services.document_loaders import ProcessedQAPair, RawQAPair
+from app.services.qa_validators.minhash import LSHIndex, content_words, jaccard, shingles
 
 logger = logging.getLogger(__name__)
 
 
+def cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
 class DuplicateDetector:
-    """Detects and merges duplicate Q&A pairs."""
+    """Detects and merges duplicate Q&A pairs.
+
+    Candidates come from MinHash/LSH over word shingles of the normalized
+    question, so near-duplicates are found without comparing every pair and
+    regardless of word order. Candidates are then verified: exact normalized
+    match, shingle Jaccard, the SequenceMatcher ratio of the content words,
+    or embedding cosine when embeddings are supplied.
+    """
 
     FUZZY_THRESHOLD = 0.85  # Similarity threshold for fuzzy matching
+    JACCARD_THRESHOLD = 0.5  # Shingle Jaccard for a verified near-duplicate
+    EMBEDDING_THRESHOLD = 0.92  # Cosine for a verified near-duplicate (when embeddings are given)
+    # 32 bands of 2 rows: candidates at Jaccard 0.2 (one typo in a short
+    # question) are found ~70% of the time, at 0.5 almost always
+    NUM_PERM = 64
+    BANDS = 32
+
+    @classmethod
+    def new_index(cls) -> LSHIndex:
+        return LSHIndex(num_perm=cls.NUM_PERM, bands=cls.BANDS)
 
     @classmethod
-    def find_duplicates(cls, pairs: List[RawQAPair]) -> List[Tuple[int, int]]:
-        """Find duplicate pairs in a list using optimized hash pooling.
+    def find_duplicates(
+        cls,
+        pairs: List[RawQAPair],
+        embeddings: Optional[Sequence[Sequence[float]]] = None
+    ) -> List[Tuple[int, int]]:
+        """Find duplicate pairs in a list.
 
         Args:
             pairs: List of Q&A pairs
+            embeddings: Optional vectors aligned with pairs for cosine verification
 
         Returns:
-            List of (index1, index2) tuples indicating duplicates
+            List of (index1, index2) tuples indicating duplicates, index1 < index2
         """
         duplicates = []
-        # Bucket pairs by approximate hash
-        buckets: dict[str, List[int]] = {}
-        
-        for i, pair in enumerate(pairs):
-            q_normalized = cls._normalize_question(pair.question)
-            # Use sorted first 10 words as hash to catch reorderings but group by content
-            words = q_normalized.split()
-            hash_key = " ".join(sorted(words[:10]))
-            buckets.setdefault(hash_key, []).append(i)
-
-        # Check for duplicates only within buckets
-        for indices in buckets.values():
-            if len(indices) > 1:
-                # Compare all pairs within the bucket
-                for i in range(len(indices)):
-                    idx1 = indices[i]
-                    for j in range(i + 1, len(indices)):
-                        idx2 = indices[j]
-                        if cls._are_duplicate(pairs[idx1], pairs[idx2]):
-                            duplicates.append((idx1, idx2))
-
+        index = cls.new_index()
+        normalized = [cls._normalize_question(p.question) for p in pairs]
+        grams = [shingles(q) for q in normalized]
+
+        for i in range(len(pairs)):
+            band_keys = index.band_keys(grams[i])
+            for j in sorted(index.query(grams[i], band_keys)):
+                if cls._verify(normalized[i], grams[i], normalized[j], grams[j], embeddings, i, j):
+                    duplicates.append((j, i))
+            index.add(i, grams[i], band_keys)
+
+        duplicates.sort()
         return duplicates
 
     @classmethod
-    def remove_duplicates(cls, pairs: List[ProcessedQAPair]) -> List[ProcessedQAPair]:
+    def remove_duplicates(
+        cls,
+        pairs: List[ProcessedQAPair],
+        embeddings: Optional[Sequence[Sequence[float]]] = None
+    ) -> List[ProcessedQAPair]:
         """Remove duplicates from list of processed pairs, keeping first occurrence.
 
         Args:
             pairs: List of processed Q&A pairs
+            embeddings: Optional vectors aligned with pairs for cosine verification
 
         Returns:
             List with duplicates removed
         """
         unique_pairs = []
-        # Map: hash_key -> List[(normalized_question, pair)]
-        seen_buckets: dict[str, List[Tuple[str, ProcessedQAPair]]] = {}
+        index = cls.new_index()
+        kept: dict[int, Tuple[str, FrozenSet[int]]] = {}
 
-        for pair in pairs:
+        for i, pair in enumerate(pairs):
             q_normalized = cls._normalize_question(pair.question)
-            words = q_normalized.split()
-            hash_key = " ".join(sorted(words[:10]))
+            grams = shingles(q_normalized)
+            band_keys = index.band_keys(grams)
 
-            candidates = seen_buckets.get(hash_key, [])
-            
             duplicate_found = False
-            for seen_q_norm, _ in candidates:
-                if cls._are_questions_similar(q_normalized, seen_q_norm):
+            for j in index.query(grams, band_keys):
+                seen_q_norm, seen_grams = kept[j]
+                if cls._verify(q_normalized, grams, seen_q_norm, seen_grams, embeddings, i, j):
                     logger.debug(
                         f"Removing duplicate of: {pair.question[:50]}..."
                     )
                     duplicate_found = True
                     break
-            
+
             if not duplicate_found:
                 unique_pairs.append(pair)
-                if hash_key not in seen_buckets:
-                    seen_buckets[hash_key] = []
-                seen_buckets[hash_key].append((q_normalized, pair))
+                kept[i] = (q_normalized, grams)
+                index.add(i, grams, band_keys)
 
         logger.info(
             f"Removed {len(pairs) - len(unique_pairs)} duplicates "
@@ -90,6 +114,39 @@ class DuplicateDetector:
         )
         return unique_pairs
 
+    @classmethod
+    def _verify(
+        cls,
+        q1: str,
+        grams1: FrozenSet[int],
+        q2: str,
+        grams2: FrozenSet[int],
+        embeddings: Optional[Sequence[Sequence[float]]] = None,
+        i: int = 0,
+        j: int = 0
+    ) -> bool:
+        """Check an LSH candidate; q1/q2 are normalized questions."""
+        if cls.text_match(q1, grams1, q2, grams2):
+            return True
+        return embeddings is not None and cosine(embeddings[i], embeddings[j]) >= cls.EMBEDDING_THRESHOLD
+
+    @classmethod
+    def text_match(cls, q1: str, grams1: FrozenSet[int], q2: str, grams2: FrozenSet[int]) -> Optional[Tuple[str, float]]:
+        """("exact" | "jaccard" | "fuzzy", shingle Jaccard) if the normalized questions match, else None.
+
+        The fuzzy ratio runs on content words only, so shared boilerplate
+        ("how do i", "can you help me") does not make distinct questions similar
+        while typos still match.
+        """
+        if q1 == q2:
+            return "exact", 1.0
+        score = jaccard(grams1, grams2)
+        if score >= cls.JACCARD_THRESHOLD:
+            return "jaccard", score
+        if cls._are_questions_similar(" ".join(content_words(q1)), " ".join(content_words(q2))):
+            return "fuzzy", score
+        return None
+
     @classmethod
     def _are_duplicate(cls, pair1: RawQAPair, pair2: RawQAPair) -> bool:
         """Check if two pairs are duplicates.
@@ -108,6 +165,9 @@ class DuplicateDetector:
         if q1_norm == q2_norm:
             return True
 
+        if jaccard(shingles(q1_norm), shingles(q2_norm)) >= cls.JACCARD_THRESHOLD:
+            return True
+
         # Fuzzy match
         if cls._are_questions_similar(q1_norm, q2_norm):
             return True
@@ -0,0 +1,130 @@
+"""MinHash signatures and banded LSH for near-duplicate candidate search."""
+
+import hashlib
+import re
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Function words and support-request boilerplate ("can you help me", "how do
+# i", "please"). Short questions share these, so keeping them makes unrelated
+# questions look alike.
+STOPWORDS = frozenset("""
+a an the and or of to in on at for with from by about is are was were be been am do does did
+i me my we our you your it its this that these those there here what which who how where when why
+can could would should will shall may might must please help need want just exactly thanks thank
+hi hello hey s t way process question quick now right asap
+и в во на с со к ко по о об от для из у за не ни но а же ли бы то это как что где когда почему
+я мне меня мой моя мои мы наш вы вам ваш ты он она они его ее их можно нужно надо пожалуйста
+помогите помочь подскажите скажите хочу
+""".split())
+
+
+def content_words(text: str) -> List[str]:
+    """Lowercased words of `text` without stopwords (all words if only stopwords)."""
+    words = _WORD_RE.findall(text.lower())
+    return [w for w in words if w not in STOPWORDS] or words
+
+
+def shingles(text: str, sizes: Tuple[int, ...] = (1, 2)) -> FrozenSet[int]:
+    """32-bit hashes of the word n-grams of `text` for each size in `sizes`.
+
+    Text is lowercased and split on non-word characters, so punctuation and
+    spacing do not matter. Stopwords are dropped unless nothing else is left.
+    Hashes are stable across processes.
+    """
+    words = content_words(text)
+    grams: Set[int] = set()
+    for size in sizes:
+        for i in range(max(0, len(words) - size + 1)):
+            gram = " ".join(words[i:i + size]).encode("utf-8")
+            grams.add(int.from_bytes(hashlib.blake2b(gram, digest_size=4).digest(), "little"))
+    return frozenset(grams)
+
+
+def jaccard(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """MinHash with `num_perm` universal hash functions (a*x + b) mod (2^61 - 1)."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # a, b < 2^31 and x < 2^32 keep a*x + b inside uint64
+        self.a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, grams: Iterable[int]) -> np.ndarray:
+        values = np.fromiter(grams, dtype=np.uint64)
+        if values.size == 0:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashed = (np.outer(values, self.a) + self.b) % _MERSENNE_PRIME & _MAX_HASH
+        return hashed.min(axis=0)
+
+
+class LSHIndex:
+    """
+    Banded LSH over MinHash signatures.
+
+    A signature is split into `bands` bands of `num_perm / bands` rows; two
+    items become candidates when any band matches exactly. With b bands of r
+    rows, items of Jaccard similarity s collide with probability
+    1 - (1 - s^r)^b (about 0.5 at s = (1/b)^(1/r)). Only band keys are kept,
+    not signatures, so memory is `bands` small ints per item.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.hasher = MinHasher(num_perm, seed)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: List[Dict[int, List[Hashable]]] = [{} for _ in range(bands)]
+        self._keys: Dict[Hashable, Tuple[int, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._keys
+
+    def band_keys(self, grams: Iterable[int]) -> Tuple[int, ...]:
+        sig = self.hasher.signature(grams)
+        return tuple(
+            hash(sig[i * self.rows:(i + 1) * self.rows].tobytes())
+            for i in range(self.bands)
+        )
+
+    def add(self, key: Hashable, grams: Iterable[int], band_keys: Optional[Tuple[int, ...]] = None):
+        if key in self._keys:
+            self.remove(key)
+        band_keys = band_keys or self.band_keys(grams)
+        for bucket, band_key in zip(self._buckets, band_keys):
+            bucket.setdefault(band_key, []).append(key)
+        self._keys[key] = band_keys
+
+    def remove(self, key: Hashable):
+        band_keys = self._keys.pop(key, None)
+        if band_keys is None:
+            return
+        for bucket, band_key in zip(self._buckets, band_keys):
+            members = bucket.get(band_key)
+            if members:
+                members.remove(key)
+                if not members:
+                    del bucket[band_key]
+
+    def query(self, grams: Iterable[int], band_keys: Optional[Tuple[int, ...]] = None) -> Set[Hashable]:
+        band_keys = band_keys or self.band_keys(grams)
+        candidates: Set[Hashable] = set()
+        for bucket, band_key in zip(self._buckets, band_keys):
+            candidates.update(bucket.get(band_key, ()))
+        return candidates
@@ -0,0 +1,267 @@
+"""
+Knowledge-base-wide near-duplicate index.
+
+Keeps an LSH index (see minhash.py) of the questions of every row in the
+`documents` table, so new uploads are checked against the whole KB rather
+than only against each other. The index is built on first use and kept
+current incrementally: each check first pulls rows with an id above the
+highest one seen and re-reads rows reported through notify_changed (edits
+and deletes via chunk_service, from any worker through LISTEN/NOTIFY on
+NEAR_DUPLICATE_NOTIFY_CHANNEL). Every FULL_SYNC_SECONDS the ids and row
+versions (xmin) are reconciled, which catches changes no one reported.
+
+Verification of LSH candidates is DuplicateDetector.text_match. With
+`near_duplicate_verification: embedding` in the global parameters, candidates that fail
+the text checks are also compared by cosine between the new pair's embedding
+and the stored document embedding.
+"""
+import asyncio
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import psycopg
+
+from app.logging_config import logger
+from app.settings import settings
+from app.services.document_loaders import ProcessedQAPair
+from app.services.qa_validators.duplicate_detector import DuplicateDetector, cosine
+from app.services.qa_validators.minhash import shingles
+
+NEAR_DUPLICATE_NOTIFY_CHANNEL = "near_duplicate_index_changed"
+
+FETCH_SIZE = 5000
+FULL_SYNC_SECONDS = 600
+NOTIFY_MAX_IDS = 500  # keeps NOTIFY payloads well under the 8000-byte limit
+
+
+def question_of(content: str) -> str:
+    """The question part of a stored "Question: ...\\nAnswer: ..." document."""
+    if content.startswith("Question:"):
+        content = content[len("Question:"):]
+    return content.split("\nAnswer:", 1)[0].strip()
+
+
+class NearDuplicateIndexService:
+    """Process-wide near-duplicate index over documents."""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(NearDuplicateIndexService, cls).__new__(cls)
+            cls._instance.index = None
+            cls._instance.questions = {}  # doc id -> (normalized question, shingles)
+            cls._instance.versions = {}  # doc id -> xmin when read
+            cls._instance.stale = set()  # ids to re-read on the next sync
+            cls._instance.max_id = 0
+            cls._instance.synced_at = 0.0
+            cls._instance._lock = asyncio.Lock()
+            cls._instance._listener_task = None
+        return cls._instance
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    def _add_rows(self, rows: List[Tuple[int, str, int]]):
+        for doc_id, content, version in rows:
+            q_normalized = DuplicateDetector._normalize_question(question_of(content))
+            grams = shingles(q_normalized)
+            self.index.add(doc_id, grams)
+            self.questions[doc_id] = (q_normalized, grams)
+            self.versions[doc_id] = version
+            self.max_id = max(self.max_id, doc_id)
+
+    def _remove_ids(self, doc_ids: Iterable[int]):
+        for doc_id in doc_ids:
+            self.index.remove(doc_id)
+            self.questions.pop(doc_id, None)
+            self.versions.pop(doc_id, None)
+
+    async def _fetch_after(self, cur, after_id: int):
+        await cur.execute(
+            "SELECT id, content, xmin::text::bigint FROM documents WHERE id > %s ORDER BY id", (after_id,)
+        )
+        while True:
+            rows = await cur.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            yield rows
+
+    async def _refresh(self, cur, doc_ids: List[int]):
+        """Re-read the given rows; ids no longer in the table are dropped."""
+        loop = asyncio.get_running_loop()
+        found = set()
+        for start in range(0, len(doc_ids), FETCH_SIZE):
+            await cur.execute(
+                "SELECT id, content, xmin::text::bigint FROM documents WHERE id = ANY(%s)",
+                (doc_ids[start:start + FETCH_SIZE],)
+            )
+            rows = await cur.fetchall()
+            await loop.run_in_executor(None, self._add_rows, rows)
+            found.update(row[0] for row in rows)
+        self._remove_ids(set(doc_ids) - found)
+
+    async def sync(self):
+        """Build on first call, then add new rows (and drop deleted ones periodically)."""
+        async with self._lock:
+            await self._sync()
+
+    async def _sync(self):
+        from app.storage.connection import get_db_connection
+
+        t0 = time.perf_counter()
+        building = self.index is None
+        if building:
+            self.index = DuplicateDetector.new_index()
+        loop = asyncio.get_running_loop()
+        async with get_db_connection() as conn:
+            async with conn.cursor() as cur:
+                # Known rows only: rows above max_id are read in full below
+                stale = [doc_id for doc_id in self.stale if doc_id <= self.max_id]
+                self.stale.clear()
+                if stale:
+                    await self._refresh(cur, stale)
+                async for rows in self._fetch_after(cur, self.max_id):
+                    await loop.run_in_executor(None, self._add_rows, rows)
+                if time.monotonic() - self.synced_at > FULL_SYNC_SECONDS:
+                    await cur.execute("SELECT id, xmin::text::bigint FROM documents")
+                    current = dict(await cur.fetchall())
+                    self._remove_ids(set(self.questions) - current.keys())
+                    changed = [
+                        doc_id for doc_id, version in current.items()
+                        if doc_id in self.versions and self.versions[doc_id] != version
+                    ]
+                    if changed:
+                        await self._refresh(cur, changed)
+                    self.synced_at = time.monotonic()
+        if building:
+            self._start_listener()
+            logger.info("Near-duplicate index built", extra={
+                "documents": len(self.index),
+                "elapsed_sec": round(time.perf_counter() - t0, 2)
+            })
+
+    async def notify_changed(self, doc_ids: List[int]):
+        """Mark edited or deleted documents for re-reading here and in the other workers."""
+        if not doc_ids:
+            return
+        if self.index is not None:
+            self.stale.update(doc_ids)
+        try:
+            from app.storage.connection import get_db_connection
+            async with get_db_connection() as conn:
+                for start in range(0, len(doc_ids), NOTIFY_MAX_IDS):
+                    payload = json.dumps([int(i) for i in doc_ids[start:start + NOTIFY_MAX_IDS]])
+                    await conn.execute("SELECT pg_notify(%s, %s)", (NEAR_DUPLICATE_NOTIFY_CHANNEL, payload))
+        except Exception as e:
+            logger.warning("Near-duplicate index NOTIFY failed", extra={"error": str(e)})
+
+    def _start_listener(self):
+        if not settings.DATABASE_URL:
+            return
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.create_task(self._listen_loop())
+
+    async def stop_listener(self):
+        task = self._listener_task
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+    async def _listen_loop(self):
+        backoff = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(settings.DATABASE_URL, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {NEAR_DUPLICATE_NOTIFY_CHANNEL}")
+                    backoff = 1.0
+                    async for notify in conn.notifies():
+                        try:
+                            # Applied by the next sync, under the lock
+                            self.stale.update(json.loads(notify.payload))
+                        except Exception as e:
+                            logger.warning("Near-duplicate index notify ignored", extra={"error": str(e)})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Near-duplicate index listener error", extra={"error": str(e), "retry_in_sec": backoff})
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+
+    async def check(self, pairs: List[ProcessedQAPair], verify: Optional[str] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        For each pair, the best verified near-duplicate in the KB or None.
+
+        Returns dicts {"doc_id", "question", "similarity", "method"} where
+        method is "exact", "jaccard", "fuzzy" or "embedding".
+        """
+        from app.services.config_loader.loader import get_global_param
+
+        verify = verify or get_global_param("near_duplicate_verification", "jaccard")
+
+        async with self._lock:
+            # Under the lock: the executor thread adding rows must not race the lookups
+            await self._sync()
+            results, unresolved = self._match(pairs)
+
+        if verify == "embedding" and unresolved:
+            await self._verify_embeddings(pairs, unresolved, results)
+        return results
+
+    def _match(self, pairs: List[ProcessedQAPair]) -> Tuple[List[Optional[Dict[str, Any]]], Dict[int, List[int]]]:
+        """Text-verified matches, plus the LSH candidates rejected for each unmatched pair."""
+        results: List[Optional[Dict[str, Any]]] = []
+        unresolved: Dict[int, List[int]] = {}
+        for i, pair in enumerate(pairs):
+            q_normalized = DuplicateDetector._normalize_question(pair.question)
+            grams = shingles(q_normalized)
+            best = None
+            rejected = []
+            for doc_id in self.index.query(grams):
+                seen_q, seen_grams = self.questions[doc_id]
+                match = DuplicateDetector.text_match(q_normalized, grams, seen_q, seen_grams)
+                if match is None:
+                    rejected.append(doc_id)
+                elif best is None or match[1] > best["similarity"]:
+                    best = {"doc_id": doc_id, "question": seen_q, "similarity": round(match[1], 4), "method": match[0]}
+            results.append(best)
+            if best is None and rejected:
+                unresolved[i] = rejected
+        return results, unresolved
+
+    async def _verify_embeddings(self, pairs, unresolved: Dict[int, List[int]], results):
+        from app.integrations.embeddings_opensource import get_embeddings_batch
+        from app.storage.connection import get_db_connection
+
+        indices = list(unresolved)
+        vectors = await get_embeddings_batch(
+            [f"Question: {pairs[i].question}\nAnswer: {pairs[i].answer}" for i in indices]
+        )
+        doc_ids = sorted({doc_id for ids in unresolved.values() for doc_id in ids})
+        async with get_db_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT id, embedding::text FROM documents WHERE id = ANY(%s)", (doc_ids,))
+                stored = {row[0]: json.loads(row[1]) for row in await cur.fetchall() if row[1]}
+
+        for i, vector in zip(indices, vectors):
+            best = None
+            for doc_id in unresolved[i]:
+                if doc_id not in stored:
+                    continue
+                score = cosine(vector, stored[doc_id])
+                if score >= DuplicateDetector.EMBEDDING_THRESHOLD and (best is None or score > best["similarity"]):
+                    best = {"doc_id": doc_id, "question": self.questions.get(doc_id, ("",))[0], "similarity": round(score, 4), "method": "embedding"}
+            results[i] = best
+
+    def stats(self) -> Dict[str, Any]:
+        return {"documents": len(self.index) if self.index else 0, "max_id": self.max_id}
+
+
+def get_near_duplicate_index() -> NearDuplicateIndexService:
+    return NearDuplicateIndexService()
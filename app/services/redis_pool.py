@@ -1,25 +1,377 @@
+"""
+Redis client layer.
+
+Every subsystem gets its Redis client from here, by logical pool name:
+
+    redis = await get_redis("staging")
+
+- Named pools share one connection budget (REDIS_MAX_CONNECTIONS) split by
+  POOL_SHARES. They are blocking pools, so a busy subsystem waits for a free
+  connection instead of failing with "Too many connections".
+- Connections are health-checked (REDIS_HEALTH_CHECK_INTERVAL) and retried
+  with backoff on connection errors.
+- Auto-pipelining (REDIS_AUTO_PIPELINE): commands issued concurrently within
+  the same event-loop tick, e.g. from asyncio.gather in one request, are sent
+  as one non-transactional pipeline.
+- Client-side caching (REDIS_CLIENT_CACHE_PREFIXES): GETs of keys under the
+  configured prefixes are served from process memory. Redis invalidates them
+  through CLIENT TRACKING (broadcast mode, redirected to a pub/sub connection);
+  a TTL bounds staleness if the invalidation connection drops.
+
+RedisPool.get_pool() is kept for existing callers and returns the "default" pool.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
 from redis import asyncio as aioredis
-from typing import Optional
+from redis.asyncio.connection import BlockingConnectionPool
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+from app.logging_config import logger
 from app.settings import settings
 
-class RedisPool:
+# name -> (share of REDIS_MAX_CONNECTIONS, decode_responses)
+POOL_SHARES: Dict[str, Tuple[float, bool]] = {
+    "default": (0.20, True),    # translation cache, guardrail verdicts
+    "cache": (0.25, False),     # FAQ response cache (CacheManager)
+    "sessions": (0.25, False),  # SessionManager
+    "staging": (0.15, True),    # StagingService drafts
+    "limiter": (0.15, True),    # fastapi-limiter
+}
+
+POOL_TIMEOUT_SECONDS = 5
+
+# Commands that must not be merged into a pipeline
+_UNPIPELINED = {
+    "SUBSCRIBE", "PSUBSCRIBE", "UNSUBSCRIBE", "PUNSUBSCRIBE", "MONITOR",
+    "BLPOP", "BRPOP", "BLMOVE", "BZPOPMIN", "BZPOPMAX", "XREAD", "XREADGROUP",
+    "WATCH", "UNWATCH", "MULTI", "EXEC", "DISCARD", "CLIENT", "SELECT",
+}
+_WRITE_COMMANDS = {"SET", "SETEX", "PSETEX", "SETNX", "DEL", "UNLINK", "EXPIRE", "GETDEL", "GETSET", "APPEND"}
+
+
+class ClientSideCache:
+    """Process-local copy of hot keys, invalidated by Redis key tracking."""
+
+    def __init__(self, prefixes: List[str], max_size: int, ttl_seconds: float):
+        self.prefixes = tuple(prefixes)
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.tracking_active = False
+
+    def applies(self, key: Any) -> bool:
+        if isinstance(key, bytes):
+            key = key.decode("utf-8", "ignore")
+        return isinstance(key, str) and key.startswith(self.prefixes)
+
+    def get(self, pool: str, key: str) -> Tuple[bool, Any]:
+        # Without an active invalidation channel entries live only until the TTL
+        entry = self._entries.get((pool, key))
+        if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+            self._entries.move_to_end((pool, key))
+            self.hits += 1
+            return True, entry[1]
+        self.misses += 1
+        return False, None
+
+    def put(self, pool: str, key: str, value: Any):
+        self._entries[(pool, key)] = (time.monotonic(), value)
+        self._entries.move_to_end((pool, key))
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None):
+        if key is None:
+            self._entries.clear()
+            return
+        for pool in POOL_SHARES:
+            if self._entries.pop((pool, key), None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "prefixes": list(self.prefixes),
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "invalidations": self.invalidations,
+            "tracking_active": self.tracking_active,
+        }
+
+
+class ManagedRedis(aioredis.Redis):
+    """
+    Redis client of one named pool. Adds auto-pipelining and client-side
+    caching on top of the regular command API.
+    """
+
+    def __init__(self, *args, pool_name: str = "default", auto_pipeline: bool = True,
+                 client_cache: Optional[ClientSideCache] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool_name = pool_name
+        self.auto_pipeline = auto_pipeline
+        self.client_cache = client_cache
+        self._pending: List[Tuple[tuple, dict, asyncio.Future]] = []
+        self._flush_scheduled = False
+        self.commands = 0
+        self.pipelines = 0
+        self.pipelined_commands = 0
+
+    async def execute_command(self, *args, **options):
+        self.commands += 1
+        command = str(args[0]).upper() if args else ""
+
+        cache = self.client_cache
+        if cache is not None and len(args) > 1:
+            key = args[1]
+            if command == "GET" and cache.applies(key):
+                found, value = cache.get(self.pool_name, key)
+                if found:
+                    return value
+                value = await self._dispatch(command, args, options)
+                cache.put(self.pool_name, key, value)
+                return value
+            if command == "MGET" and all(cache.applies(k) for k in args[1:]):
+                cached = [cache.get(self.pool_name, k) for k in args[1:]]
+                if all(found for found, _ in cached):
+                    return [value for _, value in cached]
+                values = await self._dispatch(command, args, options)
+                for k, value in zip(args[1:], values):
+                    cache.put(self.pool_name, k, value)
+                return values
+            if command in _WRITE_COMMANDS:
+                for k in args[1:] if command in {"DEL", "UNLINK"} else args[1:2]:
+                    if cache.applies(k):
+                        cache.invalidate(k.decode() if isinstance(k, bytes) else k)
+
+        return await self._dispatch(command, args, options)
+
+    async def _dispatch(self, command: str, args: tuple, options: dict):
+        if not self.auto_pipeline or command in _UNPIPELINED:
+            return await super().execute_command(*args, **options)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((args, options, future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            # Everything queued until the loop runs callbacks again goes into one pipeline
+            asyncio.get_running_loop().call_soon(lambda: asyncio.ensure_future(self._flush()))
+        return await future
+
+    async def _flush(self):
+        batch, self._pending = self._pending, []
+        self._flush_scheduled = False
+        if not batch:
+            return
+        if len(batch) == 1:
+            args, options, future = batch[0]
+            try:
+                future.set_result(await super().execute_command(*args, **options))
+            except Exception as e:
+                future.set_exception(e)
+            return
+
+        self.pipelines += 1
+        self.pipelined_commands += len(batch)
+        try:
+            async with self.pipeline(transaction=False) as pipe:
+                for args, options, _ in batch:
+                    pipe.execute_command(*args, **options)
+                results = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class RedisManager:
     _instance = None
-    _pool = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(RedisManager, cls).__new__(cls)
+            cls._instance._clients = {}
+            cls._instance._lock = asyncio.Lock()
+            cls._instance._tracking_task = None
+            prefixes = [p.strip() for p in settings.REDIS_CLIENT_CACHE_PREFIXES.split(",") if p.strip()]
+            cls._instance.client_cache = ClientSideCache(
+                prefixes,
+                max_size=settings.REDIS_CLIENT_CACHE_SIZE,
+                ttl_seconds=settings.REDIS_CLIENT_CACHE_TTL_SECONDS
+            ) if prefixes else None
+        return cls._instance
+
+    @staticmethod
+    def pool_limit(name: str) -> int:
+        share = POOL_SHARES.get(name, POOL_SHARES["default"])[0]
+        return max(2, int(settings.REDIS_MAX_CONNECTIONS * share))
+
+    async def get(self, name: str = "default") -> ManagedRedis:
+        client = self._clients.get(name)
+        if client is not None:
+            return client
+        async with self._lock:
+            if name not in self._clients:
+                self._clients[name] = self._create(name)
+                if self.client_cache is not None and self._tracking_task is None:
+                    self._tracking_task = asyncio.create_task(self._tracking_loop())
+            return self._clients[name]
+
+    def _create(self, name: str) -> ManagedRedis:
+        decode = POOL_SHARES.get(name, POOL_SHARES["default"])[1]
+        pool = BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=self.pool_limit(name),
+            timeout=POOL_TIMEOUT_SECONDS,
+            decode_responses=decode,
+            encoding="utf-8",
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            socket_keepalive=True,
+            retry_on_error=[RedisConnectionError, RedisTimeoutError],
+            retry=Retry(ExponentialBackoff(cap=1.0, base=0.05), retries=3),
+            client_name=f"support_rag:{name}",
+        )
+        logger.info("Redis pool created", extra={"pool": name, "max_connections": pool.max_connections})
+        return ManagedRedis(
+            connection_pool=pool,
+            pool_name=name,
+            auto_pipeline=settings.REDIS_AUTO_PIPELINE,
+            client_cache=self.client_cache,
+        )
+
+    async def _tracking_loop(self):
+        """Keeps a pub/sub connection that receives key invalidations for the cached prefixes."""
+        cache = self.client_cache
+        prefix_args = []
+        for prefix in cache.prefixes:
+            prefix_args += ["PREFIX", prefix]
+
+        while True:
+            # Two dedicated connections: one receives invalidations, the other
+            # holds the BCAST tracking registration redirected to the first.
+            pool = aioredis.ConnectionPool.from_url(settings.REDIS_URL, decode_responses=True, max_connections=2)
+            listener = pool.make_connection()
+            tracker = pool.make_connection()
+            try:
+                await listener.connect()
+                await listener.send_command("CLIENT", "ID")
+                listener_id = await listener.read_response()
+                await listener.send_command("SUBSCRIBE", "__redis__:invalidate")
+                await listener.read_response()
+
+                await tracker.connect()
+                await tracker.send_command("CLIENT", "TRACKING", "ON", "REDIRECT", listener_id, "BCAST", *prefix_args)
+                await tracker.read_response()
+
+                cache.invalidate()
+                cache.tracking_active = True
+                logger.info("Redis client-side caching active", extra={"prefixes": list(cache.prefixes)})
+
+                while True:
+                    message = await listener.read_response(timeout=None)
+                    if not isinstance(message, list) or len(message) < 3 or message[0] != "message":
+                        continue
+                    keys = message[2]
+                    if keys is None:
+                        cache.invalidate()  # FLUSHDB / FLUSHALL
+                    else:
+                        for key in keys if isinstance(keys, list) else [keys]:
+                            cache.invalidate(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Redis invalidation channel lost", extra={"error": str(e)})
+            finally:
+                # Entries can no longer be trusted beyond their TTL
+                cache.tracking_active = False
+                cache.invalidate()
+                for conn in (listener, tracker):
+                    try:
+                        await conn.disconnect()
+                    except Exception:
+                        pass
+                await pool.aclose()
+            await asyncio.sleep(5)
+
+    async def health_check(self) -> Dict[str, bool]:
+        results = {}
+        for name, client in list(self._clients.items()):
+            try:
+                results[name] = bool(await asyncio.wait_for(client.ping(), timeout=2))
+            except Exception:
+                results[name] = False
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        pools = {}
+        for name, client in self._clients.items():
+            pool = client.connection_pool
+            in_use = len(getattr(pool, "_in_use_connections", ()))
+            idle = len([c for c in getattr(pool, "_available_connections", ()) if c is not None])
+            pools[name] = {
+                "max_connections": pool.max_connections,
+                "in_use": in_use,
+                "idle": idle,
+                "utilization": round(in_use / pool.max_connections, 3) if pool.max_connections else 0.0,
+                "commands": client.commands,
+                "pipelines": client.pipelines,
+                "avg_pipeline_size": round(client.pipelined_commands / client.pipelines, 2) if client.pipelines else 0.0,
+            }
+        result = {
+            "max_connections_total": settings.REDIS_MAX_CONNECTIONS,
+            "auto_pipeline": settings.REDIS_AUTO_PIPELINE,
+            "pools": pools,
+        }
+        if self.client_cache is not None:
+            result["client_cache"] = self.client_cache.stats()
+        return result
+
+    async def close(self):
+        if self._tracking_task:
+            self._tracking_task.cancel()
+            try:
+                await self._tracking_task
+            except asyncio.CancelledError:
+                pass
+            self._tracking_task = None
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+
+def get_redis_manager() -> RedisManager:
+    return RedisManager()
+
+
+async def get_redis(name: str = "default") -> ManagedRedis:
+    return await RedisManager().get(name)
+
+
+class RedisPool:
+    """Backwards-compatible entry point: the "default" pool."""
 
     @classmethod
     async def get_pool(cls) -> aioredis.Redis:
-        if cls._pool is None:
-            # redis.from_url returns a Redis client which handles a connection pool internally
-            cls._pool = await aioredis.from_url(
-                settings.REDIS_URL,
-                encoding="utf-8",
-                decode_responses=True,
-                max_connections=10
-            )
-        return cls._pool
+        return await get_redis("default")
 
     @classmethod
     async def close(cls):
-        if cls._pool:
-            await cls._pool.close()
-            cls._pool = None
+        await get_redis_manager().close()
@@ -0,0 +1,512 @@
+"""
+In-process BM25 lexical index over the `documents` table.
+
+Selected with `lexical_backend: bm25` in global.yaml (default: Postgres FTS).
+
+Layout:
+- Base segment: CSR-style arrays. `offsets[t]:offsets[t+1]` slices `post_docs`
+  and `post_tfs` for term t. Per-document arrays hold the DB id and length.
+- Delta segment: postings of documents added since the last compaction, kept
+  in dicts; merged into the base arrays once it exceeds COMPACT_THRESHOLD.
+- Removed or replaced documents are tombstoned and skipped at query time.
+  Every row keeps its term ids (CSR `row_offsets`/`row_terms` for the base,
+  a dict for the delta), so a removal costs as much as the document is long.
+
+Tokens are lowercased words stemmed per script: Cyrillic words with the
+Russian Snowball stemmer, Latin words with the English one. Queries in mixed
+languages therefore match without choosing one text-search config.
+
+The index is built from Postgres on first start and saved as an .npz snapshot
+(LEXICAL_INDEX_CACHE) together with each row's xmin, so a loaded snapshot
+re-reads rows inserted, updated or deleted since. Workers keep each other in
+sync through LISTEN/NOTIFY on LEXICAL_NOTIFY_CHANNEL with the ids of changed
+documents.
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import psycopg
+
+from app.logging_config import logger
+from app.settings import settings
+from app.storage.models import SearchResult
+
+try:
+    import snowballstemmer
+    STEMMING_AVAILABLE = True
+except ImportError:
+    STEMMING_AVAILABLE = False
+    logger.debug("snowballstemmer not installed, BM25 index uses unstemmed tokens")
+
+LEXICAL_NOTIFY_CHANNEL = "lexical_index_changed"
+
+DEFAULT_CACHE_DIR = Path(os.environ.get(
+    "LEXICAL_INDEX_CACHE",
+    Path(__file__).parent.parent.parent.parent / ".cache" / "lexical"
+))
+
+COMPACT_THRESHOLD = 2000
+BUILD_FETCH_SIZE = 5000
+NOTIFY_MAX_IDS = 500  # keeps NOTIFY payloads well under the 8000-byte limit
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_CYRILLIC_RE = re.compile(r"[а-яё]")
+
+
+@lru_cache(maxsize=1)
+def _stemmers() -> Dict[str, Any]:
+    if not STEMMING_AVAILABLE:
+        return {}
+    return {
+        "ru": snowballstemmer.stemmer("russian"),
+        "en": snowballstemmer.stemmer("english"),
+    }
+
+
+@lru_cache(maxsize=100_000)
+def _stem(word: str) -> str:
+    stemmers = _stemmers()
+    if not stemmers:
+        return word
+    lang = "ru" if _CYRILLIC_RE.search(word) else "en"
+    return stemmers[lang].stemWord(word)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, per-language stemmed word tokens (single characters dropped)."""
+    return [_stem(w) for w in _TOKEN_RE.findall(text.lower()) if len(w) > 1]
+
+
+class BM25Index:
+    """BM25 (Okapi) index with an array-backed base segment and an in-memory delta."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        # Vocabulary and base segment
+        self.vocab: Dict[str, int] = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.post_docs = np.zeros(0, dtype=np.int32)
+        self.post_tfs = np.zeros(0, dtype=np.float32)
+        # Per-document arrays (row = internal doc index)
+        self.doc_ids = np.zeros(0, dtype=np.int64)
+        self.doc_lens = np.zeros(0, dtype=np.float32)
+        # Row xmin when read from Postgres (-1: unknown)
+        self.doc_versions = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.contents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.row_of: Dict[int, int] = {}
+        # Term ids per base row: row_terms[row_offsets[r]:row_offsets[r + 1]]
+        self.row_offsets = np.zeros(1, dtype=np.int64)
+        self.row_terms = np.zeros(0, dtype=np.int32)
+        # Delta segment: term id -> [(row, tf)], and row -> term ids
+        self.delta: Dict[int, List[Tuple[int, int]]] = {}
+        self.delta_rows: Dict[int, np.ndarray] = {}
+        self.delta_postings = 0
+        self.df = np.zeros(0, dtype=np.int32)
+        self.total_len = 0.0
+        self.live_docs = 0
+
+    # --- Building and updates ---
+
+    def add_documents(self, docs: Iterable[Tuple]):
+        """Add or replace documents given as (id, content, metadata[, xmin])."""
+        with self._lock:
+            for doc in docs:
+                doc_id, content, metadata = doc[:3]
+                version = doc[3] if len(doc) > 3 else -1
+                self._remove(doc_id)
+                tfs: Dict[int, int] = {}
+                tokens = tokenize(content or "")
+                for token in tokens:
+                    term = self.vocab.get(token)
+                    if term is None:
+                        term = self.vocab[token] = len(self.vocab)
+                    tfs[term] = tfs.get(term, 0) + 1
+
+                row = len(self.contents)
+                self.contents.append(content or "")
+                self.metadatas.append(metadata or {})
+                self.row_of[doc_id] = row
+                self._append_doc_arrays(doc_id, len(tokens), version)
+
+                if len(self.vocab) > len(self.df):
+                    self.df = np.concatenate([self.df, np.zeros(len(self.vocab) - len(self.df), dtype=np.int32)])
+                for term, tf in tfs.items():
+                    self.delta.setdefault(term, []).append((row, tf))
+                    self.df[term] += 1
+                self.delta_rows[row] = np.fromiter(tfs, dtype=np.int32, count=len(tfs))
+                self.delta_postings += len(tfs)
+
+            if self.delta_postings >= COMPACT_THRESHOLD:
+                self.compact()
+
+    def _append_doc_arrays(self, doc_id: int, length: int, version: int):
+        # Grow geometrically so single-document updates stay cheap
+        row = len(self.contents) - 1
+        if row >= len(self.doc_ids):
+            capacity = max(16, len(self.doc_ids) * 2)
+            self.doc_ids = np.resize(self.doc_ids, capacity)
+            self.doc_lens = np.resize(self.doc_lens, capacity)
+            self.doc_versions = np.resize(self.doc_versions, capacity)
+            alive = np.zeros(capacity, dtype=bool)
+            alive[:len(self.alive)] = self.alive
+            self.alive = alive
+        self.doc_ids[row] = doc_id
+        self.doc_lens[row] = length
+        self.doc_versions[row] = version
+        self.alive[row] = True
+        self.total_len += length
+        self.live_docs += 1
+
+    def remove_documents(self, doc_ids: Iterable[int]):
+        with self._lock:
+            for doc_id in doc_ids:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id: int):
+        row = self.row_of.pop(doc_id, None)
+        if row is None:
+            return
+        self.alive[row] = False
+        self.total_len -= float(self.doc_lens[row])
+        self.live_docs -= 1
+        # Document frequencies of its terms drop; postings are cleaned up on compaction
+        self.df[self._terms_of(row)] -= 1
+        self.contents[row] = ""
+        self.metadatas[row] = {}
+
+    def _terms_of(self, row: int) -> np.ndarray:
+        terms = self.delta_rows.pop(row, None)
+        if terms is not None:
+            return terms
+        if row < len(self.row_offsets) - 1:
+            return self.row_terms[self.row_offsets[row]:self.row_offsets[row + 1]]
+        return np.zeros(0, dtype=np.int32)
+
+    def _index_rows(self, n_rows: int):
+        """Rebuild the row -> term ids arrays from the base postings."""
+        terms = np.repeat(np.arange(len(self.offsets) - 1, dtype=np.int32), np.diff(self.offsets))
+        order = np.argsort(self.post_docs, kind="stable")
+        self.row_terms = terms[order]
+        self.row_offsets = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.post_docs, minlength=n_rows), out=self.row_offsets[1:])
+
+    def compact(self):
+        """Merge the delta into the base arrays and drop tombstoned rows."""
+        with self._lock:
+            n_terms = len(self.vocab)
+            n_rows = len(self.contents)
+            keep = self.alive[:n_rows]
+            new_row = np.full(n_rows, -1, dtype=np.int64)
+            new_row[keep] = np.arange(int(keep.sum()))
+
+            # Gather (term, row, tf) triples from both segments
+            base_terms = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+            delta_terms, delta_rows, delta_tfs = [], [], []
+            for term, postings in self.delta.items():
+                for row, tf in postings:
+                    delta_terms.append(term)
+                    delta_rows.append(row)
+                    delta_tfs.append(tf)
+            terms = np.concatenate([base_terms, np.asarray(delta_terms, dtype=np.int64)])
+            rows = np.concatenate([self.post_docs.astype(np.int64), np.asarray(delta_rows, dtype=np.int64)])
+            tfs = np.concatenate([self.post_tfs, np.asarray(delta_tfs, dtype=np.float32)])
+
+            live = new_row[rows] >= 0
+            terms, rows, tfs = terms[live], new_row[rows[live]], tfs[live]
+            order = np.lexsort((rows, terms))
+            self.post_docs = rows[order].astype(np.int32)
+            self.post_tfs = tfs[order]
+            self.offsets = np.zeros(n_terms + 1, dtype=np.int64)
+            np.cumsum(np.bincount(terms, minlength=n_terms), out=self.offsets[1:])
+            self.df = np.diff(self.offsets).astype(np.int32)
+
+            self.doc_ids = self.doc_ids[:n_rows][keep]
+            self.doc_lens = self.doc_lens[:n_rows][keep]
+            self.doc_versions = self.doc_versions[:n_rows][keep]
+            self.alive = np.ones(len(self.doc_ids), dtype=bool)
+            self.contents = [c for c, k in zip(self.contents, keep) if k]
+            self.metadatas = [m for m, k in zip(self.metadatas, keep) if k]
+            self.row_of = {int(doc_id): row for row, doc_id in enumerate(self.doc_ids)}
+            self.delta = {}
+            self.delta_rows = {}
+            self.delta_postings = 0
+            self._index_rows(len(self.doc_ids))
+
+    # --- Querying ---
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        category_filter: Optional[str] = None
+    ) -> List[SearchResult]:
+        with self._lock:
+            if not self.live_docs:
+                return []
+            terms = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+            if not terms:
+                return []
+
+            n_rows = len(self.contents)
+            avgdl = self.total_len / self.live_docs if self.live_docs else 1.0
+            scores = np.zeros(n_rows, dtype=np.float32)
+            for term in terms:
+                df = int(self.df[term])
+                if df <= 0:
+                    continue
+                idf = np.log1p((self.live_docs - df + 0.5) / (df + 0.5))
+                rows, tfs = self._postings(term)
+                if not len(rows):
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lens[rows] / avgdl)
+                scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+            scores[~self.alive[:n_rows]] = 0.0
+            candidates = np.nonzero(scores > 0)[0]
+            if category_filter:
+                candidates = np.array(
+                    [r for r in candidates if self.metadatas[r].get("category") == category_filter],
+                    dtype=np.int64
+                )
+            if not len(candidates):
+                return []
+            if len(candidates) > top_k:
+                part = np.argpartition(-scores[candidates], top_k - 1)[:top_k]
+                candidates = candidates[part]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+            return [
+                SearchResult(content=self.contents[r], score=float(scores[r]), metadata=self.metadatas[r])
+                for r in candidates
+            ]
+
+    def _postings(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = (self.offsets[term], self.offsets[term + 1]) if term < len(self.offsets) - 1 else (0, 0)
+        rows, tfs = self.post_docs[start:end], self.post_tfs[start:end]
+        extra = self.delta.get(term)
+        if extra:
+            rows = np.concatenate([rows, np.fromiter((r for r, _ in extra), dtype=np.int32, count=len(extra))])
+            tfs = np.concatenate([tfs, np.fromiter((tf for _, tf in extra), dtype=np.float32, count=len(extra))])
+        return rows, tfs
+
+    # --- Snapshots ---
+
+    def save(self, path: Path):
+        with self._lock:
+            self.compact()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp.npz")
+            np.savez(
+                tmp,
+                offsets=self.offsets,
+                post_docs=self.post_docs,
+                post_tfs=self.post_tfs,
+                doc_ids=self.doc_ids,
+                doc_lens=self.doc_lens,
+                doc_versions=self.doc_versions,
+                vocab=np.array(json.dumps(list(self.vocab))),
+                contents=np.array(json.dumps(self.contents, ensure_ascii=False)),
+                metadatas=np.array(json.dumps(self.metadatas, ensure_ascii=False, default=str)),
+                params=np.array([self.k1, self.b, float(STEMMING_AVAILABLE)]),
+            )
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        data = np.load(path, allow_pickle=False)
+        k1, b, stemmed = data["params"].tolist()
+        if bool(stemmed) != STEMMING_AVAILABLE:
+            raise ValueError("snapshot was built with a different tokenizer")
+        index = cls(k1=k1, b=b)
+        index.offsets = data["offsets"]
+        index.post_docs = data["post_docs"]
+        index.post_tfs = data["post_tfs"]
+        index.doc_ids = data["doc_ids"]
+        index.doc_lens = data["doc_lens"]
+        # Snapshots from before versions were kept: every row counts as changed
+        index.doc_versions = data["doc_versions"] if "doc_versions" in data else np.full(len(index.doc_ids), -1, dtype=np.int64)
+        index.vocab = {term: i for i, term in enumerate(json.loads(str(data["vocab"])))}
+        index.contents = json.loads(str(data["contents"]))
+        index.metadatas = json.loads(str(data["metadatas"]))
+        index.alive = np.ones(len(index.doc_ids), dtype=bool)
+        index.row_of = {int(doc_id): row for row, doc_id in enumerate(index.doc_ids)}
+        index.df = np.diff(index.offsets).astype(np.int32)
+        index.total_len = float(index.doc_lens.sum())
+        index.live_docs = len(index.doc_ids)
+        index._index_rows(len(index.doc_ids))
+        return index
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": self.live_docs,
+            "terms": len(self.vocab),
+            "postings": int(len(self.post_docs)) + self.delta_postings,
+            "delta_postings": self.delta_postings,
+            "stemming": STEMMING_AVAILABLE,
+        }
+
+
+class LexicalIndexService:
+    """Process-wide BM25 index: load/build, cross-worker sync and snapshotting."""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(LexicalIndexService, cls).__new__(cls)
+            cls._instance.index = None
+            cls._instance.snapshot_path = DEFAULT_CACHE_DIR / "bm25.npz"
+            cls._instance._build_lock = asyncio.Lock()
+            cls._instance._listener_task = None
+        return cls._instance
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    async def load_or_build(self):
+        """Load the snapshot (then catch up with the table) or build from scratch."""
+        async with self._build_lock:
+            if self.index is not None:
+                return
+            loop = asyncio.get_running_loop()
+            index = None
+            if self.snapshot_path.exists():
+                try:
+                    index = await loop.run_in_executor(None, BM25Index.load, self.snapshot_path)
+                    await self._catch_up(index)
+                except Exception as e:
+                    logger.warning("BM25 snapshot unusable, rebuilding", extra={"error": str(e)})
+                    index = None
+            if index is None:
+                index = await self._build()
+                await loop.run_in_executor(None, index.save, self.snapshot_path)
+            self.index = index
+            logger.info("BM25 index ready", extra=index.stats())
+
+    async def _build(self) -> BM25Index:
+        t0 = time.perf_counter()
+        index = BM25Index()
+        loop = asyncio.get_running_loop()
+        async for batch in self._fetch_documents():
+            await loop.run_in_executor(None, index.add_documents, batch)
+        await loop.run_in_executor(None, index.compact)
+        logger.info("BM25 index built", extra={"documents": index.live_docs, "elapsed_sec": round(time.perf_counter() - t0, 2)})
+        return index
+
+    async def _fetch_documents(self, ids: Optional[List[int]] = None):
+        from app.storage.connection import get_db_connection
+        async with get_db_connection() as conn:
+            async with conn.cursor() as cur:
+                if ids is None:
+                    await cur.execute("SELECT id, content, metadata, xmin::text::bigint FROM documents ORDER BY id")
+                else:
+                    await cur.execute(
+                        "SELECT id, content, metadata, xmin::text::bigint FROM documents WHERE id = ANY(%s)", (ids,)
+                    )
+                while True:
+                    rows = await cur.fetchmany(BUILD_FETCH_SIZE)
+                    if not rows:
+                        break
+                    yield [(row[0], row[1], row[2] or {}, row[3]) for row in rows]
+
+    async def _catch_up(self, index: BM25Index):
+        """Bring a loaded snapshot up to date: re-read new and updated rows, drop deleted ones."""
+        from app.storage.connection import get_db_connection
+        async with get_db_connection() as conn:
+            async with conn.cursor() as cur:
+                # xmin changes with every UPDATE, so it also catches edits made while no worker listened
+                await cur.execute("SELECT id, xmin::text::bigint FROM documents")
+                current = dict(await cur.fetchall())
+        index.remove_documents(set(index.row_of) - current.keys())
+        stale = [
+            doc_id for doc_id, version in current.items()
+            if doc_id not in index.row_of or index.doc_versions[index.row_of[doc_id]] != version
+        ]
+        for start in range(0, len(stale), BUILD_FETCH_SIZE):
+            async for batch in self._fetch_documents(stale[start:start + BUILD_FETCH_SIZE]):
+                index.add_documents(batch)
+        if stale:
+            logger.info("BM25 snapshot caught up", extra={"reread": len(stale), "documents": len(current)})
+
+    async def refresh(self, doc_ids: List[int]):
+        """Re-read the given documents; ids no longer in the table are removed."""
+        if self.index is None or not doc_ids:
+            return
+        found = set()
+        async for batch in self._fetch_documents(list(doc_ids)):
+            self.index.add_documents(batch)
+            found.update(doc[0] for doc in batch)
+        self.index.remove_documents(set(doc_ids) - found)
+
+    async def notify_changed(self, doc_ids: List[int]):
+        """Apply changes locally and announce them to the other workers."""
+        from app.services.config_loader.loader import get_global_param
+        if not doc_ids or get_global_param("lexical_backend", "postgres") != "bm25":
+            return
+        await self.refresh(doc_ids)
+        try:
+            from app.storage.connection import get_db_connection
+            async with get_db_connection() as conn:
+                for start in range(0, len(doc_ids), NOTIFY_MAX_IDS):
+                    payload = json.dumps([int(i) for i in doc_ids[start:start + NOTIFY_MAX_IDS]])
+                    await conn.execute("SELECT pg_notify(%s, %s)", (LEXICAL_NOTIFY_CHANNEL, payload))
+        except Exception as e:
+            logger.warning("Lexical index NOTIFY failed", extra={"error": str(e)})
+
+    async def start_listener(self):
+        if not settings.DATABASE_URL:
+            return
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.create_task(self._listen_loop())
+
+    async def stop_listener(self):
+        task = self._listener_task
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+        if self.index is not None:
+            # Snapshot on shutdown so the next start only catches up
+            await asyncio.get_running_loop().run_in_executor(None, self.index.save, self.snapshot_path)
+
+    async def _listen_loop(self):
+        backoff = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(settings.DATABASE_URL, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {LEXICAL_NOTIFY_CHANNEL}")
+                    backoff = 1.0
+                    async for notify in conn.notifies():
+                        try:
+                            await self.refresh(json.loads(notify.payload))
+                        except Exception as e:
+                            logger.warning("Lexical index refresh failed", extra={"error": str(e)})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Lexical index listener error", extra={"error": str(e), "retry_in_sec": backoff})
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+
+
+def get_lexical_index() -> LexicalIndexService:
+    return LexicalIndexService()
@@ -1,29 +1,186 @@
 import json
 import uuid
 import time
-from typing import List, Optional, Dict, Any
-from redis import asyncio as aioredis
+from typing import List, Optional, Dict, Any, Awaitable, Callable, Tuple
+from redis.exceptions import ResponseError, WatchError
 from app.settings import settings
 from app.services.ingestion.ingestion_service import DocumentIngestionService
 from app.services.document_loaders import ProcessedQAPair
 from app.logging_config import logger
-from app.services.redis_pool import RedisPool
+from app.services.redis_pool import get_redis
+
+
+class DraftVersionConflict(Exception):
+    """Raised when a draft changed since the version the caller last saw."""
+
+    def __init__(self, draft_id: str, current_version: Optional[int]):
+        super().__init__(f"Draft {draft_id} is at version {current_version}")
+        self.draft_id = draft_id
+        self.current_version = current_version
+
 
 class StagingService:
-    """Service for managing staging drafts in Redis before they are committed to permanent storage."""
+    """
+    Service for managing staging drafts in Redis before they are committed to permanent storage.
+
+    A draft is stored as three keys so single-chunk edits cost O(1):
+        staging:draft:{id}   HASH  draft fields + version + next_pos
+        staging:chunks:{id}  HASH  chunk_id -> chunk JSON
+        staging:order:{id}   ZSET  chunk_id scored by position
+    Every write bumps `version` inside a WATCH/MULTI transaction on the draft
+    hash, so concurrent editors never lose updates. Drafts written by older
+    versions as one JSON string are converted on first access.
+    """
     PREFIX = "staging:draft:"
+    CHUNKS_PREFIX = "staging:chunks:"
+    ORDER_PREFIX = "staging:order:"
     FILE_PREFIX = "staging:file:"
+    COMMIT_PAGE_SIZE = 500
     EXPIRY = 86400 * 7 # 7 days
-    
+    MAX_RETRIES = 20
+
     def __init__(self):
         self.redis_url = settings.REDIS_URL
-    
+
     async def _get_redis(self):
-        return await RedisPool.get_pool()
+        return await get_redis("staging")
 
     def _generate_id(self):
         return str(uuid.uuid4())
 
+    def _keys(self, draft_id: str) -> Tuple[str, str, str]:
+        return f"{self.PREFIX}{draft_id}", f"{self.CHUNKS_PREFIX}{draft_id}", f"{self.ORDER_PREFIX}{draft_id}"
+
+    def _new_chunk(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "chunk_id": self._generate_id(),
+            "question": data.get("question"),
+            "answer": data.get("answer"),
+            "metadata": data.get("metadata") or {}
+        }
+
+    @staticmethod
+    def _meta_from_hash(raw: Dict[str, str]) -> Dict[str, Any]:
+        return {
+            "draft_id": raw.get("draft_id"),
+            "file_id": raw.get("file_id"),
+            "filename": raw.get("filename"),
+            "created_at": float(raw.get("created_at") or 0),
+            "status": raw.get("status", "draft"),
+            "version": int(raw.get("version") or 0)
+        }
+
+    def _written(self, meta: Dict[str, str], total: int, items: List[Dict[str, Any]], write: bool) -> Dict[str, Any]:
+        """
+        Result of a write: the chunks it touched plus the draft fields as of
+        that write, in the list_chunks shape. Callers page through
+        list_chunks for everything else instead of reloading the draft.
+        """
+        draft = self._meta_from_hash(meta)
+        if write:
+            draft["version"] += 1  # bumped by _queue_touch in the same MULTI
+        draft["total_chunks"] = total
+        return {"draft": draft, "items": items, "total": total}
+
+    async def _queue_touch(self, pipe, draft_id: str):
+        """Queue the version bump and TTL refresh that end every write."""
+        meta_key, chunks_key, order_key = self._keys(draft_id)
+        await pipe.hincrby(meta_key, "version", 1)
+        for key in (meta_key, chunks_key, order_key):
+            await pipe.expire(key, self.EXPIRY)
+
+    async def _transaction(
+        self,
+        draft_id: str,
+        body: Callable[[Any, Dict[str, str]], Awaitable[Tuple[Any, bool]]],
+        expected_version: Optional[int] = None
+    ) -> Tuple[bool, Any]:
+        """
+        Optimistic read-modify-write on one draft.
+
+        `body(pipe, meta)` runs with the draft hash WATCHed: it reads in
+        immediate mode, and if it wants to write it calls pipe.multi(), queues
+        the writes and returns (result, True). Retries on concurrent changes.
+
+        Returns (found, result); found is False when the draft does not exist.
+        """
+        redis = await self._get_redis()
+        meta_key = self._keys(draft_id)[0]
+        for _ in range(self.MAX_RETRIES):
+            async with redis.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(meta_key)
+                    meta = await pipe.hgetall(meta_key)
+                    if not meta:
+                        return False, None
+                    if expected_version is not None and int(meta.get("version") or 0) != expected_version:
+                        raise DraftVersionConflict(draft_id, int(meta.get("version") or 0))
+                    result, write = await body(pipe, meta)
+                    if write:
+                        await self._queue_touch(pipe, draft_id)
+                        await pipe.execute()
+                    return True, result
+                except WatchError:
+                    continue
+                except ResponseError as e:
+                    if "WRONGTYPE" not in str(e):
+                        raise
+            # Legacy JSON blob under the draft key: convert, then retry
+            await self._migrate_legacy(draft_id)
+        raise DraftVersionConflict(draft_id, None)
+
+    async def _migrate_legacy(self, draft_id: str) -> bool:
+        """Convert a draft stored as one JSON string into the hash layout. Returns True if converted."""
+        redis = await self._get_redis()
+        meta_key, chunks_key, order_key = self._keys(draft_id)
+        async with redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(meta_key)
+                if await pipe.type(meta_key) != "string":
+                    return False
+                blob = await pipe.get(meta_key)
+                ttl = await pipe.ttl(meta_key)
+                draft = json.loads(blob)
+                chunks = draft.get("chunks") or []
+
+                pipe.multi()
+                await pipe.delete(meta_key, chunks_key, order_key)
+                await pipe.hset(meta_key, mapping={
+                    "draft_id": draft.get("draft_id", draft_id),
+                    "file_id": draft.get("file_id") or "",
+                    "filename": draft.get("filename") or "",
+                    "created_at": draft.get("created_at") or time.time(),
+                    "status": draft.get("status", "draft"),
+                    "version": 1,
+                    "next_pos": len(chunks)
+                })
+                if chunks:
+                    await pipe.hset(chunks_key, mapping={c["chunk_id"]: json.dumps(c) for c in chunks})
+                    await pipe.zadd(order_key, {c["chunk_id"]: i for i, c in enumerate(chunks)})
+                expiry = ttl if ttl and ttl > 0 else self.EXPIRY
+                for key in (meta_key, chunks_key, order_key):
+                    await pipe.expire(key, expiry)
+                await pipe.execute()
+                logger.info("Migrated legacy staging draft", extra={"draft_id": draft_id, "chunks": len(chunks)})
+                return True
+            except WatchError:
+                # Another worker converted it first
+                return False
+
+    async def migrate_legacy_drafts(self) -> int:
+        """Convert every legacy JSON-blob draft. Returns the number converted."""
+        redis = await self._get_redis()
+        migrated = 0
+        cursor = 0
+        while True:
+            cursor, keys = await redis.scan(cursor, match=f"{self.PREFIX}*", count=100, _type="STRING")
+            for key in keys:
+                if await self._migrate_legacy(key[len(self.PREFIX):]):
+                    migrated += 1
+            if cursor == 0:
+                break
+        return migrated
+
     async def create_draft(self, filename: str, pairs: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Create a new staging draft from a list of Q&A pairs.
@@ -37,42 +194,65 @@ class StagingService:
         """
         draft_id = self._generate_id()
         file_id = self._generate_id()
-        
-        # Structure locally
-        chunks = []
-        for p in pairs:
-            chunk_id = self._generate_id()
-            chunks.append({
-                "chunk_id": chunk_id,
-                "question": p.get("question"),
-                "answer": p.get("answer"),
-                "metadata": p.get("metadata", {})
-            })
-            
-        draft_data = {
-            "draft_id": draft_id,
-            "file_id": file_id,
-            "filename": filename,
-            "created_at": time.time(),
-            "status": "draft",
-            "chunks": chunks
-        }
-        
+        chunks = [self._new_chunk(p) for p in pairs]
+        created_at = time.time()
+
         redis = await self._get_redis()
         try:
-            key = f"{self.PREFIX}{draft_id}"
+            meta_key, chunks_key, order_key = self._keys(draft_id)
             file_key = f"{self.FILE_PREFIX}{file_id}"
-            
+
             async with redis.pipeline() as pipe:
-                await pipe.set(key, json.dumps(draft_data), ex=self.EXPIRY)
+                await pipe.hset(meta_key, mapping={
+                    "draft_id": draft_id,
+                    "file_id": file_id,
+                    "filename": filename,
+                    "created_at": created_at,
+                    "status": "draft",
+                    "version": 1,
+                    "next_pos": len(chunks)
+                })
+                if chunks:
+                    await pipe.hset(chunks_key, mapping={c["chunk_id"]: json.dumps(c) for c in chunks})
+                    await pipe.zadd(order_key, {c["chunk_id"]: i for i, c in enumerate(chunks)})
+                for key in (meta_key, chunks_key, order_key):
+                    await pipe.expire(key, self.EXPIRY)
                 await pipe.set(file_key, draft_id, ex=self.EXPIRY)
                 await pipe.execute()
-                
-            return draft_data
+
+            return {
+                "draft_id": draft_id,
+                "file_id": file_id,
+                "filename": filename,
+                "created_at": created_at,
+                "status": "draft",
+                "version": 1,
+                "chunks": chunks
+            }
         except Exception as e:
             logger.error(f"Error creating draft: {e}")
             raise
 
+    async def get_draft_meta(self, draft_id: str) -> Optional[Dict[str, Any]]:
+        """Draft fields, version and chunk count, without loading the chunks."""
+        redis = await self._get_redis()
+        meta_key, _, order_key = self._keys(draft_id)
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                await pipe.hgetall(meta_key)
+                await pipe.zcard(order_key)
+                raw, total = await pipe.execute()
+        except ResponseError as e:
+            if "WRONGTYPE" not in str(e) or not await self._migrate_legacy(draft_id):
+                logger.error(f"Error getting draft {draft_id}: {e}")
+                return None
+            return await self.get_draft_meta(draft_id)
+        if not raw:
+            return None
+        meta = self._meta_from_hash(raw)
+        meta["total_chunks"] = total
+        return meta
+
     async def get_draft(self, draft_id: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve a draft by its ID.
@@ -81,19 +261,51 @@ class StagingService:
             draft_id: Unique draft identifier
 
         Returns:
-            Dict containing draft data or None
+            Dict containing draft data (chunks in order) or None
+        """
+        result = await self.list_chunks(draft_id, offset=0, limit=None)
+        if result is None:
+            return None
+        draft = result["draft"]
+        draft["chunks"] = result["items"]
+        return draft
+
+    async def list_chunks(self, draft_id: str, offset: int = 0, limit: Optional[int] = 50) -> Optional[Dict[str, Any]]:
+        """
+        Page through a draft's chunks in order.
+
+        Returns {"draft": meta, "items": [...], "total": n, "offset": ..., "limit": ...}
+        or None if the draft does not exist. limit=None returns everything.
         """
         redis = await self._get_redis()
+        meta_key, chunks_key, order_key = self._keys(draft_id)
+        stop = -1 if limit is None else offset + limit - 1
         try:
-            key = f"{self.PREFIX}{draft_id}"
-            data = await redis.get(key)
-            if data:
-                return json.loads(data)
-            return None
+            # MULTI so the page, the count and the version are one snapshot
+            async with redis.pipeline(transaction=True) as pipe:
+                await pipe.hgetall(meta_key)
+                await pipe.zcard(order_key)
+                await pipe.zrange(order_key, offset, stop)
+                raw, total, chunk_ids = await pipe.execute()
+            if not raw:
+                return None
+            items = []
+            if chunk_ids:
+                values = await redis.hmget(chunks_key, chunk_ids)
+                items = [json.loads(v) for v in values if v]
+        except ResponseError as e:
+            if "WRONGTYPE" not in str(e) or not await self._migrate_legacy(draft_id):
+                logger.error(f"Error getting draft {draft_id}: {e}")
+                return None
+            return await self.list_chunks(draft_id, offset, limit)
         except Exception as e:
             logger.error(f"Error getting draft {draft_id}: {e}")
             return None
-            
+
+        meta = self._meta_from_hash(raw)
+        meta["total_chunks"] = total
+        return {"draft": meta, "items": items, "total": total, "offset": offset, "limit": limit}
+
     async def get_draft_by_file(self, file_id: str) -> Optional[Dict[str, Any]]:
         redis = await self._get_redis()
         try:
@@ -106,26 +318,67 @@ class StagingService:
             logger.error(f"Error getting draft by file {file_id}: {e}")
             return None
 
-    async def update_chunk(self, draft_id: str, chunk_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        redis = await self._get_redis()
+    async def update_chunks(
+        self,
+        draft_id: str,
+        updates: List[Dict[str, Any]],
+        expected_version: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Apply field updates to several chunks in one transaction.
+
+        updates: dicts with 'chunk_id' plus the fields to overwrite.
+        Returns {"draft": meta, "items": updated chunks, "total": n}, or None
+        if the draft does not exist. Unknown chunk ids are skipped.
+        Raises DraftVersionConflict when expected_version is stale.
+        """
+        _, chunks_key, order_key = self._keys(draft_id)
+        update_map = {u["chunk_id"]: {k: v for k, v in u.items() if k != "chunk_id"} for u in updates}
+
+        async def body(pipe, meta):
+            chunk_ids = list(update_map)
+            current = await pipe.hmget(chunks_key, chunk_ids) if chunk_ids else []
+            total = await pipe.zcard(order_key)
+            changed = []
+            for chunk_id, value in zip(chunk_ids, current):
+                if value:
+                    chunk = json.loads(value)
+                    chunk.update(update_map[chunk_id])
+                    changed.append(chunk)
+            if not changed:
+                return self._written(meta, total, [], write=False), False
+            pipe.multi()
+            await pipe.hset(chunks_key, mapping={c["chunk_id"]: json.dumps(c) for c in changed})
+            return self._written(meta, total, changed, write=True), True
+
+        found, result = await self._transaction(draft_id, body, expected_version)
+        return result if found else None
+
+    async def update_chunk(
+        self,
+        draft_id: str,
+        chunk_id: str,
+        updates: Dict[str, Any],
+        expected_version: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Update one chunk. Returns the updated chunk, or None if the draft or chunk is missing."""
+        chunks_key = self._keys(draft_id)[1]
+
+        async def body(pipe, meta):
+            value = await pipe.hget(chunks_key, chunk_id)
+            if not value:
+                return None, False
+            chunk = json.loads(value)
+            chunk.update(updates)
+            pipe.multi()
+            await pipe.hset(chunks_key, chunk_id, json.dumps(chunk))
+            return chunk, True
+
         try:
-            key = f"{self.PREFIX}{draft_id}"
-            data = await redis.get(key)
-            if not data:
-                return None
-            
-            draft = json.loads(data)
-            found = False
-            for chunk in draft["chunks"]:
-                if chunk["chunk_id"] == chunk_id:
-                    chunk.update(updates)
-                    found = True
-                    break
-            
-            if found:
-                await redis.set(key, json.dumps(draft), ex=self.EXPIRY)
-                return draft
-            return None
+            _, chunk = await self._transaction(draft_id, body, expected_version)
+            return chunk
+        except DraftVersionConflict:
+            raise
         except Exception as e:
             logger.error(f"Error updating chunk {chunk_id}: {e}")
             return None
@@ -134,146 +387,158 @@ class StagingService:
         """
         Batch update metadata for multiple chunks.
         updates: List of dicts with 'chunk_id' and 'metadata' keys.
+        Returns {"draft": meta, "items": updated chunks, "total": n} or None.
         """
-        redis = await self._get_redis()
-        try:
-            key = f"{self.PREFIX}{draft_id}"
-            data = await redis.get(key)
-            if not data:
-                return None
-            
-            draft = json.loads(data)
-            
-            # Create a map for faster lookup
-            update_map = {u['chunk_id']: u['metadata'] for u in updates}
-            
-            updates_count = 0
-            for chunk in draft["chunks"]:
-                if chunk["chunk_id"] in update_map:
+        _, chunks_key, order_key = self._keys(draft_id)
+        update_map = {u['chunk_id']: u['metadata'] for u in updates}
+
+        async def body(pipe, meta):
+            chunk_ids = list(update_map)
+            current = await pipe.hmget(chunks_key, chunk_ids) if chunk_ids else []
+            total = await pipe.zcard(order_key)
+            changed = []
+            for chunk_id, value in zip(chunk_ids, current):
+                if value:
+                    chunk = json.loads(value)
                     # Merge metadata
-                    current_meta = chunk.get("metadata", {})
-                    current_meta.update(update_map[chunk["chunk_id"]])
+                    current_meta = chunk.get("metadata") or {}
+                    current_meta.update(update_map[chunk_id])
                     chunk["metadata"] = current_meta
-                    updates_count += 1
-            
-            if updates_count > 0:
-                await redis.set(key, json.dumps(draft), ex=self.EXPIRY)
-                return draft
-            return draft # Return draft even if no updates happened, but it exists
+                    changed.append(chunk)
+            if not changed:
+                return self._written(meta, total, [], write=False), False
+            pipe.multi()
+            await pipe.hset(chunks_key, mapping={c["chunk_id"]: json.dumps(c) for c in changed})
+            return self._written(meta, total, changed, write=True), True
+
+        try:
+            found, result = await self._transaction(draft_id, body)
+            return result if found else None
         except Exception as e:
             logger.error(f"Error batch updating chunks: {e}")
             return None
 
     async def add_chunks(self, draft_id: str, new_chunks_data: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
-        redis = await self._get_redis()
+        """
+        Append chunks to a draft.
+        Returns {"draft": meta, "items": the new chunks, "total": n} or None.
+        """
+        meta_key, chunks_key, order_key = self._keys(draft_id)
+        new_chunks = [self._new_chunk(ch) for ch in new_chunks_data]
+
+        async def body(pipe, meta):
+            total = await pipe.zcard(order_key)
+            if not new_chunks:
+                return self._written(meta, total, [], write=False), False
+            next_pos = int(meta.get("next_pos") or 0)
+            pipe.multi()
+            await pipe.hset(chunks_key, mapping={c["chunk_id"]: json.dumps(c) for c in new_chunks})
+            await pipe.zadd(order_key, {c["chunk_id"]: next_pos + i for i, c in enumerate(new_chunks)})
+            await pipe.hset(meta_key, "next_pos", next_pos + len(new_chunks))
+            return self._written(meta, total + len(new_chunks), new_chunks, write=True), True
+
         try:
-            key = f"{self.PREFIX}{draft_id}"
-            data = await redis.get(key)
-            if not data:
-                return None
-            
-            draft = json.loads(data)
-            for ch in new_chunks_data:
-                chunk_id = self._generate_id()
-                draft["chunks"].append({
-                    "chunk_id": chunk_id,
-                    "question": ch.get("question"),
-                    "answer": ch.get("answer"),
-                    "metadata": ch.get("metadata", {})
-                })
-            
-            await redis.set(key, json.dumps(draft), ex=self.EXPIRY)
-            return draft
+            found, result = await self._transaction(draft_id, body)
+            return result if found else None
         except Exception as e:
             logger.error(f"Error adding chunks: {e}")
             return None
 
     async def delete_chunk(self, draft_id: str, chunk_id: str) -> bool:
-        redis = await self._get_redis()
+        _, chunks_key, order_key = self._keys(draft_id)
+
+        async def body(pipe, meta):
+            if not await pipe.hexists(chunks_key, chunk_id):
+                return False, False
+            pipe.multi()
+            await pipe.hdel(chunks_key, chunk_id)
+            await pipe.zrem(order_key, chunk_id)
+            return True, True
+
         try:
-            key = f"{self.PREFIX}{draft_id}"
-            data = await redis.get(key)
-            if not data:
-                return False
-            
-            draft = json.loads(data)
-            original_len = len(draft["chunks"])
-            draft["chunks"] = [c for c in draft["chunks"] if c["chunk_id"] != chunk_id]
-            
-            if len(draft["chunks"]) < original_len:
-                await redis.set(key, json.dumps(draft), ex=self.EXPIRY)
-                return True
-            return False
+            _, deleted = await self._transaction(draft_id, body)
+            return bool(deleted)
         except Exception as e:
             logger.error(f"Error deleting chunk {chunk_id}: {e}")
             return False
-            
+
     async def delete_draft(self, draft_id: str) -> bool:
         redis = await self._get_redis()
         try:
-            key = f"{self.PREFIX}{draft_id}"
-            
+            meta_key, chunks_key, order_key = self._keys(draft_id)
+
             # Need to find file_id to delete the mapping
-            data = await redis.get(key)
             file_id = None
-            if data:
-                try:
-                    draft = json.loads(data)
-                    file_id = draft.get("file_id")
-                except:
-                    pass
-            
+            try:
+                file_id = await redis.hget(meta_key, "file_id")
+            except ResponseError:
+                # Legacy JSON blob
+                data = await redis.get(meta_key)
+                if data:
+                    file_id = json.loads(data).get("file_id")
+
             async with redis.pipeline() as pipe:
-                await pipe.delete(key)
+                await pipe.delete(meta_key)
+                await pipe.delete(chunks_key, order_key)
                 if file_id:
                     file_key = f"{self.FILE_PREFIX}{file_id}"
                     await pipe.delete(file_key)
                 res = await pipe.execute()
-                
+
             return res[0] > 0
         except Exception as e:
             logger.error(f"Error deleting draft {draft_id}: {e}")
             return False
-            
-    async def commit_draft(self, draft_id: str) -> Dict[str, Any]:
+
+    async def commit_draft(self, draft_id: str, job_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Commit a staging draft to permanent storage (Postgres and Qdrant).
         Deletes the draft from staging on success.
 
+        Chunks are read page by page while the ingestion pipeline consumes
+        them, so a large draft is never held in memory as a whole.
+
         Args:
             draft_id: Unique draft identifier
+            job_id: Ingestion progress record id (optional)
 
         Returns:
             Dict containing ingestion results
         """
         logger.info("Committing staging draft", extra={"draft_id": draft_id})
-        draft = await self.get_draft(draft_id)
-        if not draft:
+        meta = await self.get_draft_meta(draft_id)
+        if not meta:
             raise ValueError("Draft not found")
-            
-        processed_pairs = []
-        for chunk in draft["chunks"]:
-            if not chunk.get("question") or not chunk.get("answer"):
-                continue
-                
-            processed_pairs.append(
-                ProcessedQAPair(
-                    question=chunk["question"],
-                    answer=chunk["answer"],
-                    metadata=chunk.get("metadata", {})
-                )
-            )
-            
-        if not processed_pairs:
-             return {"status": "empty", "ingested_count": 0}
+        if not meta.get("total_chunks"):
+            return {"status": "empty", "ingested_count": 0}
+
+        async def pairs():
+            offset = 0
+            while True:
+                page = await self.list_chunks(draft_id, offset=offset, limit=self.COMMIT_PAGE_SIZE)
+                if page is None:
+                    raise ValueError("Draft not found")
+                for chunk in page["items"]:
+                    if not chunk.get("question") or not chunk.get("answer"):
+                        continue
+                    yield ProcessedQAPair(
+                        question=chunk["question"],
+                        answer=chunk["answer"],
+                        metadata=chunk.get("metadata", {})
+                    )
+                offset += self.COMMIT_PAGE_SIZE
+                if offset >= page["total"]:
+                    return
 
         # Call Ingestion Service
-        result = await DocumentIngestionService.ingest_pairs(processed_pairs)
-        
+        result = await DocumentIngestionService.ingest_stream(
+            pairs(), job_id=job_id, source_name=f"draft:{draft_id}"
+        )
+
         # Clean up draft after successful commit
         if result.get("status") == "success":
             await self.delete_draft(draft_id)
-            
+
         return result
 
     async def list_drafts(self, draft_ids: Optional[List[str]] = None, search_term: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -283,39 +548,34 @@ class StagingService:
             target_keys_set = None
             if draft_ids:
                 target_keys_set = {f"{self.PREFIX}{did}" for did in draft_ids}
-            
+
             results = []
             search_term_lower = search_term.lower() if search_term else None
-            
+
             # Process during SCAN to avoid accumulating all keys in memory
             cursor = 0
             while True:
                 cursor, keys = await redis.scan(cursor, match=f"{self.PREFIX}*", count=100)
-                
+
                 if keys:
                     # Early key filtering
                     if target_keys_set:
                         keys = [k for k in keys if k in target_keys_set]
-                    
-                    if keys:
-                        # MGET for current batch
-                        batch_data = await redis.mget(keys)
-                        
-                        for d_json in batch_data:
-                            if d_json:
-                                try:
-                                    d = json.loads(d_json)
-                                    # Text search filter
-                                    if search_term_lower:
-                                        if search_term_lower not in d.get("filename", "").lower():
-                                            continue
-                                    results.append(d)
-                                except json.JSONDecodeError:
-                                    continue
-                
+
+                    for key in keys:
+                        draft_id = key[len(self.PREFIX):]
+                        # Text search filter on the filename before loading chunks
+                        if search_term_lower:
+                            meta = await self.get_draft_meta(draft_id)
+                            if not meta or search_term_lower not in (meta.get("filename") or "").lower():
+                                continue
+                        draft = await self.get_draft(draft_id)
+                        if draft:
+                            results.append(draft)
+
                 if cursor == 0:
                     break
-            
+
             return results
         except Exception as e:
             logger.error(f"Error listing drafts: {e}")
@@ -330,32 +590,21 @@ class StagingService:
         try:
             deleted_count = 0
             batch_size = 100
-            
-            # Process draft keys during SCAN (avoid accumulating all keys)
-            cursor = 0
-            while True:
-                cursor, keys = await redis.scan(cursor, match=f"{self.PREFIX}*", count=batch_size)
-                if keys:
-                    # Use pipeline for batch delete
-                    async with redis.pipeline() as pipe:
-                        await pipe.delete(*keys)
-                        results = await pipe.execute()
-                        deleted_count += sum(results)
-                if cursor == 0:
-                    break
-            
-            # Process file mapping keys during SCAN
-            cursor = 0
-            while True:
-                cursor, keys = await redis.scan(cursor, match=f"{self.FILE_PREFIX}*", count=batch_size)
-                if keys:
-                    async with redis.pipeline() as pipe:
-                        await pipe.delete(*keys)
-                        results = await pipe.execute()
-                        deleted_count += sum(results)
-                if cursor == 0:
-                    break
-                    
+
+            # Drafts, their chunk hashes and order sets, then file mappings
+            for prefix in (self.PREFIX, self.CHUNKS_PREFIX, self.ORDER_PREFIX, self.FILE_PREFIX):
+                cursor = 0
+                while True:
+                    cursor, keys = await redis.scan(cursor, match=f"{prefix}*", count=batch_size)
+                    if keys:
+                        # Use pipeline for batch delete
+                        async with redis.pipeline() as pipe:
+                            await pipe.delete(*keys)
+                            results = await pipe.execute()
+                            deleted_count += sum(results)
+                    if cursor == 0:
+                        break
+
             return deleted_count
         except Exception as e:
             logger.error(f"Error clearing drafts: {e}")
@@ -0,0 +1,111 @@
+"""
+Per-request streaming channel for /chat/stream.
+
+The SSE endpoint opens a StreamChannel and runs the graph inside it; the
+generation node writes tokens straight into the channel and the endpoint
+drains it, so tokens do not travel through LangGraph's event machinery.
+The channel is found through a context variable, which asyncio copies into
+every task LangGraph spawns for the request.
+
+Frames:
+    {"status": "searching", "node": "hybrid_search", "elapsed_ms": 120.5}
+    {"token": "..."}
+    {"replace": "..."}   # output guardrails replaced what was streamed so far
+"""
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+# Status frame emitted when a pre-generation graph node completes
+NODE_STATUS_LABELS: Dict[str, str] = {
+    "input_guardrails": "checking",
+    "language_detection": "understanding",
+    "query_translation": "understanding",
+    "check_cache": "checking_cache",
+    "cache_similarity": "checking_cache",
+    "dialog_analysis": "understanding",
+    "aggregation": "understanding",
+    "easy_classification": "classifying",
+    "classify": "classifying",
+    "metadata_filtering": "searching",
+    "expand_query": "searching",
+    "hybrid_search": "searching",
+    "retrieve": "searching",
+    "lexical_search": "searching",
+    "fusion": "searching",
+    "reranking": "ranking",
+    "multihop": "ranking",
+    "clarification_questions": "clarifying",
+    "prompt_routing": "generating",
+}
+
+_CLOSED = object()
+
+_current_channel: contextvars.ContextVar[Optional["StreamChannel"]] = contextvars.ContextVar(
+    "stream_channel", default=None
+)
+
+
+class StreamChannel:
+    """Unbounded per-request frame queue (tokens are small and drained continuously)."""
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._started = time.perf_counter()
+        self.tokens_sent = 0
+        # A replace frame carried the final answer (sent even before any token)
+        self.replaced = False
+        self.first_token_ms: Optional[float] = None
+        self.closed = False
+
+    def _elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self._started) * 1000, 1)
+
+    def send(self, frame: Dict[str, Any]):
+        if not self.closed:
+            self._queue.put_nowait(frame)
+
+    def token(self, text: str):
+        if not text:
+            return
+        if self.first_token_ms is None:
+            self.first_token_ms = self._elapsed_ms()
+        self.tokens_sent += 1
+        self.send({"token": text})
+
+    def replace(self, text: str):
+        self.replaced = True
+        self.send({"replace": text})
+
+    def node_completed(self, node_name: str):
+        label = NODE_STATUS_LABELS.get(node_name)
+        if label:
+            self.send({"status": label, "node": node_name, "elapsed_ms": self._elapsed_ms()})
+
+    def close(self):
+        if not self.closed:
+            self._queue.put_nowait(_CLOSED)
+            self.closed = True
+
+    async def frames(self) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            frame = await self._queue.get()
+            if frame is _CLOSED:
+                return
+            yield frame
+
+
+def get_stream_channel() -> Optional[StreamChannel]:
+    """Channel of the current request, or None outside /chat/stream."""
+    return _current_channel.get()
+
+
+@contextmanager
+def stream_channel_context(channel: StreamChannel) -> Iterator[StreamChannel]:
+    token = _current_channel.set(channel)
+    try:
+        yield channel
+    finally:
+        _current_channel.reset(token)
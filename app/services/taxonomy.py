@@ -1,17 +1,44 @@
 """
 Taxonomy Service
 Manages hierarchical category and intent structures
+
+The category -> intents tree is read with one aggregate query and kept as an
+in-process, versioned TaxonomySnapshot. Renames and merges bump a version in
+Redis (TAXONOMY_VERSION_KEY) and publish it on TAXONOMY_CHANNEL; every worker
+listening on the channel drops snapshots older than that version. Changes to
+documents metadata from elsewhere (ingestion) reach the snapshot through the
+intent registry's change listeners. While the pub/sub listener is not
+connected, a snapshot is trusted for at most UNLISTENED_TTL_SECONDS.
 """
-from typing import Dict, List, Optional, Any
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Tuple
 from app.settings import settings
 from app._shared_config.intent_registry import get_registry
 from app.storage.qdrant_client import get_async_qdrant_client
+from app.services.search.bm25_index import get_lexical_index
 from app.logging_config import logger
 
 import asyncio
-import psycopg
+import time
 from qdrant_client.http import models
-from datetime import datetime
+
+TAXONOMY_VERSION_KEY = "taxonomy:version"
+TAXONOMY_CHANNEL = "taxonomy:changed"
+UNLISTENED_TTL_SECONDS = 30.0
+
+# Field name -> jsonb path; only these can be renamed
+_FIELDS = {"category": ["category"], "intent": ["intent"]}
+
+
+@dataclass(frozen=True)
+class TaxonomySnapshot:
+    """Category -> intents as of one load. Replaced as a whole."""
+    version: int = 0
+    generation: int = 0
+    categories: Tuple[str, ...] = ()
+    intents: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    loaded_at: float = 0.0
+
 
 class TaxonomyService:
     """Service for managing the taxonomy (categories and intents) across storage backends."""
@@ -19,6 +46,13 @@ class TaxonomyService:
         """Initialize TaxonomyService with database URL and registry."""
         self.db_url = settings.DATABASE_URL
         self.registry = get_registry()
+        self._snapshot: Optional[TaxonomySnapshot] = None
+        # Highest version published by any worker, and local invalidations
+        self._latest_version = 0
+        self._generation = 0
+        self._listening = False
+        self._listener_task: Optional[asyncio.Task] = None
+        self._load_lock = asyncio.Lock()
 
     async def get_tree(self) -> Dict[str, Any]:
         """
@@ -39,69 +73,219 @@ class TaxonomyService:
                 for cat in self.registry.categories
             ]
         }
-    
-    async def rename_category(self, old_name: str, new_name: str) -> Dict[str, Any]:
-        """
-        Rename a category in both Postgres and Qdrant.
-        Trigger registry refresh.
 
-        Args:
-            old_name: Current category name
-            new_name: New category name
+    async def snapshot(self) -> TaxonomySnapshot:
+        """The cached taxonomy, reloaded from Postgres when a newer version is known."""
+        current = self._snapshot
+        if self._is_fresh(current):
+            return current
+        async with self._load_lock:
+            current = self._snapshot
+            if self._is_fresh(current):
+                return current
+            # Read before the query: a bump during the load leaves the result stale
+            version, generation = self._latest_version, self._generation
+            tree = await self._fetch_tree()
+            snapshot = TaxonomySnapshot(
+                version=version,
+                generation=generation,
+                categories=tuple(tree),
+                intents=tree,
+                loaded_at=time.monotonic()
+            )
+            self._snapshot = snapshot
+            logger.debug("Taxonomy snapshot loaded", extra={"version": version, "categories": len(tree)})
+            return snapshot
 
-        Returns:
-            Dict with update status and statistics
-        """
+    def _is_fresh(self, snapshot: Optional[TaxonomySnapshot]) -> bool:
+        if snapshot is None:
+            return False
+        if snapshot.version < self._latest_version or snapshot.generation != self._generation:
+            return False
+        return self._listening or time.monotonic() - snapshot.loaded_at < UNLISTENED_TTL_SECONDS
+
+    async def _fetch_tree(self) -> Dict[str, Tuple[str, ...]]:
+        """Category -> sorted intents, in one query over the shared pool."""
         if not self.db_url:
             raise ValueError("Database URL not configured")
 
-        if old_name == new_name:
-            return {"status": "skipped", "message": "Old and new names are identical"}
+        from app.storage.connection import get_db_connection
 
-        # 1. Update Postgres
-        updated_rows = 0
-        async with await psycopg.AsyncConnection.connect(self.db_url, autocommit=True) as conn:
+        async with get_db_connection() as conn:
             async with conn.cursor() as cur:
-                # Update metadata->'category' where it matches old_name
                 await cur.execute("""
-                    UPDATE documents 
-                    SET metadata = jsonb_set(metadata, '{category}', %s::jsonb) 
-                    WHERE metadata->>'category' = %s
-                """, (f'"{new_name}"', old_name))
-                updated_rows = cur.rowcount
-
-        # 2. Update Qdrant
-        qdrant_updated = 0
+                    SELECT
+                        metadata->>'category' AS category,
+                        COALESCE(
+                            json_agg(DISTINCT metadata->>'intent' ORDER BY metadata->>'intent')
+                                FILTER (WHERE metadata->>'intent' IS NOT NULL),
+                            '[]'::json
+                        ) AS intents
+                    FROM documents
+                    WHERE metadata->>'category' IS NOT NULL
+                    GROUP BY metadata->>'category'
+                    ORDER BY category
+                """)
+                rows = await cur.fetchall()
+        return {category: tuple(intents) for category, intents in rows}
+
+    def invalidate(self) -> None:
+        """Drop this worker's snapshot (other workers are told via bump_version)."""
+        self._generation += 1
+
+    async def bump_version(self) -> None:
+        """Invalidate the snapshot here and, through Redis pub/sub, in every worker."""
+        self.invalidate()
+        try:
+            from app.services.redis_pool import get_redis
+            redis = await get_redis()
+            version = await redis.incr(TAXONOMY_VERSION_KEY)
+            await redis.publish(TAXONOMY_CHANNEL, version)
+            self._observe_version(version)
+        except Exception as e:
+            logger.warning("Could not publish taxonomy version", extra={"error": str(e)})
+
+    def _observe_version(self, value: Any) -> None:
+        if value is None:
+            return
+        version = int(value)
+        if version > self._latest_version:
+            self._latest_version = version
+
+    async def start_listener(self) -> None:
+        """Follow version bumps from other workers; also drop the snapshot on registry changes."""
+        self.registry.subscribe(self._on_registry_changed)
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.create_task(self._listen_loop())
+
+    async def stop_listener(self) -> None:
+        task = self._listener_task
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+    async def _on_registry_changed(self, _snapshot) -> None:
+        # Every worker reloads the registry on its NOTIFY, so this is local only
+        self.invalidate()
+
+    async def _listen_loop(self) -> None:
+        from app.services.redis_pool import get_redis
+
+        backoff = 1.0
+        while True:
+            pubsub = None
+            try:
+                redis = await get_redis()
+                pubsub = redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(TAXONOMY_CHANNEL)
+                # Bumps published while this worker was not subscribed
+                self._observe_version(await redis.get(TAXONOMY_VERSION_KEY))
+                self._listening = True
+                backoff = 1.0
+                logger.info("Listening for taxonomy changes", extra={"channel": TAXONOMY_CHANNEL})
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._observe_version(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Taxonomy listener error, retrying", extra={"error": str(e), "backoff_sec": backoff})
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+            finally:
+                self._listening = False
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    async def _relabel(self, field_name: str, mapping: Dict[str, str]) -> int:
+        """
+        Apply old -> new names of one metadata field to Postgres and Qdrant.
+
+        Postgres is updated by a single UPDATE ... FROM over the mapping in one
+        transaction, so a merge of several names is all-or-nothing. The
+        updated ids are passed to the lexical index. Returns the number of
+        documents updated.
+        """
+        if not self.db_url:
+            raise ValueError("Database URL not configured")
+
+        from app.storage.connection import get_db_connection
+
+        mapping = {old: new for old, new in mapping.items() if old != new}
+        if not mapping:
+            return 0
+
+        # 1. Update Postgres
+        async with get_db_connection() as conn:
+            async with conn.transaction():
+                async with conn.cursor() as cur:
+                    await cur.execute("""
+                        UPDATE documents AS d
+                        SET metadata = jsonb_set(d.metadata, %s, to_jsonb(m.new_name))
+                        FROM unnest(%s::text[], %s::text[]) AS m(old_name, new_name)
+                        WHERE d.metadata->>%s = m.old_name
+                        RETURNING d.id
+                    """, (_FIELDS[field_name], list(mapping), list(mapping.values()), field_name))
+                    updated_ids = [row[0] for row in await cur.fetchall()]
+
+        # 2. Update Qdrant, one filtered set_payload per target name
+        by_target: Dict[str, List[str]] = {}
+        for old, new in mapping.items():
+            by_target.setdefault(new, []).append(old)
         try:
             qdrant = get_async_qdrant_client()
-            # Filter points with old category
-            filter_condition = models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="category",
-                        match=models.MatchValue(value=old_name)
+            for new, olds in by_target.items():
+                await qdrant.set_payload(
+                    collection_name="documents",
+                    payload={field_name: new},
+                    points=models.Filter(
+                        must=[
+                            models.FieldCondition(
+                                key=field_name,
+                                match=models.MatchAny(any=olds)
+                            )
+                        ]
                     )
-                ]
-            )
-            
-            await qdrant.set_payload(
-                collection_name="documents",
-                payload={"category": new_name},
-                points=filter_condition
-            )
-            qdrant_updated = -1 
-            
+                )
         except Exception as e:
-            logger.error("Qdrant category update failed", extra={"error": str(e), "old_name": old_name, "new_name": new_name})
+            logger.error("Qdrant taxonomy update failed", extra={"error": str(e), "field": field_name, "mapping": mapping})
+
+        # 3. The BM25 index filters on metadata, so re-read the relabelled rows
+        await get_lexical_index().notify_changed(updated_ids)
 
-        # 3. Trigger Sync
+        # 4. Invalidate snapshots everywhere and trigger sync
+        await self.bump_version()
         await self.sync_registry()
+        return len(updated_ids)
+
+    async def rename_category(self, old_name: str, new_name: str) -> Dict[str, Any]:
+        """
+        Rename a category in both Postgres and Qdrant.
+        Trigger registry refresh.
 
+        Args:
+            old_name: Current category name
+            new_name: New category name
+
+        Returns:
+            Dict with update status and statistics
+        """
+        if old_name == new_name:
+            return {"status": "skipped", "message": "Old and new names are identical"}
+
+        updated_rows = await self._relabel("category", {old_name: new_name})
         return {
-            "status": "success", 
+            "status": "success",
             "updated_documents": updated_rows,
             "qdrant_updated": "filter_applied",
-            "old_name": old_name, 
+            "old_name": old_name,
             "new_name": new_name
         }
 
@@ -116,93 +300,55 @@ class TaxonomyService:
         Returns:
             Dict with update status
         """
-        if not self.db_url:
-            raise ValueError("Database URL not configured")
+        updated_rows = await self._relabel("intent", {old_name: new_name})
+        return {"status": "success", "updated_documents": updated_rows, "old_name": old_name, "new_name": new_name}
 
-        async with await psycopg.AsyncConnection.connect(self.db_url, autocommit=True) as conn:
-            async with conn.cursor() as cur:
-                await cur.execute("""
-                    UPDATE documents 
-                    SET metadata = jsonb_set(metadata, '{intent}', %s::jsonb) 
-                    WHERE metadata->>'intent' = %s
-                """, (f'"{new_name}"', old_name))
+    async def merge(self, field_name: str, sources: List[str], target: str) -> Dict[str, Any]:
+        """
+        Merge several categories (or intents) into `target` in one transaction.
 
-        try:
-            qdrant = get_async_qdrant_client()
-            filter_condition = models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="intent",
-                        match=models.MatchValue(value=old_name)
-                    )
-                ]
-            )
-            await qdrant.set_payload(
-                collection_name="documents",
-                payload={"intent": new_name},
-                points=filter_condition
-            )
-        except Exception as e:
-            logger.error("Qdrant intent update failed", extra={"error": str(e), "old_name": old_name, "new_name": new_name})
+        Args:
+            field_name: "category" or "intent"
+            sources: Names to fold into target
+            target: Resulting name (may be new or one of the existing ones)
 
-        await self.sync_registry()
-        return {"status": "success", "old_name": old_name, "new_name": new_name}
+        Returns:
+            Dict with update status and statistics
+        """
+        if field_name not in _FIELDS:
+            raise ValueError(f"Unknown taxonomy field: {field_name}")
+        sources = [s for s in dict.fromkeys(sources) if s != target]
+        if not sources:
+            return {"status": "skipped", "message": "Nothing to merge"}
 
+        updated_rows = await self._relabel(field_name, {source: target for source in sources})
+        return {"status": "success", "updated_documents": updated_rows, "sources": sources, "target": target}
 
     async def get_all_categories(self) -> List[Dict[str, Any]]:
         """
         Get all unique categories from the database.
         Returns list of dicts with 'id' and 'name' fields.
         """
-        if not self.db_url:
-            raise ValueError("Database URL not configured")
-        
-        async with await psycopg.AsyncConnection.connect(self.db_url) as conn:
-            async with conn.cursor() as cur:
-                await cur.execute("""
-                    SELECT DISTINCT 
-                        ROW_NUMBER() OVER (ORDER BY metadata->>'category') as id,
-                        metadata->>'category' as name
-                    FROM documents 
-                    WHERE metadata->>'category' IS NOT NULL
-                    ORDER BY name
-                """)
-                rows = await cur.fetchall()
-                return [{"id": row[0], "name": row[1]} for row in rows]
-    
+        snapshot = await self.snapshot()
+        return [{"id": i + 1, "name": name} for i, name in enumerate(snapshot.categories)]
+
     async def get_intents_by_category(self, category_id: int = None, category_name: str = None) -> List[Dict[str, Any]]:
         """
         Get all intents for a specific category.
         Can filter by category_id (row number) or category_name.
         Returns list of dicts with 'id' and 'name' fields.
         """
-        if not self.db_url:
-            raise ValueError("Database URL not configured")
-        
-        # If category_id provided, first get category name
-        if category_id is not None and category_name is None:
-            categories = await self.get_all_categories()
-            matching = [c for c in categories if c["id"] == category_id]
-            if not matching:
-                return []
-            category_name = matching[0]["name"]
-        
-        if category_name is None:
+        if category_id is None and category_name is None:
             raise ValueError("Either category_id or category_name must be provided")
-        
-        async with await psycopg.AsyncConnection.connect(self.db_url) as conn:
-            async with conn.cursor() as cur:
-                await cur.execute("""
-                    SELECT DISTINCT 
-                        ROW_NUMBER() OVER (ORDER BY metadata->>'intent') as id,
-                        metadata->>'intent' as name
-                    FROM documents 
-                    WHERE metadata->>'category' = %s
-                    AND metadata->>'intent' IS NOT NULL
-                    ORDER BY name
-                """, (category_name,))
-                rows = await cur.fetchall()
-                return [{"id": row[0], "name": row[1]} for row in rows]
+
+        snapshot = await self.snapshot()
+        if category_name is None:
+            if not 1 <= category_id <= len(snapshot.categories):
+                return []
+            category_name = snapshot.categories[category_id - 1]
+
+        intents = snapshot.intents.get(category_name, ())
+        return [{"id": i + 1, "name": name} for i, name in enumerate(intents)]
 
     async def sync_registry(self) -> Dict[str, Any]:
 
@@ -211,6 +357,8 @@ class TaxonomyService:
         """
         success = await self.registry.reload()
         if success:
+            # Let the other workers pick up the change as well
+            await self.registry.notify_changed(reload_local=False)
             return {
                 "status": "success",
                 "message": "Registry synchronized from DB",
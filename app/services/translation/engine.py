@@ -0,0 +1,192 @@
+"""
+Translation Engine.
+
+Async front-end for QueryTranslator that:
+    - caches translations by (direction, text hash) in-process and in Redis
+    - merges concurrent requests for the same direction into one generate() call
+    - runs MarianMT on its own bounded executor, so translation load cannot
+      starve the default thread pool used by the rest of the pipeline
+"""
+import asyncio
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from app.logging_config import logger
+from app.services.config_loader.loader import get_node_params
+from app.services.batching import MicroBatcher
+from app.services.translation.translator import QueryTranslator
+
+SUPPORTED_DIRECTIONS = {("ru", "en"), ("en", "ru")}
+
+
+class TranslationEngine:
+    _instance = None
+
+    REDIS_PREFIX = "translation:"
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(TranslationEngine, cls).__new__(cls)
+            params = get_node_params("query_translation")
+            cls._instance.params = params
+            cls._instance.executor = ThreadPoolExecutor(
+                max_workers=params.get("max_workers", 2),
+                thread_name_prefix="translation"
+            )
+            cls._instance._cache = OrderedDict()
+            cls._instance._cache_size = params.get("cache_size", 2048)
+            cls._instance._batchers = {}
+            cls._instance.hits = 0
+            cls._instance.misses = 0
+        return cls._instance
+
+    # --- Cache ---
+
+    @staticmethod
+    def _key(direction: str, text: str) -> Tuple[str, str]:
+        return direction, hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+    def _get_local(self, key: Tuple[str, str]) -> Optional[str]:
+        value = self._cache.get(key)
+        if value is not None:
+            self._cache.move_to_end(key)
+        return value
+
+    def _put_local(self, key: Tuple[str, str], value: str):
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    async def _get_remote(self, keys: List[Tuple[str, str]]) -> List[Optional[str]]:
+        if not keys or not self.params.get("redis_cache_enabled", True):
+            return [None] * len(keys)
+        try:
+            from app.services.redis_pool import get_redis
+            redis = await get_redis()
+            return await redis.mget([f"{self.REDIS_PREFIX}{d}:{h}" for d, h in keys])
+        except Exception as e:
+            logger.debug("Translation cache lookup failed", extra={"error": str(e)})
+            return [None] * len(keys)
+
+    async def _put_remote(self, items: Dict[Tuple[str, str], str]):
+        if not items or not self.params.get("redis_cache_enabled", True):
+            return
+        ttl = self.params.get("cache_ttl_seconds", 86400)
+        try:
+            from app.services.redis_pool import get_redis
+            redis = await get_redis()
+            async with redis.pipeline(transaction=False) as pipe:
+                for (direction, digest), value in items.items():
+                    pipe.setex(f"{self.REDIS_PREFIX}{direction}:{digest}", ttl, value)
+                await pipe.execute()
+        except Exception as e:
+            logger.debug("Translation cache write failed", extra={"error": str(e)})
+
+    # --- Batching ---
+
+    def _batcher(self, source_lang: str, target_lang: str) -> MicroBatcher:
+        """
+        Batcher for a direction on the running loop. Its queue and worker task
+        belong to that loop, so another loop (asyncio.run called again, tests)
+        gets its own; batchers of closed loops are dropped.
+        """
+        direction = f"{source_lang}-{target_lang}"
+        loop = asyncio.get_running_loop()
+        batcher = self._batchers.get((loop, direction))
+        if batcher is None:
+            for key in [k for k in self._batchers if k[0].is_closed()]:
+                del self._batchers[key]
+            translator = QueryTranslator.get_instance()
+            batcher = MicroBatcher(
+                f"translate:{direction}",
+                lambda texts: translator.translate_batch(texts, source_lang, target_lang),
+                self.executor,
+                max_batch_size=self.params.get("batch_max_size", 16),
+                max_wait_ms=self.params.get("batch_max_wait_ms", 5.0)
+            )
+            batcher.start()
+            self._batchers[(loop, direction)] = batcher
+        return batcher
+
+    async def _translate_direction(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        direction = f"{source_lang}-{target_lang}"
+        keys = [self._key(direction, t) for t in texts]
+        results: List[Optional[str]] = [self._get_local(k) for k in keys]
+
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            remote = await self._get_remote([keys[i] for i in missing])
+            for i, value in zip(missing, remote):
+                if value is not None:
+                    results[i] = value
+                    self._put_local(keys[i], value)
+
+        # Deduplicate what is left so repeated texts are translated once
+        pending: Dict[Tuple[str, str], str] = {}
+        for i, r in enumerate(results):
+            if r is None:
+                pending.setdefault(keys[i], texts[i])
+
+        self.hits += len(texts) - len(pending)
+        self.misses += len(pending)
+
+        if pending:
+            translated = await self._batcher(source_lang, target_lang).submit(list(pending.values()))
+            fresh = dict(zip(pending.keys(), translated))
+            for key, value in fresh.items():
+                self._put_local(key, value)
+            for i, r in enumerate(results):
+                if r is None:
+                    results[i] = fresh[keys[i]]
+            await self._put_remote(fresh)
+
+        return results
+
+    # --- Public API ---
+
+    async def translate_many(self, texts: List[str], target_lang: str = "en") -> List[str]:
+        """
+        Translate texts to `target_lang`; texts already in it are returned as is.
+        All misses for a direction are translated in one batched call.
+        """
+        if not texts:
+            return []
+
+        translator = QueryTranslator.get_instance()
+        loop = asyncio.get_running_loop()
+        sources = await loop.run_in_executor(
+            self.executor, lambda: [translator.detect_source_language(t) if t else target_lang for t in texts]
+        )
+
+        results = list(texts)
+        by_direction: Dict[Tuple[str, str], List[int]] = {}
+        for i, source_lang in enumerate(sources):
+            if (source_lang, target_lang) in SUPPORTED_DIRECTIONS:
+                by_direction.setdefault((source_lang, target_lang), []).append(i)
+
+        translated = await asyncio.gather(*(
+            self._translate_direction([texts[i] for i in indices], s, t)
+            for (s, t), indices in by_direction.items()
+        ))
+        for indices, values in zip(by_direction.values(), translated):
+            for i, value in zip(indices, values):
+                results[i] = value
+        return results
+
+    async def translate(self, text: str, target_lang: str = "en") -> str:
+        return (await self.translate_many([text], target_lang))[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "local_entries": len(self._cache),
+            "batches": sum(b.batches for b in self._batchers.values()),
+        }
+
+
+def get_translation_engine() -> TranslationEngine:
+    return TranslationEngine()
@@ -1,8 +1,10 @@
 import torch
-from transformers import MarianMTModel, MarianTokenizer
 from langdetect import detect, DetectorFactory
-from typing import Optional
+from typing import Optional, List
 from app.logging_config import logger
+from app.services.config_loader.loader import get_node_params
+from app.services.inference.backend import load_seq2seq
+from app.services.model_server.client import ModelServerClient, get_model_server_client
 
 # Ensure consistent results from langdetect
 DetectorFactory.seed = 0
@@ -13,7 +15,8 @@ class QueryTranslator:
     @classmethod
     def get_instance(cls):
         if cls._instance is None:
-            cls._instance = cls()
+            client = get_model_server_client()
+            cls._instance = RemoteQueryTranslator(client) if client is not None else cls()
         return cls._instance
 
     def __init__(self):
@@ -28,31 +31,56 @@ class QueryTranslator:
         if self.model_ru_en is None:
             model_name = "Helsinki-NLP/opus-mt-ru-en"
             logger.info("Loading translation model", extra={"model": model_name})
-            self.tokenizer_ru_en = MarianTokenizer.from_pretrained(model_name)
-            self.model_ru_en = MarianMTModel.from_pretrained(model_name).to(self.device)
+            self.tokenizer_ru_en, self.model_ru_en = load_seq2seq(model_name, "translator", self.device)
 
     def _load_en_ru(self):
         if self.model_en_ru is None:
             model_name = "Helsinki-NLP/opus-mt-en-ru"
             logger.info("Loading translation model", extra={"model": model_name})
-            self.tokenizer_en_ru = MarianTokenizer.from_pretrained(model_name)
-            self.model_en_ru = MarianMTModel.from_pretrained(model_name).to(self.device)
+            self.tokenizer_en_ru, self.model_en_ru = load_seq2seq(model_name, "translator", self.device)
 
     def translate_ru_to_en(self, text: str) -> str:
-        self._load_ru_en()
-        self.model_ru_en.eval()
-        with torch.no_grad():
-            inputs = self.tokenizer_ru_en(text, return_tensors="pt", padding=True).to(self.device)
-            translated = self.model_ru_en.generate(**inputs)
-            return self.tokenizer_ru_en.decode(translated[0], skip_special_tokens=True)
+        return self.translate_batch([text], "ru", "en")[0]
 
     def translate_en_to_ru(self, text: str) -> str:
-        self._load_en_ru()
-        self.model_en_ru.eval()
+        return self.translate_batch([text], "en", "ru")[0]
+
+    @staticmethod
+    def _generation_kwargs(num_beams: Optional[int] = None, max_new_tokens: Optional[int] = None) -> dict:
+        # Greedy / short-beam decoding with a length cap keeps latency bounded
+        params = get_node_params("query_translation")
+        return {
+            "num_beams": num_beams or params.get("num_beams", 1),
+            "max_new_tokens": max_new_tokens or params.get("max_new_tokens", 256),
+        }
+
+    def translate_batch(
+        self,
+        texts: List[str],
+        source_lang: str = "ru",
+        target_lang: str = "en",
+        num_beams: Optional[int] = None,
+        max_new_tokens: Optional[int] = None
+    ) -> List[str]:
+        """Translate several texts with a single generate() call."""
+        if not texts:
+            return []
+        if (source_lang, target_lang) == ("ru", "en"):
+            self._load_ru_en()
+            tokenizer, model = self.tokenizer_ru_en, self.model_ru_en
+        elif (source_lang, target_lang) == ("en", "ru"):
+            self._load_en_ru()
+            tokenizer, model = self.tokenizer_en_ru, self.model_en_ru
+        else:
+            return list(texts)
+
+        if hasattr(model, "eval"):
+            # PyTorch backend only; ONNX Runtime models have no train/eval mode
+            model.eval()
         with torch.no_grad():
-            inputs = self.tokenizer_en_ru(text, return_tensors="pt", padding=True).to(self.device)
-            translated = self.model_en_ru.generate(**inputs)
-            return self.tokenizer_en_ru.decode(translated[0], skip_special_tokens=True)
+            inputs = tokenizer(texts, return_tensors="pt", padding=True, truncation=True).to(self.device)
+            translated = model.generate(**inputs, **self._generation_kwargs(num_beams, max_new_tokens))
+            return tokenizer.batch_decode(translated, skip_special_tokens=True)
 
     def detect_language(self, text: str) -> str:
         try:
@@ -60,24 +88,29 @@ class QueryTranslator:
         except:
             return "en"
 
-    def translate_query(self, query: str, target_lang: str = "en") -> str:
-        """
-        Translates query to target language if it's different.
-        """
-        current_lang = self.detect_language(query)
-        
+    def detect_source_language(self, text: str) -> str:
+        """Detect the language of `text`, mapped onto the languages we can translate from."""
+        current_lang = self.detect_language(text)
+
         # Normalize cyrillic slavic languages to Russian
         # Our translation models only support ru-en, so we treat all cyrillic 
         # slavic languages (Bulgarian, Ukrainian, Belarusian, Macedonian, Serbian) 
         # as Russian for translation purposes
         cyrillic_slavic_langs = {'bg', 'uk', 'be', 'mk', 'sr'}
-        
+
         if current_lang in cyrillic_slavic_langs:
             logger.info(
                 f"Detected {current_lang}, treating as Russian for translation", 
-                extra={"query": query, "original_lang": current_lang}
+                extra={"query": text, "original_lang": current_lang}
             )
             current_lang = "ru"
+        return current_lang
+
+    def translate_query(self, query: str, target_lang: str = "en") -> str:
+        """
+        Translates query to target language if it's different.
+        """
+        current_lang = self.detect_source_language(query)
         
         # Handle cases where language codes might differ slightly (e.g. "ru" vs "ru-RU")
         # For this simple implementation, we assume simple 2-letter codes.
@@ -99,4 +132,37 @@ class QueryTranslator:
         self._load_en_ru()
         logger.info("Translator models loaded")
 
+class RemoteQueryTranslator(QueryTranslator):
+    """QueryTranslator that runs MarianMT on the shared model server."""
+
+    def __init__(self, client: ModelServerClient):
+        self.client = client
+        self.device = "remote"
+        self.tokenizer_ru_en = self.model_ru_en = None
+        self.tokenizer_en_ru = self.model_en_ru = None
+        logger.info("QueryTranslator using model server", extra={"socket": client.socket_path})
+
+    def _load_ru_en(self):
+        # Models live in the server process; just check it is reachable
+        self.client.ping()
+
+    def _load_en_ru(self):
+        self.client.ping()
+
+    def translate_batch(
+        self,
+        texts: List[str],
+        source_lang: str = "ru",
+        target_lang: str = "en",
+        num_beams: Optional[int] = None,
+        max_new_tokens: Optional[int] = None
+    ) -> List[str]:
+        # Decoding settings are applied by the server, which batches across workers
+        if not texts:
+            return []
+        if (source_lang, target_lang) not in (("ru", "en"), ("en", "ru")):
+            return list(texts)
+        return self.client.translate(texts, source_lang, target_lang)
+
+
 translator = QueryTranslator.get_instance()
@@ -3,58 +3,197 @@ Model Warmup Service.
 
 Handles warming up ML models on application startup to prevent
 first-request latency.
+
+Independent models are loaded concurrently, and only models whose nodes are
+enabled in pipeline_config.yaml are loaded at all. Progress is reported per
+model through app.services.model_readiness.
 """
 import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+
 from app.integrations.embeddings import get_embedding
 from app.logging_config import logger
+from app.services.config_loader.loader import get_node_enabled, get_node_params, get_global_param
+from app.services.model_readiness import model_readiness
+
+
+@dataclass
+class ModelSpec:
+    """A model to warm up and the pipeline nodes that need it."""
+    name: str
+    nodes: List[str]
+    loader: Callable[[], Awaitable[None]]
+    condition: Optional[Callable[[], bool]] = None
+
+    def is_needed(self) -> bool:
+        if not any(get_node_enabled(node) for node in self.nodes):
+            return False
+        return self.condition is None or self.condition()
+
+
+def _classification_mode() -> str:
+    return get_node_params("easy_classification").get("mode", "semantic")
+
+
+async def _load_reranker():
+    from app.nodes.reranking.ranker import get_reranker
+    loop = asyncio.get_running_loop()
+    # Construct and run the first inference off the event loop
+    await loop.run_in_executor(None, lambda: get_reranker().rank("warmup", ["warmup"]))
+
+
+async def _load_semantic_classifier():
+    from app.services.classification.semantic_service import SemanticClassificationService
+    svc = SemanticClassificationService()
+    # Force model load and first inference (to load weights to GPU/CPU)
+    await svc._ensure_model()
+    # Run dummy classification to finalize initialization
+    await svc.classify("warmup check")
+
+
+async def _load_classification_prototypes():
+    # Reuses the e5 embedding model, only label prototypes need building
+    from app.services.classification.prototype_service import PrototypeClassificationService
+    await PrototypeClassificationService().warmup()
+
+
+def _classify_params() -> dict:
+    return get_node_params("classify")
+
+
+async def _load_zero_shot_classifier():
+    from app.nodes.classification.classifier import ClassificationService
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, ClassificationService().load_nli)
+
+
+async def _load_classification_head():
+    from app.services.classification.linear_head import LinearHeadClassifier
+    await LinearHeadClassifier().warmup()
+
+
+async def _load_embeddings():
+    await get_embedding("warmup")
+
+
+async def _load_translator_ru_en():
+    from app.services.translation.translator import translator
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, translator._load_ru_en)
+
+
+async def _load_input_guardrails():
+    from app.nodes.input_guardrails.node import input_guardrails_node
+    await input_guardrails_node.warmup()
+
+
+async def _load_lexical_index():
+    from app.services.search.bm25_index import get_lexical_index
+    await get_lexical_index().load_or_build()
+    await get_lexical_index().start_listener()
+
+
+MODEL_SPECS: List[ModelSpec] = [
+    ModelSpec(
+        "embeddings",
+        ["hybrid_search", "retrieve", "cache_similarity", "store_in_cache", "dialog_analysis"],
+        _load_embeddings
+    ),
+    ModelSpec("reranker", ["reranking"], _load_reranker),
+    ModelSpec(
+        "semantic_classifier", ["easy_classification"], _load_semantic_classifier,
+        condition=lambda: _classification_mode() != "prototype"
+    ),
+    ModelSpec(
+        "classification_prototypes", ["easy_classification"], _load_classification_prototypes,
+        condition=lambda: _classification_mode() == "prototype"
+    ),
+    ModelSpec(
+        "classification_head", ["classify"], _load_classification_head,
+        condition=lambda: _classify_params().get("mode", "linear_head") == "linear_head"
+    ),
+    # NLI is only needed in "nli" mode or as the low-margin fallback
+    ModelSpec(
+        "zero_shot_classifier", ["classify"], _load_zero_shot_classifier,
+        condition=lambda: _classify_params().get("mode", "linear_head") != "linear_head"
+        or _classify_params().get("nli_fallback", True)
+    ),
+    # EN->RU Marian has no pipeline consumer (clarifications translate via LLM),
+    # so it is left to load lazily on first use
+    ModelSpec("translator_ru_en", ["query_translation", "dialog_analysis"], _load_translator_ru_en),
+    ModelSpec("input_guardrails", ["input_guardrails"], _load_input_guardrails),
+    ModelSpec(
+        "lexical_index", ["hybrid_search", "lexical_search"], _load_lexical_index,
+        condition=lambda: get_global_param("lexical_backend", "postgres") == "bm25"
+    ),
+]
 
 
 class WarmupService:
     """Service for warming up models on startup."""
-    
+
+    _background_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    async def _load(spec: ModelSpec):
+        model_readiness.mark_loading(spec.name)
+        try:
+            await spec.loader()
+            model_readiness.mark_ready(spec.name)
+            logger.info("Model warmed up", extra={"model": spec.name})
+        except Exception as e:
+            model_readiness.mark_failed(spec.name, str(e))
+            logger.error("Model warmup failed", extra={"model": spec.name, "error": str(e)})
+
+    @staticmethod
+    def _register() -> List[ModelSpec]:
+        """Register every known model with the readiness tracker; return those to load."""
+        needed = []
+        for spec in MODEL_SPECS:
+            enabled = spec.is_needed()
+            model_readiness.register(spec.name, spec.nodes, enabled=enabled)
+            if enabled:
+                needed.append(spec)
+
+        logger.info("Warming up models", extra={
+            "models": [spec.name for spec in needed],
+            "skipped": [spec.name for spec in MODEL_SPECS if spec not in needed]
+        })
+        return needed
+
+    @staticmethod
+    async def _load_concurrently(specs: List[ModelSpec]):
+        await asyncio.gather(*(WarmupService._load(spec) for spec in specs))
+        logger.info("Warmup complete", extra=model_readiness.snapshot())
+
     @staticmethod
     async def warmup_all():
         """
-        Warm up all models used in the pipeline.
-        
+        Warm up all models used by enabled pipeline nodes, concurrently.
+
         This prevents the first user from experiencing 10+ second delays
         by pre-loading all models during startup.
         """
-        loop = asyncio.get_running_loop()
-        
-        try:
-            # 1. Reranker
-            from app.nodes.reranking.ranker import get_reranker
-            ranker = get_reranker()
-            await loop.run_in_executor(None, ranker.rank, "warmup", ["warmup"])
-            logger.info("Reranker Warmed Up")
-            
-            # 2. Classifier (Semantic - Multilingual)
-            from app.services.classification.semantic_service import SemanticClassificationService
-            svc = SemanticClassificationService()
-            # Force model load and first inference (to load weights to GPU/CPU)
-            await svc._ensure_model()
-            # Run dummy classification to finalize initialization
-            await svc.classify("warmup check")
-            logger.info("Classifier Warmed Up (Multilingual)")
-
-            # 3. Embeddings
-            await get_embedding("warmup")
-            logger.info("Embeddings Warmed Up")
-
-            # 4. Translator
-            from app.services.translation.translator import translator
-            await loop.run_in_executor(None, translator.warmup)
-            logger.info("Translator Warmed Up")
+        await WarmupService._load_concurrently(WarmupService._register())
 
-            # 5. Guardrails
-            from app.nodes.input_guardrails.node import input_guardrails_node
-            await input_guardrails_node.warmup()
-            logger.info("Guardrails Warmed Up")
+    @staticmethod
+    async def start():
+        """
+        Run warmup according to the global `warmup_mode` parameter:
+            - blocking: wait for every model before serving (default)
+            - background: serve while warming; nodes wait or degrade per model
+        """
+        if get_global_param("warmup_mode", "blocking") == "background":
+            # Register before serving so early requests see models as "warming"
+            needed = WarmupService._register()
+            WarmupService._background_task = asyncio.create_task(
+                WarmupService._load_concurrently(needed)
+            )
+            logger.info("Serving while models warm up in background")
+        else:
+            await WarmupService.warmup_all()
 
-        except Exception as e:
-            logger.error("Warmup failed", extra={"error": str(e)})
-    
     @staticmethod
     async def warmup_embeddings_only():
         """Warm up only embeddings (fast warmup)."""
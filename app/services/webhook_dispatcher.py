@@ -0,0 +1,372 @@
+"""
+Webhook Dispatcher.
+
+Outgoing webhook deliveries go through a durable queue in Postgres: every
+delivery is a `webhook_deliveries` row, and the dispatcher loop claims due rows
+with `FOR UPDATE SKIP LOCKED`, so several API workers can share the queue and
+nothing is lost on restart.
+
+- Subscriptions (event type -> active webhooks) are cached for a short TTL
+  and dropped locally when webhooks change.
+- One pooled httpx client per destination host (HTTP/2 when `h2` is installed).
+- Rows are claimed only for free send slots (WEBHOOK_MAX_CONCURRENCY), and a
+  send is capped at SEND_TIMEOUT_SECONDS < LEASE_SECONDS, so a claimed row is
+  delivered before its lease runs out and no other worker re-sends it.
+- Failures are retried with exponential backoff and jitter up to max_attempts.
+- Status updates are buffered and written in batches.
+
+Row lifecycle: queued -> sending -> delivered | retrying -> ... | failed.
+A 'sending' row whose lease (next_retry) expired, e.g. after a crash, is
+claimed again.
+"""
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.logging_config import logger
+from app.settings import settings
+from app.storage.connection import get_db_connection
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+CLAIM_BATCH_SIZE = 50
+LEASE_SECONDS = 60
+SEND_TIMEOUT_SECONDS = 45
+IDLE_POLL_SECONDS = 5.0
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 3600
+STATUS_FLUSH_SIZE = 100
+STATUS_FLUSH_INTERVAL_SECONDS = 1.0
+
+
+@dataclass
+class DeliveryResult:
+    delivery_id: str
+    status: str  # delivered | retrying | failed
+    attempt: int
+    http_status: int
+    error_message: Optional[str]
+    response_time_ms: int
+    retry_in_seconds: float = 0.0
+
+
+def retry_delay_seconds(attempt: int) -> float:
+    """Exponential backoff with full jitter: 10s, 20s, 40s, ... capped at 1h."""
+    ceiling = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * (2 ** max(attempt - 1, 0)))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+class SubscriptionCache:
+    """Event type -> active webhooks, cached for ttl_seconds."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+
+    async def get(self, event_type: str) -> List[Dict[str, Any]]:
+        entry = self._entries.get(event_type)
+        if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+            return entry[1]
+        from app.storage.repositories.webhook_repository import WebhookRepository
+        webhooks = await WebhookRepository.get_webhooks_by_event(event_type, active_only=True)
+        self._entries[event_type] = (time.monotonic(), webhooks)
+        return webhooks
+
+    def invalidate(self):
+        self._entries.clear()
+
+
+class HostClientPool:
+    """One keep-alive httpx client per scheme://host:port."""
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._timeout = httpx.Timeout(connect=5.0, read=30.0, write=10.0, pool=5.0)
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}"
+        client = self._clients.get(key)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=self._timeout,
+                follow_redirects=False,
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
+            )
+            self._clients[key] = client
+        return client
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+
+class WebhookDispatcher:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(WebhookDispatcher, cls).__new__(cls)
+            cls._instance.subscriptions = SubscriptionCache(settings.WEBHOOK_SUBSCRIPTION_TTL_SECONDS)
+            cls._instance.clients = HostClientPool()
+            cls._instance._max_in_flight = settings.WEBHOOK_MAX_CONCURRENCY
+            cls._instance._in_flight = set()
+            cls._instance._wakeup = asyncio.Event()
+            cls._instance._pending_results = []
+            cls._instance._results_lock = asyncio.Lock()
+            cls._instance._task = None
+            cls._instance._flush_task = None
+            cls._instance.stats = {"claimed": 0, "delivered": 0, "retried": 0, "failed": 0}
+        return cls._instance
+
+    # --- Producer side ---
+
+    async def enqueue(self, event_type: str, payload: Dict[str, Any]) -> int:
+        """Queue one delivery per subscribed webhook in a single insert. Returns the count."""
+        import uuid
+
+        targets = await self.subscriptions.get(event_type)
+        if not targets:
+            return 0
+
+        event_id = f"evt_{uuid.uuid4().hex[:12]}"
+        payload_json = json.dumps(payload, default=str)
+        rows = [
+            (f"dlv_{uuid.uuid4().hex[:12]}", webhook["webhook_id"], event_id, event_type, payload_json)
+            for webhook in targets
+        ]
+        async with get_db_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany(
+                    """
+                    INSERT INTO webhook_deliveries (
+                        delivery_id, webhook_id, event_id, event_type, payload,
+                        status, attempt, next_retry, created_at
+                    )
+                    VALUES (%s, %s, %s, %s, %s, 'queued', 1, NOW(), NOW())
+                    """,
+                    rows
+                )
+        self._wakeup.set()
+        return len(rows)
+
+    def wake(self):
+        self._wakeup.set()
+
+    # --- Consumer side ---
+
+    async def start(self):
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info("Webhook dispatcher started", extra={"http2": HTTP2_AVAILABLE})
+
+    async def stop(self):
+        # Unfinished sends are claimed again once their lease expires
+        for task in (self._task, self._flush_task, *self._in_flight):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        await self._flush_results()
+        await self.clients.close()
+
+    async def _run(self):
+        while True:
+            free = self._max_in_flight - len(self._in_flight)
+            if free <= 0:
+                # Claiming more now would start their leases before a slot can send them
+                await asyncio.wait(self._in_flight, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            # Cleared before claiming so an enqueue during the claim is not missed
+            self._wakeup.clear()
+            try:
+                claimed = await self._claim_due(min(free, CLAIM_BATCH_SIZE))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Webhook claim failed", extra={"error": str(e)})
+                claimed = []
+
+            if claimed:
+                self.stats["claimed"] += len(claimed)
+                for row in claimed:
+                    task = asyncio.create_task(self._deliver(row))
+                    self._in_flight.add(task)
+                    task.add_done_callback(self._in_flight.discard)
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=IDLE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim_due(self, limit: int) -> List[Dict[str, Any]]:
+        async with get_db_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    WITH due AS (
+                        SELECT delivery_id FROM webhook_deliveries
+                        WHERE status IN ('queued', 'retrying', 'sending')
+                          AND next_retry <= NOW()
+                        ORDER BY next_retry
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    UPDATE webhook_deliveries d
+                    SET status = 'sending', next_retry = NOW() + make_interval(secs => %s)
+                    FROM due, webhooks w
+                    WHERE d.delivery_id = due.delivery_id AND w.webhook_id = d.webhook_id
+                    RETURNING d.delivery_id, d.webhook_id, d.event_type, d.payload,
+                              d.attempt, d.max_attempts, w.url, w.secret_hash, w.active
+                    """,
+                    (limit, LEASE_SECONDS)
+                )
+                rows = await cur.fetchall()
+                columns = [desc.name for desc in cur.description]
+        return [dict(zip(columns, row)) for row in rows]
+
+    async def _deliver(self, row: Dict[str, Any]):
+        """Send one claimed row; runs in its own task, which holds one send slot."""
+        from app.services.webhook_service import WebhookService
+
+        attempt = row.get("attempt") or 1
+        max_attempts = row.get("max_attempts") or 7
+        payload = row["payload"]
+        payload_str = payload if isinstance(payload, str) else json.dumps(payload)
+
+        if not row.get("active", True):
+            await self._record(DeliveryResult(row["delivery_id"], "failed", attempt, 0, "Webhook disabled", 0))
+            return
+
+        # Signed right before sending, so receivers checking freshness see the send time
+        timestamp = datetime.utcnow().isoformat()
+        headers = {
+            "Content-Type": "application/json",
+            "User-Agent": "SupportRAG-Webhook/1.0",
+            "X-Webhook-ID": row["webhook_id"],
+            "X-Webhook-Event": row["event_type"],
+            "X-Webhook-Timestamp": timestamp,
+            "X-Webhook-Signature": WebhookService.sign_payload(payload_str, row["secret_hash"], timestamp),
+            "X-Webhook-Delivery": row["delivery_id"],
+            "X-Webhook-Attempt": str(attempt)
+        }
+
+        http_status = 0
+        error_message = None
+        start_time = time.time()
+        try:
+            response = await asyncio.wait_for(
+                self.clients.get(row["url"]).post(row["url"], content=payload_str, headers=headers),
+                timeout=SEND_TIMEOUT_SECONDS
+            )
+            http_status = response.status_code
+            if not 200 <= http_status < 300:
+                # Truncate error message to prevent log injection
+                error_message = f"HTTP {http_status}: {response.text[:200]}"
+        except (httpx.TimeoutException, asyncio.TimeoutError) as e:
+            error_message = f"Request timeout: {str(e)[:100]}"
+        except httpx.RequestError as e:
+            error_message = f"Request error: {str(e)[:100]}"
+        except Exception as e:
+            error_message = f"Unexpected error: {str(e)[:100]}"
+        duration = int((time.time() - start_time) * 1000)
+
+        if error_message is None:
+            result = DeliveryResult(row["delivery_id"], "delivered", attempt, http_status, None, duration)
+        elif attempt < max_attempts and (http_status == 0 or http_status == 429 or http_status >= 500):
+            # Network errors, throttling and server errors are retried; other 4xx are final
+            result = DeliveryResult(
+                row["delivery_id"], "retrying", attempt + 1, http_status, error_message, duration,
+                retry_in_seconds=retry_delay_seconds(attempt)
+            )
+        else:
+            result = DeliveryResult(row["delivery_id"], "failed", attempt, http_status, error_message, duration)
+        await self._record(result)
+
+    # --- Batched status updates ---
+
+    async def _record(self, result: DeliveryResult):
+        self.stats[{"delivered": "delivered", "retrying": "retried", "failed": "failed"}[result.status]] += 1
+        async with self._results_lock:
+            self._pending_results.append(result)
+            should_flush = len(self._pending_results) >= STATUS_FLUSH_SIZE
+        if should_flush:
+            await self._flush_results()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(STATUS_FLUSH_INTERVAL_SECONDS)
+            try:
+                await self._flush_results()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Webhook status flush failed", extra={"error": str(e)})
+
+    async def _flush_results(self):
+        async with self._results_lock:
+            results, self._pending_results = self._pending_results, []
+        if not results:
+            return
+        try:
+            async with get_db_connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.executemany(
+                        """
+                        UPDATE webhook_deliveries
+                        SET status = %s,
+                            attempt = %s,
+                            http_status = %s,
+                            error_message = %s,
+                            response_time_ms = %s,
+                            next_retry = NOW() + make_interval(secs => %s),
+                            delivered_at = CASE WHEN %s = 'delivered' THEN NOW() ELSE delivered_at END
+                        WHERE delivery_id = %s
+                        """,
+                        [
+                            (r.status, r.attempt, r.http_status, r.error_message, r.response_time_ms,
+                             r.retry_in_seconds, r.status, r.delivery_id)
+                            for r in results
+                        ]
+                    )
+        except Exception:
+            # Keep them for the next flush; leases expire otherwise and rows get re-sent
+            async with self._results_lock:
+                self._pending_results = results + self._pending_results
+            raise
+
+        if any(r.status == "retrying" for r in results):
+            self._wakeup.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "pending_status_updates": len(self._pending_results),
+            "in_flight": len(self._in_flight),
+            "hosts": len(self.clients._clients),
+            "http2": HTTP2_AVAILABLE,
+            "running": bool(self._task and not self._task.done())
+        }
+
+
+def get_webhook_dispatcher() -> WebhookDispatcher:
+    return WebhookDispatcher()
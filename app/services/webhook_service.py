@@ -1,19 +1,11 @@
 import hmac
 import hashlib
-import json
 import uuid
 import secrets
-import asyncio
-import time
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
-from app.storage.connection import get_db_connection
 from app.logging_config import logger
-
-
-
-
-
+from app.services.webhook_dispatcher import get_webhook_dispatcher
 from app.api.webhook_schemas import WebhookCreate, WebhookUpdate
 from app.storage.repositories.webhook_repository import WebhookRepository
 from app.utils.url_security import validate_webhook_url_async
@@ -68,6 +60,8 @@ class WebhookService:
             ip_whitelist=webhook_data.ip_whitelist
         )
 
+        get_webhook_dispatcher().subscriptions.invalidate()
+
         # Return secret ONLY on registration (shown once)
         # This is the only time the user sees the secret
         webhook['secret'] = secret
@@ -107,11 +101,15 @@ class WebhookService:
                 
             update_dict['url'] = url_str
             
-        return await WebhookRepository.update_webhook(webhook_id, update_dict)
+        webhook = await WebhookRepository.update_webhook(webhook_id, update_dict)
+        get_webhook_dispatcher().subscriptions.invalidate()
+        return webhook
 
     @staticmethod
     async def delete_webhook(webhook_id: str) -> bool:
-        return await WebhookRepository.delete_webhook(webhook_id)
+        deleted = await WebhookRepository.delete_webhook(webhook_id)
+        get_webhook_dispatcher().subscriptions.invalidate()
+        return deleted
 
     @staticmethod
     async def get_deliveries(webhook_id: str, limit: int = 20, status: str = None) -> List[Dict[str, Any]]:
@@ -193,115 +191,17 @@ class WebhookService:
     @staticmethod
     async def trigger_outgoing_event(event_type: str, payload: Dict[str, Any]):
         """
-        Identify active webhooks for an event and queue deliveries.
+        Queue deliveries of an event to every subscribed active webhook.
+        Delivery itself happens in the webhook dispatcher (durable, retried).
 
         Args:
             event_type: Type of event (e.g. 'message.received')
             payload: Payload to deliver
         """
-        targets = await WebhookRepository.get_webhooks_by_event(event_type, active_only=True)
-        timestamp = datetime.utcnow().isoformat()
-        
-        for webhook in targets:
-            # Create delivery record (pending)
-            delivery_id = f"dlv_{uuid.uuid4().hex[:12]}"
-            event_id = f"evt_{uuid.uuid4().hex[:12]}" # or pass one in
-            
-            # Since we don't have a background worker running in this context,
-            # we will just LOG the intention to deliver or try a direct fire-and-forget?
-            # For robustness in this demo environment, I'll allow a simple immediate sync attempt
-            # or just log it as 'queued' if no worker exists.
-            
-            await WebhookRepository.log_delivery(
-                delivery_id=delivery_id,
-                webhook_id=webhook['webhook_id'],
-                event_id=event_id,
-                event_type=event_type,
-                payload=payload,
-                status='queued'
-            )
-            
-            # Execute delivery immediately (simple background task, no durable queue yet)
-            asyncio.create_task(WebhookService._perform_delivery(delivery_id, webhook, event_type, payload, timestamp))
-
-    @staticmethod
-    async def _perform_delivery(delivery_id: str, webhook: Dict[str, Any], event_type: str, payload: Dict[str, Any], timestamp: str):
-        """
-        Perform the actual HTTP POST for a webhook delivery.
-        """
-        import httpx
-        
-        url = webhook['url']
-        secret = webhook['secret_hash'] # Assumed plaintext
-        
-        # Prepare headers
-        payload_str = json.dumps(payload)
-        signature = WebhookService.sign_payload(payload_str, secret, timestamp)
-        
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": "SupportRAG-Webhook/1.0",
-            "X-Webhook-ID": webhook['webhook_id'],
-            "X-Webhook-Event": event_type,
-            "X-Webhook-Timestamp": timestamp,
-            "X-Webhook-Signature": signature
-        }
-        
-        status = 'failed'
-        http_status = 0
-        error_message = None
-        start_time = time.time()
-
         try:
-            # Use longer timeout for internal network requests (30 seconds)
-            # Configure timeout per operation type
-            timeout = httpx.Timeout(
-                connect=5.0,   # Time to establish connection
-                read=30.0,     # Time to read response
-                write=10.0,    # Time to send request
-                pool=5.0       # Time to acquire connection from pool
-            )
-
-            async with httpx.AsyncClient(timeout=timeout, follow_redirects=False) as client:
-                response = await client.post(url, content=payload_str, headers=headers)
-                http_status = response.status_code
-
-                if 200 <= http_status < 300:
-                    status = 'delivered'
-                else:
-                    status = 'failed'
-                    # Truncate error message to prevent log injection
-                    error_message = f"HTTP {http_status}: {response.text[:200]}"
-
-        except httpx.TimeoutException as e:
-            status = 'failed'
-            error_message = f"Request timeout: {str(e)[:100]}"
-        except httpx.RequestError as e:
-            status = 'failed'
-            error_message = f"Request error: {str(e)[:100]}"
+            await get_webhook_dispatcher().enqueue(event_type, payload)
         except Exception as e:
-            status = 'failed'
-            error_message = f"Unexpected error: {str(e)[:100]}"
-            
-        duration = int((time.time() - start_time) * 1000)
-        
-        # Update delivery log
-        async with get_db_connection() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute(
-                    """
-                    UPDATE webhook_deliveries
-                    SET status = %s,
-                        http_status = %s,
-                        error_message = %s,
-                        response_time_ms = %s,
-                        delivered_at = CASE WHEN %s = 'delivered' THEN NOW() ELSE delivered_at END
-                    WHERE delivery_id = %s
-                    """,
-                    (status, http_status, error_message, duration, status, delivery_id)
-                )
-
-
+            logger.error("Failed to queue webhook event", extra={"event_type": event_type, "error": str(e)})
 
     @staticmethod
     async def retry_delivery(delivery_id: str) -> Optional[Dict[str, Any]]:
@@ -338,6 +238,7 @@ class WebhookService:
             status='queued',
             attempt=next_attempt
         )
+        get_webhook_dispatcher().wake()
         
         return {
             "delivery_id": new_delivery_id,
@@ -16,12 +16,25 @@ class Settings(BaseSettings):
 
     # Cache
     REDIS_URL: str = "redis://redis:6379/0"
+    # Connections per worker, split across the named pools (see app/services/redis_pool.py)
+    REDIS_MAX_CONNECTIONS: int = 100
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    # Send commands issued in the same event-loop tick as one pipeline
+    REDIS_AUTO_PIPELINE: bool = True
+    # Comma-separated key prefixes served from process memory (empty = off)
+    REDIS_CLIENT_CACHE_PREFIXES: str = ""
+    REDIS_CLIENT_CACHE_SIZE: int = 10000
+    REDIS_CLIENT_CACHE_TTL_SECONDS: int = 60
 
     # Langfuse
     LANGFUSE_PUBLIC_KEY: Optional[str] = None
     LANGFUSE_SECRET_KEY: Optional[str] = None
     LANGFUSE_HOST: Optional[str] = "https://cloud.langfuse.com"
 
+    # Shared model server (Unix socket). When set, workers use thin clients
+    # instead of loading their own copies of the models.
+    MODEL_SERVER_SOCKET: Optional[str] = None
+
     # Telegram
     TELEGRAM_TOKEN: Optional[str] = None
 
@@ -29,6 +42,11 @@ class Settings(BaseSettings):
     # Set to True in development to allow localhost webhooks for testing
     ALLOW_LOCALHOST_WEBHOOKS: bool = False
 
+    # Webhook dispatcher (durable delivery queue in webhook_deliveries)
+    WEBHOOK_DISPATCHER_ENABLED: bool = True
+    WEBHOOK_MAX_CONCURRENCY: int = 20
+    WEBHOOK_SUBSCRIPTION_TTL_SECONDS: int = 30
+
     model_config = SettingsConfigDict(
         env_file=".env", 
         env_file_encoding="utf-8",
@@ -15,7 +15,8 @@ async def lexical_search_db(
     category_filter: Optional[str] = None
 ) -> List[SearchResult]:
     """
-    Search for documents using PostgreSQL full-text search.
+    Search for documents using PostgreSQL full-text search, or the in-process
+    BM25 index when `lexical_backend: bm25` is set and the index is loaded.
     
     Contracts:
         Input:
@@ -44,6 +45,26 @@ async def lexical_search_db(
     if document_language == "ru":
         document_language = get_global_param("default_language", "ru")
     
+    if get_global_param("lexical_backend", "postgres") == "bm25":
+        from app.services.search.bm25_index import get_lexical_index
+        lexical_index = get_lexical_index()
+        if lexical_index.ready:
+            t_start = time.perf_counter()
+            results = lexical_index.index.search(query, top_k=top_k, category_filter=category_filter)
+            elapsed = time.perf_counter() - t_start
+            logger.debug("BM25 search completed", extra={"elapsed_sec": round(elapsed, 6)})
+            if langfuse_context:
+                langfuse_context.update_current_observation(
+                    output={
+                        "backend": "bm25",
+                        "results_count": len(results),
+                        "top_score": results[0].score if results else 0.0,
+                        "elapsed_ms": round(elapsed * 1000, 3)
+                    }
+                )
+            return results
+        # Still building: serve from Postgres meanwhile
+    
     filter_info = f", category_filter={category_filter}" if category_filter else ""
     logger.debug("Lexical search initiated", extra={"query": query, "lang": document_language, "filter": category_filter})
     
@@ -184,7 +184,7 @@ class WebhookRepository:
                         status, http_status, attempt, error_message, 
                         response_time_ms, next_retry, created_at
                     )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, COALESCE(%s, NOW()), NOW())
                     """,
                     (
                         delivery_id, webhook_id, event_id, event_type, json.dumps(payload),
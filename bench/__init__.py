@@ -0,0 +1 @@
+"""Offline benchmark harness; see docs/DEVELOPMENT.md."""
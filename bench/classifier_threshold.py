@@ -0,0 +1,141 @@
+"""
+Calibrate AutoClassificationPipeline.distance_threshold on real e5 vectors.
+
+Embeds the labelled questions in datasets/ (every QA file whose pairs carry
+metadata.category) once with the shared embedding model, then runs category
+discovery at each threshold of the sweep from an empty state and compares the
+discovered categories with the labels:
+
+- purity: share of questions whose category's most common label is their own
+  (1.0 when every question is its own category);
+- inverse purity: share of questions whose label's most common category is
+  their own (1.0 when everything lands in one category);
+- f1: harmonic mean of the two.
+
+The threshold with the best f1 among those reaching --min_purity is suggested;
+the one in auto_classification.distance_threshold is reported alongside.
+
+Needs the real model (downloads it unless cached):
+
+    python -m bench.classifier_threshold
+    python -m bench.classifier_threshold --thresholds 0.1 0.15 0.2 0.25 --min_purity 0.8
+
+Exits with status 1 when the configured threshold falls below --min_purity.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+from collections import Counter
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.run_offline import prepare_environment  # noqa: E402
+
+LABELLED_DATASETS = [
+    os.path.join(ROOT, "datasets", "qa_data_extended.json"),
+    os.path.join(ROOT, "datasets", "qa_data_generated_check.json"),
+    os.path.join(ROOT, "datasets", "qa_synthetic_1000_pairs.json"),
+    os.path.join(ROOT, "datasets", "qa_synthetic_test_100.json"),
+    *sorted(glob.glob(os.path.join(ROOT, "datasets", "synthetic_batch_12x100", "qa_synthetic_batch_*_pairs.json"))),
+]
+DEFAULT_SWEEP = [0.08, 0.1, 0.12, 0.14, 0.16, 0.18, 0.2, 0.22, 0.25, 0.3]
+
+
+def load_labelled(paths: List[str]) -> Tuple[List[str], List[str]]:
+    """Unique questions with their metadata.category, first label wins."""
+    labels: Dict[str, str] = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for item in data:
+            category = (item.get("metadata") or {}).get("category")
+            if item.get("question") and category:
+                labels.setdefault(item["question"], category)
+    return list(labels), list(labels.values())
+
+
+def scores(categories, truth: List[str]) -> Dict[str, float]:
+    agree = sum(Counter(truth[i] for i in cat.member_indices).most_common(1)[0][1] for cat in categories)
+    home: Dict[str, Counter] = {}
+    for cat in categories:
+        for i in cat.member_indices:
+            home.setdefault(truth[i], Counter())[cat.category_id] += 1
+    gathered = sum(c.most_common(1)[0][1] for c in home.values())
+    purity, inverse = agree / len(truth), gathered / len(truth)
+    return {
+        "categories": len(categories),
+        "purity": round(purity, 4),
+        "inverse_purity": round(inverse, 4),
+        "f1": round(2 * purity * inverse / (purity + inverse), 4),
+    }
+
+
+async def run(args) -> Dict:
+    from app.services.metadata_generation.auto_classifier import AutoClassificationPipeline
+
+    questions, truth = load_labelled(LABELLED_DATASETS)
+    if not questions:
+        raise SystemExit("No labelled questions found under datasets/")
+    configured = AutoClassificationPipeline(state_path=None).distance_threshold
+    thresholds = sorted(set(args.thresholds) | {configured})
+
+    embedder = AutoClassificationPipeline(state_path=None)
+    await embedder.initialize()
+    embeddings = await embedder._embed(questions)
+
+    async def cached(_questions):
+        return embeddings.copy()
+
+    pairs = [{"question": q, "answer": ""} for q in questions]
+    sweep = []
+    for threshold in thresholds:
+        pipeline = AutoClassificationPipeline(state_path=None, distance_threshold=threshold)
+        pipeline._embed = cached
+        _, categories = await pipeline.classify_batch(pairs, use_llm_validation=False)
+        sweep.append({"distance_threshold": threshold, **scores(categories, truth)})
+
+    eligible = [r for r in sweep if r["purity"] >= args.min_purity] or sweep
+    best = max(eligible, key=lambda r: (r["f1"], r["distance_threshold"]))
+    return {
+        "model": embedder._model_name,
+        "questions": len(questions),
+        "labels": len(set(truth)),
+        "configured": next(r for r in sweep if r["distance_threshold"] == configured),
+        "suggested": best,
+        "sweep": sweep,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AutoClassifier distance_threshold calibration")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=DEFAULT_SWEEP)
+    parser.add_argument("--min_purity", type=float, default=0.8)
+    parser.add_argument("--output", help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    prepare_environment(online_models=True)
+    report = asyncio.run(run(args))
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    print(payload)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+
+    if report["configured"]["purity"] < args.min_purity:
+        print(
+            f"configured distance_threshold {report['configured']['distance_threshold']} "
+            f"purity {report['configured']['purity']} < {args.min_purity}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
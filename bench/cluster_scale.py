@@ -0,0 +1,238 @@
+"""
+Memory and stability of AutoClassificationPipeline category discovery.
+
+Generates --questions synthetic questions over --topics topics and classifies
+them with the shared embedding model replaced by a fake: every topic has a
+random unit center and a question's vector is that center plus noise seeded
+by the question text, so the expected grouping is known. Process RSS is
+sampled while the batch is classified.
+
+A second pipeline then loads the saved categories and classifies fresh
+questions from the same topics plus --new_topics unseen ones. Known topics
+should land in the categories from the first run, unseen ones in new
+categories.
+
+    python -m bench.cluster_scale --questions 100000 --max_rss_growth_mb 384
+    python -m bench.cluster_scale --questions 20000 --topics 50 --noise 0.6
+
+Exits with status 1 when RSS grows by more than --max_rss_growth_mb, or when
+purity or stability falls below the minimums.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.ingest_stream import current_rss_mb  # noqa: E402
+from bench.run_offline import prepare_environment  # noqa: E402
+
+TEMPLATES = [
+    "How do I {verb} the {topic}?",
+    "Can I {verb} the {topic} {qualifier}?",
+    "What happens if I {verb} the {topic}?",
+    "Is it possible to {verb} the {topic} {qualifier}?",
+    "Why can't I {verb} the {topic}?",
+    "Where do I {verb} the {topic} {qualifier}?",
+]
+VERBS = ["change", "cancel", "update", "renew", "check", "activate", "transfer", "configure", "view", "remove"]
+QUALIFIERS = ["online", "today", "from the app", "on my phone", "abroad", "for free", "again", "myself"]
+SYLLABLES = ["ka", "mo", "ru", "te", "li", "sa", "ven", "dor", "pi", "lu", "gar", "nes", "ti", "bo", "zen"]
+
+
+class FakeEmbeddingModel:
+    """Topic center + per-text noise, unit length; the topic word follows "the "."""
+
+    model_name = "bench-fake-e5"
+
+    def __init__(self, topic_words: List[str], dim: int, noise: float, seed: int):
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        centers = rng.standard_normal((len(topic_words), dim))
+        self.centers = centers / np.linalg.norm(centers, axis=1, keepdims=True)
+        self.topic_index = {word: i for i, word in enumerate(topic_words)}
+        self.vector_size = dim
+        self.sigma = noise / dim ** 0.5
+
+    def encode_sync(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        import numpy as np
+
+        out = np.empty((len(texts), self.vector_size), dtype=np.float32)
+        for i, text in enumerate(texts):
+            topic = text.split(" the ", 1)[1].split()[0].rstrip("?")
+            noise = np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(self.vector_size)
+            vector = self.centers[self.topic_index[topic]] + noise * self.sigma
+            out[i] = vector / np.linalg.norm(vector)
+        # The real model hands back Python lists too
+        return out.tolist()
+
+
+def topic_words(count: int, rng: random.Random) -> List[str]:
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(3)))
+    return sorted(words)
+
+
+def make_questions(topics: List[str], count: int, rng: random.Random) -> Tuple[List[str], List[int]]:
+    questions, labels = [], []
+    for _ in range(count):
+        t = rng.randrange(len(topics))
+        questions.append(rng.choice(TEMPLATES).format(
+            verb=rng.choice(VERBS), topic=topics[t], qualifier=rng.choice(QUALIFIERS)
+        ))
+        labels.append(t)
+    return questions, labels
+
+
+def purity(categories, truth: List[int]) -> float:
+    """Share of questions whose category's most common topic is their own."""
+    agree = 0
+    for cat in categories:
+        agree += Counter(truth[i] for i in cat.member_indices).most_common(1)[0][1]
+    return agree / len(truth)
+
+
+async def classify(pipeline, questions: List[str], sample_ms: float) -> Tuple[Dict[str, float], list]:
+    samples = []
+    done = threading.Event()
+
+    def sampler():
+        # A thread, since clustering runs in an executor and blocks nothing async
+        while not done.wait(sample_ms / 1000):
+            samples.append(current_rss_mb())
+
+    pairs = [{"question": q, "answer": ""} for q in questions]
+    baseline = current_rss_mb()
+    thread = threading.Thread(target=sampler, daemon=True)
+    thread.start()
+    start = time.perf_counter()
+    try:
+        _, categories = await pipeline.classify_batch(pairs, use_llm_validation=False)
+    finally:
+        done.set()
+        thread.join()
+    elapsed = time.perf_counter() - start
+    samples.append(current_rss_mb())
+    peak = max(samples)
+    return {
+        "seconds": round(elapsed, 2),
+        "rss_mb": {"before": round(baseline, 1), "peak": round(peak, 1), "growth": round(peak - baseline, 1)},
+    }, categories
+
+
+async def run(args) -> Dict:
+    import app.integrations.embeddings_opensource as embeddings_module
+    from app.services.metadata_generation.auto_classifier import AutoClassificationPipeline
+
+    rng = random.Random(args.seed)
+    words = topic_words(args.topics + args.new_topics, rng)
+    known, unseen = words[:args.topics], words[args.topics:]
+    embeddings_module.EmbeddingModel._instance = FakeEmbeddingModel(words, args.dim, args.noise, args.seed)
+
+    state_dir = tempfile.mkdtemp(prefix="cluster_scale_")
+    state_path = os.path.join(state_dir, "categories.npz")
+    try:
+        questions, truth = make_questions(known, args.questions, rng)
+        first = AutoClassificationPipeline(state_path=state_path, distance_threshold=args.distance_threshold)
+        first_run, first_categories = await classify(first, questions, args.sample_ms)
+        del questions
+        first_run.update({
+            "questions": len(truth),
+            "categories": len(first_categories),
+            "purity": round(purity(first_categories, truth), 4),
+        })
+        # Topic -> category it mostly went to in the first run
+        votes: Dict[int, Counter] = {}
+        for cat in first_categories:
+            for i in cat.member_indices:
+                votes.setdefault(truth[i], Counter())[cat.category_id] += 1
+        home = {t: c.most_common(1)[0][0] for t, c in votes.items()}
+        known_ids = {c.category_id for c in first_categories}
+        del first, first_categories, truth, votes
+
+        again, again_truth = make_questions(known, args.rerun_questions, rng)
+        fresh, fresh_truth = make_questions(unseen, args.rerun_questions // 4 if unseen else 0, rng)
+        second = AutoClassificationPipeline(state_path=state_path, distance_threshold=args.distance_threshold)
+        second_run, second_categories = await classify(second, again + fresh, args.sample_ms)
+        label = {}
+        for cat in second_categories:
+            for i in cat.member_indices:
+                label[i] = cat.category_id
+        stable = sum(label[i] == home.get(t) for i, t in enumerate(again_truth))
+        separated = sum(label[len(again) + i] not in known_ids for i in range(len(fresh)))
+        second_run.update({
+            "questions": len(again) + len(fresh),
+            "stability": round(stable / len(again), 4) if again else 1.0,
+            "unseen_in_new_categories": round(separated / len(fresh), 4) if fresh else 1.0,
+            "new_categories": len({c.category_id for c in second_categories} - known_ids),
+        })
+    finally:
+        for name in os.listdir(state_dir):
+            os.unlink(os.path.join(state_dir, name))
+        os.rmdir(state_dir)
+
+    return {
+        "topics": args.topics,
+        "new_topics": args.new_topics,
+        # Condensed float64 distance matrix the previous agglomerative clustering needed
+        "agglomerative_matrix_mb": round(args.questions * (args.questions - 1) / 2 * 8 / 1024 / 1024, 1),
+        "first_run": first_run,
+        "second_run": second_run,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AutoClassifier clustering memory/stability benchmark")
+    parser.add_argument("--questions", type=int, default=100000)
+    parser.add_argument("--rerun_questions", type=int, default=20000, help="Known-topic questions in the second run")
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--new_topics", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--noise", type=float, default=0.45, help="Norm of the noise added to a topic center")
+    parser.add_argument("--distance_threshold", type=float, default=0.2)
+    parser.add_argument("--max_rss_growth_mb", type=float, default=384.0)
+    parser.add_argument("--min_purity", type=float, default=0.95)
+    parser.add_argument("--min_stability", type=float, default=0.95)
+    parser.add_argument("--sample_ms", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--output", help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    prepare_environment(online_models=False)
+    report = asyncio.run(run(args))
+    payload = json.dumps(report, indent=2)
+    print(payload)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+
+    first, second = report["first_run"], report["second_run"]
+    failures = []
+    for name, result in (("first_run", first), ("second_run", second)):
+        if result["rss_mb"]["growth"] > args.max_rss_growth_mb:
+            failures.append(f"{name} RSS grew by {result['rss_mb']['growth']} MB > {args.max_rss_growth_mb} MB")
+    if first["purity"] < args.min_purity:
+        failures.append(f"purity {first['purity']} < {args.min_purity}")
+    if second["stability"] < args.min_stability:
+        failures.append(f"stability {second['stability']} < {args.min_stability}")
+    if second["unseen_in_new_categories"] < args.min_stability:
+        failures.append(f"unseen topics in new categories {second['unseen_in_new_categories']} < {args.min_stability}")
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
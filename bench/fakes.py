@@ -0,0 +1,364 @@
+"""
+In-memory stand-ins for the pipeline's external services.
+
+install_fakes() swaps them in at the module attributes the pipeline calls
+through, so the unmodified graph from app/pipeline/graph_builder.py runs
+without Qdrant, Postgres, Redis, OpenAI or Langfuse:
+
+- Vector search (Qdrant + Postgres)  -> NumpyVectorStore (exact cosine top-k)
+- Lexical search (Postgres FTS)      -> SqliteLexicalStore (SQLite FTS5, bm25())
+- Redis (cache, sessions, staging)   -> fakeredis, one shared server
+- Semantic cache (Qdrant)            -> qdrant-client local in-memory mode
+- Persistence / intent registry      -> InMemoryPersistence, corpus categories
+- ChatOpenAI                         -> FakeChatModel, deterministic, fixed latency
+
+Local models (e5 embeddings, reranker, classifiers, translators) are the real
+ones and must be present in the Hugging Face cache (scripts/download_models.py).
+"""
+import asyncio
+import json
+import random
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from app.storage.models import SearchResult
+
+
+# --- LLM ---
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic chat model accepting the same arguments as ChatOpenAI in
+    app/integrations/llm.get_llm.
+
+    JSON-mode calls get a well-formed dialog/turn analysis object; other calls
+    echo the last line of the last user message, which is a usable rewrite,
+    expansion or answer. Latency is latency_ms +/- jitter_ms, seeded per prompt.
+    """
+
+    model: str = "fake-chat"
+    temperature: float = 0.0
+    api_key: Optional[Any] = None
+    streaming: bool = False
+    model_kwargs: Dict[str, Any] = {}
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "bench-fake-chat"
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        user_text = ""
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                user_text = str(message.content)
+                break
+        if not user_text and messages:
+            user_text = str(messages[-1].content)
+        last_line = next((line.strip() for line in reversed(user_text.splitlines()) if line.strip()), "")
+        last_line = last_line[:300]
+
+        if self.model_kwargs.get("response_format", {}).get("type") == "json_object":
+            return json.dumps({
+                "signals": {"is_question": True, "is_gratitude": False, "escalation_requested": False},
+                "sentiment": {"label": "neutral", "score": 0.0},
+                "safety": {"violation": False, "reason": None},
+                "escalation": {"decision": "auto_reply", "reason": None},
+                "rewritten_query": last_line or "question",
+                "expansions": [],
+            })
+        return last_line
+
+    def _delay(self, text: str) -> float:
+        jitter = random.Random(text).uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(self.latency_ms + jitter, 0.0) / 1000
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        import time
+        text = self._respond(messages)
+        time.sleep(self._delay(text))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        text = self._respond(messages)
+        await asyncio.sleep(self._delay(text))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ):
+        text = self._respond(messages)
+        words = text.split(" ")
+        # Total latency matches the non-streaming path, spread over the tokens
+        per_token = self._delay(text) / max(len(words), 1)
+        for i, word in enumerate(words):
+            await asyncio.sleep(per_token)
+            token = word if i == 0 else f" {word}"
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+# --- Retrieval ---
+
+class NumpyVectorStore:
+    """Exact cosine search over normalized embeddings held in one matrix."""
+
+    def __init__(self):
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.docs: List[Dict[str, Any]] = []
+
+    def add(self, embeddings: List[List[float]], docs: List[Dict[str, Any]]):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        self.matrix = vectors if not len(self.docs) else np.vstack([self.matrix, vectors])
+        self.docs.extend(docs)
+
+    async def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 3,
+        category_filter: Optional[Union[str, List[str]]] = None
+    ) -> List[SearchResult]:
+        if not self.docs:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        scores = self.matrix @ (query / (np.linalg.norm(query) + 1e-12))
+        if category_filter:
+            allowed = {category_filter} if isinstance(category_filter, str) else set(category_filter)
+            mask = np.array([d["metadata"].get("category") in allowed for d in self.docs])
+            scores = np.where(mask, scores, -np.inf)
+        k = min(top_k, len(self.docs))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            SearchResult(content=self.docs[i]["content"], score=float(scores[i]), metadata=self.docs[i]["metadata"])
+            for i in top if np.isfinite(scores[i])
+        ]
+
+
+class SqliteLexicalStore:
+    """SQLite FTS5 table ranked with bm25(); OR semantics like the Postgres query."""
+
+    def __init__(self):
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._conn.execute("CREATE VIRTUAL TABLE docs USING fts5(content, category UNINDEXED, metadata UNINDEXED)")
+        self._lock = threading.Lock()
+
+    def add(self, docs: List[Dict[str, Any]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO docs (content, category, metadata) VALUES (?, ?, ?)",
+                [(d["content"], d["metadata"].get("category"), json.dumps(d["metadata"])) for d in docs]
+            )
+
+    async def search(
+        self,
+        query: str,
+        top_k: int = 3,
+        detected_language: Optional[str] = None,
+        document_language: str = "ru",
+        category_filter: Optional[str] = None
+    ) -> List[SearchResult]:
+        import re
+        words = re.findall(r"\w+", query)
+        if not words:
+            return []
+        match = " OR ".join(f'"{w}"' for w in words)
+        sql = "SELECT content, -bm25(docs) AS score, metadata FROM docs WHERE docs MATCH ?"
+        params: List[Any] = [match]
+        if category_filter:
+            sql += " AND category = ?"
+            params.append(category_filter)
+        sql += " ORDER BY score DESC LIMIT ?"
+        params.append(top_k)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [SearchResult(content=r[0], score=float(r[1]), metadata=json.loads(r[2])) for r in rows]
+
+
+# --- Persistence ---
+
+class InMemoryPersistence:
+    """Same static interface as app.storage.persistence.PersistenceManager."""
+
+    messages: Dict[str, List[Dict[str, Any]]] = {}
+    profiles: Dict[str, Dict[str, Any]] = {}
+    sessions: Dict[str, Dict[str, Any]] = {}
+    escalations: List[Dict[str, Any]] = []
+
+    @staticmethod
+    async def load_long_term_memory(user_id: str) -> Dict[str, Any]:
+        return dict(InMemoryPersistence.profiles.get(user_id, {}))
+
+    @staticmethod
+    async def save_user_profile_update(user_id: str, memory_update: Dict[str, Any], name: Optional[str] = None):
+        InMemoryPersistence.profiles.setdefault(user_id, {}).update(memory_update)
+
+    @staticmethod
+    async def save_message(session_id: str, user_id: str, role: str, content: str, metadata: dict = None):
+        InMemoryPersistence.messages.setdefault(session_id, []).append(
+            {"session_id": session_id, "user_id": user_id, "role": role, "content": content, "metadata": metadata or {}}
+        )
+
+    @staticmethod
+    async def get_session_messages(session_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        return InMemoryPersistence.messages.get(session_id, [])[-limit:]
+
+    @staticmethod
+    async def get_user_recent_messages(user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        found = [m for msgs in InMemoryPersistence.messages.values() for m in msgs if m["user_id"] == user_id]
+        return found[-limit:]
+
+    @staticmethod
+    async def update_session(session_id: str, user_id: str, channel: str, status: str, metadata: dict = None):
+        InMemoryPersistence.sessions[session_id] = {
+            "session_id": session_id, "user_id": user_id, "channel": channel, "status": status, "metadata": metadata or {}
+        }
+
+    @staticmethod
+    async def get_user_recent_sessions(user_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+        return [s for s in InMemoryPersistence.sessions.values() if s["user_id"] == user_id][-limit:]
+
+    @staticmethod
+    async def save_escalation(session_id: str, reason: str, priority: str = "normal"):
+        InMemoryPersistence.escalations.append({"session_id": session_id, "reason": reason, "priority": priority})
+
+
+# --- Installation ---
+
+class OfflineServices:
+    """Handles to the installed fakes, for loading the corpus and inspection."""
+
+    def __init__(self, llm_latency_ms: float, llm_jitter_ms: float):
+        self.vector_store = NumpyVectorStore()
+        self.lexical_store = SqliteLexicalStore()
+        self.llm_latency_ms = llm_latency_ms
+        self.llm_jitter_ms = llm_jitter_ms
+        self.categories: Dict[str, List[str]] = {}
+
+    async def load_corpus(self, items: List[Dict[str, Any]], batch_size: int = 64):
+        """Index dataset Q&A pairs the way scripts/ingest.py stores them."""
+        from app.integrations.embeddings_opensource import get_embeddings_batch
+
+        docs = []
+        for item in items:
+            metadata = dict(item.get("metadata") or {})
+            docs.append({
+                "content": f"Question: {item.get('question', '')}\nAnswer: {item.get('answer', '')}",
+                "metadata": metadata,
+            })
+            category, intent = metadata.get("category"), metadata.get("intent")
+            if category:
+                intents = self.categories.setdefault(category, [])
+                if intent and intent not in intents:
+                    intents.append(intent)
+
+        for start in range(0, len(docs), batch_size):
+            batch = docs[start:start + batch_size]
+            embeddings = await get_embeddings_batch([d["content"] for d in batch])
+            self.vector_store.add(embeddings, batch)
+        self.lexical_store.add(docs)
+
+
+def install_fakes(llm_latency_ms: float = 300.0, llm_jitter_ms: float = 50.0) -> OfflineServices:
+    """Patch the service entry points used by the pipeline. Call before building the graph."""
+    import fakeredis
+    from fakeredis import aioredis as fake_aioredis
+    from qdrant_client import AsyncQdrantClient
+
+    import app.integrations.llm as llm_module
+    import app.services.redis_pool as redis_pool
+    import app.storage.qdrant_client as qdrant_module
+    import app.storage.persistence as persistence_module
+    from app._shared_config.intent_registry import IntentRegistryService
+
+    services = OfflineServices(llm_latency_ms, llm_jitter_ms)
+
+    # LLM: get_llm() resolves ChatOpenAI at call time
+    class _BenchChatModel(FakeChatModel):
+        latency_ms: float = llm_latency_ms
+        jitter_ms: float = llm_jitter_ms
+    llm_module.ChatOpenAI = _BenchChatModel
+
+    # Redis: every named pool becomes a client of one shared fake server
+    server = fakeredis.FakeServer()
+
+    def _create(self, name: str):
+        decode = redis_pool.POOL_SHARES.get(name, redis_pool.POOL_SHARES["default"])[1]
+        return fake_aioredis.FakeRedis(server=server, decode_responses=decode)
+    redis_pool.RedisManager._create = _create
+
+    # Semantic cache collection: qdrant-client local mode
+    qdrant_module._async_client = AsyncQdrantClient(location=":memory:")
+
+    # Vector and lexical search, at every module that imported them by name
+    import app.storage.vector_operations as vector_operations
+    import app.storage.lexical_operations as lexical_operations
+    import app.storage.vector_store as vector_store
+    import app.nodes.retrieval.storage as retrieval_storage
+    import app.nodes.retrieval.search as retrieval_search
+    import app.nodes.hybrid_search.node as hybrid_search_node
+    import app.nodes.lexical_search.node as lexical_search_node
+    import app.nodes.lexical_search.storage as lexical_search_storage
+
+    vector_operations.vector_search = services.vector_store.search
+    retrieval_storage.vector_search = services.vector_store.search
+    retrieval_search.search_documents = services.vector_store.search
+    hybrid_search_node.search_documents = services.vector_store.search
+    lexical_operations.lexical_search_db = services.lexical_store.search
+    lexical_search_node.lexical_search_db = services.lexical_store.search
+    lexical_search_storage.lexical_search_db = services.lexical_store.search
+    vector_store.search_documents = services.vector_store.search
+    vector_store.lexical_search = services.lexical_store.search
+
+    # Postgres-backed persistence and the intent registry
+    for name in ("load_long_term_memory", "save_user_profile_update", "save_message", "get_session_messages",
+                 "get_user_recent_messages", "update_session", "get_user_recent_sessions", "save_escalation"):
+        setattr(persistence_module.PersistenceManager, name, staticmethod(getattr(InMemoryPersistence, name)))
+
+    async def _fetch_structure(self) -> Dict[str, List[str]]:
+        return {category: list(intents) for category, intents in services.categories.items()}
+    IntentRegistryService._fetch_structure = _fetch_structure
+
+    return services
+
+
+def install_api_fakes():
+    """Patch the Postgres-backed calls the HTTP layer makes around the pipeline."""
+    from app.services.identity.manager import IdentityManager
+    from app.services.webhook_service import WebhookService
+
+    async def _resolve_identity(channel: str, identifier: Optional[str], metadata_payload: Any = None) -> str:
+        return f"{channel}:{identifier}" if identifier else "anonymous"
+
+    async def _trigger_outgoing_event(event_type: str, payload: Dict[str, Any]):
+        return None
+
+    IdentityManager.resolve_identity = staticmethod(_resolve_identity)
+    WebhookService.trigger_outgoing_event = staticmethod(_trigger_outgoing_event)
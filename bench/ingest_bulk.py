@@ -0,0 +1,157 @@
+"""
+Postgres ingestion throughput: per-row SELECT + INSERT vs COPY + ON CONFLICT.
+
+Needs a Postgres with pgvector at DATABASE_URL. Rows go into two scratch
+tables (bench_ingest_legacy, bench_ingest_bulk) that are dropped afterwards;
+`documents` is not touched. Embeddings are random so only the database path
+is measured, and Qdrant is not involved.
+
+    python -m bench.ingest_bulk --rows 50000
+    python -m bench.ingest_bulk --rows 50000 --legacy_rows 5000 --duplicates 0.05
+
+The legacy path matches the old DocumentIngestionService loop: a duplicate
+SELECT on content (no index) and an INSERT per row. It slows down as the table
+grows, so --legacy_rows caps it and its rows/sec is reported for that size.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+LEGACY_TABLE = "bench_ingest_legacy"
+BULK_TABLE = "bench_ingest_bulk"
+DIM = 384
+
+
+def make_rows(n: int, duplicates: float, seed: int):
+    """Synthetic (content, embedding, metadata) rows built from the Q&A dataset."""
+    rng = random.Random(seed)
+    with open(os.path.join(ROOT, "datasets", "qa_synthetic_1000_pairs.json"), "r", encoding="utf-8") as f:
+        items = json.load(f)
+    rows = []
+    for i in range(n):
+        if rows and rng.random() < duplicates:
+            rows.append(rng.choice(rows))
+            continue
+        item = items[i % len(items)]
+        content = f"Question: {item['question']} (#{i})\nAnswer: {item['answer']}"
+        embedding = [rng.uniform(-1, 1) for _ in range(DIM)]
+        rows.append((content, embedding, item.get("metadata") or {}))
+    return rows
+
+
+async def setup_tables(conn):
+    async with conn.cursor() as cur:
+        await cur.execute(f"DROP TABLE IF EXISTS {LEGACY_TABLE}, {BULK_TABLE}")
+        await cur.execute(f"""
+            CREATE TABLE {LEGACY_TABLE} (
+                id SERIAL PRIMARY KEY,
+                content TEXT NOT NULL,
+                embedding vector({DIM}),
+                metadata JSONB
+            )
+        """)
+        await cur.execute(f"""
+            CREATE TABLE {BULK_TABLE} (
+                id SERIAL PRIMARY KEY,
+                content TEXT NOT NULL,
+                embedding vector({DIM}),
+                metadata JSONB,
+                content_hash TEXT GENERATED ALWAYS AS (md5(content)) STORED
+            )
+        """)
+        await cur.execute(f"CREATE UNIQUE INDEX ON {BULK_TABLE} (content_hash)")
+
+
+async def drop_tables(conn):
+    async with conn.cursor() as cur:
+        await cur.execute(f"DROP TABLE IF EXISTS {LEGACY_TABLE}, {BULK_TABLE}")
+
+
+async def run_legacy(conn, rows) -> int:
+    inserted = 0
+    async with conn.cursor() as cur:
+        for content, embedding, metadata in rows:
+            await cur.execute(f"SELECT id FROM {LEGACY_TABLE} WHERE content = %s", (content,))
+            if await cur.fetchone():
+                continue
+            await cur.execute(
+                f"INSERT INTO {LEGACY_TABLE} (content, embedding, metadata) VALUES (%s, %s, %s) RETURNING id",
+                (content, "[" + ",".join(map(str, embedding)) + "]", json.dumps(metadata))
+            )
+            await cur.fetchone()
+            inserted += 1
+    return inserted
+
+
+async def run_bulk(conn, rows, batch_size: int) -> int:
+    from app.services.ingestion.ingestion_service import DocumentIngestionService
+    inserted = 0
+    for i in range(0, len(rows), batch_size):
+        inserted += len(await DocumentIngestionService.bulk_insert(conn, rows[i:i + batch_size], table=BULK_TABLE))
+    return inserted
+
+
+async def main_async(args):
+    from app.storage.connection import get_db_connection, close_db_pool
+
+    rows = make_rows(args.rows, args.duplicates, args.seed)
+    legacy_rows = rows[:args.legacy_rows]
+    report = {"rows": args.rows, "duplicates": args.duplicates}
+
+    try:
+        async with get_db_connection() as conn:
+            await setup_tables(conn)
+            try:
+                start = time.perf_counter()
+                inserted = await run_legacy(conn, legacy_rows)
+                elapsed = time.perf_counter() - start
+                report["before"] = {
+                    "rows": len(legacy_rows),
+                    "inserted": inserted,
+                    "seconds": round(elapsed, 2),
+                    "rows_per_sec": round(len(legacy_rows) / elapsed, 1),
+                }
+
+                start = time.perf_counter()
+                inserted = await run_bulk(conn, rows, args.batch_size)
+                elapsed = time.perf_counter() - start
+                report["after"] = {
+                    "rows": len(rows),
+                    "inserted": inserted,
+                    "seconds": round(elapsed, 2),
+                    "rows_per_sec": round(len(rows) / elapsed, 1),
+                }
+            finally:
+                if not args.keep_tables:
+                    await drop_tables(conn)
+    finally:
+        await close_db_pool()
+
+    report["speedup"] = round(report["after"]["rows_per_sec"] / report["before"]["rows_per_sec"], 1)
+    print(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Postgres ingestion throughput benchmark")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--legacy_rows", type=int, default=5000, help="Rows for the per-row path (it is O(n) per row)")
+    parser.add_argument("--duplicates", type=float, default=0.02, help="Share of rows repeating an earlier one")
+    parser.add_argument("--batch_size", type=int, default=5000, help="Rows per COPY transaction")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep_tables", action="store_true")
+    args = parser.parse_args()
+
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
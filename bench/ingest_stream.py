@@ -0,0 +1,197 @@
+"""
+Memory ceiling of the streaming ingestion pipeline.
+
+Writes a synthetic JSON Lines corpus of --corpus_mb megabytes, then ingests it
+through DocumentIngestionService.ingest_stream with the embedding model,
+Postgres and Qdrant replaced by fakes (a fixed delay per batch each), and
+samples the process RSS while it runs. Progress is recorded in fakeredis, as
+the API would record it in Redis.
+
+    python -m bench.ingest_stream --corpus_mb 200 --max_rss_growth_mb 256
+    python -m bench.ingest_stream --file datasets/qa_synthetic_1000_pairs.json
+
+Exits with status 1 when peak RSS grows by more than --max_rss_growth_mb over
+the RSS measured right before ingestion starts.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.run_offline import prepare_environment  # noqa: E402
+
+DIM = 384
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_corpus(path: str, corpus_mb: int, seed: int) -> int:
+    """Synthetic Q&A lines until the file reaches corpus_mb; returns the item count."""
+    rng = random.Random(seed)
+    words = ("тариф", "заказ", "доставка", "оплата", "account", "refund", "password", "invoice", "plan", "support")
+    target = corpus_mb * 1024 * 1024
+    written = count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            answer = " ".join(rng.choice(words) for _ in range(rng.randint(40, 160)))
+            line = json.dumps({
+                "question": f"Question {count}: " + " ".join(rng.choice(words) for _ in range(8)),
+                "answer": answer,
+                "metadata": {"category": rng.choice(["billing", "delivery", "account"]), "intent": "provide_info"}
+            }, ensure_ascii=False) + "\n"
+            f.write(line)
+            written += len(line.encode("utf-8"))
+            count += 1
+    return count
+
+
+def install_ingestion_fakes(embed_ms: float, write_ms: float):
+    import fakeredis
+    from fakeredis import aioredis as fake_aioredis
+
+    import app.services.redis_pool as redis_pool
+    import app.services.ingestion.ingestion_service as ingestion_module
+    from app.services.ingestion.ingestion_service import DocumentIngestionService
+
+    server = fakeredis.FakeServer()
+
+    def _create(self, name: str):
+        decode = redis_pool.POOL_SHARES.get(name, redis_pool.POOL_SHARES["default"])[1]
+        return fake_aioredis.FakeRedis(server=server, decode_responses=decode)
+    redis_pool.RedisManager._create = _create
+
+    # Synthetic items are unique; keeping a set of seen hashes here would
+    # itself grow with the corpus and hide what the pipeline holds
+    next_id = [0]
+
+    async def get_embeddings_batch(texts, batch_size: int = 32):
+        await asyncio.sleep(embed_ms / 1000)
+        return [[random.random() for _ in range(DIM)] for _ in texts]
+
+    async def ensure_collection(recreate: bool = False):
+        return None
+
+    async def existing_hashes(hashes):
+        return set()
+
+    async def write_batch(rows, embeddings):
+        await asyncio.sleep(write_ms / 1000)
+        ids = list(range(next_id[0] + 1, next_id[0] + 1 + len(rows)))
+        next_id[0] += len(rows)
+        return ids
+
+    class _Quiet:
+        async def notify_changed(self, *args, **kwargs):
+            return None
+
+    ingestion_module.get_embeddings_batch = get_embeddings_batch
+    ingestion_module.get_lexical_index = lambda: _Quiet()
+    ingestion_module.get_registry = lambda: _Quiet()
+    DocumentIngestionService.ensure_collection = staticmethod(ensure_collection)
+    DocumentIngestionService.existing_hashes = staticmethod(existing_hashes)
+    DocumentIngestionService.write_batch = staticmethod(write_batch)
+
+
+async def run(args, path: str):
+    from app.services.ingestion import DocumentIngestionService, IngestionProgress, iter_json_pairs
+
+    samples = []
+    done = asyncio.Event()
+
+    async def sampler():
+        while not done.is_set():
+            samples.append(current_rss_mb())
+            try:
+                await asyncio.wait_for(done.wait(), timeout=args.sample_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+
+    baseline = current_rss_mb()
+    sampler_task = asyncio.create_task(sampler())
+    start = time.perf_counter()
+    try:
+        result = await DocumentIngestionService.ingest_stream(
+            iter_json_pairs(path),
+            source_name=os.path.basename(path),
+            write_batch_size=args.write_batch_size,
+            queue_size=args.queue_size,
+            embed_concurrency=args.embed_concurrency,
+            write_concurrency=args.write_concurrency,
+        )
+    finally:
+        done.set()
+        await sampler_task
+    elapsed = time.perf_counter() - start
+    samples.append(current_rss_mb())
+
+    job = await IngestionProgress.get(result["job_id"])
+    peak = max(samples)
+    return {
+        "corpus_mb": round(os.path.getsize(path) / 1024 / 1024, 1),
+        "seconds": round(elapsed, 1),
+        "pairs_per_sec": round(job["parsed"] / elapsed, 1) if elapsed else 0.0,
+        "job": {k: job[k] for k in ("status", "parsed", "skipped", "embedded", "written", "batches")},
+        "rss_mb": {
+            "before": round(baseline, 1),
+            "peak": round(peak, 1),
+            "growth": round(peak - baseline, 1),
+        },
+        "settings": job.get("settings"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming ingestion memory benchmark")
+    parser.add_argument("--file", help="Ingest this JSON/JSONL file instead of a synthetic corpus")
+    parser.add_argument("--corpus_mb", type=int, default=200)
+    parser.add_argument("--max_rss_growth_mb", type=float, default=256.0)
+    parser.add_argument("--embed_ms", type=float, default=20.0, help="Fake embedding latency per call")
+    parser.add_argument("--write_ms", type=float, default=50.0, help="Fake Postgres+Qdrant latency per batch")
+    parser.add_argument("--write_batch_size", type=int)
+    parser.add_argument("--queue_size", type=int)
+    parser.add_argument("--embed_concurrency", type=int)
+    parser.add_argument("--write_concurrency", type=int)
+    parser.add_argument("--sample_ms", type=float, default=100.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    prepare_environment(online_models=False)
+    install_ingestion_fakes(args.embed_ms, args.write_ms)
+
+    path = args.file
+    tmp_dir = None
+    if not path:
+        tmp_dir = tempfile.mkdtemp(prefix="ingest_stream_")
+        path = os.path.join(tmp_dir, "corpus.jsonl")
+        print(f"Writing {args.corpus_mb} MB synthetic corpus...", file=sys.stderr)
+        write_corpus(path, args.corpus_mb, args.seed)
+
+    try:
+        report = asyncio.run(run(args, path))
+    finally:
+        if tmp_dir:
+            os.unlink(path)
+            os.rmdir(tmp_dir)
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if report["rss_mb"]["growth"] > args.max_rss_growth_mb:
+        print(f"RSS grew by {report['rss_mb']['growth']} MB > {args.max_rss_growth_mb} MB", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
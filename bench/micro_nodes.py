@@ -0,0 +1,277 @@
+"""
+Per-node micro-benchmarks with regression thresholds.
+
+Times the CPU-side work of individual nodes on realistic state fixtures. For
+BaseNode subclasses both `node(state)` (contract filtering, tracing wrapper,
+output validation) and `node.execute(state)` are timed, so the framework
+overhead of `BaseNode.__call__` is reported separately from the node body.
+Model-backed pieces (reranker, embeddings, translation) are replaced with
+deterministic local fakes, so numbers reflect the node code only.
+
+    python -m bench.micro_nodes                      # compare with baselines
+    python -m bench.micro_nodes --update-baseline    # record baselines
+    python -m bench.micro_nodes --only fusion,reranking --threshold 10
+
+Exits with status 1 when a case's median exceeds its baseline by more than
+--threshold percent (or the case's own "threshold_pct" in the baseline file),
+or when a case has no baseline.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.run_offline import prepare_environment  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(ROOT, "bench", "baselines", "micro_nodes.json")
+EMBEDDING_DIM = 384
+
+
+@dataclass
+class MicroCase:
+    name: str
+    body: Callable[[], Awaitable[Any]]
+    call: Optional[Callable[[], Awaitable[Any]]] = None  # full BaseNode.__call__, when applicable
+
+
+# --- Local fakes --------------------------------------------------------------
+
+def fake_embedding(text: str) -> List[float]:
+    """Deterministic unit vector derived from the text hash."""
+    import numpy as np
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    vec = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM)
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+async def fake_embeddings_batch(texts: List[str], batch_size: int = 32) -> List[List[float]]:
+    return [fake_embedding(t) for t in texts]
+
+
+async def fake_translate_texts(texts: List[str], target_lang: str = "en") -> List[str]:
+    return list(texts)
+
+
+class FakeReranker:
+    """Token-overlap scorer with the Reranker.rank_async contract."""
+
+    async def rank_async(self, query: str, documents: List[str]):
+        q = set(query.lower().split())
+        scored = [(len(q & set(d.lower().split())) / (len(q) or 1), d) for d in documents]
+        return sorted(scored, key=lambda x: x[0], reverse=True)
+
+
+async def _ready(*args, **kwargs) -> bool:
+    return True
+
+
+def install_local_fakes():
+    import app.integrations.translation as translation_module
+    import app.nodes.dialog_analysis.loop_detector as loop_module
+    import app.nodes.reranking.node as rerank_module
+
+    loop_module.get_embeddings_batch = fake_embeddings_batch
+    translation_module.translate_texts = fake_translate_texts
+    rerank_module.get_reranker = lambda: FakeReranker()
+    rerank_module.ensure_model_ready = _ready
+
+
+# --- Fixtures -----------------------------------------------------------------
+
+DOCS = [
+    f"Question: Как изменить тариф {i}?\nAnswer: Откройте раздел «Тарифы» в личном кабинете, "
+    f"выберите новый план {i} и подтвердите смену. Изменения вступят в силу с начала "
+    f"следующего расчётного периода, номер заказа ORD-{10000 + i}."
+    for i in range(20)
+]
+
+HISTORY = [
+    {"role": "user" if i % 2 == 0 else "assistant",
+     "content": ("Как сменить тариф на годовой? Мой email ivan.petrov@example.com" if i % 2 == 0
+                 else "Откройте раздел «Тарифы» и выберите годовой план.")}
+    for i in range(12)
+]
+
+ANSWER = (
+    "Чтобы сменить тариф, откройте личный кабинет, перейдите в раздел «Тарифы» и выберите "
+    "подходящий план. Новый тариф начнёт действовать со следующего расчётного периода. "
+    "Если у вас остались вопросы по заказу #48213, напишите нам в чат поддержки."
+)
+
+
+def _search_results(offset: int):
+    from app.storage.models import SearchResult
+    return [
+        SearchResult(content=DOCS[(i + offset) % len(DOCS)], score=1.0 - i * 0.03, metadata={"category": "billing", "idx": i})
+        for i in range(20)
+    ]
+
+
+def build_cases() -> List[MicroCase]:
+    from app.nodes.fusion.node import FusionNode
+    from app.nodes.reranking.node import RerankingNode
+    from app.nodes.aggregation.lightweight import lightweight_aggregation_node
+    from app.nodes.dialog_analysis.loop_detector import detect_topic_loop
+    from app.nodes.metadata_filtering.node import MetadataFilteringNode
+    from app.nodes.output_guardrails.node import OutputGuardrailsNode
+
+    fusion = FusionNode()
+    fusion_state = {"vector_results": _search_results(0), "lexical_results": _search_results(7)}
+
+    rerank = RerankingNode()
+    rerank_state = {"question": "как сменить тариф на годовой", "docs": DOCS}
+
+    aggregation_state = {"question": "А что с ним сейчас?", "conversation_history": HISTORY}
+
+    filtering = MetadataFilteringNode()
+    filtering_state = {"semantic_category": "billing", "semantic_category_confidence": 0.72}
+
+    guard = OutputGuardrailsNode()
+    guard_state = {"final_answer": ANSWER, "user_input": "Как сменить тариф?"}
+
+    async def aggregation_body():
+        return lightweight_aggregation_node(aggregation_state)
+
+    async def loop_body():
+        return await detect_topic_loop(
+            current_question="Как сменить тариф на годовой?",
+            conversation_history=HISTORY,
+            detected_language="ru",
+            translated_query="How do I switch to the annual plan?",
+        )
+
+    async def scanner_body():
+        return await guard.scanner.scan(response=ANSWER, user_query="Как сменить тариф?", enabled_scanners=guard.scanners)
+
+    return [
+        MicroCase("fusion", lambda: fusion.execute(fusion_state), lambda: fusion(fusion_state)),
+        MicroCase("reranking", lambda: rerank.execute(rerank_state), lambda: rerank(rerank_state)),
+        MicroCase("aggregation.lightweight", aggregation_body),
+        MicroCase("dialog_analysis.loop_detector", loop_body),
+        MicroCase("metadata_filtering", lambda: filtering.execute(filtering_state), lambda: filtering(filtering_state)),
+        MicroCase("output_guardrails.scanner", scanner_body),
+        MicroCase("output_guardrails", lambda: guard.execute(guard_state), lambda: guard(guard_state)),
+    ]
+
+
+# --- Timing -------------------------------------------------------------------
+
+async def measure(fn: Callable[[], Awaitable[Any]], rounds: int, iterations: int, warmup: int) -> Dict[str, float]:
+    """Median/min/stddev of per-call microseconds over `rounds` rounds of `iterations` calls."""
+    for _ in range(warmup):
+        await fn()
+    per_call = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await fn()
+        per_call.append((time.perf_counter() - start) / iterations * 1e6)
+    return {
+        "median_us": round(statistics.median(per_call), 3),
+        "min_us": round(min(per_call), 3),
+        "stddev_us": round(statistics.pstdev(per_call), 3),
+    }
+
+
+async def run_cases(cases: List[MicroCase], rounds: int, iterations: int, warmup: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for case in cases:
+        body = await measure(case.body, rounds, iterations, warmup)
+        entry = dict(body)
+        if case.call is not None:
+            call = await measure(case.call, rounds, iterations, warmup)
+            entry["call_median_us"] = call["median_us"]
+            entry["call_overhead_us"] = round(max(0.0, call["median_us"] - body["median_us"]), 3)
+        results[case.name] = entry
+    return results
+
+
+def check_regressions(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], threshold_pct: float) -> List[str]:
+    failures = []
+    for name, entry in results.items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            # A case without a baseline would never be checked
+            failures.append(f"{name}: no baseline; run with --update-baseline to record one")
+            continue
+        limit = base.get("threshold_pct", threshold_pct)
+        for field in ("median_us", "call_median_us"):
+            if field not in entry or not base.get(field):
+                continue
+            change = (entry[field] - base[field]) / base[field] * 100
+            if change > limit:
+                failures.append(f"{name}.{field}: {base[field]:.1f} -> {entry[field]:.1f} us ({change:+.1f}% > {limit}%)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-node micro-benchmarks")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Allowed regression in percent")
+    parser.add_argument("--only", help="Comma-separated case names")
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--output", help="Also write results JSON here")
+    args = parser.parse_args()
+
+    prepare_environment(online_models=False)
+    install_local_fakes()
+
+    cases = build_cases()
+    if args.only:
+        wanted = {n.strip() for n in args.only.split(",")}
+        cases = [c for c in cases if c.name in wanted]
+
+    results = asyncio.run(run_cases(cases, args.rounds, args.iterations, args.warmup))
+
+    for name, entry in results.items():
+        overhead = f"  __call__ +{entry['call_overhead_us']:.1f} us" if "call_overhead_us" in entry else ""
+        print(f"{name:<32} {entry['median_us']:>10.1f} us  (min {entry['min_us']:.1f}, sd {entry['stddev_us']:.1f}){overhead}")
+
+    report = {"python": sys.version.split()[0], "cases": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        previous = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                previous = json.load(f).get("cases", {})
+        # Keep per-case thresholds across re-recordings
+        for name, entry in results.items():
+            if "threshold_pct" in previous.get(name, {}):
+                entry["threshold_pct"] = previous[name]["threshold_pct"]
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one.")
+        sys.exit(1)
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    failures = check_regressions(results, baseline, args.threshold)
+    if failures:
+        print("\nRegressions:")
+        for line in failures:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
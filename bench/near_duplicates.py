@@ -0,0 +1,277 @@
+"""
+Precision/recall of near-duplicate detection on the synthetic datasets.
+
+The synthetic datasets already contain templated variants of each question
+("... please?", "... exactly?", "I need help with: ...", "Can you help me ..."
+"What's the way/process to ..." and "How can I ..." for "How do I ..."); this script also injects rule-based paraphrases (typos,
+greetings, synonyms, dropped words, punctuation). Questions that reduce to the
+same canonical form are the ground-truth duplicates.
+
+Two checks are reported:
+- batch: DuplicateDetector.find_duplicates over all questions, compared with
+  the previous bucketed SequenceMatcher approach; duplicates are clustered
+  transitively and scored pairwise.
+- kb: the original questions are indexed as KB documents with the
+  near-duplicate index service and every injected paraphrase is looked up,
+  as an upload would be.
+
+    python -m bench.near_duplicates
+    python -m bench.near_duplicates --paraphrases 1000 --seed 7
+
+Exits with status 1 when LSH precision or recall falls below the minimums.
+"""
+import argparse
+import asyncio
+import difflib
+import glob
+import json
+import os
+import random
+import re
+import sys
+import time
+from itertools import combinations
+from typing import Dict, List, Set, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.run_offline import prepare_environment  # noqa: E402
+
+DEFAULT_DATASETS = [
+    os.path.join(ROOT, "datasets", "qa_synthetic_1000_pairs.json"),
+    os.path.join(ROOT, "datasets", "qa_synthetic_test_100.json"),
+    *sorted(glob.glob(os.path.join(ROOT, "datasets", "synthetic_batch_12x100", "qa_synthetic_batch_*_pairs.json"))),
+]
+
+SYNONYMS = [
+    ("how do i", "how can i"),
+    ("how can i", "how do i"),
+    ("can i", "is it possible to"),
+    ("help me", "assist me to"),
+    ("find", "locate"),
+    ("change", "modify"),
+    ("update", "change"),
+    ("cancel", "stop"),
+    ("get", "receive"),
+]
+PREFIXES = ["Hi, ", "Hello! ", "Quick question: ", "Hey there, "]
+SUFFIXES = [" thanks", " asap", " thank you", " right now"]
+FILLERS = {"the", "my", "a", "any", "there"}
+
+
+def canonical(question: str) -> str:
+    """Strip the dataset's templating so variants of one question compare equal."""
+    text = " ".join(question.lower().split()).rstrip("?.!,;: ")
+    text = re.sub(r"^i need help with:\s*", "", text)
+    text = re.sub(r"\s+(please|exactly)$", "", text)
+    text = re.sub(r"^(can you help me|what's the way to|what's the process to|how can i)\s+", "how do i ", text)
+    return text.rstrip("?.!,;: ")
+
+
+def _typo(q: str, rng: random.Random) -> str:
+    words = q.split()
+    long_words = [i for i, w in enumerate(words) if len(w) >= 5]
+    if not long_words:
+        return q
+    i = rng.choice(long_words)
+    w = words[i]
+    j = rng.randrange(1, len(w) - 2)
+    words[i] = w[:j] + w[j + 1] + w[j] + w[j + 2:]
+    return " ".join(words)
+
+
+def _synonym(q: str, rng: random.Random) -> str:
+    options = [(a, b) for a, b in SYNONYMS if re.search(rf"\b{a}\b", q, re.IGNORECASE)]
+    if not options:
+        return q
+    a, b = rng.choice(options)
+    return re.sub(rf"\b{a}\b", b, q, count=1, flags=re.IGNORECASE)
+
+
+def _drop_filler(q: str, rng: random.Random) -> str:
+    words = q.split()
+    fillers = [i for i, w in enumerate(words) if w.lower() in FILLERS]
+    if not fillers:
+        return q
+    del words[rng.choice(fillers)]
+    return " ".join(words)
+
+
+def _punctuation(q: str, rng: random.Random) -> str:
+    return rng.choice([q.rstrip("?") + "??", q.rstrip("?"), q.upper(), q.lower()])
+
+
+TRANSFORMS = [
+    lambda q, rng: rng.choice(PREFIXES) + q[0].lower() + q[1:],
+    lambda q, rng: q.rstrip("?") + rng.choice(SUFFIXES) + "?",
+    _synonym,
+    _typo,
+    _drop_filler,
+    _punctuation,
+]
+
+
+def paraphrase(question: str, rng: random.Random) -> str:
+    out = question
+    for transform in rng.sample(TRANSFORMS, k=rng.choice([1, 2, 2, 3])):
+        out = transform(out, rng)
+    return out
+
+
+def load_questions(paths: List[str]) -> List[str]:
+    questions, seen = [], set()
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for item in json.load(f):
+                q = (item.get("question") or "").strip()
+                if q and q not in seen:
+                    seen.add(q)
+                    questions.append(q)
+    return questions
+
+
+def legacy_find_duplicates(questions: List[str], threshold: float = 0.85) -> List[Tuple[int, int]]:
+    """The previous detector: buckets keyed by the sorted first 10 words, SequenceMatcher inside."""
+    def norm(q):
+        return " ".join(q.lower().split()).rstrip("?.!,;:")
+    buckets: Dict[str, List[int]] = {}
+    normalized = [norm(q) for q in questions]
+    for i, q in enumerate(normalized):
+        buckets.setdefault(" ".join(sorted(q.split()[:10])), []).append(i)
+    found = []
+    for indices in buckets.values():
+        for a, b in combinations(indices, 2):
+            if normalized[a] == normalized[b] or difflib.SequenceMatcher(None, normalized[a], normalized[b]).ratio() >= threshold:
+                found.append((a, b))
+    return found
+
+
+def cluster_pairs(n: int, pairs: List[Tuple[int, int]]) -> Set[Tuple[int, int]]:
+    """All (i, j) pairs that end up in the same cluster under transitive closure."""
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs:
+        parent[find(a)] = find(b)
+    groups: Dict[int, List[int]] = {}
+    for i in range(n):
+        groups.setdefault(find(i), []).append(i)
+    return {pair for members in groups.values() for pair in combinations(sorted(members), 2)}
+
+
+def score(predicted: Set[Tuple[int, int]], truth: Set[Tuple[int, int]]) -> Dict[str, float]:
+    tp = len(predicted & truth)
+    precision = tp / len(predicted) if predicted else 1.0
+    recall = tp / len(truth) if truth else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4),
+            "predicted_pairs": len(predicted), "true_pairs": len(truth)}
+
+
+def run_batch(questions: List[str], truth: Set[Tuple[int, int]]) -> Dict[str, Dict[str, float]]:
+    from app.services.document_loaders import RawQAPair
+    from app.services.qa_validators import DuplicateDetector
+
+    pairs = [RawQAPair(question=q, answer="-", source_block_ids=[], extraction_method="bench") for q in questions]
+    report = {}
+    for name, detect in (
+        ("legacy", lambda: legacy_find_duplicates(questions)),
+        ("lsh", lambda: DuplicateDetector.find_duplicates(pairs)),
+    ):
+        start = time.perf_counter()
+        found = detect()
+        elapsed = time.perf_counter() - start
+        report[name] = {**score(cluster_pairs(len(questions), found), truth), "seconds": round(elapsed, 3)}
+    return report
+
+
+async def run_kb(originals: List[str], injected: List[Tuple[int, str]]) -> Dict[str, float]:
+    from app.services.document_loaders import ProcessedQAPair
+    from app.services.qa_validators import DuplicateDetector
+    from app.services.qa_validators.near_duplicate_index import NearDuplicateIndexService
+
+    service = NearDuplicateIndexService()
+    service.index = DuplicateDetector.new_index()
+    service._add_rows([(i + 1, f"Question: {q}\nAnswer: -", 0) for i, q in enumerate(originals)])
+    canon = [canonical(q) for q in originals]
+
+    start = time.perf_counter()
+    results, _ = service._match([ProcessedQAPair(question=q, answer="-") for _, q in injected])
+    elapsed = time.perf_counter() - start
+
+    hits = wrong = 0
+    for (source, _), match in zip(injected, results):
+        if match is None:
+            continue
+        if canon[match["doc_id"] - 1] == canon[source]:
+            hits += 1
+        else:
+            wrong += 1
+    found = hits + wrong
+    return {
+        "kb_documents": len(originals),
+        "queries": len(injected),
+        "precision": round(hits / found, 4) if found else 1.0,
+        "recall": round(hits / len(injected), 4) if injected else 1.0,
+        "ms_per_query": round(elapsed / max(1, len(injected)) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate detection precision/recall")
+    parser.add_argument("--datasets", nargs="*", default=DEFAULT_DATASETS)
+    parser.add_argument("--paraphrases", type=int, default=300, help="Injected paraphrases")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--min_precision", type=float, default=0.9)
+    parser.add_argument("--min_recall", type=float, default=0.85)
+    parser.add_argument("--output", help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    prepare_environment(online_models=False)
+    rng = random.Random(args.seed)
+
+    originals = load_questions(args.datasets)
+    injected = []
+    for _ in range(args.paraphrases):
+        source = rng.randrange(len(originals))
+        injected.append((source, paraphrase(originals[source], rng)))
+
+    questions = originals + [q for _, q in injected]
+    canon = [canonical(q) for q in originals] + [canonical(originals[s]) for s, _ in injected]
+    groups: Dict[str, List[int]] = {}
+    for i, key in enumerate(canon):
+        groups.setdefault(key, []).append(i)
+    truth = {pair for members in groups.values() for pair in combinations(members, 2)}
+
+    report = {
+        "questions": len(questions),
+        "originals": len(originals),
+        "injected": len(injected),
+        "batch": run_batch(questions, truth),
+        "kb": asyncio.run(run_kb(originals, injected)),
+    }
+    payload = json.dumps(report, indent=2)
+    print(payload)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+
+    failures = []
+    for name, result in (("batch.lsh", report["batch"]["lsh"]), ("kb", report["kb"])):
+        if result["precision"] < args.min_precision:
+            failures.append(f"{name} precision {result['precision']} < {args.min_precision}")
+        if result["recall"] < args.min_recall:
+            failures.append(f"{name} recall {result['recall']} < {args.min_recall}")
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
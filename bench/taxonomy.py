@@ -0,0 +1,144 @@
+"""
+Taxonomy read path: per-category queries vs one aggregate query vs the snapshot.
+
+Needs the Postgres at DATABASE_URL and only reads `documents`. Three ways of
+building the category -> intents map used by zero-shot classification are
+timed:
+
+- before: the old TaxonomyService calls, one new connection per query, with
+  get_intents_by_category(category_id) looking the categories up again;
+- query: TaxonomyService._fetch_tree, one json_agg query on the shared pool;
+- snapshot: TaxonomyService.snapshot() once it is loaded.
+
+With --pubsub, two TaxonomyService instances stand in for two workers on the
+Redis at REDIS_URL: one bumps the version and the time until the other drops
+its snapshot is reported. No documents are changed.
+
+    python -m bench.taxonomy --repeat 20
+    python -m bench.taxonomy --pubsub
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+async def legacy_tree(db_url: str) -> Dict[str, List[str]]:
+    """The old get_all_categories + get_intents_by_category(id) loop, queries verbatim."""
+    import psycopg
+
+    async def all_categories():
+        async with await psycopg.AsyncConnection.connect(db_url) as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("""
+                    SELECT DISTINCT
+                        ROW_NUMBER() OVER (ORDER BY metadata->>'category') as id,
+                        metadata->>'category' as name
+                    FROM documents
+                    WHERE metadata->>'category' IS NOT NULL
+                    ORDER BY name
+                """)
+                return [{"id": row[0], "name": row[1]} for row in await cur.fetchall()]
+
+    tree: Dict[str, List[str]] = {}
+    for cat in await all_categories():
+        matching = [c for c in await all_categories() if c["id"] == cat["id"]]
+        async with await psycopg.AsyncConnection.connect(db_url) as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("""
+                    SELECT DISTINCT
+                        ROW_NUMBER() OVER (ORDER BY metadata->>'intent') as id,
+                        metadata->>'intent' as name
+                    FROM documents
+                    WHERE metadata->>'category' = %s
+                    AND metadata->>'intent' IS NOT NULL
+                    ORDER BY name
+                """, (matching[0]["name"],))
+                tree.setdefault(cat["name"], []).extend(row[1] for row in await cur.fetchall())
+    return tree
+
+
+async def timed(fn, repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {"median_ms": round(timings[len(timings) // 2], 3), "max_ms": round(timings[-1], 3)}
+
+
+async def pubsub_check(timeout: float) -> Dict[str, float]:
+    from app.services.taxonomy import TaxonomyService
+
+    writer, reader = TaxonomyService(), TaxonomyService()
+    await reader.start_listener()
+    try:
+        for _ in range(100):
+            if reader._listening:
+                break
+            await asyncio.sleep(0.05)
+        before = await reader.snapshot()
+        start = time.perf_counter()
+        await writer.bump_version()
+        while reader._latest_version <= before.version:
+            if time.perf_counter() - start > timeout:
+                return {"invalidated": False}
+            await asyncio.sleep(0.001)
+        elapsed = (time.perf_counter() - start) * 1000
+        after = await reader.snapshot()
+        return {
+            "invalidated": after is not before,
+            "propagation_ms": round(elapsed, 2),
+            "version": after.version,
+        }
+    finally:
+        await reader.stop_listener()
+
+
+async def main_async(args):
+    from app.services.taxonomy import TaxonomyService
+    from app.settings import settings
+    from app.storage.connection import close_db_pool
+
+    service = TaxonomyService()
+    try:
+        legacy = await legacy_tree(settings.DATABASE_URL)
+        tree = await service._fetch_tree()
+        report = {
+            "categories": len(tree),
+            "intents": sum(len(v) for v in tree.values()),
+            # The old queries returned a row per document, not per category
+            "before_categories_returned": len(legacy),
+            "before": await timed(lambda: legacy_tree(settings.DATABASE_URL), max(1, args.repeat // 4)),
+            "query": await timed(service._fetch_tree, args.repeat),
+        }
+        await service.snapshot()
+        report["snapshot"] = await timed(service.snapshot, args.repeat)
+        if args.pubsub:
+            report["pubsub"] = await pubsub_check(args.timeout)
+    finally:
+        await close_db_pool()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Taxonomy read path benchmark")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--pubsub", action="store_true", help="Also check cross-worker invalidation through Redis")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Seconds to wait for the pub/sub message")
+    args = parser.parse_args()
+
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
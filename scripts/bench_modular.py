@@ -3,6 +3,7 @@ import sys
 import asyncio
 import argparse
 import json
+import time
 import yaml
 from datetime import datetime
 from typing import Dict, Any, List
@@ -82,6 +83,9 @@ CONFIG_TO_ORDER_MAP = {
     # Others match 1:1
 }
 
+# Nodes whose LLM calls the combined turn analysis merges into one
+PRE_GENERATION_LLM_NODES = ("dialog_analysis", "aggregation", "expand_query")
+
 # Mapping from order names to node instances
 NODE_INSTANCES = {
     "session_starter": load_session_node,
@@ -160,6 +164,13 @@ async def run_modular_bench(args, config):
             # For now, we assume if it's False in CLI but True in config, and CLI was default, we keep True.
             pass
 
+    # A/B: dialog_analysis mode (rule_based | llm | combined) without editing YAML
+    if args.dialog_analysis_mode:
+        from app.services.config_loader.loader import load_pipeline_config
+        da_details = load_pipeline_config().setdefault("details", {}).setdefault("dialog_analysis", {})
+        da_details.setdefault("config", {})["mode"] = args.dialog_analysis_mode
+        print(f"   Dialog analysis mode: {args.dialog_analysis_mode}")
+
     pipeline_order = get_pipeline_order()
     active_sequence = [node for node in pipeline_order if node in enabled_nodes]
 
@@ -183,6 +194,7 @@ async def run_modular_bench(args, config):
     all_metrics = []
     cls_results = {"zs": {"true": [], "pred": [], "conf": []}, "ft": {"true": [], "pred": [], "conf": []}}
     selected_prompts_list = []
+    pre_generation_latencies = []
     
     for i, item in enumerate(dataset.items, 1):
         question = item.input["question"]
@@ -224,6 +236,7 @@ async def run_modular_bench(args, config):
                 
                 skip_to_node = None
                 nodes_actually_executed = []
+                node_latencies = {}
 
                 for node_name in pipeline_order:
                     # Handle skipping
@@ -243,12 +256,15 @@ async def run_modular_bench(args, config):
                     nodes_actually_executed.append(node_name)
                     
                     # Execute node
+                    node_start = time.perf_counter()
                     if not args.verbose:
                         with contextlib.redirect_stdout(io.StringIO()):
                             updates = await node_inst(state)
                     else:
                         updates = await node_inst(state)
 
+                    node_latencies[node_name] = (time.perf_counter() - node_start) * 1000
+
                     if updates:
                         state.update(updates)
                     
@@ -287,6 +303,9 @@ async def run_modular_bench(args, config):
                                 break
                             continue
 
+                pre_generation_ms = sum(node_latencies.get(n, 0.0) for n in PRE_GENERATION_LLM_NODES)
+                pre_generation_latencies.append(pre_generation_ms)
+
                 # Retrieval Results
                 output_docs = state.get("docs", [])
                 output_scores = state.get("rerank_scores") or state.get("scores") or [0.0] * len(output_docs)
@@ -325,6 +344,9 @@ async def run_modular_bench(args, config):
                         "search_type": search_type,
                         "cache_hit": state.get("cache_hit", False),
                         "nodes_executed": nodes_actually_executed,
+                        "node_latencies_ms": node_latencies,
+                        "pre_generation_llm_ms": pre_generation_ms,
+                        "turn_analysis_mode": (state.get("turn_analysis") or {}).get("mode", "individual"),
                         "category_filter": state.get("matched_category"),
                         "selected_prompt": state.get("dialog_state") if "prompt_routing" in enabled_nodes else "N/A"
                     }
@@ -370,6 +392,10 @@ async def run_modular_bench(args, config):
         avg_mrr = sum(m["mrr"] for m in all_metrics) / len(all_metrics)
         print(f"  - Avg Hit: {avg_hit:.4f}")
         print(f"  - Avg MRR: {avg_mrr:.4f}")
+        if pre_generation_latencies:
+            ordered = sorted(pre_generation_latencies)
+            print(f"  - Pre-generation LLM stage (dialog_analysis + aggregation + expand_query): "
+                  f"avg {sum(ordered) / len(ordered):.0f} ms, p95 {ordered[int(0.95 * (len(ordered) - 1))]:.0f} ms")
 
         # Classification Metrics Report
         for tag, eval_obj in [("zs", cls_evaluator), ("ft", ft_evaluator)]:
@@ -431,6 +457,11 @@ if __name__ == "__main__":
     parser.add_argument("--use_cache_similarity", action="store_true", default=get_enabled_default("cache_similarity"))
     
     parser.add_argument("--verbose", action="store_true", help="Show all node logs and detailed results")
+    parser.add_argument(
+        "--dialog_analysis_mode", choices=["rule_based", "llm", "combined"],
+        default=config.get("dialog_analysis_mode"),
+        help="Override dialog_analysis mode (combined = one LLM call for analysis, rewrite and expansion)"
+    )
     
     parser.add_argument("--top_k_retrieval", type=int, default=config.get("top_k_retrieval", 10))
     parser.add_argument("--top_k_rerank", type=int, default=config.get("top_k_rerank", 5))
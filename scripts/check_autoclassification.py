@@ -34,8 +34,6 @@ async def main():
     # 2. Initialize pipeline
     print("\n📦 Initializing AutoClassificationPipeline...")
     pipeline = AutoClassificationPipeline(
-        embedding_model="all-MiniLM-L6-v2",  # Small, fast, CPU-friendly
-        distance_threshold=0.7,  # Lower = more granular clusters
         confidence_threshold=0.65,
         llm_validation_threshold=0.4  # Only call LLM if very uncertain
     )
@@ -0,0 +1,222 @@
+"""
+ONNX int8 parity check.
+
+Runs each local model on the ground-truth dataset with the PyTorch and the
+ONNX int8 backends and compares outputs, so quality regressions show up
+before switching `inference_backends` in global.yaml. Also reports
+throughput of both backends.
+
+The `translator` backend covers both MarianMT directions: ru->en (the query
+path) is checked on the Russian load-test questions, en->ru on the dataset.
+
+Usage:
+    python scripts/check_onnx_parity.py
+    python scripts/check_onnx_parity.py --models e5,reranker --dataset datasets/ground_truth_dataset.json
+    python scripts/check_onnx_parity.py --models translator_ru_en,translator_en_ru
+
+Exits with status 1 if any model falls below its threshold.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.inference.backend import (  # noqa: E402
+    ONNX_AVAILABLE,
+    ONNX_INT8,
+    TORCH,
+    load_cross_encoder,
+    load_sentence_transformer,
+    load_seq2seq,
+    load_zero_shot_pipeline,
+)
+from scripts.load_test import FOLLOW_UPS, QUESTIONS_RU  # noqa: E402
+
+MODELS = {
+    "e5": "intfloat/multilingual-e5-small",
+    "semantic": "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+    "reranker": "BAAI/bge-reranker-v2-m3",
+    "zero_shot": "valhalla/distilbart-mnli-12-1",
+    "translator_ru_en": "Helsinki-NLP/opus-mt-ru-en",
+    "translator_en_ru": "Helsinki-NLP/opus-mt-en-ru",
+}
+
+
+def timed(fn: Callable, *args) -> Tuple[object, float]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def check_encoder(key: str, questions: List[str], prefix: str = "") -> Dict:
+    texts = [f"{prefix}{q}" for q in questions]
+    results = {}
+    for backend in (TORCH, ONNX_INT8):
+        model = load_sentence_transformer(MODELS[key], key, backend=backend)
+        model.encode(texts[:4])  # warm up
+        results[backend] = timed(model.encode, texts)
+    cos = cosine_rows(np.asarray(results[TORCH][0]), np.asarray(results[ONNX_INT8][0]))
+    return {
+        "metric": "cosine(torch, onnx)",
+        "mean": float(cos.mean()),
+        "min": float(cos.min()),
+        "score": float(cos.min()),
+        "speedup": results[TORCH][1] / results[ONNX_INT8][1],
+    }
+
+
+def check_reranker(items: List[dict], negatives: int = 4) -> Dict:
+    chunks = sorted({c for item in items for c in item.get("expected_chunks", [])})
+    rng = random.Random(42)
+    groups = []
+    for item in items:
+        candidates = list(item.get("expected_chunks", []))
+        candidates += rng.sample(chunks, min(negatives, len(chunks)))
+        groups.append([(item["question"], c) for c in candidates])
+    pairs = [p for group in groups for p in group]
+
+    results = {}
+    for backend in (TORCH, ONNX_INT8):
+        model = load_cross_encoder(MODELS["reranker"], backend=backend)
+        model.predict(pairs[:4])
+        results[backend] = timed(model.predict, pairs)
+
+    torch_scores = np.asarray(results[TORCH][0])
+    onnx_scores = np.asarray(results[ONNX_INT8][0])
+    agree, offset = 0, 0
+    for group in groups:
+        n = len(group)
+        agree += int(torch_scores[offset:offset + n].argmax() == onnx_scores[offset:offset + n].argmax())
+        offset += n
+    sigmoid = lambda x: 1 / (1 + np.exp(-x))  # noqa: E731
+    return {
+        "metric": "top-1 agreement",
+        "top1_agreement": agree / len(groups),
+        "max_abs_score_diff": float(np.abs(sigmoid(torch_scores) - sigmoid(onnx_scores)).max()),
+        "score": agree / len(groups),
+        "speedup": results[TORCH][1] / results[ONNX_INT8][1],
+    }
+
+
+def check_zero_shot(items: List[dict]) -> Dict:
+    labels = sorted({item["expected_intent"] for item in items if item.get("expected_intent")})
+    questions = [item["question"] for item in items]
+    results = {}
+    for backend in (TORCH, ONNX_INT8):
+        classifier = load_zero_shot_pipeline(MODELS["zero_shot"], backend=backend)
+        results[backend] = timed(lambda: [classifier(q, labels)["labels"][0] for q in questions])
+    agreement = np.mean([a == b for a, b in zip(results[TORCH][0], results[ONNX_INT8][0])])
+    return {
+        "metric": "label agreement",
+        "score": float(agreement),
+        "speedup": results[TORCH][1] / results[ONNX_INT8][1],
+    }
+
+
+def check_translator(key: str, questions: List[str]) -> Dict:
+    results = {}
+    for backend in (TORCH, ONNX_INT8):
+        tokenizer, model = load_seq2seq(MODELS[key], backend=backend)
+
+        def translate():
+            out = []
+            for i in range(0, len(questions), 16):
+                inputs = tokenizer(questions[i:i + 16], return_tensors="pt", padding=True, truncation=True)
+                out += tokenizer.batch_decode(
+                    model.generate(**inputs, num_beams=1, max_new_tokens=256), skip_special_tokens=True
+                )
+            return out
+
+        results[backend] = timed(translate)
+
+    def token_f1(a: str, b: str) -> float:
+        ta, tb = a.lower().split(), b.lower().split()
+        common = sum(min(ta.count(t), tb.count(t)) for t in set(ta))
+        if not ta or not tb or not common:
+            return float(ta == tb)
+        precision, recall = common / len(tb), common / len(ta)
+        return 2 * precision * recall / (precision + recall)
+
+    pairs = list(zip(results[TORCH][0], results[ONNX_INT8][0]))
+    return {
+        "metric": "token F1 vs torch",
+        "exact_match": float(np.mean([a == b for a, b in pairs])),
+        "score": float(np.mean([token_f1(a, b) for a, b in pairs])),
+        "speedup": results[TORCH][1] / results[ONNX_INT8][1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ONNX int8 outputs against PyTorch.")
+    parser.add_argument("--dataset", default="datasets/ground_truth_dataset.json")
+    parser.add_argument("--models", default=",".join(MODELS))
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    parser.add_argument("--min-translation-f1", type=float, default=0.85)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    if not ONNX_AVAILABLE:
+        print("onnxruntime/optimum are not installed: pip install -r requirements.onnx.txt")
+        sys.exit(2)
+
+    with open(args.dataset, encoding="utf-8") as f:
+        items = json.load(f)
+    questions = [item["question"] for item in items]
+
+    thresholds = {
+        "e5": args.min_cosine,
+        "semantic": args.min_cosine,
+        "reranker": args.min_agreement,
+        "zero_shot": args.min_agreement,
+        "translator_ru_en": args.min_translation_f1,
+        "translator_en_ru": args.min_translation_f1,
+    }
+    checks = {
+        "e5": lambda: check_encoder("e5", questions, prefix="query: "),
+        "semantic": lambda: check_encoder("semantic", questions),
+        "reranker": lambda: check_reranker(items),
+        "zero_shot": lambda: check_zero_shot(items),
+        "translator_ru_en": lambda: check_translator("translator_ru_en", QUESTIONS_RU + FOLLOW_UPS["ru"]),
+        "translator_en_ru": lambda: check_translator("translator_en_ru", questions),
+    }
+
+    report, failed = {}, []
+    for key in [m.strip() for m in args.models.split(",") if m.strip()]:
+        print(f"Checking {key} ({MODELS[key]})...")
+        result = checks[key]()
+        result["threshold"] = thresholds[key]
+        result["passed"] = result["score"] >= thresholds[key]
+        report[key] = result
+        status = "PASS" if result["passed"] else "FAIL"
+        print(f"  {status} {result['metric']}={result['score']:.4f} "
+              f"(threshold {thresholds[key]}), speedup x{result['speedup']:.2f}")
+        if not result["passed"]:
+            failed.append(key)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if failed:
+        print(f"Parity check failed for: {', '.join(failed)}")
+        sys.exit(1)
+    print("All models within parity thresholds")
+
+
+if __name__ == "__main__":
+    main()
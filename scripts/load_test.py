@@ -1,15 +1,41 @@
+"""
+Scenario-driven load test for /api/v1/chat/completions.
+
+Scenarios and SLOs live in scripts/load_scenarios.yaml. Conversations arrive
+open-loop (Poisson or uniform) at the configured rate, ramping across stages;
+each one is English or Russian, may repeat an earlier question to hit the
+cache, and may continue for several turns on the same session_id.
+
+    python scripts/load_test.py --scenario smoke
+    python scripts/load_test.py --scenario ramp --url http://localhost:8000
+    python scripts/load_test.py --scenario smoke --target inprocess --report load.json --histogram load.hgrm
+
+--target inprocess drives the FastAPI app through httpx's ASGI transport with
+the in-memory fakes from bench/fakes.py, so no external service is needed.
+
+Latency is measured from each request's scheduled send time, so client-side
+queueing is not hidden (no coordinated omission). Arrivals dropped because
+max_in_flight conversations were already running count as errors in
+error_rate and against max_dropped. Exits with status 1 when an SLO is missed.
+"""
+import argparse
 import asyncio
-import aiohttp
-import time
-import statistics
-import uuid
-import random
 import json
+import os
+import random
+import sys
+import uuid
+from typing import Any, Dict, Iterator, List, Tuple
+
+import yaml
 
-URL = "http://localhost:8000/api/v1/chat/completions"
-CONCURRENT_REQUESTS = 100
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CHAT_PATH = "/api/v1/chat/completions"
+DEFAULT_URL = "http://localhost:8000"
+DEFAULT_SCENARIOS = os.path.join(ROOT, "scripts", "load_scenarios.yaml")
 
-# Hardcoded list of 100 unique questions to ensure high variance
 QUESTIONS_LIST = [
     "Where is the section to see my past orders?",
     "I need to call your support team, what is the number?",
@@ -115,77 +141,423 @@ QUESTIONS_LIST = [
     ),  # Parantheses to avoid linter issues with long strings? No, just string.
 ]
 
-def generate_questions(count):
-    # Return the exact list, slicing if count < 100, or repeating if count > 100 (though we expect 100)
-    if count <= len(QUESTIONS_LIST):
-        return QUESTIONS_LIST[:count]
-    else:
-        # Repeat list if more requested
-        return (QUESTIONS_LIST * (count // len(QUESTIONS_LIST) + 1))[:count]
-
-async def send_request(session, req_id, question):
-    start = time.time()
-    
-    # Unique user and session for each request to avoid caching/state overlap
-    payload = {
-        "question": question,
-        "user_id": f"load_user_{uuid.uuid4()}",
-        "session_id": f"load_session_{uuid.uuid4()}"
+
+QUESTIONS_RU = [
+    "Где посмотреть историю моих заказов?",
+    "Какой номер телефона службы поддержки?",
+    "Вы доставляете в Японию?",
+    "Как отследить мою посылку?",
+    "Можно ли оплатить картой American Express?",
+    "Где находится ваш головной офис?",
+    "Как связаться с живым оператором?",
+    "Доставка в Германию доступна?",
+    "Можно оплатить через Google Pay?",
+    "Где скачать счета по заказам?",
+    "В какие часы работает поддержка?",
+    "Как узнать статус доставки?",
+    "Принимаете ли вы криптовалюту?",
+    "Можно разделить оплату между двумя картами?",
+    "Как открыть обращение в поддержку?",
+    "Моя посылка задерживается, что делать?",
+    "Можно оплатить банковским переводом?",
+    "Не могу найти свои прошлые покупки.",
+    "Как сбросить пароль от аккаунта?",
+    "Можно ли вернуть товар после получения?",
+    "Сколько идёт возврат денег на карту?",
+    "Как изменить адрес доставки?",
+    "Принимаете ли вы оплату при получении?",
+    "Трекинг показывает, что доставлено, но посылки нет.",
+    "Можно оплатить подарочной картой?",
+]
+
+FOLLOW_UPS = {
+    "en": [
+        "Can you explain that in more detail?",
+        "What if that doesn't work?",
+        "How long does it usually take?",
+        "And what about refunds in that case?",
+        "Thanks. Is there anything else I should know?",
+    ],
+    "ru": [
+        "Можете объяснить подробнее?",
+        "А если это не сработает?",
+        "Сколько это обычно занимает?",
+        "А что с возвратом в этом случае?",
+        "Спасибо. Что ещё мне нужно знать?",
+    ],
+}
+
+QUESTIONS = {"en": QUESTIONS_LIST, "ru": QUESTIONS_RU}
+
+
+# --- Arrivals -----------------------------------------------------------------
+
+def _stage_rate(stage: Dict[str, Any], t: float) -> float:
+    if "rate" in stage:
+        return float(stage["rate"])
+    start, end = float(stage["rate_start"]), float(stage["rate_end"])
+    return start + (end - start) * t / float(stage["duration_seconds"])
+
+
+def arrival_offsets(stages: List[Dict[str, Any]], arrival: str, rng: random.Random) -> Iterator[float]:
+    """Conversation start times in seconds from t=0 across all stages."""
+    base = 0.0
+    for stage in stages:
+        duration = float(stage["duration_seconds"])
+        peak = max(_stage_rate(stage, 0), _stage_rate(stage, duration))
+        t = 0.0
+        while peak > 0:
+            if arrival == "poisson":
+                # Thinning: candidate events at the peak rate, kept with rate(t)/peak
+                t += rng.expovariate(peak)
+                if t >= duration:
+                    break
+                if rng.random() * peak <= _stage_rate(stage, t):
+                    yield base + t
+            else:
+                rate = _stage_rate(stage, t)
+                t += 1.0 / rate if rate > 0 else 0.1
+                if t >= duration:
+                    break
+                if rate > 0:
+                    yield base + t
+        base += duration
+
+
+# --- Recording ----------------------------------------------------------------
+
+class Recorder:
+    """Latency histograms overall and per tag, plus error accounting."""
+
+    def __init__(self):
+        from app.services.cache.stats import LatencyHistogram
+        self._histogram = LatencyHistogram
+        self.overall = LatencyHistogram()
+        self.by_tag: Dict[str, Any] = {}
+        self.sent = 0
+        self.errors = 0
+        self.dropped = 0
+        self.error_samples: List[Tuple[int, str]] = []
+
+    def record(self, latency_ms: float, tags: List[str], ok: bool, status: int = 0, detail: str = ""):
+        self.sent += 1
+        if not ok:
+            self.errors += 1
+            if len(self.error_samples) < 5:
+                self.error_samples.append((status, detail[:200]))
+            return
+        self.overall.record(latency_ms)
+        for tag in tags:
+            if tag not in self.by_tag:
+                self.by_tag[tag] = self._histogram()
+            self.by_tag[tag].record(latency_ms)
+
+
+def summarize(hist) -> Dict[str, float]:
+    q = hist.quantiles([0.5, 0.9, 0.95, 0.99, 0.999])
+    return {
+        "count": hist.count,
+        "mean": round(hist.mean(), 2),
+        "p50": round(q[0.5], 2),
+        "p90": round(q[0.9], 2),
+        "p95": round(q[0.95], 2),
+        "p99": round(q[0.99], 2),
+        "p99.9": round(q[0.999], 2),
+        "max": round(hist.max, 2),
     }
-    
+
+
+def percentile_ladder(ticks_per_half: int = 5, halves: int = 12) -> List[float]:
+    """HdrHistogram-style reporting points: denser as the percentile approaches 100."""
+    points = []
+    for h in range(halves):
+        lo, hi = 1 - 0.5 ** h, 1 - 0.5 ** (h + 1)
+        points.extend(lo + (hi - lo) * i / ticks_per_half for i in range(ticks_per_half))
+    return points + [1.0]
+
+
+def write_hgrm(hist, path: str):
+    """Percentile distribution in the HdrHistogram .hgrm text layout (values in ms)."""
+    ladder = percentile_ladder()
+    values = hist.quantiles(ladder)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}\n\n")
+        for p in ladder:
+            count = min(hist.count, max(1, int(p * hist.count + 0.999999))) if hist.count else 0
+            inverse = f"{1 / (1 - p):14.2f}" if p < 1.0 else f"{'inf':>14}"
+            f.write(f"{values[p]:12.3f} {p:14.12f} {count:10d} {inverse}\n")
+        f.write(f"#[Mean    = {hist.mean():12.3f}, Max        = {hist.max:12.3f}]\n")
+        f.write(f"#[Total count    = {hist.count:12d}]\n")
+
+
+# --- SLOs ---------------------------------------------------------------------
+
+def _quantile_key(name: str) -> float:
+    return round(float(name.lstrip("p")) / 100, 6)
+
+
+def evaluate_slos(slos: Dict[str, Any], recorder: Recorder) -> List[Dict[str, Any]]:
+    checks = []
+
+    def latency_checks(scope: str, hist, objectives: Dict[str, float]):
+        qs = {name: _quantile_key(name) for name in objectives}
+        actual = hist.quantiles(list(qs.values())) if hist is not None else {}
+        for name, limit in objectives.items():
+            value = actual.get(qs[name])
+            checks.append({
+                "slo": f"{scope}.{name}",
+                "objective_ms": limit,
+                "actual_ms": round(value, 2) if value is not None else None,
+                "passed": value is not None and hist.count > 0 and value <= limit,
+            })
+
+    latency_checks("latency", recorder.overall, slos.get("latency_ms", {}))
+
+    if "error_rate" in slos:
+        # A dropped arrival is a request the service never answered
+        attempted = recorder.sent + recorder.dropped
+        rate = (recorder.errors + recorder.dropped) / attempted if attempted else 0.0
+        checks.append({
+            "slo": "error_rate",
+            "objective": slos["error_rate"],
+            "actual": round(rate, 4),
+            "passed": rate <= slos["error_rate"],
+        })
+
+    if "max_dropped" in slos:
+        checks.append({
+            "slo": "max_dropped",
+            "objective": slos["max_dropped"],
+            "actual": recorder.dropped,
+            "passed": recorder.dropped <= slos["max_dropped"],
+        })
+
+    for tag, objectives in (slos.get("by_tag") or {}).items():
+        latency_checks(tag, recorder.by_tag.get(tag), objectives)
+    return checks
+
+
+# --- Traffic ------------------------------------------------------------------
+
+class TrafficModel:
+    """Chooses language, cache-hot/cold questions and follow-ups for conversations."""
+
+    def __init__(self, scenario: Dict[str, Any], rng: random.Random):
+        self.rng = rng
+        languages = scenario.get("languages") or {"en": 1.0}
+        self.languages = list(languages)
+        self.language_weights = [float(w) for w in languages.values()]
+        self.cache_hit_ratio = float(scenario.get("cache_hit_ratio", 0.0))
+        multi_turn = scenario.get("multi_turn") or {}
+        self.multi_turn_share = float(multi_turn.get("share", 0.0))
+        self.turns = multi_turn.get("turns", [2, 3])
+        self.think_time_ms = multi_turn.get("think_time_ms", [500, 2000])
+        self._cold = {lang: rng.sample(QUESTIONS[lang], len(QUESTIONS[lang])) for lang in QUESTIONS}
+        self._cursor = {lang: 0 for lang in QUESTIONS}
+        self.answered: Dict[str, List[str]] = {lang: [] for lang in QUESTIONS}
+
+    def first_question(self, lang: str) -> Tuple[str, str]:
+        if self.answered[lang] and self.rng.random() < self.cache_hit_ratio:
+            return self.rng.choice(self.answered[lang]), "cache_hot"
+        pool = self._cold[lang]
+        question = pool[self._cursor[lang] % len(pool)]
+        self._cursor[lang] += 1
+        return question, "cache_cold"
+
+    def plan(self) -> Dict[str, Any]:
+        lang = self.rng.choices(self.languages, weights=self.language_weights)[0]
+        turns = 1
+        if self.rng.random() < self.multi_turn_share:
+            turns = self.rng.randint(int(self.turns[0]), int(self.turns[1]))
+        return {"lang": lang, "turns": turns}
+
+    def follow_up(self, lang: str) -> str:
+        return self.rng.choice(FOLLOW_UPS[lang])
+
+    def think_time(self) -> float:
+        return self.rng.uniform(float(self.think_time_ms[0]), float(self.think_time_ms[1])) / 1000
+
+
+async def send(client, question: str, user_id: str, session_id: str) -> Tuple[int, str]:
     try:
-        async with session.post(URL, json=payload) as response:
-            # We must read the response to ensure the request completes
-            resp_text = await response.text()
-            elapsed = time.time() - start
-            status = response.status
-            return status, elapsed, resp_text
+        response = await client.post(CHAT_PATH, json={"question": question, "user_id": user_id, "session_id": session_id})
+        return response.status_code, response.text
     except Exception as e:
-        return 0, time.time() - start, str(e)
-
-async def main():
-    questions = generate_questions(CONCURRENT_REQUESTS)
-    print(f"Generated {len(questions)} unique questions.")
-    print(f"Starting load test on {URL} with {CONCURRENT_REQUESTS} concurrent requests...")
-    
-    async with aiohttp.ClientSession() as session:
-        # Create all tasks
-        tasks = [send_request(session, i, questions[i]) for i in range(CONCURRENT_REQUESTS)]
-        
-        start_global = time.time()
-        # Run them concurrently
-        results = await asyncio.gather(*tasks)
-        total_time = time.time() - start_global
-
-    # Analysis
-    successes = []
-    errors = []
-    
-    for status, elapsed, text in results:
-        if status == 200:
-            successes.append(elapsed)
+        return 0, str(e)
+
+
+async def conversation(client, model: TrafficModel, recorder: Recorder, scheduled: float):
+    loop = asyncio.get_running_loop()
+    plan = model.plan()
+    lang = plan["lang"]
+    user_id = f"load_user_{uuid.uuid4()}"
+    session_id = f"load_session_{uuid.uuid4()}"
+
+    question, cache_tag = model.first_question(lang)
+    for turn in range(plan["turns"]):
+        if turn == 0:
+            tags = [cache_tag, f"lang_{lang}", "turn_first"]
         else:
-            errors.append((status, text))
-    
-    print(f"\n--- Load Test Results ---")
-    print(f"Total time for batch: {total_time:.2f}s")
-    print(f"Concurrent Users: {CONCURRENT_REQUESTS}")
-    print(f"Successful requests: {len(successes)}/{CONCURRENT_REQUESTS}")
-    print(f"Failed requests: {len(errors)}")
-    
-    if successes:
-        print(f"Avg latency: {statistics.mean(successes):.4f}s")
-        print(f"Min latency: {min(successes):.4f}s")
-        print(f"Max latency: {max(successes):.4f}s")
-        print(f"Median latency: {statistics.median(successes):.4f}s")
-        print(f"Throughput: {len(successes) / total_time:.2f} req/s")
-    
-    if errors:
+            await asyncio.sleep(model.think_time())
+            scheduled = loop.time()
+            question = model.follow_up(lang)
+            tags = [f"lang_{lang}", "turn_follow_up"]
+
+        status, body = await send(client, question, user_id, session_id)
+        latency_ms = (loop.time() - scheduled) * 1000
+        ok = status == 200
+        recorder.record(latency_ms, tags, ok, status, body)
+        if not ok:
+            return
+        if turn == 0 and cache_tag == "cache_cold":
+            model.answered[lang].append(question)
+
+
+async def run_scenario(client, scenario: Dict[str, Any], seed: int) -> Tuple[Recorder, float]:
+    rng = random.Random(seed)
+    model = TrafficModel(scenario, rng)
+    recorder = Recorder()
+    max_in_flight = int(scenario.get("max_in_flight", 1000))
+    offsets = list(arrival_offsets(scenario["stages"], scenario.get("arrival", "poisson"), rng))
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    tasks = set()
+    for offset in offsets:
+        delay = start + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(tasks) >= max_in_flight:
+            # Open loop: never queue behind a saturated client
+            recorder.dropped += 1
+            continue
+        task = asyncio.create_task(conversation(client, model, recorder, start + offset))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    return recorder, loop.time() - start
+
+
+# --- Targets ------------------------------------------------------------------
+
+async def inprocess_client(llm_latency_ms: float, llm_jitter_ms: float, corpus_limit: int):
+    """FastAPI app behind httpx's ASGI transport, backed by the bench fakes."""
+    import httpx
+    from bench.run_offline import prepare_environment, configure_pipeline, UNSUPPORTED_NODES, DEFAULT_DATASET
+
+    prepare_environment(online_models=False)
+    from bench.fakes import install_fakes, install_api_fakes
+    services = install_fakes(llm_latency_ms=llm_latency_ms, llm_jitter_ms=llm_jitter_ms)
+    install_api_fakes()
+    configure_pipeline(list(UNSUPPORTED_NODES))
+
+    with open(DEFAULT_DATASET, "r", encoding="utf-8") as f:
+        await services.load_corpus(json.load(f)[:corpus_limit])
+
+    from app._shared_config.intent_registry import get_registry
+    from app.services.cache.manager import get_cache_manager
+    from app.services.warmup_service import WarmupService
+    from app.settings import settings
+    await get_registry().initialize()
+    await WarmupService.warmup_all()
+    await get_cache_manager(redis_url=settings.REDIS_URL)
+
+    # Importing the app builds the graph, so this comes after configure_pipeline
+    from app.main import app
+    from app.api.v1.limiter import standard_limiter, strict_limiter, critical_limiter
+
+    async def _no_limit():
+        return None
+    for limiter in (standard_limiter, strict_limiter, critical_limiter):
+        app.dependency_overrides[limiter] = _no_limit
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://inprocess", timeout=120.0)
+
+
+def http_client(url: str):
+    import httpx
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+    return httpx.AsyncClient(base_url=url, timeout=120.0, limits=limits)
+
+
+# --- Entry point --------------------------------------------------------------
+
+async def main_async(args) -> int:
+    with open(args.scenarios, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    scenario = config["scenarios"][args.scenario]
+    slos = config.get("slos") or {}
+
+    if args.target == "inprocess":
+        client = await inprocess_client(args.llm_latency_ms, args.llm_jitter_ms, args.corpus_limit)
+    else:
+        client = http_client(args.url)
+
+    print(f"Running scenario '{args.scenario}' against {args.target if args.target == 'inprocess' else args.url}...")
+    async with client:
+        recorder, elapsed = await run_scenario(client, scenario, args.seed)
+
+    checks = evaluate_slos(slos, recorder)
+    passed = all(c["passed"] for c in checks)
+    report = {
+        "scenario": args.scenario,
+        "target": args.target,
+        "seed": args.seed,
+        "elapsed_seconds": round(elapsed, 2),
+        "requests": recorder.sent,
+        "errors": recorder.errors,
+        "dropped_conversations": recorder.dropped,
+        "throughput_rps": round((recorder.sent - recorder.errors) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": summarize(recorder.overall),
+        "latency_ms_by_tag": {tag: summarize(h) for tag, h in sorted(recorder.by_tag.items())},
+        "slo_checks": checks,
+        "passed": passed,
+    }
+
+    print(f"\n--- Load Test Results ({args.scenario}) ---")
+    print(f"Requests: {recorder.sent}  errors: {recorder.errors}  dropped conversations: {recorder.dropped}")
+    print(f"Throughput: {report['throughput_rps']} req/s over {report['elapsed_seconds']}s")
+    lat = report["latency_ms"]
+    print(f"Latency ms: p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}  max {lat['max']}")
+    for tag, s in report["latency_ms_by_tag"].items():
+        print(f"  {tag:<16} n={s['count']:<6} p50 {s['p50']:>9}  p95 {s['p95']:>9}  p99 {s['p99']:>9}")
+    print("\nSLOs:")
+    for c in checks:
+        actual = c.get("actual_ms", c.get("actual"))
+        objective = c.get("objective_ms", c.get("objective"))
+        print(f"  [{'PASS' if c['passed'] else 'FAIL'}] {c['slo']}: {actual} (objective {objective})")
+    if recorder.error_samples:
         print("\nSample Errors:")
-        for status, msg in errors[:5]:
+        for status, msg in recorder.error_samples:
             print(f"[{status}] {msg[:100]}...")
 
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.histogram:
+        write_hgrm(recorder.overall, args.histogram)
+    return 0 if passed else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SLO-driven load test")
+    parser.add_argument("--scenario", default="smoke")
+    parser.add_argument("--scenarios", default=DEFAULT_SCENARIOS, help="YAML with scenarios and slos")
+    parser.add_argument("--target", choices=["http", "inprocess"], default="http")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--report", help="Write the JSON report here")
+    parser.add_argument("--histogram", help="Write an .hgrm percentile distribution here")
+    parser.add_argument("--llm_latency_ms", type=float, default=300.0, help="inprocess only")
+    parser.add_argument("--llm_jitter_ms", type=float, default=50.0, help="inprocess only")
+    parser.add_argument("--corpus_limit", type=int, default=1000, help="inprocess only: documents to index")
+    args = parser.parse_args()
+
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    sys.exit(asyncio.run(main_async(args)))
+
+
 if __name__ == "__main__":
-    # Windows specific event loop policy
-    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-    asyncio.run(main())
+    main()
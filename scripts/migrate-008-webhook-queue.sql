@@ -0,0 +1,10 @@
+-- Webhook deliveries as a durable queue.
+-- The dispatcher claims due rows with FOR UPDATE SKIP LOCKED; next_retry holds
+-- the retry time for 'retrying' rows and the lease expiry for 'sending' rows.
+
+UPDATE webhook_deliveries SET next_retry = created_at
+WHERE status IN ('queued', 'retrying') AND next_retry IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_wd_due
+  ON webhook_deliveries(next_retry)
+  WHERE status IN ('queued', 'retrying', 'sending');
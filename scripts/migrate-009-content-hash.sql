@@ -0,0 +1,14 @@
+-- Content hash for set-based duplicate detection during ingestion.
+-- Ingestion COPYs new rows into a temp table and inserts them with
+-- ON CONFLICT (content_hash) DO NOTHING instead of one SELECT per chunk.
+--
+-- The unique index cannot be built while documents holds duplicate content:
+-- run scripts/remove_duplicates.py first (it also drops the Qdrant points).
+
+ALTER TABLE documents
+ADD COLUMN IF NOT EXISTS content_hash TEXT
+GENERATED ALWAYS AS (md5(content)) STORED;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_content_hash ON documents (content_hash);
+
+ANALYZE documents;
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Convert staging drafts stored as one JSON string into the per-chunk layout
+(draft hash + chunk hash + order set). Drafts are also converted lazily on
+first access, so running this is optional; it just avoids the one-time cost
+on the next edit.
+"""
+
+import sys
+import os
+import asyncio
+
+# Add project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.staging import staging_service
+from app.services.redis_pool import get_redis_manager
+
+
+async def _run() -> int:
+    try:
+        return await staging_service.migrate_legacy_drafts()
+    finally:
+        await get_redis_manager().close()
+
+
+def main():
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    print("🔄 Migrating legacy staging drafts...")
+    migrated = asyncio.run(_run())
+    print(f"✅ Migrated {migrated} draft(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -152,17 +152,23 @@ def generate_full_config():
             "retry_count": global_params.get("retry_count", 3)
         }
     }
+    # Every other key in global.yaml is carried over as is
+    for key, value in global_params.items():
+        details["global"]["parameters"].setdefault(key, value)
 
     
-    # Cache Configuration (Defaults)
+    # Cache Configuration (defaults, overridden by cache.yaml)
     details["cache"] = {
         "parameters": {
             "backend": "redis",
             "redis_url": "${REDIS_URL:-redis://redis:6379/0}",
             "ttl_seconds": 86400,
-            "max_entries": 1000
+            "max_entries": 1000,
+            **shared_configs.get("cache", {}).get("parameters", {})
         }
     }
+    # The loader expands ${...} while reading cache.yaml; keep the placeholder
+    details["cache"]["parameters"]["redis_url"] = "${REDIS_URL:-redis://redis:6379/0}"
 
     # Map raw node details into the centralized config
     for node_name, folder_name in name_to_folder.items():
@@ -0,0 +1,116 @@
+"""
+Test script for the /chat/stream frames
+
+Runs the SSE endpoint with the graph replaced by a two-step stand-in: input
+guardrails, then the generation node's streaming path with a scripted LLM
+and a data-leakage pattern in the incremental output guard. Identity and
+webhooks are stubbed; no LLM, database or Redis is used.
+"""
+import asyncio
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import app.api.v1.chat as chat
+from app.nodes.generation.node import generate_node
+from app.nodes.output_guardrails import node as output_guardrails
+from app.nodes.output_guardrails.incremental import IncrementalOutputGuard
+from app.nodes.output_guardrails.scanner import BasicOutputGuardrailsService
+from app.services.streaming import get_stream_channel
+
+FALLBACK = "I cannot provide this response."
+LEAK = {"pattern": r"\b\d{16}\b", "description": "Card number"}
+
+
+class ScriptedChain:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def astream(self, inputs, config=None):
+        for text in self.chunks:
+            yield SimpleNamespace(content=text)
+
+
+class FakeGraph:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def astream(self, input_state, stream_mode=None, config=None):
+        yield {"input_guardrails": {"guardrails_passed": True}}
+        answer = await generate_node._stream_answer(
+            ScriptedChain(self.chunks), {}, {}, get_stream_channel(), input_state
+        )
+        yield {"generate": {"answer": answer}}
+
+
+def guard(user_query="", language=None):
+    scanner = BasicOutputGuardrailsService(data_leakage_patterns=[LEAK], hallucination_indicators=[])
+    return IncrementalOutputGuard(
+        scanner=scanner,
+        enabled_scanners={"data_leakage": True, "relevance": False},
+        action_mode="block",
+        fallback_message=FALLBACK,
+        user_query=user_query
+    )
+
+
+async def stream_frames(chunks):
+    async def resolve_identity(**kwargs):
+        return "user-1"
+
+    async def no_webhook(**kwargs):
+        return None
+
+    chat.rag_graph = FakeGraph(chunks)
+    chat.IdentityManager.resolve_identity = resolve_identity
+    chat.WebhookService.trigger_outgoing_event = no_webhook
+    output_guardrails.output_guardrails_node.incremental_guard = guard
+
+    request = SimpleNamespace(state=SimpleNamespace(trace_id="trace-1"))
+    response = await chat.chat_stream(request, chat.ChatCompletionRequest(question="What is my card number?"))
+    frames = []
+    async for line in response.body_iterator:
+        frames.append(json.loads(line[len("data: "):]))
+    return frames
+
+
+async def test_block_before_first_token():
+    print("Testing a guard block before the first sentence is released...")
+    frames = await stream_frames(["Your card is ", "4111111111111111. ", "Anything else?"])
+    fallback_frames = [f for f in frames if FALLBACK in (f.get("token"), f.get("replace"))]
+    assert fallback_frames == [{"replace": FALLBACK, "trace_id": "trace-1"}], frames
+    assert not any("4111" in json.dumps(f) for f in frames), frames
+    assert frames[-2]["final_data"]["answer"] == FALLBACK
+    print("✅ Fallback sent once, as the replace frame")
+
+
+async def test_block_after_tokens():
+    print("Testing a guard block after a sentence was released...")
+    frames = await stream_frames(["Sure, here it is. ", "Card 4111111111111111. "])
+    assert {"token": "Sure, here it is. ", "trace_id": "trace-1"} in frames, frames
+    assert [f for f in frames if "replace" in f] == [{"replace": FALLBACK, "trace_id": "trace-1"}], frames
+    assert not any(f.get("token") == FALLBACK for f in frames), frames
+    print("✅ Released sentence replaced by the fallback")
+
+
+async def test_clean_answer():
+    print("Testing an answer the guard lets through...")
+    frames = await stream_frames(["Orders ship ", "in two days. ", "Anything else?"])
+    tokens = [f["token"] for f in frames if "token" in f and f["token"] != "[DONE]"]
+    assert "".join(tokens) == "Orders ship in two days. Anything else?", tokens
+    assert not any("replace" in f for f in frames), frames
+    print("✅ Tokens streamed once, no replace frame")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(test_block_before_first_token())
+        asyncio.run(test_block_after_tokens())
+        asyncio.run(test_clean_answer())
+        print("\nAll chat stream tests passed!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
@@ -0,0 +1,84 @@
+"""
+Test script for the linear classification heads
+
+Trains heads on synthetic clustered vectors, including a registry with only
+two categories and two intents, where sklearn returns a single logit column.
+The documents table is replaced by in-memory vectors; nothing connects to
+Postgres.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from app._shared_config.intent_registry import RegistrySnapshot
+from app.services.classification.linear_head import LinearHeadClassifier, train_head
+
+
+def clustered(labels, per_label=40, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((len(labels), dim)) * 3
+    vectors, names = [], []
+    for center, label in zip(centers, labels):
+        vectors.append(center + rng.standard_normal((per_label, dim)))
+        names += [label] * per_label
+    return np.vstack(vectors).astype(np.float32), names, centers
+
+
+def test_binary_head():
+    print("Testing a two-class head...")
+    vectors, labels, centers = clustered(["billing", "shipping"])
+    head = train_head(vectors, labels, ["billing", "shipping"])
+    assert head is not None and sorted(head.labels) == ["billing", "shipping"]
+    for center, expected in zip(centers, ["billing", "shipping"]):
+        label, confidence, margin = head.predict(center.astype(np.float32))
+        assert label == expected and confidence > 0.5 and margin > 0, (label, confidence, margin)
+    print("✅ Binary head trained and calibrated")
+
+
+def test_multiclass_head():
+    print("Testing a three-class head...")
+    names = ["billing", "shipping", "returns"]
+    vectors, labels, centers = clustered(names)
+    head = train_head(vectors, labels, names)
+    for center, expected in zip(centers, names):
+        assert head.predict(center.astype(np.float32))[0] == expected
+    print("✅ Multiclass head predicts every cluster")
+
+
+async def test_binary_registry_retrain():
+    print("Testing retrain with a two-category, two-intent registry...")
+    vectors, categories, _ = clustered(["Billing", "Shipping"])
+    intents = ["refund" if c == "Billing" else "track_order" for c in categories]
+
+    async def training_data():
+        return vectors, categories, intents
+
+    LinearHeadClassifier._instance = None
+    LinearHeadClassifier._heads = None
+    LinearHeadClassifier._failed_version = None
+    classifier = LinearHeadClassifier()
+    classifier._load_training_data = training_data
+    await classifier.retrain(RegistrySnapshot(
+        version=1, categories=("Billing", "Shipping"), intents=("refund", "track_order")
+    ))
+
+    assert classifier.is_ready, "binary registry produced no heads"
+    assert classifier._failed_version is None
+    prediction = classifier.predict(vectors[0].tolist())
+    assert prediction["category"][0] == "Billing" and prediction["intent"][0] == "refund", prediction
+    print("✅ Both binary heads trained through retrain")
+
+
+if __name__ == "__main__":
+    try:
+        test_binary_head()
+        test_multiclass_head()
+        asyncio.run(test_binary_registry_retrain())
+        print("\nAll linear head tests passed!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
@@ -0,0 +1,144 @@
+"""
+Test script for the near-duplicate index
+
+Checks MinHash/LSH matching of paraphrases and that edited or deleted
+documents reported through notify_changed are re-read on the next sync.
+The database is replaced by an in-memory table; nothing connects to Postgres.
+"""
+import asyncio
+import contextlib
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.document_loaders import ProcessedQAPair
+from app.services.qa_validators import DuplicateDetector
+from app.services.qa_validators import near_duplicate_index
+from app.services.qa_validators.near_duplicate_index import NearDuplicateIndexService
+
+
+class FakeTable:
+    """documents as {id: (content, xmin)}; answers the queries the index issues."""
+
+    def __init__(self, rows):
+        self.rows = {doc_id: (content, 1) for doc_id, content in rows.items()}
+        self.xid = 1
+
+    def write(self, doc_id, content):
+        self.xid += 1
+        self.rows[doc_id] = (content, self.xid)
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        yield self
+
+    @contextlib.asynccontextmanager
+    async def cursor(self):
+        yield FakeCursor(self)
+
+    async def execute(self, query, params=None):
+        # pg_notify from notify_changed
+        return None
+
+
+class FakeCursor:
+    def __init__(self, table):
+        self.table = table
+        self.result = []
+
+    async def execute(self, query, params=None):
+        rows = self.table.rows
+        if "WHERE id > %s" in query:
+            self.result = [(i, rows[i][0], rows[i][1]) for i in sorted(rows) if i > params[0]]
+        elif "WHERE id = ANY(%s)" in query:
+            self.result = [(i, rows[i][0], rows[i][1]) for i in params[0] if i in rows]
+        else:
+            self.result = [(i, rows[i][1]) for i in rows]
+
+    async def fetchall(self):
+        result, self.result = self.result, []
+        return result
+
+    async def fetchmany(self, size):
+        result, self.result = self.result[:size], self.result[size:]
+        return result
+
+
+def qa(question):
+    return f"Question: {question}\nAnswer: -"
+
+
+def fresh_service(table):
+    NearDuplicateIndexService._instance = None
+    near_duplicate_index.settings.DATABASE_URL = ""  # no LISTEN task
+    from app.storage import connection
+    connection.get_db_connection = table.connection
+    return NearDuplicateIndexService()
+
+
+def best(service, question):
+    results, _ = service._match([ProcessedQAPair(question=question, answer="-")])
+    return results[0]
+
+
+def test_paraphrases_match():
+    print("Testing paraphrase matching...")
+    NearDuplicateIndexService._instance = None
+    service = NearDuplicateIndexService()
+    service.index = DuplicateDetector.new_index()
+    service._add_rows([
+        (1, qa("How do I reset my password?"), 1),
+        (2, qa("How can I change the delivery address of my order?"), 1),
+    ])
+    match = best(service, "Hi, how can I reset my password please?")
+    assert match is not None and match["doc_id"] == 1, match
+    assert best(service, "What payment methods do you accept?") is None
+    print("✅ Paraphrase found, unrelated question not matched")
+
+
+async def test_edits_are_reread():
+    print("Testing edits and deletes reported through notify_changed...")
+    table = FakeTable({
+        1: qa("How do I reset my password?"),
+        2: qa("How can I change the delivery address of my order?"),
+    })
+    service = fresh_service(table)
+    await service.sync()
+    assert best(service, "How do I reset my password?")["doc_id"] == 1
+
+    table.write(1, qa("How do I cancel my subscription?"))
+    del table.rows[2]
+    await service.notify_changed([1, 2])
+    await service.sync()
+
+    assert best(service, "How do I reset my password?") is None, "stale question still indexed"
+    assert best(service, "How can I cancel my subscription?")["doc_id"] == 1
+    assert best(service, "How can I change the delivery address of my order?") is None, "deleted row still indexed"
+    print("✅ Edited row re-read, deleted row dropped")
+
+
+async def test_unreported_edits_caught_by_full_sync():
+    print("Testing edits nobody reported...")
+    table = FakeTable({1: qa("How do I reset my password?")})
+    service = fresh_service(table)
+    await service.sync()
+
+    table.write(1, qa("Where can I download my invoice?"))
+    service.synced_at = 0.0  # next sync reconciles ids and xmin
+    await service.sync()
+
+    assert best(service, "Where do I download my invoice?")["doc_id"] == 1
+    assert best(service, "How do I reset my password?") is None
+    print("✅ Changed xmin picked up by the periodic reconcile")
+
+
+if __name__ == "__main__":
+    try:
+        test_paraphrases_match()
+        asyncio.run(test_edits_are_reread())
+        asyncio.run(test_unreported_edits_caught_by_full_sync())
+        print("\nAll near-duplicate index tests passed!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        sys.exit(1)
@@ -0,0 +1,78 @@
+"""
+Test script for the translation engine
+
+Runs the engine from two consecutive event loops (as asyncio.run twice does)
+and checks that concurrent requests are still merged into one batch. The
+MarianMT translator is replaced by a scripted one and the Redis cache is
+switched off.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.translation import engine as engine_module
+from app.services.translation.engine import TranslationEngine
+
+
+class ScriptedTranslator:
+    def __init__(self):
+        self.calls = []
+
+    def detect_source_language(self, text):
+        return "ru" if any("а" <= c.lower() <= "я" for c in text) else "en"
+
+    def translate_batch(self, texts, source_lang="ru", target_lang="en"):
+        self.calls.append(list(texts))
+        return [f"[{source_lang}->{target_lang}] {t}" for t in texts]
+
+
+def fresh_engine(translator):
+    engine_module.QueryTranslator.get_instance = classmethod(lambda cls: translator)
+    TranslationEngine._instance = None
+    engine = TranslationEngine()
+    engine.params = {**engine.params, "redis_cache_enabled": False, "batch_max_wait_ms": 20}
+    return engine
+
+
+async def translate(engine, texts):
+    return await asyncio.wait_for(
+        asyncio.gather(*(engine.translate(t) for t in texts)), timeout=5
+    )
+
+
+def test_new_event_loop():
+    print("Testing translation from a second event loop...")
+    translator = ScriptedTranslator()
+    engine = fresh_engine(translator)
+
+    first = asyncio.run(translate(engine, ["привет"]))
+    assert first == ["[ru->en] привет"], first
+
+    # The first loop is closed now; its batcher must not be reused
+    second = asyncio.run(translate(engine, ["как дела", "где заказ"]))
+    assert second == ["[ru->en] как дела", "[ru->en] где заказ"], second
+    assert len(engine._batchers) == 1, engine._batchers
+    print("✅ Second loop got its own batcher, stale one dropped")
+
+
+def test_concurrent_requests_batched():
+    print("Testing that concurrent requests share one generate() call...")
+    translator = ScriptedTranslator()
+    engine = fresh_engine(translator)
+    texts = ["один", "два", "три", "hello"]
+    results = asyncio.run(translate(engine, texts))
+    assert results == ["[ru->en] один", "[ru->en] два", "[ru->en] три", "hello"], results
+    assert translator.calls == [["один", "два", "три"]], translator.calls
+    print("✅ Three Russian texts translated in one batch, English passed through")
+
+
+if __name__ == "__main__":
+    try:
+        test_new_event_loop()
+        test_concurrent_requests_batched()
+        print("\nAll translation engine tests passed!")
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {type(e).__name__}: {e}")
+        sys.exit(1)